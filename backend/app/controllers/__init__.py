@@ -1,4 +1,5 @@
 from .core import router as core_router
 from .tasks import router as tasks_router
+from .async_catalog import router as async_catalog_router
 
-__all__ = ["core_router", "tasks_router"]
+__all__ = ["core_router", "tasks_router", "async_catalog_router"]
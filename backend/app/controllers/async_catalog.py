@@ -0,0 +1,203 @@
+'''
+Variantes asíncronas de los endpoints de catálogo.
+Con DB_ASYNC activado se registran antes que las síncronas y las sustituyen: las consultas usan
+un driver asyncio (aiomysql, o aiosqlite en local) y se multiplexan en el bucle de eventos en
+lugar de ocupar un hilo del threadpool por petición. El trabajo que bloquea sin pasar por la base
+de datos (la caché de consultas y el almacén de resultados en Redis, la búsqueda en el índice en
+memoria y la codificación de las respuestas de la instantánea) se ejecuta en el threadpool con los
+mismos cuerpos que los endpoints síncronos de `core` y `tasks`, para no detener el bucle de eventos.
+'''
+
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Header, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db import CatalogQueries, DatabaseRegistry, get_async_read_session
+from services import CatalogCache, FulltextSearch, SearchIndex, ShardedSearch, SharedIndex
+from utils import get_logger
+
+from . import core
+from .tasks import TaskStatus, finished_task, snapshot_task_products, task_products_query, task_result
+
+logger = get_logger("backend_async_catalog_controller")
+
+router = APIRouter()
+
+
+@router.get("/categories")
+async def get_categories(
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_read_session),
+):
+    logger.info("Solicitando lista de categorías")
+    snapshot = CatalogCache.current()
+    if snapshot is not None:
+        return await run_in_threadpool(core.categories_response, snapshot, accept_encoding, if_none_match)
+    categories = (await session.exec(CatalogQueries.categories())).all()
+    logger.debug(f"Encontradas {len(categories)} categorías")
+    return core.categories_payload(categories)
+
+
+async def fetch_products_page(session: AsyncSession, after_id: Optional[int], limit: int):
+    """Lee hasta `limit` productos con id mayor que `after_id`, ordenados por id."""
+    snapshot = CatalogCache.current()
+    if snapshot is not None:
+        return snapshot.products_after(after_id, limit)
+    return (await session.exec(CatalogQueries.products_page(after_id, limit))).all()
+
+
+async def stream_products(after_id: Optional[int], limit: Optional[int]):
+    """Genera el listado de productos en formato NDJSON leyendo la base de datos por bloques."""
+    # La respuesta se envía después de cerrar la sesión de la petición, así que se abre una propia
+    session = DatabaseRegistry.async_read_session()
+    try:
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = core.PRODUCTS_STREAM_CHUNK if remaining is None else min(core.PRODUCTS_STREAM_CHUNK, remaining)
+            chunk = await fetch_products_page(session, after_id, size)
+            for p in chunk:
+                yield json.dumps({"id": p.id, "name": p.name, "price": p.price}) + "\n"
+            if len(chunk) < size:
+                return
+            after_id = chunk[-1].id
+            if remaining is not None:
+                remaining -= len(chunk)
+    finally:
+        await session.close()
+
+
+@router.get("/products")
+async def get_products(
+    after_id: Optional[int] = Query(None, ge=0, description="Último id de la página anterior"),
+    limit: Optional[int] = Query(None, ge=1, description="Número máximo de productos"),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_read_session),
+):
+    """Variante asíncrona de `GET /products` (paginación por clave y streaming NDJSON incluidos)."""
+    if accept and core.NDJSON_MEDIA_TYPE in accept:
+        logger.info(f"Streaming de productos solicitado - after_id: {after_id}, limit: {limit}")
+        return StreamingResponse(stream_products(after_id, limit), media_type=core.NDJSON_MEDIA_TYPE)
+
+    if after_id is not None or limit is not None:
+        limit = min(limit or core.PRODUCTS_MAX_LIMIT, core.PRODUCTS_MAX_LIMIT)
+        logger.info(f"Solicitando página de productos - after_id: {after_id}, limit: {limit}")
+        products = await fetch_products_page(session, after_id, limit)
+        return await run_in_threadpool(core.products_page_response, products, limit, accept_encoding, if_none_match)
+
+    logger.info("Solicitando lista de productos")
+    snapshot = CatalogCache.current()
+    if snapshot is not None:
+        return await run_in_threadpool(core.products_response, snapshot, accept_encoding, if_none_match)
+    products = (await session.exec(CatalogQueries.products_page())).all()
+    logger.debug(f"Encontrados {len(products)} productos")
+    return core.products_payload(products)
+
+
+async def search_index(session: AsyncSession, snapshot) -> SearchIndex:
+    """
+    Devuelve el índice de búsqueda activo (en modo `shared`, el proyectado en memoria compartida)
+    o, si no se ha construido, uno efímero (construido en el threadpool).
+    """
+    shared = SharedIndex.current() if core.SEARCH_MODE == "shared" else None
+    if shared is not None:
+        return shared
+    index = SearchIndex.current()
+    if index is None and snapshot is not None:
+        # Sin índice precargado se construye uno efímero desde la caché del catálogo
+        index = await run_in_threadpool(SearchIndex.build, snapshot.categories.values(), snapshot.products)
+    elif index is None:
+        logger.warning("Índice de búsqueda no inicializado, construyéndolo desde la base de datos")
+        categories = (await session.exec(CatalogQueries.categories())).all()
+        products = (await session.exec(CatalogQueries.index_products())).all()
+        index = await run_in_threadpool(SearchIndex.build, categories, products)
+    return index
+
+
+async def run_text_search(session: AsyncSession, tokens, limit: int, offset: int, fuzzy, filters):
+    """Resuelve una búsqueda por texto ya tokenizada según el modo configurado."""
+    sharded = ShardedSearch.current()
+    if core.SEARCH_MODE == "sharded" and sharded is not None:
+        return await sharded.search_async(tokens, limit, offset, fuzzy=fuzzy, filters=filters)
+    snapshot = CatalogCache.current()
+    if core.SEARCH_MODE == "fulltext":
+        categories = snapshot.categories.values() if snapshot is not None else None
+        return await FulltextSearch.search_async(session, tokens, limit, offset, categories, filters)
+    index = await search_index(session, snapshot)
+    return await run_in_threadpool(index.search, tokens, limit, offset, fuzzy=fuzzy, filters=filters)
+
+
+async def run_text_search_many(session: AsyncSession, token_lists, limit: int, offset: int, fuzzy, filters):
+    """Resuelve varias búsquedas ya tokenizadas sobre las mismas estructuras del catálogo."""
+    sharded = ShardedSearch.current()
+    if core.SEARCH_MODE == "sharded" and sharded is not None:
+        return await sharded.search_many_async(token_lists, limit, offset, fuzzy=fuzzy, filters=filters)
+    snapshot = CatalogCache.current()
+    if core.SEARCH_MODE == "fulltext":
+        categories = snapshot.categories.values() if snapshot is not None else None
+        return await FulltextSearch.search_many_async(session, token_lists, limit, offset, categories, filters)
+    index = await search_index(session, snapshot)
+    return await run_in_threadpool(index.search_many, token_lists, limit, offset, fuzzy=fuzzy, filters=filters)
+
+
+@router.post("/search/text")
+async def search_text(
+    response: Response,
+    payload: dict = Body(...),
+    cache_control: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_read_session),
+):
+    """Variante asíncrona de `POST /search/text`, con la misma caché y el mismo formato de respuesta."""
+    search, cached = await run_in_threadpool(core.lookup_text_search, response, payload, cache_control)
+    if cached is not None:
+        return cached
+    result = await run_text_search(session, search.tokens, search.limit, search.offset, search.fuzzy, search.filters)
+    return await run_in_threadpool(core.finish_text_search, response, search.key, result)
+
+
+@router.post("/search/text/batch")
+async def search_text_batch(
+    payload: dict = Body(...),
+    cache_control: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_read_session),
+):
+    """Variante asíncrona de `POST /search/text/batch`, con la misma caché y el mismo formato de respuesta."""
+    batch = await run_in_threadpool(core.lookup_batch_search, payload, cache_control)
+    pending = batch.pending()
+    computed = await run_text_search_many(
+        session, [list(tokens) for tokens in pending], batch.limit, batch.offset, batch.fuzzy, batch.filters
+    ) if pending else []
+    return await run_in_threadpool(
+        core.finish_batch_search, batch.normalized, batch.keys, batch.results, dict(zip(pending, computed))
+    )
+
+
+@router.get(
+    "/tasks/{task_id}/result",
+    status_code=status.HTTP_200_OK,
+    responses={
+        202: {"model": TaskStatus, "description": "Tarea pendiente"},
+        404: {"model": TaskStatus, "description": "Tarea no encontrada"},
+    },
+)
+async def get_task_result(task_id: str, session: AsyncSession = Depends(get_async_read_session)):
+    """Variante asíncrona de `GET /tasks/{task_id}/result`."""
+    # El almacén de resultados (y del texto de la búsqueda combinada) es síncrono: se lee en el threadpool
+    category_ids, text_query = await run_in_threadpool(finished_task, task_id)
+    if not category_ids:
+        return {"categories": [], "products": []}
+
+    snapshot = CatalogCache.current()
+    if snapshot is not None:
+        categories, products = snapshot_task_products(snapshot, category_ids)
+    else:
+        categories = (await session.exec(CatalogQueries.categories(category_ids))).all()
+        products = (await session.exec(task_products_query(category_ids, text_query))).all()
+
+    return await run_in_threadpool(task_result, task_id, categories, products, text_query)
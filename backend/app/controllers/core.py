@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Body, UploadFile, File, HTTPException
-from sqlmodel import select
-from db import DatabaseRegistry, Category, Product
-from utils import get_logger
+from fastapi import APIRouter, Body, Depends, UploadFile, File, Form, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+from db import CatalogQueries, DatabaseRegistry, get_read_session
+from services import (
+    CatalogCache, CatalogVersion, FulltextSearch, QueryCache, ResultService, SearchIndex, ShardedSearch, SharedIndex,
+    SuggestIndex,
+)
+from services.encoded_response import JSON_MEDIA_TYPE, EncodedBody
+from services.facet_index import SORTS, SearchFilters
+from utils import get_logger, tokenize
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import orjson
 import requests
+import json
 import os
-import unicodedata
-import re
 
 logger = get_logger("backend_core_controller")
 
@@ -14,6 +23,20 @@ router = APIRouter()
 # Configuración del servicio de inferencia
 INFERENCE_SERVICE_URL = os.getenv("INFERENCE_SERVICE_URL", "http://inference-dev:80")
 
+# Modo de búsqueda por texto: "index" (índice invertido en memoria) o "fulltext" (MATCH ... AGAINST en MariaDB)
+SEARCH_MODE = os.getenv("SEARCH_MODE", "index").lower()
+
+# Paginación de la búsqueda por texto
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", 50))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", 500))
+# Número máximo de consultas de `/search/text/batch`
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", 1000))
+
+# Paginación por clave y streaming NDJSON del listado de productos
+PRODUCTS_MAX_LIMIT = int(os.getenv("PRODUCTS_MAX_LIMIT", 1000))
+PRODUCTS_STREAM_CHUNK = int(os.getenv("PRODUCTS_STREAM_CHUNK", 1000))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 @router.get("/health")
 def health_check():
@@ -21,110 +44,439 @@ def health_check():
     return {"status": "ok"}
 
 
+@router.get("/catalog/version")
+def get_catalog_version():
+    """
+    Devuelve la versión actual del catálogo en memoria.
+    Las cachés derivadas del catálogo pueden compararla para saber si siguen vigentes.
+    """
+    watermark = CatalogVersion.watermark()
+    return {
+        "version": CatalogVersion.current(),
+        "updated_at": watermark.isoformat() if watermark else None,
+    }
+
+
+@router.get("/db/pool/stats")
+def db_pool_stats():
+    """Devuelve la ocupación del pool de conexiones y sus estadísticas de espera."""
+    return DatabaseRegistry.pool_stats()
+
+
+def categories_payload(categories) -> dict:
+    return {"categories": [{"id": c.id, "name": c.name} for c in categories]}
+
+
+def products_payload(products) -> dict:
+    return {"products": [{"id": p.id, "name": p.name, "price": p.price} for p in products]}
+
+
+def products_page_payload(products, limit: int) -> dict:
+    """Cuerpo de una página de `/products` con el `next_after_id` para pedir la siguiente."""
+    return {
+        "products": [{"id": p.id, "name": p.name, "price": p.price} for p in products],
+        "next_after_id": products[-1].id if len(products) == limit else None,
+    }
+
+
+def products_page_response(products, limit: int, accept_encoding: Optional[str],
+                           if_none_match: Optional[str]) -> Response:
+    """
+    Respuesta de una página de `/products`. El ETag es la huella del propio cuerpo, así que siempre
+    corresponde a los productos enviados aunque la huella del catálogo cambie mientras se sustituye
+    la instantánea.
+    """
+    return EncodedBody(products_page_payload(products, limit)).response(accept_encoding, if_none_match)
+
+
+def categories_response(snapshot, accept_encoding: Optional[str], if_none_match: Optional[str]) -> Response:
+    """Respuesta de `/categories` desde la instantánea del catálogo, codificada una vez por instantánea."""
+    return snapshot.encoded(
+        "categories", lambda: categories_payload(snapshot.categories.values())
+    ).response(accept_encoding, if_none_match)
+
+
+def products_response(snapshot, accept_encoding: Optional[str], if_none_match: Optional[str]) -> Response:
+    """Respuesta del listado completo de `/products` desde la instantánea del catálogo."""
+    return snapshot.encoded(
+        "products", lambda: products_payload(snapshot.products.values())
+    ).response(accept_encoding, if_none_match)
+
+
 @router.get("/categories")
-def get_categories():
+def get_categories(
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    session: Session = Depends(get_read_session),
+):
+    """
+    Devuelve las categorías. Con la caché del catálogo cargada el cuerpo se serializa una vez
+    por instantánea y se envía ya codificado (comprimido con gzip si el cliente lo acepta),
+    con un ETag del contenido; si `If-None-Match` coincide se responde 304 sin cuerpo.
+    """
     logger.info("Solicitando lista de categorías")
-    session = DatabaseRegistry.session()
-    categories = session.exec(select(Category)).all()
+    snapshot = CatalogCache.current()
+    if snapshot is not None:
+        return categories_response(snapshot, accept_encoding, if_none_match)
+    categories = session.exec(CatalogQueries.categories()).all()
     logger.debug(f"Encontradas {len(categories)} categorías")
-    return {"categories": [{"id": c.id, "name": c.name} for c in categories]}
+    return categories_payload(categories)
+
+
+def fetch_products_page(session: Session, after_id: Optional[int], limit: int):
+    """Lee hasta `limit` productos con id mayor que `after_id`, ordenados por id."""
+    snapshot = CatalogCache.current()
+    if snapshot is not None:
+        return snapshot.products_after(after_id, limit)
+    return session.exec(CatalogQueries.products_page(after_id, limit)).all()
+
+
+def stream_products(after_id: Optional[int], limit: Optional[int]):
+    """
+    Genera el listado de productos en formato NDJSON (un producto por línea).
+    Las filas se leen por bloques de PRODUCTS_STREAM_CHUNK con paginación por clave,
+    de modo que la memoria usada no depende del tamaño del catálogo.
+    """
+    # La respuesta se envía después de cerrar la sesión de la petición, así que se abre una propia
+    session = DatabaseRegistry.read_session()
+    try:
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = PRODUCTS_STREAM_CHUNK if remaining is None else min(PRODUCTS_STREAM_CHUNK, remaining)
+            chunk = fetch_products_page(session, after_id, size)
+            for p in chunk:
+                yield json.dumps({"id": p.id, "name": p.name, "price": p.price}) + "\n"
+            if len(chunk) < size:
+                return
+            after_id = chunk[-1].id
+            if remaining is not None:
+                remaining -= len(chunk)
+    finally:
+        session.close()
 
 
 @router.get("/products")
-def get_products():
+def get_products(
+    after_id: Optional[int] = Query(None, ge=0, description="Último id de la página anterior"),
+    limit: Optional[int] = Query(None, ge=1, description="Número máximo de productos"),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    session: Session = Depends(get_read_session),
+):
+    """
+    Devuelve el listado de productos.
+    Con `after_id` y/o `limit` se pagina por clave (orden por id) y la respuesta incluye
+    `next_after_id` para pedir la página siguiente. Con `Accept: application/x-ndjson`
+    la respuesta se transmite en streaming, un producto por línea. El listado completo se
+    sirve ya serializado desde la caché del catálogo, como `/categories`. Las respuestas JSON
+    llevan ETag y responden 304 a un `If-None-Match` que coincida.
+    """
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        logger.info(f"Streaming de productos solicitado - after_id: {after_id}, limit: {limit}")
+        return StreamingResponse(stream_products(after_id, limit), media_type=NDJSON_MEDIA_TYPE)
+
+    if after_id is not None or limit is not None:
+        limit = min(limit or PRODUCTS_MAX_LIMIT, PRODUCTS_MAX_LIMIT)
+        logger.info(f"Solicitando página de productos - after_id: {after_id}, limit: {limit}")
+        return products_page_response(fetch_products_page(session, after_id, limit), limit, accept_encoding,
+                                      if_none_match)
+
     logger.info("Solicitando lista de productos")
-    session = DatabaseRegistry.session()
-    products = session.exec(select(Product)).all()
+    snapshot = CatalogCache.current()
+    if snapshot is not None:
+        return products_response(snapshot, accept_encoding, if_none_match)
+    products = session.exec(CatalogQueries.products_page()).all()
     logger.debug(f"Encontrados {len(products)} productos")
-    return {"products": [{"id": p.id, "name": p.name, "price": p.price} for p in products]}
+    return products_payload(products)
 
 
-@router.post("/search/text")
-def search_text(payload: dict = Body(...)):
+def parse_pagination(payload: dict):
+    """Valida los parámetros `limit` y `offset` de una búsqueda."""
+    try:
+        limit = int(payload.get("limit", SEARCH_DEFAULT_LIMIT))
+        offset = int(payload.get("offset", 0))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="limit y offset deben ser números enteros")
+    if limit < 1 or offset < 0:
+        raise HTTPException(status_code=422, detail="limit debe ser positivo y offset no negativo")
+    return min(limit, SEARCH_MAX_LIMIT), offset
+
+
+def parse_text_search(payload: dict):
+    """Valida y normaliza el cuerpo de `/search/text`: devuelve (query, tokens, limit, offset, fuzzy)."""
     query = payload.get("query", "").lower()
-    logger.info(f"Búsqueda de texto solicitada - query: '{query}'")
-
-    # Normalizar texto: quitar tildes y signos de puntuación
-    def normalize(text):
-        text = unicodedata.normalize('NFD', text)
-        text = text.encode('ascii', 'ignore').decode('utf-8')
-        text = re.sub(r'[\W_]+', ' ', text)
-        return text.lower()
-    query_norm = normalize(query)
-    tokens = query_norm.split()
-
-    # Diccionario de palabras clave por categoría
-    category_keywords = {
-        "camisetas": ["camiseta", "camisa", "polo"],
-        "pantalones": ["pantalon", "jean", "vaquero", "bermuda", "chino"],
-        "zapatos": ["zapato", "zapatilla", "calzado"],
-        "telefonos": ["telefono", "movil", "smartphone", "celular"],
-        "portatiles": ["portatil", "laptop", "notebook", "ordenador"],
-        "otros": ["otros"]
-    }
+    limit, offset = parse_pagination(payload)
+    fuzzy = payload.get("fuzzy")
+    fuzzy = None if fuzzy is None else bool(fuzzy)
+    logger.info(f"Búsqueda de texto solicitada - query: '{query}', limit: {limit}, offset: {offset}")
+    # Normalizar texto (quitar tildes y signos de puntuación) y tokenizar
+    return query, tokenize(query), limit, offset, fuzzy
+
+
+def parse_search_filters(payload: dict) -> SearchFilters:
+    """Valida los filtros opcionales de `/search/text` (`min_price`, `max_price`, `categories`, `sort`, `facets`)."""
+    try:
+        min_price = None if payload.get("min_price") is None else float(payload["min_price"])
+        max_price = None if payload.get("max_price") is None else float(payload["max_price"])
+        categories = tuple(sorted({int(cid) for cid in payload.get("categories") or ()}))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="min_price, max_price y categories deben ser numéricos")
+    sort = payload.get("sort") or "relevance"
+    if sort not in SORTS:
+        raise HTTPException(status_code=422, detail=f"sort debe ser uno de: {', '.join(SORTS)}")
+    return SearchFilters(min_price, max_price, categories, sort, bool(payload.get("facets", False)))
 
-    # Buscar coincidencias de palabras clave
-    matched = set()
-    for cat, keywords in category_keywords.items():
-        for kw in keywords:
-            if kw in tokens:
-                matched.add(cat)
-    logger.debug(f"Categorías encontradas: {matched}")
-
-    session = DatabaseRegistry.session()
-    all_cats = session.exec(select(Category)).all()
-    products = session.exec(select(Product)).all()
-
-    # Obtener ids de categorías coincidentes ignorando mayúsculas/minúsculas y tildes
-    def normalize_cat_name(name):
-        name = unicodedata.normalize('NFD', name)
-        name = name.encode('ascii', 'ignore').decode('utf-8')
-        return name.lower()
-    matched_ids = [c.id for c in all_cats if normalize_cat_name(c.name) in matched]
-    filtered = [p for p in products if p.category_id in matched_ids]
-
-    # búsqueda por palabra en nombre o descripción (palabra completa, no subcadena) ---
-    # Para cada producto, separar el nombre y descripción en palabras y buscar
-    # coincidencias exactas con las palabras de la query
-    extra_products = []
-    query_words = set(tokens)
-    for p in products:
-        name_words = set(normalize(p.name).split())
-        desc_words = set(normalize(p.description or '').split())
-        # Coincidencia si alguna palabra de la query está exactamente en el nombre o descripción
-        if query_words & (name_words | desc_words):
-            if p not in filtered:
-                extra_products.append(p)
-    filtered.extend(extra_products)
-
-    logger.info(f"Búsqueda completada - {len(matched)} categorías, {len(filtered)} productos")
-
-    # Devolver nombres de categoría reales (capitalizados) para la respuesta
-    matched_names = [c.name for c in all_cats if c.id in matched_ids]
-    # Si no se detectó ninguna categoría pero hay productos, añadir la categoría de cada producto a categories (únicas)
-    if not matched_names and filtered:
-        matched_names = list({next((c.name for c in all_cats if c.id == p.category_id),
-                                   None) for p in filtered if p.category_id})
+
+def search_cache_key(payload: dict, cache_control: Optional[str], tokens, limit: int, offset: int, fuzzy,
+                     filters: SearchFilters):
+    """Devuelve la clave de caché de una búsqueda, o None si la petición no debe usar la caché."""
+    if (not QueryCache.enabled() or payload.get("cache", True) is False
+            or "no-cache" in (cache_control or "").lower()):
+        return None
+    return QueryCache.make_key(tokens, mode=SEARCH_MODE, limit=limit, offset=offset, fuzzy=fuzzy, **filters._asdict())
+
+
+class TextSearch(NamedTuple):
+    """Búsqueda de `/search/text` ya validada y normalizada, con su clave de caché (None si no se usa)."""
+    query: str
+    tokens: List[str]
+    limit: int
+    offset: int
+    fuzzy: Optional[bool]
+    filters: SearchFilters
+    key: Optional[str]
+
+
+def lookup_text_search(response: Response, payload: dict,
+                       cache_control: Optional[str]) -> Tuple[TextSearch, Optional[dict]]:
+    """
+    Valida una búsqueda de `/search/text` y la busca en la caché (que puede consultar Redis).
+    Devuelve la búsqueda y el resultado cacheado, o None si hay que resolverla.
+    """
+    query, tokens, limit, offset, fuzzy = parse_text_search(payload)
+    filters = parse_search_filters(payload)
+    key = search_cache_key(payload, cache_control, tokens, limit, offset, fuzzy, filters)
+    cached = QueryCache.get(key) if key else None
+    if cached is not None:
+        logger.debug(f"Búsqueda servida desde caché - query: '{query}'")
+        response.headers["X-Cache"] = "HIT"
+    return TextSearch(query, tokens, limit, offset, fuzzy, filters, key), cached
+
+
+def finish_text_search(response: Response, key: Optional[str], result: dict) -> dict:
+    """Registra el resultado de una búsqueda, lo guarda en caché si procede y marca la cabecera `X-Cache`."""
+    logger.info(f"Búsqueda completada ({SEARCH_MODE}) - {len(result['categories'])} categorías, "
+                f"{len(result['products'])} de {result['total']} productos")
+    if key:
+        QueryCache.set(key, result)
+        response.headers["X-Cache"] = "MISS"
+    else:
+        response.headers["X-Cache"] = "BYPASS"
+    return result
+
+
+def search_index(session: Session, snapshot) -> SearchIndex:
+    """
+    Devuelve el índice de búsqueda activo (en modo `shared`, el proyectado en memoria compartida)
+    o, si no se ha construido, uno efímero.
+    """
+    shared = SharedIndex.current() if SEARCH_MODE == "shared" else None
+    if shared is not None:
+        return shared
+    index = SearchIndex.current()
+    if index is None and snapshot is not None:
+        # Sin índice precargado se construye uno efímero desde la caché del catálogo
+        index = SearchIndex.build(snapshot.categories.values(), snapshot.products)
+    elif index is None:
+        logger.warning("Índice de búsqueda no inicializado, construyéndolo desde la base de datos")
+        index = SearchIndex.from_session(session)
+    return index
+
+
+def run_text_search(session: Session, tokens, limit: int, offset: int, fuzzy, filters: SearchFilters):
+    """Resuelve una búsqueda por texto ya tokenizada según el modo configurado."""
+    sharded = ShardedSearch.current()
+    if SEARCH_MODE == "sharded" and sharded is not None:
+        return sharded.search(tokens, limit, offset, fuzzy=fuzzy, filters=filters)
+    snapshot = CatalogCache.current()
+    if SEARCH_MODE == "fulltext":
+        categories = snapshot.categories.values() if snapshot is not None else None
+        return FulltextSearch.search(session, tokens, limit, offset, categories, filters)
+    return search_index(session, snapshot).search(tokens, limit, offset, fuzzy=fuzzy, filters=filters)
+
+
+def run_text_search_many(session: Session, token_lists, limit: int, offset: int, fuzzy, filters: SearchFilters):
+    """Resuelve varias búsquedas ya tokenizadas sobre las mismas estructuras del catálogo."""
+    sharded = ShardedSearch.current()
+    if SEARCH_MODE == "sharded" and sharded is not None:
+        return sharded.search_many(token_lists, limit, offset, fuzzy=fuzzy, filters=filters)
+    snapshot = CatalogCache.current()
+    if SEARCH_MODE == "fulltext":
+        categories = snapshot.categories.values() if snapshot is not None else None
+        return FulltextSearch.search_many(session, token_lists, limit, offset, categories, filters)
+    return search_index(session, snapshot).search_many(token_lists, limit, offset, fuzzy=fuzzy, filters=filters)
+
+
+@router.post("/search/text")
+def search_text(
+    response: Response,
+    payload: dict = Body(...),
+    cache_control: Optional[str] = Header(None),
+    session: Session = Depends(get_read_session),
+):
+    """
+    Busca productos por texto y los devuelve ordenados por relevancia (BM25).
+    Acepta `limit` (por defecto SEARCH_DEFAULT_LIMIT, máximo SEARCH_MAX_LIMIT) y `offset`
+    para paginar; `total` indica el número de productos que coinciden.
+    Con `fuzzy` a false se desactiva la corrección de erratas para esa petición.
+    `min_price`, `max_price` y `categories` (ids) filtran el resultado, `sort` lo ordena por
+    relevancia (`relevance`), `price_asc` o `price_desc`, y `"facets": true` añade los recuentos
+    por categoría y tramo de precio. Sin texto en `query`, los filtros se aplican a todo el catálogo.
+    Los resultados se cachean por consulta normalizada y versión del catálogo; `"cache": false`
+    en el cuerpo o la cabecera `Cache-Control: no-cache` omiten la caché (cabecera `X-Cache`).
+    Al ser un POST, la respuesta no lleva ETag ni es reutilizable por proxies (RFC 9110).
+    """
+    search, cached = lookup_text_search(response, payload, cache_control)
+    if cached is not None:
+        return cached
+    result = run_text_search(session, search.tokens, search.limit, search.offset, search.fuzzy, search.filters)
+    return finish_text_search(response, search.key, result)
+
+
+def parse_batch_search(payload: dict):
+    """
+    Valida el cuerpo de `/search/text/batch` y normaliza todas sus consultas en una pasada.
+    Devuelve (tokens de cada consulta, limit, offset, fuzzy, filtros); las consultas que se
+    normalizan igual (mayúsculas, tildes, orden de las palabras) comparten los mismos tokens.
+    """
+    queries = payload.get("queries")
+    if not isinstance(queries, list) or not queries or not all(isinstance(query, str) for query in queries):
+        raise HTTPException(status_code=422, detail="queries debe ser una lista no vacía de textos")
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=422, detail=f"Como máximo {SEARCH_BATCH_MAX_QUERIES} consultas por lote")
+    limit, offset = parse_pagination(payload)
+    fuzzy = payload.get("fuzzy")
+    fuzzy = None if fuzzy is None else bool(fuzzy)
+    filters = parse_search_filters(payload)
+    normalized = {query: tuple(sorted(set(tokenize(query.lower())))) for query in dict.fromkeys(queries)}
+    logger.info(f"Búsqueda por lotes solicitada - {len(queries)} consultas, {len(set(normalized.values()))} distintas")
+    return normalized, limit, offset, fuzzy, filters
+
+
+def batch_cache_keys(payload: dict, cache_control: Optional[str], normalized: Dict[str, Tuple[str, ...]],
+                     limit: int, offset: int, fuzzy, filters: SearchFilters) -> Dict[Tuple[str, ...], Optional[str]]:
+    """Devuelve la clave de caché de cada consulta distinta del lote (None si no se usa la caché)."""
     return {
-        "categories": matched_names,
-        "products": [
-            {
-                "id": p.id,
-                "name": p.name,
-                "price": p.price,
-                "category": next((c.name for c in all_cats if c.id == p.category_id), None)
-            }
-            for p in filtered
-        ]
+        tokens: search_cache_key(payload, cache_control, list(tokens), limit, offset, fuzzy, filters)
+        for tokens in dict.fromkeys(normalized.values())
     }
 
 
-@router.post("/search/image")
-async def search_image(file: UploadFile = File(...)):
+def cached_batch_results(keys: Dict[Tuple[str, ...], Optional[str]]) -> Dict[Tuple[str, ...], dict]:
+    """Busca en la caché, con una sola operación, los resultados de las consultas del lote."""
+    found = QueryCache.get_many([key for key in keys.values() if key])
+    return {tokens: found[key] for tokens, key in keys.items() if key in found}
+
+
+class BatchSearch(NamedTuple):
+    """Lote de `/search/text/batch` ya validado, con las claves de caché y los resultados encontrados en ella."""
+    normalized: Dict[str, Tuple[str, ...]]
+    limit: int
+    offset: int
+    fuzzy: Optional[bool]
+    filters: SearchFilters
+    keys: Dict[Tuple[str, ...], Optional[str]]
+    results: Dict[Tuple[str, ...], dict]
+
+    def pending(self) -> List[Tuple[str, ...]]:
+        """Consultas distintas del lote que no estaban en la caché."""
+        return [tokens for tokens in self.keys if tokens not in self.results]
+
+
+def lookup_batch_search(payload: dict, cache_control: Optional[str]) -> BatchSearch:
+    """Valida un lote de `/search/text/batch` y busca en la caché los resultados de sus consultas."""
+    normalized, limit, offset, fuzzy, filters = parse_batch_search(payload)
+    keys = batch_cache_keys(payload, cache_control, normalized, limit, offset, fuzzy, filters)
+    return BatchSearch(normalized, limit, offset, fuzzy, filters, keys, cached_batch_results(keys))
+
+
+def finish_batch_search(normalized: Dict[str, Tuple[str, ...]], keys: Dict[Tuple[str, ...], Optional[str]],
+                        results: Dict[Tuple[str, ...], dict], computed: Dict[Tuple[str, ...], dict]) -> Response:
+    """Guarda en caché los resultados calculados y compone la respuesta por consulta."""
+    QueryCache.set_many({keys[tokens]: result for tokens, result in computed.items() if keys[tokens]})
+    results.update(computed)
+    logger.info(f"Búsqueda por lotes completada - {len(computed)} resueltas, {len(keys) - len(computed)} desde caché")
+    # El cuerpo puede tener miles de resultados: se serializa directamente con orjson
+    body = {"results": {query: results[tokens] for query, tokens in normalized.items()}}
+    return Response(orjson.dumps(body), media_type=JSON_MEDIA_TYPE)
+
+
+@router.post("/search/text/batch")
+def search_text_batch(
+    payload: dict = Body(...),
+    cache_control: Optional[str] = Header(None),
+    session: Session = Depends(get_read_session),
+):
     """
-    Recibe una imagen enviada por el usuario, encola una tarea de inferencia y devuelve un task_id.
+    Resuelve varias búsquedas por texto en una sola petición.
+    `queries` es la lista de textos (como máximo SEARCH_BATCH_MAX_QUERIES); `limit`, `offset`,
+    `fuzzy` y los filtros de `/search/text` se aplican a todas. Las consultas se normalizan en una
+    pasada, las que coinciden tras normalizar se resuelven una vez y el resto se resuelve sobre el
+    mismo índice y la misma sesión. Devuelve `results`, con el resultado de cada consulta por su texto.
+    """
+    batch = lookup_batch_search(payload, cache_control)
+    pending = batch.pending()
+    computed = run_text_search_many(
+        session, [list(tokens) for tokens in pending], batch.limit, batch.offset, batch.fuzzy, batch.filters
+    ) if pending else []
+    return finish_batch_search(batch.normalized, batch.keys, batch.results, dict(zip(pending, computed)))
+
+
+@router.get("/search/cache/stats")
+def search_cache_stats():
+    """Devuelve los contadores de aciertos y fallos de la caché de resultados de búsqueda."""
+    return QueryCache.stats()
+
+
+@router.get("/search/suggest")
+def search_suggest(
+    q: str = Query(..., description="Texto introducido hasta el momento"),
+    limit: int = Query(10, ge=1, le=SuggestIndex.MAX_LIMIT, description="Número máximo de sugerencias"),
+):
+    """
+    Devuelve completados para búsqueda mientras se escribe.
+    Las sugerencias (nombres de producto, términos de descripción y palabras clave de categoría,
+    normalizados) se ordenan por frecuencia y se resuelven en memoria sin consultar la base de datos.
+    En modo `sharded` cada fragmento completa el prefijo y se mezclan sus sugerencias. En modo
+    `fulltext`, sin índice en memoria, se completan los nombres de producto con el índice de
+    `product.name_normalized`.
+    """
+    sharded = ShardedSearch.current()
+    if SEARCH_MODE == "sharded" and sharded is not None:
+        suggestions = sharded.suggest(q, limit)
+    elif SEARCH_MODE == "fulltext":
+        # La sesión solo se abre en este modo: los demás responden sin base de datos
+        session = DatabaseRegistry.read_session()
+        try:
+            suggestions = FulltextSearch.suggest(session, q, limit)
+        finally:
+            session.close()
+    else:
+        # El índice se construye al arrancar y en el refresco del catálogo, nunca en la petición;
+        # en modo `shared` se proyecta con cada versión del índice compartido
+        shared = SharedIndex.current() if SEARCH_MODE == "shared" else None
+        suggest_index = shared.suggester if shared is not None else SuggestIndex.current()
+        suggestions = suggest_index.suggest(q, limit) if suggest_index is not None else []
+    logger.debug(f"Sugerencias para '{q}': {len(suggestions)}")
+    return {"query": q, "suggestions": suggestions}
+
+
+async def submit_image(file: UploadFile) -> str:
+    """
+    Envía una imagen al servicio de inferencia y devuelve el task_id de la tarea creada.
+    Lanza un HTTPException 400 si el archivo no es una imagen y 500 si falla el servicio de inferencia.
     """
-    logger.info(f"Búsqueda por imagen solicitada - archivo: {file.filename}")
     try:
         # Verificar que el archivo sea una imagen
         if not file.content_type or not file.content_type.startswith("image/"):
@@ -138,7 +490,8 @@ async def search_image(file: UploadFile = File(...)):
         # Enviar la imagen al servicio de inferencia
         files = {"file": (file.filename, file_data, file.content_type)}
         logger.debug(f"Enviando imagen al servicio de inferencia: {INFERENCE_SERVICE_URL}")
-        response = requests.post(
+        response = await run_in_threadpool(
+            requests.post,
             f"{INFERENCE_SERVICE_URL}/infer/image",
             files=files,
             timeout=30
@@ -153,7 +506,7 @@ async def search_image(file: UploadFile = File(...)):
 
         result = response.json()
         logger.info(f"Tarea de inferencia creada exitosamente - task_id: {result['task_id']}")
-        return {"task_id": result["task_id"]}
+        return result["task_id"]
     except HTTPException as e:
         raise e
     except requests.RequestException as e:
@@ -168,3 +521,36 @@ async def search_image(file: UploadFile = File(...)):
             status_code=500,
             detail=f"Error interno del servidor: {str(e)}"
         )
+
+
+@router.post("/search/image")
+async def search_image(file: UploadFile = File(...)):
+    """
+    Recibe una imagen enviada por el usuario, encola una tarea de inferencia y devuelve un task_id.
+    """
+    logger.info(f"Búsqueda por imagen solicitada - archivo: {file.filename}")
+    return {"task_id": await submit_image(file)}
+
+
+# Modos de `/search/combined`: reordenar los productos de la imagen por el texto o quedarse solo con los que coinciden
+COMBINED_MATCH_MODES = ("rerank", "filter")
+
+
+@router.post("/search/combined")
+async def search_combined(file: UploadFile = File(...), query: str = Form(...), match: str = Form("rerank")):
+    """
+    Búsqueda combinada por imagen y texto en una sola petición.
+    Encola la inferencia de la imagen como `/search/image` y asocia el texto a la tarea: al consultar
+    `/tasks/{task_id}/result`, los productos de las categorías predichas se reordenan por su puntuación
+    para el texto (`match=rerank`) o se reducen a los que coinciden con él (`match=filter`),
+    en una sola pasada sobre esos productos.
+    """
+    logger.info(f"Búsqueda combinada solicitada - archivo: {file.filename}, query: '{query}', match: {match}")
+    if match not in COMBINED_MATCH_MODES:
+        raise HTTPException(status_code=422, detail=f"match debe ser uno de: {', '.join(COMBINED_MATCH_MODES)}")
+    task_id = await submit_image(file)
+    tokens = tokenize(query)
+    if tokens:
+        # El texto puede guardarse en Redis: se escribe en el threadpool para no bloquear el bucle de eventos
+        await run_in_threadpool(ResultService().store_text_query, task_id, tokens, match == "filter")
+    return {"task_id": task_id}
@@ -3,13 +3,15 @@ API para la gestión de tareas.
 Este módulo proporciona endpoints para consultar el estado y los resultados de tareas de inferencia.
 '''
 
-from fastapi import APIRouter, HTTPException, status
+from typing import Any, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from utils import get_logger
 
-from services import ResultService
-from db import Category, Product, DatabaseRegistry
-from sqlmodel import select
+from services import CatalogCache, ResultService, SearchIndex
+from db import CatalogQueries, Product, get_read_session
+from sqlmodel import Session
 
 logger = get_logger("backend_tasks_controller")
 
@@ -21,23 +23,10 @@ class TaskStatus(BaseModel):
     status: str
 
 
-@router.get(
-    "/tasks/{task_id}/result",
-    status_code=status.HTTP_200_OK,
-    responses={
-        202: {"model": TaskStatus, "description": "Tarea pendiente"},
-        404: {"model": TaskStatus, "description": "Tarea no encontrada"},
-    },
-)
-async def get_task_result(task_id: str):
+def predicted_category_ids(task_id: str) -> List[int]:
     """
-    Consulta el resultado de una tarea de inferencia.
-    Args:
-        task_id: Identificador único de la tarea.
-    Returns:
-        Si la tarea está completada, devuelve las categorías predichas y los productos asociados.
-        Si la tarea aún está en proceso, devuelve un estado "pending" con código HTTP 202.
-        Si la tarea no existe, devuelve un error 404.
+    Devuelve los ids de las categorías predichas para una tarea que superan el umbral de confianza.
+    Lanza un HTTPException 202 si la tarea aún está en proceso.
     """
     logger.info(f"Consultando resultado de tarea: {task_id}")
     result_service = ResultService()
@@ -59,27 +48,68 @@ async def get_task_result(task_id: str):
 
     if not filtered_predictions:
         logger.info(f"Tarea {task_id} - No hay predicciones que superen el umbral")
-        return {"categories": [], "products": []}
+        return []
 
     # Obtener categorías predichas
     category_ids = [p.label for p in filtered_predictions]
     logger.debug(f"IDs de categorías predichas: {category_ids}")
 
-    # Buscar productos asociados a las categorías predichas
-    session = DatabaseRegistry.session()
-    categories = session.exec(
-        select(Category).where(Category.id.in_(category_ids))
-    ).all()
+    return category_ids
+
+
+def task_products_query(category_ids: List[int], text_query: Optional[Tuple[List[str], bool]]):
+    """
+    Consulta de los productos de las categorías predichas cuando no hay caché del catálogo.
+    En una búsqueda combinada sin índice de búsqueda activo se leen también los campos indexados,
+    para poder puntuar el texto sobre las propias filas.
+    """
+    if text_query is not None and SearchIndex.current() is None:
+        return CatalogQueries.index_products(Product.category_id.in_(category_ids))
+    return CatalogQueries.products_in(category_ids)
+
+
+def refine_products(products: List[Any], text_query: Optional[Tuple[List[str], bool]]) -> List[Any]:
+    """
+    Aplica el texto de una búsqueda combinada a los productos de las categorías predichas:
+    los reordena por coincidencia con el texto (o descarta los que no coinciden) en una sola pasada,
+    sin volver a recorrer el catálogo.
+    """
+    if text_query is None:
+        return products
+    tokens, only_matches = text_query
+    index = SearchIndex.current()
+    if index is None:
+        # Sin índice activo se indexan solo los productos de las categorías predichas
+        index = SearchIndex.build([], products)
+    return index.rerank(products, tokens, only_matches)
+
+
+def finished_task(task_id: str) -> Tuple[List[int], Optional[Tuple[List[str], bool]]]:
+    """
+    Lee del almacén de resultados las categorías predichas de una tarea terminada y el texto de su
+    búsqueda combinada, que se elimina al leerlo. Lanza las mismas excepciones que `predicted_category_ids`.
+    """
+    category_ids = predicted_category_ids(task_id)
+    return category_ids, ResultService().pop_text_query(task_id)
+
+
+def snapshot_task_products(snapshot, category_ids: List[int]) -> Tuple[List[Any], Any]:
+    """Categorías y productos de las categorías predichas leídos de la instantánea del catálogo."""
+    categories = [snapshot.categories[cid] for cid in sorted(set(category_ids)) if cid in snapshot.categories]
+    return categories, snapshot.products_in(category_ids)
+
 
+def task_result(task_id: str, categories, products, text_query: Optional[Tuple[List[str], bool]]) -> dict:
+    """Aplica el texto de la búsqueda combinada a los productos y construye la respuesta de la tarea."""
+    return task_result_payload(task_id, categories, refine_products(products, text_query))
+
+
+def task_result_payload(task_id: str, categories, products) -> dict:
+    """Construye la respuesta de `/tasks/{task_id}/result` a partir de las categorías y productos encontrados."""
     # Obtener nombres de categorías
     category_names = [category.name for category in categories]
     logger.debug(f"Nombres de categorías encontradas: {category_names}")
 
-    # Buscar productos de las categorías
-    products = session.exec(
-        select(Product).where(Product.category_id.in_(category_ids))
-    ).all()
-
     logger.info(f"Tarea {task_id} completada exitosamente - {len(category_names)} categorías, {len(products)} productos")
 
     return {
@@ -89,3 +119,40 @@ async def get_task_result(task_id: str):
             for p in products
         ],
     }
+
+
+@router.get(
+    "/tasks/{task_id}/result",
+    status_code=status.HTTP_200_OK,
+    responses={
+        202: {"model": TaskStatus, "description": "Tarea pendiente"},
+        404: {"model": TaskStatus, "description": "Tarea no encontrada"},
+    },
+)
+def get_task_result(task_id: str, session: Session = Depends(get_read_session)):
+    """
+    Consulta el resultado de una tarea de inferencia.
+    Es síncrono para que FastAPI lo ejecute en el threadpool: el almacén de resultados (Redis),
+    la consulta a la base de datos y el reordenado por el texto bloquean.
+    Args:
+        task_id: Identificador único de la tarea.
+    Returns:
+        Si la tarea está completada, devuelve las categorías predichas y los productos asociados
+        (reordenados por el texto si la tarea es una búsqueda combinada de `/search/combined`).
+        Si la tarea aún está en proceso, devuelve un estado "pending" con código HTTP 202.
+        Si la tarea no existe, devuelve un error 404.
+    """
+    # La tarea ha terminado: el texto de la búsqueda combinada se lee una sola vez y se elimina
+    category_ids, text_query = finished_task(task_id)
+    if not category_ids:
+        return {"categories": [], "products": []}
+
+    # Buscar productos asociados a las categorías predichas
+    snapshot = CatalogCache.current()
+    if snapshot is not None:
+        categories, products = snapshot_task_products(snapshot, category_ids)
+    else:
+        categories = session.exec(CatalogQueries.categories(category_ids)).all()
+        products = session.exec(task_products_query(category_ids, text_query)).all()
+
+    return task_result(task_id, categories, products, text_query)
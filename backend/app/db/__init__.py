@@ -1,4 +1,19 @@
-from .registry import DatabaseRegistry
+from .registry import DatabaseRegistry, get_async_read_session, get_async_session, get_read_session, get_session
 from .entities import Category, Product, CategoryTypes
+from .migrations import SchemaMigrations
+from .projections import CatalogQueries
+from .query_plans import QueryPlanCheck
 
-__all__ = ["DatabaseRegistry", "Category", "Product", "CategoryTypes"]
+__all__ = [
+    "DatabaseRegistry",
+    "get_session",
+    "get_read_session",
+    "get_async_session",
+    "get_async_read_session",
+    "Category",
+    "Product",
+    "CategoryTypes",
+    "SchemaMigrations",
+    "CatalogQueries",
+    "QueryPlanCheck",
+]
@@ -1,13 +1,46 @@
 """ Product entity representation for SQLAlchemy ORM. """
 
+from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index, event, func
 from sqlmodel import SQLModel, Field
 
+from utils import normalize
+
+
+def normalize_product_name(name: Optional[str]) -> Optional[str]:
+    """Returns the product name as stored in `name_normalized`: lowercase, without accents or punctuation."""
+    if name is None:
+        return None
+    return " ".join(normalize(name).split())
+
 
 class Product(SQLModel, table=True):
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # Índice FULLTEXT para la búsqueda delegada en MariaDB (SEARCH_MODE=fulltext)
+        Index(
+            "ft_product_name_description", "name", "description", mysql_prefix="FULLTEXT"
+        ).ddl_if(dialect=("mysql", "mariadb")),
+        # Productos de una categoría (resultado de tareas) y filtros de precio dentro de ella
+        Index("ix_product_category_price", "category_id", "price"),
+        {"extend_existing": True},
+    )
     id: int = Field(primary_key=True)
     name: str
     description: Optional[str] = None
     price: float
     category_id: int = Field(foreign_key="category.id")
+    # Marca de agua de cambios: la base de datos la actualiza en cada INSERT/UPDATE
+    updated_at: Optional[datetime] = Field(
+        default=None,
+        index=True,
+        sa_column_kwargs={"server_default": func.current_timestamp(), "onupdate": func.current_timestamp()},
+    )
+    # Nombre normalizado para filtros por nombre con índice; se mantiene desde `name` al escribir
+    name_normalized: Optional[str] = Field(default=None, max_length=255, index=True)
+
+
+@event.listens_for(Product, "before_insert")
+@event.listens_for(Product, "before_update")
+def _set_name_normalized(mapper, connection, target: Product) -> None:
+    target.name_normalized = normalize_product_name(target.name)
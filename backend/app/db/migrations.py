@@ -0,0 +1,199 @@
+"""Versioned schema migrations for the backend database."""
+
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import Column, DateTime, Engine, Integer, MetaData, String, Table, bindparam, func, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+from utils import get_logger
+
+from .entities import Product
+from .entities.product import normalize_product_name
+
+logger = get_logger("backend_db_migrations")
+
+BACKFILL_BATCH_SIZE = 5000
+# Lock name used on MariaDB so that several backend replicas starting at once migrate only once
+MIGRATION_LOCK = "ecommerce_schema_migrations"
+# SQLite trigger that stamps `product.updated_at` on every update
+UPDATED_AT_TRIGGER = "trg_product_updated_at"
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    """A schema change. `upgrade` must be idempotent: databases created by `init.sql` or by
+    `create_all` may already contain part of the change."""
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _has_index(connection: Connection, table: str, name: str) -> bool:
+    return any(index["name"] == name for index in inspect(connection).get_indexes(table))
+
+
+def _has_column(connection: Connection, table: str, name: str) -> bool:
+    return any(column["name"] == name for column in inspect(connection).get_columns(table))
+
+
+def _create_index(connection: Connection, name: str) -> None:
+    index = next(index for index in Product.__table__.indexes if index.name == name)
+    if not _has_index(connection, "product", name):
+        index.create(connection)
+
+
+def create_initial_schema(connection: Connection) -> None:
+    SQLModel.metadata.create_all(connection)
+
+
+def add_category_price_index(connection: Connection) -> None:
+    _create_index(connection, "ix_product_category_price")
+
+
+def _is_mariadb(connection: Connection) -> bool:
+    return connection.dialect.name in ("mysql", "mariadb")
+
+
+def add_updated_at(connection: Connection) -> None:
+    if not _has_column(connection, "product", "updated_at"):
+        if _is_mariadb(connection):
+            connection.execute(text(
+                "ALTER TABLE product ADD COLUMN updated_at TIMESTAMP(6) NOT NULL "
+                "DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"
+            ))
+        else:
+            # SQLite does not accept a non-constant default in ADD COLUMN: existing rows are stamped below
+            connection.execute(text("ALTER TABLE product ADD COLUMN updated_at DATETIME"))
+            table = Product.__table__
+            connection.execute(
+                table.update().where(table.c.updated_at.is_(None)).values(updated_at=func.current_timestamp())
+            )
+    _create_index(connection, "ix_product_updated_at")
+
+
+def add_fulltext_index(connection: Connection) -> None:
+    # The FULLTEXT index only exists on MariaDB (SEARCH_MODE=fulltext)
+    if _is_mariadb(connection):
+        _create_index(connection, "ft_product_name_description")
+
+
+def add_name_normalized(connection: Connection) -> None:
+    if not _has_column(connection, "product", "name_normalized"):
+        connection.execute(text("ALTER TABLE product ADD COLUMN name_normalized VARCHAR(255)"))
+    _create_index(connection, "ix_product_name_normalized")
+    # Rellena la columna por bloques de ids para no cargar toda la tabla en memoria
+    table = Product.__table__
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(table.c.id, table.c.name)
+            .where(table.c.id > last_id, table.c.name_normalized.is_(None))
+            .order_by(table.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        # `updated_at` se asigna a sí misma para que el relleno no mueva la marca de agua del catálogo
+        connection.execute(
+            table.update().where(table.c.id == bindparam("row_id")).values(
+                name_normalized=bindparam("value"), updated_at=table.c.updated_at
+            ),
+            [{"row_id": row.id, "value": normalize_product_name(row.name)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def maintain_updated_at(connection: Connection) -> None:
+    # The ORM `onupdate` only covers writes made through the models: the database must move the
+    # watermark itself for bulk SQL and any other write that bypasses them
+    table = Product.__table__
+    if _is_mariadb(connection):
+        connection.execute(table.update().where(table.c.updated_at.is_(None)).values(updated_at=func.now(6)))
+        connection.execute(text(
+            "ALTER TABLE product MODIFY COLUMN updated_at TIMESTAMP(6) NOT NULL "
+            "DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"
+        ))
+    elif connection.dialect.name == "sqlite":
+        # SQLite has no ON UPDATE clause. The trigger only stamps updates that leave `updated_at`
+        # untouched, so writes that set it explicitly (the ORM, the ingest upsert) keep their value
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {UPDATED_AT_TRIGGER} AFTER UPDATE ON product "
+            "FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at "
+            "BEGIN UPDATE product SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END"
+        ))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Esquema inicial (category, product)", create_initial_schema),
+    Migration(2, "Índice product(category_id, price)", add_category_price_index),
+    Migration(3, "Columna product.updated_at con índice", add_updated_at),
+    Migration(4, "Índice FULLTEXT product(name, description)", add_fulltext_index),
+    Migration(5, "Columna product.name_normalized con índice", add_name_normalized),
+    Migration(6, "product.updated_at mantenida por la base de datos", maintain_updated_at),
+]
+
+
+class SchemaMigrations:
+    """Applies the pending migrations in order and records each one in `schema_version`."""
+
+    @staticmethod
+    def current_version(engine: Engine) -> int:
+        """Returns the version of the last migration applied, or 0 on an empty database."""
+        with engine.connect() as connection:
+            if not inspect(connection).has_table(schema_version.name):
+                return 0
+            return connection.execute(select(schema_version.c.version).order_by(
+                schema_version.c.version.desc()).limit(1)).scalar() or 0
+
+    @staticmethod
+    def latest_version() -> int:
+        return MIGRATIONS[-1].version
+
+    @classmethod
+    def upgrade(cls, engine: Engine, target: Optional[int] = None) -> List[int]:
+        """
+        Applies every pending migration up to `target` (the latest one by default),
+        each in its own transaction.
+
+        Returns:
+            The versions applied.
+        """
+        target = cls.latest_version() if target is None else target
+        applied = []
+        with cls._lock(engine):
+            schema_version.create(engine, checkfirst=True)
+            current = cls.current_version(engine)
+            for migration in MIGRATIONS:
+                if current < migration.version <= target:
+                    with engine.begin() as connection:
+                        migration.upgrade(connection)
+                        connection.execute(schema_version.insert().values(
+                            version=migration.version, description=migration.description,
+                            applied_at=func.current_timestamp(),
+                        ))
+                    applied.append(migration.version)
+                    logger.info(f"Migración {migration.version} aplicada: {migration.description}")
+        return applied
+
+    @staticmethod
+    @contextmanager
+    def _lock(engine: Engine) -> Iterator[None]:
+        """Holds a MariaDB named lock while migrating (other databases need no lock)."""
+        if engine.dialect.name not in ("mysql", "mariadb"):
+            yield
+            return
+        with engine.connect() as connection:
+            connection.execute(text("SELECT GET_LOCK(:name, 60)"), {"name": MIGRATION_LOCK})
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK})
@@ -0,0 +1,81 @@
+"""
+Column-projected reads for the hot catalog paths.
+
+The statements select table columns (Core), so `session.exec` returns lightweight rows with
+attribute access (`row.id`, `row.name`) instead of hydrating a model instance per row.
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import Select, select
+
+from .entities import Category, Product
+from .entities.product import normalize_product_name
+
+product = Product.__table__
+category = Category.__table__
+
+# Campos de los listados (`/products`, `/tasks/{task_id}/result`)
+LISTING_COLUMNS = (product.c.id, product.c.name, product.c.price)
+# Campos que necesitan el índice de búsqueda y la caché del catálogo
+INDEX_COLUMNS = (product.c.id, product.c.name, product.c.description, product.c.price, product.c.category_id)
+
+
+def name_prefix_condition(prefix: str):
+    """
+    Filters products whose normalized name starts with `prefix`. It is written as a range
+    instead of LIKE so that SQLite can also resolve it with `ix_product_name_normalized`.
+    """
+    prefix = normalize_product_name(prefix) or ""
+    if not prefix:
+        return product.c.name_normalized.is_not(None)
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (product.c.name_normalized >= prefix) & (product.c.name_normalized < upper)
+
+
+class CatalogQueries:
+    """Builders of the projected catalog selects."""
+
+    @staticmethod
+    def categories(category_ids: Optional[Iterable[int]] = None) -> Select:
+        """Selects `(id, name)` of every category, or only of `category_ids`."""
+        query = select(category.c.id, category.c.name)
+        if category_ids is not None:
+            query = query.where(category.c.id.in_(list(category_ids)))
+        return query
+
+    @staticmethod
+    def products_page(after_id: Optional[int] = None, limit: Optional[int] = None) -> Select:
+        """Selects `(id, name, price)` of the products after `after_id`, ordered by id (keyset pagination)."""
+        query = select(*LISTING_COLUMNS).order_by(product.c.id)
+        if after_id is not None:
+            query = query.where(product.c.id > after_id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    @staticmethod
+    def products_in(category_ids: Iterable[int]) -> Select:
+        """Selects `(id, name, price)` of the products of some categories."""
+        return select(*LISTING_COLUMNS).where(product.c.category_id.in_(list(category_ids)))
+
+    @staticmethod
+    def index_products(*conditions) -> Select:
+        """Selects the fields indexed for search, optionally filtered by `conditions`, ordered by id."""
+        query = select(*INDEX_COLUMNS)
+        if conditions:
+            query = query.where(*conditions)
+        return query.order_by(product.c.id)
+
+    @staticmethod
+    def name_suggestions(prefix: str, limit: int) -> Select:
+        """
+        Selects the first `limit` distinct normalized names starting with `prefix`, in alphabetical
+        order. It reads a range of `ix_product_name_normalized` without touching the table rows.
+        """
+        return (
+            select(product.c.name_normalized).distinct()
+            .where(name_prefix_condition(prefix))
+            .order_by(product.c.name_normalized)
+            .limit(limit)
+        )
@@ -0,0 +1,68 @@
+"""EXPLAIN checks for the hot catalog queries: none of them may fall back to a full table scan."""
+
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple
+
+from sqlalchemy import Engine, text
+from sqlmodel import select
+
+from .entities import Product
+from .projections import CatalogQueries, name_prefix_condition
+
+
+# Consultas con filtro de los endpoints y servicios. Las lecturas completas del catálogo
+# (`CatalogQueries.index_products()` al construir el índice en memoria) recorren la tabla a propósito y no se incluyen.
+HOT_QUERIES: Dict[str, Callable[[], object]] = {
+    "task_result_categories": lambda: CatalogQueries.categories([1, 3]),
+    "task_result_products": lambda: CatalogQueries.products_in([1, 3]),
+    "products_keyset_page": lambda: CatalogQueries.products_page(after_id=100, limit=100),
+    "catalog_changes": lambda: (
+        select(Product).where(Product.updated_at > datetime(2000, 1, 1)).order_by(Product.updated_at)
+    ),
+    "category_price_range": lambda: (
+        select(Product.id).where(Product.category_id == 1, Product.price.between(10, 50))
+    ),
+    "product_name_prefix": lambda: select(Product.id).where(name_prefix_condition("camiseta dep")),
+    "product_name_suggestions": lambda: CatalogQueries.name_suggestions("camiseta dep", 10),
+}
+
+
+class QueryPlan(NamedTuple):
+    """EXPLAIN output of a query and the tables it reads with a full scan."""
+    name: str
+    sql: str
+    plan: List[str]
+    full_scans: List[str]
+
+
+class QueryPlanCheck:
+    """Runs EXPLAIN on every hot query (SQLite and MariaDB)."""
+
+    @staticmethod
+    def explain(engine: Engine, name: str, statement) -> QueryPlan:
+        """Returns the plan of a statement and the tables that it reads with a full scan."""
+        sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+        with engine.connect() as connection:
+            if engine.dialect.name == "sqlite":
+                rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).mappings().all()
+                plan = [row["detail"] for row in rows]
+                # "SCAN product" recorre la tabla; "SCAN ... USING INDEX" y "SEARCH ..." usan un índice
+                full_scans = [detail.split()[-1] for detail in plan
+                              if detail.startswith("SCAN") and "USING" not in detail]
+            elif engine.dialect.name in ("mysql", "mariadb"):
+                rows = connection.execute(text(f"EXPLAIN {sql}")).mappings().all()
+                plan = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}" for row in rows]
+                full_scans = [row["table"] for row in rows if row["type"] == "ALL"]
+            else:
+                raise ValueError(f"EXPLAIN no soportado para la base de datos '{engine.dialect.name}'")
+        return QueryPlan(name, sql, plan, full_scans)
+
+    @classmethod
+    def run(cls, engine: Engine) -> List[QueryPlan]:
+        """Returns the plan of every query in `HOT_QUERIES`."""
+        return [cls.explain(engine, name, build()) for name, build in HOT_QUERIES.items()]
+
+    @classmethod
+    def failures(cls, engine: Engine) -> List[QueryPlan]:
+        """Returns the hot queries that read some table with a full scan."""
+        return [plan for plan in cls.run(engine) if plan.full_scans]
@@ -1,66 +1,262 @@
 """Database registry for managing database connections and sessions."""
 
 import os
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
 from sqlalchemy import Engine
-from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .migrations import SchemaMigrations
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from .replicas import ReadSession, Replica, ReplicaSet
+
+# Drivers asyncio equivalentes a cada backend síncrono
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "mariadb": "mariadb+aiomysql", "sqlite": "sqlite+aiosqlite"}
 
 
 class DatabaseRegistry:
-    """Registers and manages the database session."""
+    """Registers the shared database engine and its connection pool, and opens sessions on it."""
 
     DB_HOST = os.getenv("DB_HOST", "db")
     DB_USER = os.getenv("DB_USER", "user")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
     DB_NAME = os.getenv("DB_NAME", "ecommerce")
-    __session: Optional[Session] = None
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+    DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+    DB_ASYNC_URL = os.getenv("DB_ASYNC_URL")
+    DB_REPLICA_STRATEGY = os.getenv("DB_REPLICA_STRATEGY", "round_robin").lower()
+    DB_REPLICA_RETRY_AFTER = float(os.getenv("DB_REPLICA_RETRY_AFTER", 30))
     __engine: Optional[Engine] = None
+    __async_engine: Optional[AsyncEngine] = None
     __db_url: Optional[str] = None
+    __replicas: Optional[ReplicaSet] = None
 
     @classmethod
-    def initialize(cls, db_url: Optional[str] = None) -> None:
-        """Initialize the database connection."""
+    def initialize(cls, db_url: Optional[str] = None, replica_urls: Optional[List[str]] = None) -> None:
+        """
+        Initialize the database connection pool.
+
+        Args:
+            db_url: URL of the primary database, which receives every write.
+            replica_urls: URLs of the read replicas used by `read_session`. Without replicas,
+                reads also go to the primary.
+        """
         if db_url:
             cls.__db_url = db_url
         cls.__engine = cls.__get_engine()
-        # Crear tablas si no existen
-        SQLModel.metadata.create_all(cls.__engine)
-        cls.__session = Session(cls.__engine)
+        # Crear las tablas o aplicar las migraciones pendientes
+        applied = SchemaMigrations.upgrade(cls.__engine)
+        if applied:
+            print(f"Migraciones aplicadas: {', '.join(map(str, applied))}.")
+        if replica_urls:
+            cls.__replicas = ReplicaSet(
+                [Replica(url, cls.__create_engine(url)) for url in replica_urls],
+                cls.DB_REPLICA_STRATEGY,
+                cls.DB_REPLICA_RETRY_AFTER,
+            )
+            print(f"Réplicas de lectura configuradas: {len(replica_urls)} ({cls.DB_REPLICA_STRATEGY}).")
         print("Base de datos inicializada correctamente.")
 
     @classmethod
     def close(cls) -> None:
-        """Close the database session."""
-        if cls.__session:
-            cls.__session.close()
-            cls.__session = None
+        """Close every pooled connection."""
         if cls.__engine:
             cls.__engine.dispose()
             cls.__engine = None
+        if cls.__replicas:
+            cls.__replicas.dispose()
+            cls.__replicas = None
         print("Conexiones a la base de datos cerradas correctamente.")
 
+    @classmethod
+    async def close_async(cls) -> None:
+        """Close every pooled connection of the async engines, if they were created."""
+        if cls.__async_engine:
+            await cls.__async_engine.dispose()
+            cls.__async_engine = None
+        if cls.__replicas:
+            await cls.__replicas.dispose_async()
+
     @classmethod
     def session(cls) -> Session:
-        """Returns the database session singleton."""
-        if cls.__session is None:
-            cls.__session = cls.__create_session()
-        return cls.__session
+        """
+        Returns a new session bound to the shared connection pool.
+        The session only checks out a connection when it runs its first query,
+        and the caller is responsible for closing it.
+        """
+        return Session(cls.engine())
+
+    @classmethod
+    def engine(cls) -> Engine:
+        """Returns the shared engine, creating it on first use (no connection is opened until a query runs)."""
+        if cls.__engine is None:
+            cls.__engine = cls.__get_engine()
+        return cls.__engine
+
+    @classmethod
+    def read_session(cls) -> Session:
+        """
+        Returns a new session for read-only work, bound to the replica chosen by the configured
+        strategy. Falls back to the primary when there are no replicas or all of them are ejected.
+        A read that fails because its replica is down is retried once on the next replica or the primary.
+        """
+        replica = cls.__replicas.choose() if cls.__replicas else None
+        if replica is None:
+            return cls.session()
+        return ReadSession(replica.engine, fallback=cls.__read_fallback)
+
+    @classmethod
+    def async_read_session(cls) -> AsyncSession:
+        """Async variant of `read_session`."""
+        replica = cls.__replicas.choose() if cls.__replicas else None
+        if replica is None:
+            return cls.async_session()
+        return AsyncSession(cls.__replica_async_engine(replica), sync_session_class=ReadSession,
+                            fallback=cls.__async_read_fallback)
+
+    @classmethod
+    def __read_fallback(cls) -> Engine:
+        """Engine for retrying a failed read: the next healthy replica, or the primary."""
+        replica = cls.__replicas.choose() if cls.__replicas else None
+        return replica.engine if replica is not None else cls.engine()
+
+    @classmethod
+    def __async_read_fallback(cls) -> Engine:
+        """Async variant of `__read_fallback` (returns the sync facade of the async engine)."""
+        replica = cls.__replicas.choose() if cls.__replicas else None
+        engine = cls.__replica_async_engine(replica) if replica is not None else cls.async_engine()
+        return engine.sync_engine
+
+    @classmethod
+    def __replica_async_engine(cls, replica: Replica) -> AsyncEngine:
+        """Returns the async engine of a replica, creating it (and watching its errors) on first use."""
+        if replica.async_engine is None:
+            replica.async_engine = cls.__create_async_engine(cls.__async_url_for(replica.url))
+            cls.__replicas.watch(replica.async_engine.sync_engine, replica)
+        return replica.async_engine
+
+    @classmethod
+    def async_session(cls) -> AsyncSession:
+        """Returns a new async session bound to the shared async connection pool. The caller must close it."""
+        return AsyncSession(cls.async_engine())
+
+    @classmethod
+    def async_engine(cls) -> AsyncEngine:
+        """Returns the shared async engine, creating it on first use."""
+        if cls.__async_engine is None:
+            cls.__async_engine = cls.__create_async_engine(cls.async_url())
+        return cls.__async_engine
+
+    @classmethod
+    def async_url(cls) -> str:
+        """Returns the async database URL: DB_ASYNC_URL, or the sync URL with its asyncio driver."""
+        if cls.DB_ASYNC_URL:
+            return cls.DB_ASYNC_URL
+        return cls.__async_url_for(cls.__url())
+
+    @staticmethod
+    def __async_url_for(db_url: str) -> str:
+        """Returns a database URL with the driver switched to its asyncio equivalent."""
+        url = make_url(db_url)
+        driver = ASYNC_DRIVERS.get(url.get_backend_name())
+        if driver is None:
+            raise ValueError(f"No hay driver asíncrono para la base de datos '{url.get_backend_name()}'")
+        return url.set(drivername=driver).render_as_string(hide_password=False)
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, Any]:
+        """Returns the occupancy and checkout/wait statistics of the connection pool(s)."""
+        stats = cls.__engine_pool_stats(cls.__engine)
+        if cls.__async_engine is not None:
+            stats["async"] = cls.__engine_pool_stats(cls.__async_engine.sync_engine)
+        if cls.__replicas:
+            stats["replicas"] = cls.__replicas.stats()
+        return stats
+
+    @staticmethod
+    def __engine_pool_stats(engine: Optional[Engine]) -> Dict[str, Any]:
+        if engine is None:
+            return {"initialized": False}
+        pool = engine.pool
+        if isinstance(pool, InstrumentedQueuePool):
+            return {"initialized": True, **pool.stats()}
+        return {"initialized": True, "status": pool.status()}
 
     @classmethod
     def __get_engine(cls) -> Engine:
         """Returns the engine for the database."""
-        if cls.__db_url:
-            return create_engine(cls.__db_url, echo=True)
-        return create_engine(
-            f"mysql+pymysql://{cls.DB_USER}:{cls.DB_PASSWORD}@{cls.DB_HOST}/{cls.DB_NAME}",
-            echo=True,
-        )
-
-    @classmethod
-    def __create_session(cls) -> Session:
-        """Creates and returns a new database session."""
-        engine = cls.__get_engine()
-        # Crear tablas si no existen
-        SQLModel.metadata.create_all(engine)
-        return Session(engine)
+        return cls.__create_engine(cls.__url())
+
+    @classmethod
+    def __create_engine(cls, db_url: str) -> Engine:
+        """Creates a pooled engine for a database URL."""
+        return create_engine(db_url, echo=cls.DB_ECHO, **cls.__pool_options(db_url))
+
+    @classmethod
+    def __create_async_engine(cls, db_url: str) -> AsyncEngine:
+        """Creates a pooled async engine for a database URL."""
+        return create_async_engine(db_url, echo=cls.DB_ECHO, **cls.__pool_options(db_url, InstrumentedAsyncQueuePool))
+
+    @classmethod
+    def __url(cls) -> str:
+        """Returns the sync database URL."""
+        return cls.__db_url or f"mysql+pymysql://{cls.DB_USER}:{cls.DB_PASSWORD}@{cls.DB_HOST}/{cls.DB_NAME}"
+
+    @classmethod
+    def __pool_options(cls, db_url: str, poolclass: type = InstrumentedQueuePool) -> Dict[str, Any]:
+        """Returns the connection pool settings for a database URL."""
+        options: Dict[str, Any] = {"pool_pre_ping": cls.DB_POOL_PRE_PING}
+        # SQLite usa su propio pool (p.ej. una única conexión en memoria) y no admite estos parámetros
+        if make_url(db_url).get_backend_name() != "sqlite":
+            options.update(
+                poolclass=poolclass,
+                pool_size=cls.DB_POOL_SIZE,
+                max_overflow=cls.DB_MAX_OVERFLOW,
+                pool_timeout=cls.DB_POOL_TIMEOUT,
+                pool_recycle=cls.DB_POOL_RECYCLE,
+            )
+        return options
+
+
+def get_session() -> Iterator[Session]:
+    """FastAPI dependency that opens one session per request and closes it afterwards."""
+    session = DatabaseRegistry.session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency that opens one async session per request and closes it afterwards."""
+    session = DatabaseRegistry.async_session()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+def get_read_session() -> Iterator[Session]:
+    """FastAPI dependency for read-only endpoints: one replica session per request (or primary without replicas)."""
+    session = DatabaseRegistry.read_session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+async def get_async_read_session() -> AsyncIterator[AsyncSession]:
+    """Async variant of `get_read_session`."""
+    session = DatabaseRegistry.async_read_session()
+    try:
+        yield session
+    finally:
+        await session.close()
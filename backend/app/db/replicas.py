@@ -0,0 +1,165 @@
+"""Read replicas with round-robin or least-connections selection and health-based ejection."""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import Engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session
+
+from utils import get_logger
+
+logger = get_logger("backend_db_replicas")
+
+STRATEGIES = ("round_robin", "least_connections")
+
+
+class Replica:
+    """A read replica: its engines and its health state."""
+
+    def __init__(self, url: str, engine: Engine):
+        self.url = url
+        self.engine = engine
+        self.async_engine: Optional[AsyncEngine] = None
+        self.ejected_until = 0.0
+        self.failures = 0
+        self.reads = 0
+
+    def healthy(self, now: float) -> bool:
+        """Tells whether the replica can receive reads (it is not ejected or its ejection has expired)."""
+        return self.ejected_until <= now
+
+    def checked_out(self) -> int:
+        """Returns the number of connections currently in use on this replica."""
+        engines = [self.engine]
+        if self.async_engine is not None:
+            engines.append(self.async_engine.sync_engine)
+        return sum(getattr(engine.pool, "checkedout", lambda: 0)() for engine in engines)
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "url": make_url(self.url).render_as_string(hide_password=True),
+            "healthy": self.healthy(now),
+            "ejected_for_s": round(max(0.0, self.ejected_until - now), 3),
+            "failures": self.failures,
+            "reads": self.reads,
+            "checked_out": self.checked_out(),
+        }
+
+
+class ReplicaSet:
+    """
+    Distributes reads among replicas.
+    A replica whose connection fails is ejected for `retry_after` seconds; once that time
+    has passed it receives reads again and is ejected again if it keeps failing.
+    """
+
+    def __init__(self, replicas: Iterable[Replica], strategy: str = "round_robin", retry_after: float = 30.0):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Estrategia de réplicas desconocida: '{strategy}' (válidas: {', '.join(STRATEGIES)})")
+        self._replicas: List[Replica] = list(replicas)
+        self._strategy = strategy
+        self._retry_after = retry_after
+        self._next = 0
+        self._lock = threading.Lock()
+        for replica in self._replicas:
+            self.watch(replica.engine, replica)
+
+    def __len__(self) -> int:
+        return len(self._replicas)
+
+    def __iter__(self):
+        return iter(self._replicas)
+
+    def watch(self, engine: Engine, replica: Replica) -> None:
+        """Ejects `replica` whenever `engine` reports a connection error."""
+        event.listen(engine, "handle_error", lambda context: self._on_error(replica, context))
+
+    def choose(self) -> Optional[Replica]:
+        """
+        Selects the replica for the next read.
+
+        Returns:
+            A healthy replica, or None if every replica is ejected.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [r for r in self._replicas if r.healthy(now)]
+            if not healthy:
+                return None
+            start = self._next % len(healthy)
+            self._next += 1
+            if self._strategy == "least_connections":
+                # Se recorre en orden rotado para repartir los empates (p.ej. réplicas ociosas)
+                replica = min(healthy[start:] + healthy[:start], key=Replica.checked_out)
+            else:
+                replica = healthy[start]
+            replica.reads += 1
+            return replica
+
+    def eject(self, replica: Replica, reason: str = "") -> None:
+        """Stops sending reads to a replica for `retry_after` seconds."""
+        with self._lock:
+            replica.ejected_until = time.monotonic() + self._retry_after
+            replica.failures += 1
+        logger.warning(f"Réplica {make_url(replica.url).render_as_string(hide_password=True)} expulsada "
+                       f"durante {self._retry_after}s: {reason}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [replica.stats(now) for replica in self._replicas]
+
+    def dispose(self) -> None:
+        """Closes the pooled connections of every sync replica engine."""
+        for replica in self._replicas:
+            replica.engine.dispose()
+
+    async def dispose_async(self) -> None:
+        """Closes the pooled connections of every async replica engine."""
+        for replica in self._replicas:
+            if replica.async_engine is not None:
+                await replica.async_engine.dispose()
+                replica.async_engine = None
+
+    def _on_error(self, replica: Replica, context) -> None:
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+            self.eject(replica, str(context.original_exception))
+
+
+def is_connection_error(error: exc.DBAPIError) -> bool:
+    """Tells whether a database error means the server could not be reached (the replica is ejected for it)."""
+    return error.connection_invalidated or isinstance(error, exc.OperationalError)
+
+
+class ReadSession(Session):
+    """
+    Session for read-only work on a replica.
+    When a statement fails with a connection error (which also ejects the replica), the session
+    rebinds to the engine returned by `fallback` (the next healthy replica or the primary) and
+    runs the statement again, once, so the failed read does not reach the client.
+    """
+
+    def __init__(self, bind: Any = None, *, fallback: Optional[Callable[[], Engine]] = None, **kwargs: Any):
+        super().__init__(bind, **kwargs)
+        self._fallback = fallback
+
+    def exec(self, *args: Any, **kwargs: Any) -> Any:
+        return self._retrying(super().exec, *args, **kwargs)
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return self._retrying(super().execute, *args, **kwargs)
+
+    def _retrying(self, run: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        try:
+            return run(*args, **kwargs)
+        except exc.DBAPIError as error:
+            if self._fallback is None or not is_connection_error(error):
+                raise
+            fallback, self._fallback = self._fallback, None
+            self.rollback()
+            self.bind = fallback()
+            logger.warning(f"Lectura reintentada en {make_url(str(self.bind.url)).render_as_string(hide_password=True)}: "
+                           f"{error.orig}")
+            return run(*args, **kwargs)
@@ -0,0 +1,51 @@
+"""
+Carga masiva del catálogo desde la línea de comandos.
+
+Uso (con PYTHONPATH=src):
+    python src/ingest.py categories data/categorias.csv
+    python src/ingest.py products data/productos.jsonl --batch-size 10000
+    zcat productos.csv.gz | python src/ingest.py products - --format csv
+"""
+
+import argparse
+import os
+import sys
+
+from db import DatabaseRegistry
+from services.catalog_ingest import ENTITIES, FORMATS, CatalogIngest
+from utils import get_logger
+
+logger = get_logger("backend_ingest")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Carga masiva de productos o categorías desde CSV o JSONL.")
+    parser.add_argument("entity", choices=sorted(ENTITIES), help="Tabla de destino")
+    parser.add_argument("path", help="Fichero a cargar ('-' para la entrada estándar)")
+    parser.add_argument("--format", choices=FORMATS, dest="fmt",
+                        help="Formato del fichero (por defecto, según la extensión)")
+    parser.add_argument("--batch-size", type=int, default=CatalogIngest.BATCH_SIZE, help="Filas por transacción")
+    parser.add_argument("--db-url", default=os.getenv("DB_URL", "mysql+pymysql://user:password@db/ecommerce"),
+                        help="URL de la base de datos primaria")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    DatabaseRegistry.initialize(args.db_url)
+    try:
+        report = CatalogIngest.ingest_file(
+            DatabaseRegistry.engine(), args.entity, args.path, args.fmt, args.batch_size
+        )
+    except Exception as e:
+        logger.error(f"La carga ha fallado: {str(e)}")
+        return 1
+    finally:
+        DatabaseRegistry.close()
+    print(f"{report.rows} filas cargadas, {report.rejected} descartadas, "
+          f"{report.seconds:.2f}s ({report.rows_per_second:.0f} filas/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,95 @@
 import os
+from datetime import datetime
+from typing import List, Optional, Tuple
 from api import webhook_router
-from controllers import core_router, tasks_router
+from controllers import async_catalog_router, core_router, tasks_router
+from controllers.core import SEARCH_MODE
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from db import DatabaseRegistry
+from services import (
+    CatalogCache, CatalogRefresher, CatalogSnapshot, CatalogVersion, QueryCache, SearchIndex, ShardedSearch,
+    SharedIndex, SuggestIndex
+)
 from utils import get_logger
 
 logger = get_logger("backend_main")
 
+# Configuración de la base de datos
+# Usar la URL de conexión completa
+DB_URL = os.getenv("DB_URL", "mysql+pymysql://user:password@db/ecommerce")
+
+
+def load_catalog(build_index: bool = True) -> None:
+    """
+    Carga la instantánea del catálogo y, si `build_index`, construye el índice de búsqueda por texto con
+    las mismas filas (el catálogo se lee una sola vez) y arranca su refresco incremental.
+    Si en SHARED_INDEX_DIR hay una instantánea en disco al día (ver `snapshot.py`), ambos se crean a
+    partir de ella y el catálogo no se lee.
+    """
+    logger.info("Cargando el catálogo...")
+    try:
+        with DatabaseRegistry.session() as session:
+            # La marca de agua se toma antes de leer el catálogo para no perder cambios concurrentes
+            watermark = CatalogRefresher.current_watermark(session)
+            categories = CatalogRefresher.current_categories(session)
+            published = SharedIndex.fresh(session)
+            snapshot = CatalogCache.initialize(session, published)
+        CatalogCache.start()
+    except Exception as e:
+        logger.error(f"No se pudo cargar la caché del catálogo: {str(e)}", exc_info=True)
+        return
+    if build_index:
+        build_search_index(snapshot, watermark, categories, published)
+
+
+def build_search_index(snapshot: CatalogSnapshot, watermark: Optional[datetime],
+                       categories: List[Tuple[int, str]], published: Optional[SharedIndex] = None) -> None:
+    """
+    Construye el índice de búsqueda por texto con las filas de la instantánea (y, si se indica, con las
+    listas de publicación y el autocompletado de la instantánea en disco) y arranca su refresco incremental.
+    """
+    logger.info("Construyendo el índice de búsqueda por texto...")
+    try:
+        index = SearchIndex.initialize(snapshot=snapshot, published=published)
+        logger.info(f"Índice de búsqueda construido con {len(index)} productos.")
+        if published is not None:
+            suggest_index = SuggestIndex.adopt(published.suggest_index(), index)
+        else:
+            suggest_index = SuggestIndex.rebuild(index)
+        logger.info(f"Índice de autocompletado construido con {len(suggest_index)} entradas.")
+        CatalogRefresher.start(watermark, rows=len(index), categories=categories)
+    except Exception as e:
+        logger.error(f"No se pudo construir el índice de búsqueda: {str(e)}", exc_info=True)
+
+
+def attach_shared_index() -> None:
+    """
+    Adopta el índice publicado en SHARED_INDEX_DIR si corresponde al catálogo (o lo construye si está
+    desactualizado o no existe) y arranca el refresco, que publica una versión nueva cuando cambia el catálogo.
+    """
+    logger.info(f"Usando el índice de búsqueda compartido en {SharedIndex.DIRECTORY}")
+    try:
+        with DatabaseRegistry.session() as session:
+            watermark = CatalogRefresher.current_watermark(session)
+            index = SharedIndex.initialize(session)
+        CatalogRefresher.start(watermark, rows=len(index), categories=index.fingerprint["categories"])
+    except Exception as e:
+        logger.error(f"No se pudo adoptar el índice compartido: {str(e)}", exc_info=True)
+
+
+def build_sharded_search(db_url: str) -> None:
+    """Arranca los procesos de la búsqueda repartida (cada uno carga su fragmento) y su refresco incremental."""
+    logger.info(f"Repartiendo el índice de búsqueda en {ShardedSearch.SHARDS} procesos...")
+    try:
+        with DatabaseRegistry.session() as session:
+            watermark = CatalogRefresher.current_watermark(session)
+            categories = CatalogRefresher.current_categories(session)
+        sharded = ShardedSearch.initialize(db_url)
+        CatalogRefresher.start(watermark, rows=len(sharded), categories=categories)
+    except Exception as e:
+        logger.error(f"No se pudo crear la búsqueda repartida: {str(e)}", exc_info=True)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -15,15 +97,39 @@ async def lifespan(app: FastAPI):
     logger.info("Iniciando aplicación backend")
     logger.info("Inicializando la conexión a la base de datos...")
     DatabaseRegistry.initialize(
-        os.getenv("DB_URL", "mysql+pymysql://user:password@db/ecommerce")
+        DB_URL,
+        replica_urls=[url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()],
     )
     logger.info("Base de datos inicializada correctamente.")
     # Ya no se cargan datos de muestra desde JSON
 
+    # Cargar la instantánea del catálogo y construir con ella el índice de búsqueda por texto (no se usa en
+    # modo FULLTEXT). En los modos SHARDED y SHARED el catálogo no se copia en cada proceso.
+    logger.info(f"Modo de búsqueda por texto: {SEARCH_MODE}")
+    if SEARCH_MODE == "sharded":
+        build_sharded_search(DB_URL)
+    elif SEARCH_MODE == "shared":
+        attach_shared_index()
+    else:
+        load_catalog(build_index=SEARCH_MODE != "fulltext")
+
+    # Activar la caché de resultados de búsqueda
+    QueryCache.initialize()
+
     yield
 
     # Limpieza al cerrar la aplicación
+    CatalogRefresher.stop()
+    CatalogCache.stop()
+    CatalogVersion.reset()
+    SearchIndex.reset()
+    ShardedSearch.reset()
+    SharedIndex.reset()
+    SuggestIndex.reset()
+    CatalogCache.reset()
+    QueryCache.reset()
     logger.info("Cerrando conexiones a la base de datos...")
+    await DatabaseRegistry.close_async()
     DatabaseRegistry.close()
     logger.info("Aplicación backend cerrada correctamente")
 
@@ -33,12 +139,12 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Configuración de la base de datos
-# Usar la URL de conexión completa
-DB_URL = os.getenv("DB_URL", "mysql+pymysql://user:password@db/ecommerce")
-
 # Incluir routers de la API
 logger.info("Configurando routers de la aplicación")
+if DatabaseRegistry.DB_ASYNC:
+    # Las variantes asíncronas se registran primero para que tengan prioridad sobre las síncronas
+    logger.info("Usando los endpoints de catálogo asíncronos (DB_ASYNC)")
+    app.include_router(async_catalog_router)
 app.include_router(core_router)
 app.include_router(webhook_router)
 app.include_router(tasks_router)
@@ -0,0 +1,55 @@
+"""
+Migraciones del esquema y comprobación de planes de consulta desde la línea de comandos.
+
+Uso (con PYTHONPATH=src):
+    python src/migrate.py current
+    python src/migrate.py upgrade [--target 2]
+    python src/migrate.py check
+"""
+
+import argparse
+import os
+import sys
+
+from sqlmodel import create_engine
+
+from db import QueryPlanCheck, SchemaMigrations
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos.")
+    parser.add_argument("command", choices=("current", "upgrade", "check"),
+                        help="current: versión aplicada; upgrade: aplica las pendientes; "
+                             "check: falla si una consulta crítica recorre una tabla completa")
+    parser.add_argument("--target", type=int, help="Versión hasta la que migrar (por defecto, la última)")
+    parser.add_argument("--db-url", default=os.getenv("DB_URL", "mysql+pymysql://user:password@db/ecommerce"),
+                        help="URL de la base de datos primaria")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    engine = create_engine(args.db_url)
+    try:
+        if args.command == "current":
+            print(f"Versión del esquema: {SchemaMigrations.current_version(engine)} "
+                  f"(última: {SchemaMigrations.latest_version()})")
+        elif args.command == "upgrade":
+            applied = SchemaMigrations.upgrade(engine, args.target)
+            print(f"Migraciones aplicadas: {', '.join(map(str, applied))}" if applied else "El esquema está al día")
+        else:
+            failures = 0
+            for plan in QueryPlanCheck.run(engine):
+                status = "FULL SCAN" if plan.full_scans else "OK"
+                failures += bool(plan.full_scans)
+                print(f"[{status}] {plan.name}: {' | '.join(plan.plan)}")
+            if failures:
+                print(f"{failures} consultas recorren tablas completas")
+                return 1
+    finally:
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
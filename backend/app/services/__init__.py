@@ -4,5 +4,35 @@ Este módulo contiene los servicios que se utilizan en la aplicación.
 """
 
 from .result_service import ResultService
+from .search_index import SearchIndex
+from .facet_index import FacetIndex, SearchFilters
+from .catalog_version import CatalogVersion
+from .catalog_refresher import CatalogRefresher
+from .fulltext_search import FulltextSearch
+from .suggest_index import SuggestIndex
+from .catalog_cache import CatalogCache, CatalogSnapshot
+from .product_store import ProductStore
+from .query_cache import QueryCache
+from .catalog_ingest import CatalogIngest
+from .encoded_response import EncodedBody
+from .sharded_search import ShardedSearch
+from .shared_index import SharedIndex
 
-__all__ = ["ResultService"]
+__all__ = [
+    "ResultService",
+    "SearchIndex",
+    "FacetIndex",
+    "SearchFilters",
+    "CatalogVersion",
+    "CatalogRefresher",
+    "FulltextSearch",
+    "SuggestIndex",
+    "CatalogCache",
+    "CatalogSnapshot",
+    "ProductStore",
+    "QueryCache",
+    "CatalogIngest",
+    "EncodedBody",
+    "ShardedSearch",
+    "SharedIndex",
+]
@@ -0,0 +1,261 @@
+"""
+Caché compartida del catálogo en memoria.
+Mantiene una instantánea inmutable de categorías (diccionario por id) y de productos en un
+`ProductStore` columnar, con los productos agrupados por categoría, para que los endpoints de
+catálogo no consulten MariaDB en cada petición ni resuelvan nombres de categoría recorriendo listas.
+"""
+
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, NamedTuple, Optional
+
+from sqlmodel import Session
+
+from db import CatalogQueries, DatabaseRegistry
+from utils import get_logger
+
+from .catalog_version import CatalogVersion
+from .encoded_response import EncodedBody
+from .product_store import ProductRows, ProductStore
+
+logger = get_logger("backend_catalog_cache")
+
+
+class CatalogCategory(NamedTuple):
+    """Categoría almacenada en la instantánea."""
+    id: int
+    name: str
+
+
+class CatalogProduct(NamedTuple):
+    """Registro de un producto (la instantánea los guarda en columnas, ver `ProductStore`)."""
+    id: int
+    name: str
+    description: Optional[str]
+    price: float
+    category_id: Optional[int]
+
+
+class CatalogSnapshot:
+    """Instantánea inmutable del catálogo en una versión concreta."""
+
+    def __init__(self, categories: Iterable[Any], products: Iterable[Any], version: int):
+        """
+        Args:
+            categories: Objetos con atributos `id` y `name`.
+            products: Objetos con atributos `id`, `name`, `description`, `price` y `category_id`, o un
+                `ProductStore` ya construido, que se usa tal cual.
+            version: Versión del catálogo.
+        """
+        category_rows = [CatalogCategory(c.id, c.name) for c in categories]
+        store = products if isinstance(products, ProductStore) else ProductStore(products)
+
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.categories: Mapping[int, CatalogCategory] = MappingProxyType({c.id: c for c in category_rows})
+        self.products: ProductStore = store
+        self.products_by_category: Mapping[Optional[int], ProductRows] = MappingProxyType(
+            {cid: store.in_category(cid) for cid in store.category_keys()}
+        )
+        self._encoded: Dict[str, EncodedBody] = {}
+        self._encoded_lock = threading.Lock()
+
+    def updated(self, categories: Iterable[Any], changes: Mapping[int, Optional[Any]], version: int,
+                store: Optional[ProductStore] = None) -> "CatalogSnapshot":
+        """
+        Devuelve una instantánea nueva con los productos cambiados aplicados (ver `ProductStore.updated`),
+        sin volver a leer el catálogo.
+
+        Args:
+            categories: Tabla de categorías completa (es pequeña y se sustituye entera).
+            changes: Producto actual de cada id cambiado, o None si se ha eliminado.
+            version: Versión del catálogo de la nueva instantánea.
+            store: Almacén con los cambios ya aplicados (el del índice de búsqueda), que se usa tal cual.
+        """
+        if store is None:
+            store = self.products.updated(changes) if changes else self.products
+        return CatalogSnapshot(categories, store, version)
+
+    def encoded(self, name: str, build: Callable[[], Any]) -> EncodedBody:
+        """
+        Devuelve un cuerpo de respuesta de esta instantánea ya serializado.
+
+        Args:
+            name: Nombre del cuerpo (p. ej. el endpoint).
+            build: Función que construye el contenido JSON; solo se llama la primera vez.
+        """
+        body = self._encoded.get(name)
+        if body is None:
+            with self._encoded_lock:
+                body = self._encoded.get(name)
+                if body is None:
+                    body = self._encoded[name] = EncodedBody(build())
+        return body
+
+    def category_name(self, category_id: Optional[int]) -> Optional[str]:
+        """Devuelve el nombre de una categoría en O(1), o None si no existe."""
+        category = self.categories.get(category_id)
+        return category.name if category else None
+
+    def products_in(self, category_ids: Iterable[int]) -> ProductRows:
+        """Devuelve los productos de varias categorías, ordenados por id."""
+        return self.products.in_categories(category_ids)
+
+    def products_after(self, after_id: Optional[int], limit: Optional[int] = None) -> ProductRows:
+        """
+        Devuelve los productos con id mayor que `after_id`, ordenados por id (paginación por clave).
+
+        Args:
+            after_id: Último id de la página anterior, o None para empezar desde el principio.
+            limit: Número máximo de productos, o None para devolver el resto.
+        """
+        return self.products.after(after_id, limit)
+
+
+class CatalogCache:
+    """
+    Servicio que publica la instantánea vigente del catálogo.
+    Un hilo en segundo plano recarga la instantánea desde la base de datos cuando cambia la
+    versión del catálogo o cuando supera el TTL, y la sustituye de forma atómica: las peticiones
+    solo leen la referencia y nunca esperan a una recarga.
+    """
+
+    TTL = float(os.getenv("CATALOG_CACHE_TTL", 300))
+    CHECK_INTERVAL = float(os.getenv("CATALOG_CACHE_CHECK_INTERVAL", 1))
+
+    _snapshot: Optional[CatalogSnapshot] = None
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+    _stop_event: Optional[threading.Event] = None
+
+    @classmethod
+    def load(cls, session: Session) -> CatalogSnapshot:
+        """Lee el catálogo completo y publica una nueva instantánea."""
+        version = CatalogVersion.current()
+        categories = session.exec(CatalogQueries.categories()).all()
+        products = session.exec(CatalogQueries.index_products()).all()
+        cls._snapshot = CatalogSnapshot(categories, products, version)
+        logger.info(f"Caché del catálogo cargada: {len(cls._snapshot.products)} productos (versión {version})")
+        return cls._snapshot
+
+    @classmethod
+    def initialize(cls, session: Session, published: Optional[Any] = None) -> CatalogSnapshot:
+        """
+        Activa la caché cargando la primera instantánea.
+
+        Args:
+            session: Sesión de base de datos de la que leer el catálogo.
+            published: Versión al día de la instantánea en disco (`SharedIndex`); si se indica, la
+                instantánea se crea con sus columnas y no se lee el catálogo.
+        """
+        if published is None:
+            return cls.load(session)
+        cls._snapshot = published.catalog_snapshot(CatalogVersion.current())
+        logger.info(f"Caché del catálogo leída de la instantánea en disco {published.name}: "
+                    f"{len(cls._snapshot.products)} productos")
+        return cls._snapshot
+
+    @classmethod
+    def apply_changes(cls, categories: Iterable[Any], changes: Mapping[int, Optional[Any]],
+                      store: Optional[ProductStore] = None) -> bool:
+        """
+        Publica una instantánea con los cambios del refresco incremental aplicados sobre la vigente
+        (ver `CatalogSnapshot.updated`), en lugar de recargar el catálogo completo.
+
+        Args:
+            categories: Tabla de categorías completa.
+            changes: Producto actual de cada id cambiado, o None si se ha eliminado.
+            store: Almacén con los cambios ya aplicados, compartido con el índice de búsqueda (ver
+                `CatalogSnapshot.updated`).
+
+        Returns:
+            True si se ha publicado una instantánea nueva (False si la caché no está activa).
+        """
+        with cls._lock:
+            snapshot = cls._snapshot
+            if snapshot is None:
+                return False
+            cls._snapshot = snapshot.updated(categories, changes, CatalogVersion.current(), store)
+        return True
+
+    @classmethod
+    def current(cls) -> Optional[CatalogSnapshot]:
+        """
+        Devuelve la instantánea vigente sin recargarla (de eso se encarga el hilo de `start`).
+
+        Returns:
+            La instantánea, o None si la caché no se ha inicializado.
+        """
+        return cls._snapshot
+
+    @classmethod
+    def refresh(cls, session: Optional[Session] = None) -> bool:
+        """
+        Recarga la instantánea si ha caducado. Si falla, se sigue sirviendo la anterior.
+
+        Args:
+            session: Sesión de base de datos a utilizar. None abre una propia.
+
+        Returns:
+            True si se ha publicado una instantánea nueva.
+        """
+        snapshot = cls._snapshot
+        if snapshot is None or not cls._is_stale(snapshot):
+            return False
+        with cls._lock:
+            if cls._snapshot is not snapshot:
+                return False
+            try:
+                if session is not None:
+                    cls.load(session)
+                else:
+                    with Session(DatabaseRegistry.engine()) as own_session:
+                        cls.load(own_session)
+            except Exception as e:
+                logger.error(f"Error recargando la caché del catálogo: {str(e)}", exc_info=True)
+                return False
+        return True
+
+    @classmethod
+    def start(cls, interval: Optional[float] = None) -> None:
+        """
+        Arranca el hilo que recarga la instantánea cuando caduca.
+
+        Args:
+            interval: Segundos entre comprobaciones. Si es 0 o negativo no se arranca el hilo.
+        """
+        interval = cls.CHECK_INTERVAL if interval is None else interval
+        if interval <= 0 or cls._thread is not None:
+            return
+        cls._stop_event = threading.Event()
+        cls._thread = threading.Thread(
+            target=cls._run, args=(cls._stop_event, interval), name="catalog-cache-reloader", daemon=True
+        )
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls) -> None:
+        """Detiene el hilo de recarga si está en marcha."""
+        if cls._thread is None:
+            return
+        cls._stop_event.set()
+        cls._thread.join(timeout=5)
+        cls._thread = None
+        cls._stop_event = None
+
+    @classmethod
+    def reset(cls) -> None:
+        """Desactiva la caché descartando la instantánea."""
+        cls._snapshot = None
+
+    @classmethod
+    def _run(cls, stop_event: threading.Event, interval: float) -> None:
+        while not stop_event.wait(interval):
+            cls.refresh()
+
+    @classmethod
+    def _is_stale(cls, snapshot: CatalogSnapshot) -> bool:
+        return (snapshot.version != CatalogVersion.current()
+                or time.monotonic() - snapshot.loaded_at > cls.TTL)
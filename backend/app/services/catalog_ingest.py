@@ -0,0 +1,206 @@
+"""
+Carga masiva del catálogo desde ficheros CSV o JSONL.
+El fichero se lee en streaming y cada fila se valida contra el modelo `Product` o `Category`;
+las filas válidas se insertan o actualizan (upsert por `id`) en lotes de tamaño fijo, cada uno en
+su propia transacción con un único `executemany`. La memoria usada depende del tamaño de lote,
+no del tamaño del fichero.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import Engine, func, or_
+from sqlalchemy.dialects import mysql, sqlite
+
+from db import Category, Product
+from db.entities.product import normalize_product_name
+from utils import get_logger
+
+logger = get_logger("backend_catalog_ingest")
+
+ENTITIES = {"products": Product, "categories": Category}
+FORMATS = ("csv", "jsonl")
+
+
+class IngestReport(NamedTuple):
+    """Resultado de una carga."""
+    rows: int
+    rejected: int
+    batches: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+
+class CatalogIngest:
+    """
+    Servicio de carga masiva del catálogo.
+    Las filas que no superan la validación se descartan y se registran con su número de línea;
+    un error de la base de datos (p. ej. un `category_id` inexistente) aborta la carga, pero los
+    lotes ya confirmados se conservan, de modo que repetir la carga es seguro.
+    """
+
+    BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 5000))
+
+    @staticmethod
+    def detect_format(path: str) -> str:
+        """Deduce el formato del fichero a partir de su extensión."""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            return "csv"
+        if extension in (".jsonl", ".ndjson"):
+            return "jsonl"
+        raise ValueError(f"No se puede deducir el formato de '{path}' (válidos: {', '.join(FORMATS)})")
+
+    @staticmethod
+    def read_rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Union[str, Dict[str, Any]]]]:
+        """
+        Lee las filas de un fichero una a una.
+
+        Args:
+            stream: Fichero de texto abierto.
+            fmt: `csv` (con cabecera) o `jsonl` (un objeto JSON por línea).
+
+        Yields:
+            Tuplas (número de línea, fila). En CSV la fila es un diccionario sin las celdas vacías,
+            para que los campos opcionales tomen su valor por defecto; en JSONL es la línea sin
+            decodificar, de modo que una línea mal formada se descarta sin abortar la lectura.
+        """
+        if fmt == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, {k: v for k, v in row.items() if k is not None and v not in ("", None)}
+        elif fmt == "jsonl":
+            for line_num, line in enumerate(stream, start=1):
+                if line.strip():
+                    yield line_num, line
+        else:
+            raise ValueError(f"Formato desconocido: '{fmt}' (válidos: {', '.join(FORMATS)})")
+
+    @staticmethod
+    def upsert_statement(engine: Engine, model):
+        """
+        Construye la sentencia de upsert por `id` para el dialecto del motor.
+        En los productos, `updated_at` solo avanza cuando cambia algún campo, para que el
+        refresco incremental no vuelva a aplicar las filas que se cargan sin cambios.
+        """
+        table = model.__table__
+        columns = [c.name for c in table.columns if c.name not in ("id", "updated_at")]
+        dialect = engine.dialect.name
+        if dialect in ("mysql", "mariadb"):
+            statement = mysql.insert(table)
+            new = statement.inserted
+            now = func.now(6)
+        elif dialect == "sqlite":
+            statement = sqlite.insert(table)
+            new = statement.excluded
+            now = func.current_timestamp()
+        else:
+            raise ValueError(f"La carga masiva no admite la base de datos '{dialect}'")
+
+        changed = or_(*(table.c[name].is_distinct_from(new[name]) for name in columns))
+        values = [(name, new[name]) for name in columns]
+        if dialect == "sqlite":
+            if "updated_at" in table.c:
+                values.append(("updated_at", now))
+            return statement.on_conflict_do_update(index_elements=["id"], set_=dict(values), where=changed)
+        if "updated_at" in table.c:
+            # MariaDB evalúa las asignaciones en orden: `updated_at` debe compararse antes de cambiar la fila
+            values.insert(0, ("updated_at", func.if_(changed, now, table.c.updated_at)))
+        return statement.on_duplicate_key_update(values)
+
+    @classmethod
+    def ingest(cls, engine: Engine, entity: str, rows: Iterable[Tuple[int, Union[str, Dict[str, Any]]]],
+               batch_size: Optional[int] = None) -> IngestReport:
+        """
+        Valida y carga filas en la base de datos.
+
+        Args:
+            engine: Motor de la base de datos primaria.
+            entity: `products` o `categories`.
+            rows: Tuplas (número de línea, fila o línea JSON), p. ej. las de `read_rows`.
+            batch_size: Filas por transacción. Por defecto `INGEST_BATCH_SIZE`.
+
+        Returns:
+            El informe de la carga.
+        """
+        model = ENTITIES.get(entity)
+        if model is None:
+            raise ValueError(f"Entidad desconocida: '{entity}' (válidas: {', '.join(ENTITIES)})")
+        batch_size = batch_size or cls.BATCH_SIZE
+        if batch_size < 1:
+            raise ValueError("El tamaño de lote debe ser mayor que 0")
+
+        statement = cls.upsert_statement(engine, model)
+        fields = [c.name for c in model.__table__.columns if c.name != "updated_at"]
+        start = time.perf_counter()
+        loaded = rejected = batches = 0
+        batch: List[Dict[str, Any]] = []
+
+        def flush() -> None:
+            nonlocal loaded, batches
+            with engine.begin() as connection:
+                connection.execute(statement, batch)
+            loaded += len(batch)
+            batches += 1
+            elapsed = time.perf_counter() - start
+            logger.info(f"Lote {batches}: {loaded} filas cargadas ({loaded / elapsed:.0f} filas/s)")
+            batch.clear()
+
+        for line_num, row in rows:
+            try:
+                item = model.model_validate(json.loads(row) if isinstance(row, str) else row)
+            except ValidationError as e:
+                rejected += 1
+                errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                logger.warning(f"Línea {line_num} descartada: {errors}")
+                continue
+            except ValueError as e:
+                rejected += 1
+                logger.warning(f"Línea {line_num} descartada: JSON no válido ({e})")
+                continue
+            values = {name: getattr(item, name) for name in fields}
+            if "name_normalized" in values:
+                # Las sentencias de Core no disparan los eventos del ORM que mantienen la columna
+                values["name_normalized"] = normalize_product_name(item.name)
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        report = IngestReport(loaded, rejected, batches, time.perf_counter() - start)
+        logger.info(f"Carga de {entity} terminada: {report.rows} filas en {report.batches} lotes, "
+                    f"{report.rejected} descartadas, {report.seconds:.2f}s ({report.rows_per_second:.0f} filas/s)")
+        return report
+
+    @classmethod
+    def ingest_file(cls, engine: Engine, entity: str, path: str, fmt: Optional[str] = None,
+                    batch_size: Optional[int] = None) -> IngestReport:
+        """
+        Carga un fichero CSV o JSONL (`-` para la entrada estándar).
+
+        Args:
+            engine: Motor de la base de datos primaria.
+            entity: `products` o `categories`.
+            path: Ruta del fichero.
+            fmt: `csv` o `jsonl`. Por defecto se deduce de la extensión.
+            batch_size: Filas por transacción.
+
+        Returns:
+            El informe de la carga.
+        """
+        if path == "-":
+            if fmt is None:
+                raise ValueError("Indica el formato para leer de la entrada estándar")
+            return cls.ingest(engine, entity, cls.read_rows(sys.stdin, fmt), batch_size)
+        fmt = fmt or cls.detect_format(path)
+        with open(path, encoding="utf-8", newline="") as stream:
+            return cls.ingest(engine, entity, cls.read_rows(stream, fmt), batch_size)
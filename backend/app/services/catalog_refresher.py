@@ -0,0 +1,156 @@
+"""
+Refresco incremental del catálogo en memoria.
+Un hilo en segundo plano consulta periódicamente solo los productos modificados desde la
+última marca de agua (`product.updated_at`) y los aplica sobre el índice de búsqueda,
+en lugar de reconstruirlo a partir de `select(Product)`.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from db import Category, DatabaseRegistry, Product
+from utils import get_logger
+
+from .catalog_cache import CatalogCache
+from .catalog_version import CatalogVersion
+from .search_index import SearchIndex
+from .sharded_search import ShardedSearch
+from .shared_index import SharedIndex
+from .suggest_index import SuggestIndex
+
+logger = get_logger("backend_catalog_refresher")
+
+
+class CatalogRefresher:
+    """
+    Servicio que mantiene las estructuras en memoria sincronizadas con la base de datos.
+    Cada refresco aplica las filas modificadas desde la marca de agua menos una ventana de
+    solape (para no perder transacciones que confirman tarde con un `updated_at` anterior;
+    las filas que ya estaban aplicadas se ignoran), recarga la tabla de categorías, que es
+    pequeña, y detecta productos borrados comparando el número de filas con el del índice.
+    """
+
+    REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", 30))
+    REFRESH_OVERLAP = timedelta(seconds=float(os.getenv("CATALOG_REFRESH_OVERLAP", 1)))
+
+    _thread: Optional[threading.Thread] = None
+    _stop_event: Optional[threading.Event] = None
+
+    @classmethod
+    def current_watermark(cls, session: Session) -> Optional[datetime]:
+        """Devuelve el `updated_at` más reciente de la tabla de productos."""
+        return session.exec(select(func.max(Product.updated_at))).one()
+
+    @classmethod
+    def current_categories(cls, session: Session) -> List[Tuple[int, str]]:
+        """Devuelve los pares `(id, nombre)` de la tabla de categorías, para la huella del catálogo."""
+        return [(c.id, c.name) for c in session.exec(select(Category)).all()]
+
+    @classmethod
+    def refresh(cls, session: Session) -> int:
+        """
+        Aplica al índice activo (o a los fragmentos del modo `sharded`) los cambios posteriores a la marca de agua.
+        Si hay cambios, pone al día también las columnas de facetas, el índice de autocompletado y la
+        instantánea de `CatalogCache`, de modo que las peticiones nunca los construyen. Los tres se
+        actualizan solo con las filas cambiadas, sin releer ni recorrer el catálogo completo.
+
+        Args:
+            session: Sesión de base de datos a utilizar.
+
+        Returns:
+            Número de cambios aplicados (productos o categorías añadidos, modificados o eliminados).
+        """
+        index = SearchIndex.current()
+        if index is None:
+            index = ShardedSearch.current()
+        if index is None:
+            # En modo `shared` no se aplican cambios sueltos: se publica una versión nueva del índice compartido
+            return SharedIndex.refresh(session)
+
+        categories = session.exec(select(Category)).all()
+        changes = sum(index.add_category(c) for c in categories)
+        # Si el índice comparte el almacén de productos con la instantánea del catálogo, lo sigue compartiendo
+        snapshot = CatalogCache.current()
+        shares_store = (isinstance(index, SearchIndex) and snapshot is not None
+                        and snapshot.products is index.product_store())
+
+        watermark = CatalogVersion.watermark()
+        query = select(Product).order_by(Product.updated_at)
+        if watermark is not None:
+            query = query.where(Product.updated_at > watermark - cls.REFRESH_OVERLAP)
+        products = session.exec(query).all()
+        # Los cambios se aplican en lote: en modo `sharded`, un mensaje por fragmento y no uno por producto
+        changes += index.apply_changes(products)
+        for product in products:
+            if product.updated_at is not None and (watermark is None or product.updated_at > watermark):
+                watermark = product.updated_at
+
+        removed = set()
+        total = session.exec(select(func.count()).select_from(Product)).one()
+        if total != len(index):
+            existing = set(session.exec(select(Product.id)).all())
+            removed = index.product_ids() - existing
+            changes += index.apply_changes((), removed)
+
+        CatalogVersion.set_watermark(watermark, total, [(c.id, c.name) for c in categories])
+        if changes:
+            version = CatalogVersion.bump()
+            logger.info(f"Catálogo actualizado: {changes} cambios aplicados (versión {version})")
+            # Las facetas y la instantánea del catálogo se ponen al día aquí, no en la siguiente petición
+            index.refresh_facets()
+            product_changes = {product.id: product for product in products}
+            product_changes.update(dict.fromkeys(removed))
+            CatalogCache.apply_changes(categories, product_changes, index.product_store() if shares_store else None)
+            if isinstance(index, ShardedSearch):
+                # Cada fragmento pone al día su propio autocompletado
+                index.rebuild_suggestions()
+            else:
+                SuggestIndex.refresh(index)
+        return changes
+
+    @classmethod
+    def start(cls, watermark: Optional[datetime], interval: Optional[float] = None,
+              rows: Optional[int] = None, categories: Optional[List[Tuple[int, str]]] = None) -> None:
+        """
+        Arranca el hilo de refresco en segundo plano.
+
+        Args:
+            watermark: Marca de agua tomada antes de construir el índice.
+            interval: Segundos entre refrescos. Si es 0 o negativo no se arranca el hilo.
+            rows: Número de productos del índice construido.
+            categories: Pares `(id, nombre)` de las categorías leídas al construirlo.
+        """
+        interval = cls.REFRESH_INTERVAL if interval is None else interval
+        CatalogVersion.set_watermark(watermark, rows, categories)
+        if interval <= 0 or cls._thread is not None:
+            return
+        cls._stop_event = threading.Event()
+        cls._thread = threading.Thread(
+            target=cls._run, args=(cls._stop_event, interval), name="catalog-refresher", daemon=True
+        )
+        cls._thread.start()
+        logger.info(f"Refresco incremental del catálogo cada {interval} segundos")
+
+    @classmethod
+    def stop(cls) -> None:
+        """Detiene el hilo de refresco si está en marcha."""
+        if cls._thread is None:
+            return
+        cls._stop_event.set()
+        cls._thread.join(timeout=5)
+        cls._thread = None
+        cls._stop_event = None
+
+    @classmethod
+    def _run(cls, stop_event: threading.Event, interval: float) -> None:
+        while not stop_event.wait(interval):
+            try:
+                with Session(DatabaseRegistry.engine()) as session:
+                    cls.refresh(session)
+            except Exception as e:
+                logger.error(f"Error refrescando el catálogo: {str(e)}", exc_info=True)
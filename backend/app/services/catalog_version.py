@@ -0,0 +1,82 @@
+"""
+Versión del catálogo en memoria.
+Contador monótono que se incrementa cada vez que se aplica un cambio del catálogo a las
+estructuras en memoria, de modo que las cachés derivadas puedan comprobar en O(1) si siguen vigentes.
+"""
+
+import hashlib
+import threading
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+
+class CatalogVersion:
+    """Versión actual del catálogo y marca de agua de la última fila de producto aplicada."""
+
+    _version: int = 0
+    _watermark: Optional[datetime] = None
+    _rows: Optional[int] = None
+    # Huella de la tabla de categorías (ids y nombres) aplicada a las estructuras en memoria
+    _categories: Optional[str] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def current(cls) -> int:
+        """Devuelve la versión actual del catálogo."""
+        return cls._version
+
+    @classmethod
+    def watermark(cls) -> Optional[datetime]:
+        """Devuelve el `updated_at` más reciente aplicado a las estructuras en memoria."""
+        return cls._watermark
+
+    @classmethod
+    def bump(cls) -> int:
+        """
+        Incrementa la versión del catálogo.
+
+        Returns:
+            La nueva versión.
+        """
+        with cls._lock:
+            cls._version += 1
+            return cls._version
+
+    @classmethod
+    def fingerprint(cls) -> Optional[str]:
+        """
+        Devuelve una huella del estado del catálogo derivada de la base de datos (marca de agua,
+        número de productos y tabla de categorías), o None si ningún refresco del catálogo la sigue.
+        A diferencia de la versión, que es un contador local de cada proceso, coincide entre
+        réplicas que han aplicado los mismos cambios.
+        """
+        if cls._rows is None or cls._categories is None:
+            return None
+        watermark = cls._watermark.isoformat() if cls._watermark else "-"
+        return f"{watermark}|{cls._rows}|{cls._categories}"
+
+    @classmethod
+    def set_watermark(cls, watermark: Optional[datetime], rows: Optional[int] = None,
+                      categories: Optional[Iterable[Tuple[int, str]]] = None) -> None:
+        """
+        Actualiza la marca de agua (y el número de productos y las categorías, si se conocen)
+        sin cambiar la versión.
+
+        Args:
+            watermark: `updated_at` más reciente aplicado.
+            rows: Número de productos aplicados.
+            categories: Pares `(id, nombre)` de la tabla de categorías aplicada.
+        """
+        cls._watermark = watermark
+        if rows is not None:
+            cls._rows = rows
+        if categories is not None:
+            pairs = sorted((int(cid), str(name)) for cid, name in categories)
+            cls._categories = hashlib.sha1(repr(pairs).encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def reset(cls) -> None:
+        """Olvida la huella del catálogo (las respuestas dejan de llevar ETag hasta el próximo refresco)."""
+        cls._watermark = None
+        cls._rows = None
+        cls._categories = None
@@ -0,0 +1,111 @@
+"""
+Cuerpos de respuesta JSON ya serializados.
+Los endpoints de catálogo (`/categories` y `/products`) devuelven los mismos datos mientras no
+cambie la instantánea del catálogo, así que su cuerpo se codifica una vez con orjson (y, si el
+cliente lo acepta, se comprime con gzip una vez) y cada petición solo envía esos bytes.
+También incluye las cabeceras de validación HTTP (`ETag`, `Cache-Control`) para que el
+frontend o un proxy inverso revaliden con `If-None-Match` y reciban 304 sin cuerpo.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import Response
+
+JSON_MEDIA_TYPE = "application/json"
+# Segundos que un proxy o el navegador pueden reutilizar una respuesta del catálogo sin revalidarla
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", 30))
+
+
+def make_etag(*parts: Any) -> str:
+    """Construye un ETag fuerte a partir de las partes que identifican el contenido."""
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    """Indica si la cabecera `If-None-Match` coincide con alguno de los ETag (comparación débil, RFC 9110)."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    if "*" in candidates:
+        return True
+    return any((tag[2:] if tag.startswith("W/") else tag) in etags for tag in candidates)
+
+
+def cache_headers(etag: Optional[str]) -> Dict[str, str]:
+    """Cabeceras de caché HTTP de una respuesta con `etag` (ninguna si no hay ETag)."""
+    if etag is None:
+        return {}
+    cache_control = f"public, max-age={HTTP_CACHE_MAX_AGE}" if HTTP_CACHE_MAX_AGE > 0 else "no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Respuesta 304 Not Modified con las cabeceras de caché de `etag`."""
+    return Response(status_code=304, headers={**cache_headers(etag), **(headers or {})})
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Indica si la cabecera `Accept-Encoding` admite gzip (explícitamente o con `*`, y sin `q=0`)."""
+    weights = {}
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.partition(";")
+        params = params.strip()
+        try:
+            weights[coding.strip()] = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            weights[coding.strip()] = 1.0
+    return weights.get("gzip", weights.get("*", 0.0)) > 0
+
+
+class EncodedBody:
+    """
+    Cuerpo JSON codificado y, bajo demanda, su variante gzip.
+    La compresión se hace en la primera petición que la acepta, no al codificar, para no
+    retrasar la carga de la instantánea con catálogos grandes.
+    """
+
+    GZIP_ENABLED = os.getenv("CATALOG_RESPONSE_GZIP", "true").lower() in ("1", "true", "yes")
+    GZIP_LEVEL = int(os.getenv("CATALOG_RESPONSE_GZIP_LEVEL", 6))
+    # Por debajo de este tamaño la compresión no compensa
+    GZIP_MIN_SIZE = int(os.getenv("CATALOG_RESPONSE_GZIP_MIN_SIZE", 1024))
+
+    def __init__(self, payload: Any):
+        self.raw = orjson.dumps(payload)
+        # La variante gzip es otra representación: un ETag fuerte no puede compartirse entre ambas
+        self.etag = make_etag(hashlib.sha1(self.raw).hexdigest())
+        self.gzip_etag = self.etag[:-1] + '-gzip"'
+        self._gzip: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    @property
+    def gzip(self) -> Optional[bytes]:
+        """Devuelve el cuerpo comprimido, o None si la compresión está desactivada o no compensa."""
+        if not self.GZIP_ENABLED or len(self.raw) < self.GZIP_MIN_SIZE:
+            return None
+        if self._gzip is None:
+            with self._lock:
+                if self._gzip is None:
+                    self._gzip = gzip.compress(self.raw, compresslevel=self.GZIP_LEVEL)
+        return self._gzip
+
+    def response(self, accept_encoding: Optional[str] = None, if_none_match: Optional[str] = None) -> Response:
+        """
+        Construye la respuesta HTTP con los bytes ya codificados, comprimidos si el cliente lo acepta.
+        Si `If-None-Match` coincide con el ETag del cuerpo (en cualquiera de sus variantes) responde 304.
+        """
+        compressed = self.gzip if accepts_gzip(accept_encoding) else None
+        etag = self.etag if compressed is None else self.gzip_etag
+        headers = {"Vary": "Accept-Encoding"} if self.GZIP_ENABLED else {}
+        if etag_matches(if_none_match, self.etag, self.gzip_etag):
+            return not_modified(etag, headers)
+        headers.update(cache_headers(etag))
+        if compressed is not None:
+            headers["Content-Encoding"] = "gzip"
+            return Response(compressed, media_type=JSON_MEDIA_TYPE, headers=headers)
+        return Response(self.raw, media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,215 @@
+"""
+Índice columnar de precio y categoría para filtrar y facetar la búsqueda.
+Guarda en arrays de NumPy, alineados por id de producto, el precio, la categoría y la posición de
+inserción de cada producto, además del orden por precio. Los filtros se resuelven con máscaras
+vectorizadas (o con bisección sobre los precios ordenados cuando se filtra el catálogo completo)
+y los recuentos de facetas con `bincount`, sin recorrer los productos en Python.
+"""
+
+import os
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+# Órdenes admitidos por `/search/text`
+SORTS = ("relevance", "price_asc", "price_desc")
+
+
+class SearchFilters(NamedTuple):
+    """Filtros, orden y facetas opcionales de una búsqueda."""
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    categories: Tuple[int, ...] = ()
+    sort: str = "relevance"
+    facets: bool = False
+
+    def filtering(self) -> bool:
+        """Indica si la búsqueda restringe el resultado por precio o categoría."""
+        return self.min_price is not None or self.max_price is not None or bool(self.categories)
+
+    def active(self) -> bool:
+        """Indica si hace falta el índice de facetas (filtros, orden por precio o facetas)."""
+        return self.filtering() or self.sort != "relevance" or self.facets
+
+
+class FacetIndex:
+    """
+    Columnas de precio y categoría de los productos de un `SearchIndex`.
+    Es inmutable: cuando cambian productos, el índice de búsqueda crea uno nuevo con `updated`,
+    que parte de las columnas actuales en lugar de recorrer el catálogo.
+    """
+
+    # Límites inferiores de los tramos de precio (el primero empieza en 0 y el último no tiene tope)
+    PRICE_BUCKETS = tuple(float(edge) for edge in os.getenv("SEARCH_PRICE_BUCKETS", "10,25,50,100,250").split(","))
+    # Nombres de los arrays que devuelve `columns`
+    COLUMNS = ("ids", "prices", "category_codes", "ranks", "price_order", "sorted_prices", "price_asc", "price_desc")
+
+    def __init__(self, products: Iterable[Any], positions: Mapping[int, int]):
+        """
+        Args:
+            products: Objetos con atributos `id`, `price` y `category_id`.
+            positions: Posición de inserción de cada producto (desempate del ranking).
+        """
+        products = sorted(products, key=lambda p: p.id)
+        self.ids, self.prices, self.category_codes, self.ranks = self._product_columns(products, positions)
+        self._sort()
+
+    @staticmethod
+    def _product_columns(products: List[Any], positions: Mapping[int, int]) -> Tuple[np.ndarray, ...]:
+        """Columnas de id, precio, código de categoría y posición de una lista de productos."""
+        count = len(products)
+        return (
+            np.fromiter((p.id for p in products), dtype=np.int64, count=count),
+            np.fromiter((p.price for p in products), dtype=np.float64, count=count),
+            # Id de categoría desplazado en uno (0 = sin categoría) para contar con `bincount`
+            np.fromiter((0 if p.category_id is None else p.category_id + 1 for p in products),
+                        dtype=np.int64, count=count),
+            np.fromiter((positions[p.id] for p in products), dtype=np.int64, count=count),
+        )
+
+    def _sort(self) -> None:
+        """Calcula los órdenes por precio a partir de las columnas de producto."""
+        # Filas ordenadas por precio (y por posición a igual precio) para resolver rangos por bisección
+        self.price_order = np.lexsort((self.ranks, self.prices))
+        self.sorted_prices = self.prices[self.price_order]
+        # Puesto de cada fila en cada orden: ordenar un subconjunto se reduce a ordenar enteros únicos
+        self.sort_keys = {
+            "relevance": self.ranks,
+            "price_asc": self._positions_of(self.price_order),
+            "price_desc": self._positions_of(np.lexsort((self.ranks, -self.prices))),
+        }
+        self.edges = np.array(self.PRICE_BUCKETS, dtype=np.float64)
+
+    def updated(self, changes: Mapping[int, Optional[Any]], positions: Mapping[int, int]) -> "FacetIndex":
+        """
+        Devuelve un índice nuevo con los cambios aplicados, sin modificar este.
+        Solo los productos cambiados se leen en Python; el resto de filas se copian y reordenan
+        con operaciones vectorizadas.
+
+        Args:
+            changes: Producto actual de cada id cambiado, o None si se ha eliminado.
+            positions: Posición de inserción de cada producto (desempate del ranking).
+        """
+        changed = np.fromiter(changes, dtype=np.int64, count=len(changes))
+        keep = ~np.isin(self.ids, changed)
+        added = self._product_columns([p for p in changes.values() if p is not None], positions)
+        columns = [np.concatenate((column[keep], new)) for column, new in
+                   zip((self.ids, self.prices, self.category_codes, self.ranks), added)]
+        order = np.argsort(columns[0], kind="stable")
+        index = self.__class__.__new__(self.__class__)
+        index.ids, index.prices, index.category_codes, index.ranks = (column[order] for column in columns)
+        index._sort()
+        return index
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Devuelve los arrays del índice por nombre (`COLUMNS`), para guardarlos y restaurarlos con `from_columns`."""
+        arrays = (self.ids, self.prices, self.category_codes, self.ranks, self.price_order, self.sorted_prices,
+                  self.sort_keys["price_asc"], self.sort_keys["price_desc"])
+        return dict(zip(self.COLUMNS, arrays))
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, np.ndarray]) -> "FacetIndex":
+        """
+        Crea el índice sobre arrays ya construidos por `columns` (p. ej. proyectados en memoria
+        desde un archivo) sin copiarlos.
+        """
+        index = cls.__new__(cls)
+        index.ids = columns["ids"]
+        index.prices = columns["prices"]
+        index.category_codes = columns["category_codes"]
+        index.ranks = columns["ranks"]
+        index.price_order = columns["price_order"]
+        index.sorted_prices = columns["sorted_prices"]
+        index.sort_keys = {"relevance": index.ranks, "price_asc": columns["price_asc"],
+                           "price_desc": columns["price_desc"]}
+        index.edges = np.array(cls.PRICE_BUCKETS, dtype=np.float64)
+        return index
+
+    @staticmethod
+    def _positions_of(order: np.ndarray) -> np.ndarray:
+        positions = np.empty(len(order), dtype=np.int64)
+        positions[order] = np.arange(len(order))
+        return positions
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows(self, product_ids: Iterable[int]) -> np.ndarray:
+        """Convierte ids de producto indexados en filas de las columnas."""
+        ids = np.fromiter(product_ids, dtype=np.int64)
+        return np.searchsorted(self.ids, ids)
+
+    def category_ids(self, rows: np.ndarray) -> Set[int]:
+        """Devuelve los ids de las categorías de los productos de `rows`."""
+        counts = np.bincount(self.category_codes[rows])
+        return {None if code == 0 else code - 1 for code in np.flatnonzero(counts).tolist()}
+
+    def price_rows(self, rows: Optional[np.ndarray], filters: SearchFilters) -> np.ndarray:
+        """
+        Filtra `rows` por el rango de precio. Con `rows` a None parte del catálogo completo y
+        resuelve el rango por bisección: el resultado sale ya ordenado por precio.
+        """
+        if rows is None:
+            lo = 0 if filters.min_price is None else np.searchsorted(self.sorted_prices, filters.min_price, "left")
+            hi = len(self) if filters.max_price is None else np.searchsorted(
+                self.sorted_prices, filters.max_price, "right")
+            return self.price_order[lo:hi]
+        keep = np.ones(len(rows), dtype=bool)
+        prices = self.prices[rows]
+        if filters.min_price is not None:
+            keep &= prices >= filters.min_price
+        if filters.max_price is not None:
+            keep &= prices <= filters.max_price
+        return rows[keep]
+
+    def category_rows(self, rows: Optional[np.ndarray], filters: SearchFilters) -> np.ndarray:
+        """Filtra `rows` (o el catálogo completo si es None) por las categorías pedidas."""
+        if rows is None:
+            rows = np.arange(len(self))
+        if not filters.categories:
+            return rows
+        # Tabla de categorías admitidas indexada por código: una sola lectura vectorizada por fila
+        allowed = np.zeros(int(self.category_codes.max(initial=0)) + 1, dtype=bool)
+        codes = [cid + 1 for cid in filters.categories if 0 <= cid + 1 < len(allowed)]
+        allowed[codes] = True
+        return rows[allowed[self.category_codes[rows]]]
+
+    def select(self, rows: Optional[np.ndarray], filters: SearchFilters) -> np.ndarray:
+        """Aplica los filtros de precio y categoría a `rows` (o al catálogo completo si es None)."""
+        return self.category_rows(self.price_rows(rows, filters), filters)
+
+    def order(self, rows: np.ndarray, sort: str, count: Optional[int] = None) -> np.ndarray:
+        """
+        Ordena `rows` por precio (ascendente o descendente) o, con `relevance`, por posición.
+        Con `count` solo se devuelven las primeras `count` filas, seleccionadas con `argpartition`
+        antes de ordenar.
+        """
+        keys = self.sort_keys[sort][rows]
+        if count is not None and count < len(rows):
+            top = np.argpartition(keys, count - 1)[:count] if count > 0 else np.empty(0, dtype=np.int64)
+            return rows[top[np.argsort(keys[top])]]
+        return rows[np.argsort(keys)]
+
+    def facets(self, rows: Optional[np.ndarray], filters: SearchFilters,
+               category_names: Mapping[int, str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Cuenta los productos de `rows` (o del catálogo completo) por categoría y por tramo de precio.
+        Cada faceta aplica los demás filtros pero no el suyo, de modo que el cliente puede ver
+        cuántos productos hay en las otras categorías o tramos antes de cambiar la selección.
+        """
+        counts = np.bincount(self.category_codes[self.price_rows(rows, filters)])
+        category_facets = [
+            {"id": None if code == 0 else code - 1, "name": category_names.get(code - 1), "count": int(counts[code])}
+            for code in np.flatnonzero(counts).tolist()
+        ]
+        category_facets.sort(key=lambda facet: -facet["count"])
+
+        prices = self.prices[self.category_rows(rows, filters)]
+        buckets = np.bincount(np.searchsorted(self.edges, prices, "right"), minlength=len(self.edges) + 1)
+        lower = [0.0] + self.edges.tolist()
+        upper = self.edges.tolist() + [None]
+        price_facets = [
+            {"min": low, "max": high, "count": int(count)}
+            for low, high, count in zip(lower, upper, buckets.tolist())
+        ]
+        return {"categories": category_facets, "price": price_facets}
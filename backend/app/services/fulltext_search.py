@@ -0,0 +1,268 @@
+"""
+Búsqueda por texto delegada en MariaDB.
+Alternativa al índice en memoria: la coincidencia por palabra se resuelve con un índice
+FULLTEXT sobre `product(name, description)` mediante `MATCH ... AGAINST`, de modo que solo
+las filas coincidentes viajan desde la base de datos. Sin palabras en la consulta, los filtros,
+el orden por precio y las facetas se resuelven por completo en SQL sobre el catálogo, como hace
+el índice en memoria, y solo viaja la página pedida.
+"""
+
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Select, case, desc, func, or_, select, text
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db import CatalogQueries, Product
+
+from .facet_index import FacetIndex, SearchFilters
+from .search_index import SearchIndex
+
+# Coincidencia de cualquiera de las palabras (modo booleano sin operadores = OR)
+MATCH_CLAUSE = text(
+    "MATCH (product.name, product.description) AGAINST (:terms IN BOOLEAN MODE)"
+)
+
+product = Product.__table__
+
+
+class BrowseQueries(NamedTuple):
+    """Consultas de una búsqueda sin palabras: página, total, categorías presentes y facetas (o None)."""
+    page: Select
+    total: Select
+    categories: Select
+    category_facets: Optional[Select]
+    price_facets: Optional[Select]
+
+
+class FulltextSearch:
+    """
+    Servicio de búsqueda por texto con push-down a MariaDB.
+    Devuelve el mismo formato que `SearchIndex.search`: las filas obtenidas se vuelven a
+    indexar en un índice efímero (de tamaño proporcional al resultado) que aplica exactamente
+    las mismas reglas de coincidencia por palabra completa. Las estadísticas de BM25 se calculan
+    sobre las filas obtenidas, por lo que el orden puede diferir ligeramente del modo en memoria.
+    Como mucho se leen MAX_CANDIDATES filas por consulta, las más relevantes según MariaDB.
+    """
+
+    MAX_CANDIDATES = int(os.getenv("SEARCH_FULLTEXT_MAX_CANDIDATES", 10000))
+
+    @staticmethod
+    def filter_conditions(filters: Optional[SearchFilters]) -> List[Any]:
+        """Condiciones SQL de los filtros de precio y categoría."""
+        conditions = []
+        if filters is None:
+            return conditions
+        if filters.min_price is not None:
+            conditions.append(product.c.price >= filters.min_price)
+        if filters.max_price is not None:
+            conditions.append(product.c.price <= filters.max_price)
+        if filters.categories:
+            conditions.append(product.c.category_id.in_(list(filters.categories)))
+        return conditions
+
+    @classmethod
+    def build_query(cls, category_ids: List[int], tokens: List[str], filters: Optional[SearchFilters] = None):
+        """
+        Construye la consulta de productos para una búsqueda.
+        Los filtros de precio y categoría se aplican en SQL salvo que se pidan facetas, que cuentan
+        los productos que excluye cada filtro. Las filas se limitan a MAX_CANDIDATES, primero las
+        de las categorías detectadas y después por la relevancia de `MATCH ... AGAINST`.
+
+        Args:
+            category_ids: Ids de las categorías detectadas por palabras clave.
+            tokens: Palabras normalizadas de la consulta.
+            filters: Filtros, orden y facetas de la búsqueda.
+
+        Returns:
+            La sentencia `select` o None si la consulta no puede coincidir con ningún producto.
+        """
+        conditions = []
+        order = []
+        if category_ids:
+            conditions.append(product.c.category_id.in_(category_ids))
+            order.append(case((product.c.category_id.in_(category_ids), 1), else_=0).desc())
+        if tokens:
+            match = MATCH_CLAUSE.bindparams(terms=" ".join(sorted(set(tokens))))
+            conditions.append(match)
+            order.append(desc(match.self_group()))
+        if not conditions:
+            return None
+        pushed = cls.filter_conditions(filters) if filters is not None and not filters.facets else []
+        query = CatalogQueries.index_products(or_(*conditions), *pushed)
+        return query.order_by(None).order_by(*order, product.c.id).limit(cls.MAX_CANDIDATES)
+
+    @classmethod
+    def browse_queries(cls, limit: Optional[int], offset: int, filters: SearchFilters) -> BrowseQueries:
+        """
+        Consultas de una búsqueda sin palabras sobre el catálogo completo: la página ordenada
+        (LIMIT/OFFSET en SQL), el total, las categorías con algún producto y, si se piden, las facetas.
+        Cada faceta aplica los demás filtros pero no el suyo, como `FacetIndex.facets`.
+        """
+        conditions = cls.filter_conditions(filters)
+        if filters.sort == "price_asc":
+            order = (product.c.price, product.c.id)
+        elif filters.sort == "price_desc":
+            order = (product.c.price.desc(), product.c.id)
+        else:
+            # Sin texto la relevancia es el orden de inserción del índice en memoria: el orden por id
+            order = (product.c.id,)
+        page = CatalogQueries.index_products(*conditions).order_by(None).order_by(*order).offset(offset)
+        if limit is not None:
+            page = page.limit(limit)
+        category_facets = price_facets = None
+        if filters.facets:
+            by_price = SearchFilters(filters.min_price, filters.max_price)
+            by_category = SearchFilters(categories=filters.categories)
+            category_facets = (select(product.c.category_id, func.count())
+                               .where(*cls.filter_conditions(by_price)).group_by(product.c.category_id))
+            edges = FacetIndex.PRICE_BUCKETS
+            bucket = case(*((product.c.price < edge, i) for i, edge in enumerate(edges)), else_=len(edges))
+            price_facets = (select(bucket.label("bucket"), func.count())
+                            .where(*cls.filter_conditions(by_category)).group_by("bucket"))
+        return BrowseQueries(
+            page=page,
+            total=select(func.count()).select_from(product).where(*conditions),
+            categories=select(product.c.category_id).where(*conditions).distinct(),
+            category_facets=category_facets,
+            price_facets=price_facets,
+        )
+
+    @staticmethod
+    def browse_result(categories: Iterable[Any], products: Iterable[Any], total: int,
+                      found: Iterable[Optional[int]], category_counts: Optional[Iterable[Any]] = None,
+                      price_counts: Optional[Iterable[Any]] = None) -> Dict[str, Any]:
+        """Construye el resultado de una búsqueda sin palabras con el formato de `SearchIndex.search`."""
+        names = {c.id: c.name for c in categories}
+        found = set(found)
+        result = {
+            "categories": [name for cid, name in names.items() if cid in found],
+            "products": [{"id": p.id, "name": p.name, "price": p.price, "category": names.get(p.category_id)}
+                         for p in products],
+            "total": total,
+            "corrections": {},
+        }
+        if category_counts is not None:
+            counts = sorted(category_counts, key=lambda row: (row[0] is not None, row[0] or 0))
+            category_facets = [{"id": cid, "name": names.get(cid), "count": count} for cid, count in counts]
+            category_facets.sort(key=lambda facet: -facet["count"])
+            buckets = dict(price_counts or ())
+            edges = list(FacetIndex.PRICE_BUCKETS)
+            result["facets"] = {
+                "categories": category_facets,
+                "price": [{"min": low, "max": high, "count": buckets.get(i, 0)}
+                          for i, (low, high) in enumerate(zip([0.0] + edges, edges + [None]))],
+            }
+        return result
+
+    @classmethod
+    def browse(cls, session: Session, limit: Optional[int], offset: int, categories: Iterable[Any],
+               filters: SearchFilters) -> Dict[str, Any]:
+        """Resuelve en SQL una búsqueda sin palabras con filtros, orden por precio o facetas."""
+        queries = cls.browse_queries(limit, offset, filters)
+        facets = filters.facets
+        return cls.browse_result(
+            categories, session.exec(queries.page).all(), session.exec(queries.total).scalar_one(),
+            session.exec(queries.categories).scalars(),
+            session.exec(queries.category_facets).all() if facets else None,
+            session.exec(queries.price_facets).all() if facets else None,
+        )
+
+    @classmethod
+    def search(cls, session: Session, tokens: List[str], limit: Optional[int] = None,
+               offset: int = 0, categories: Optional[Iterable[Any]] = None,
+               filters: Optional[SearchFilters] = None) -> Dict[str, Any]:
+        """
+        Resuelve una consulta ya tokenizada en la base de datos.
+
+        Args:
+            session: Sesión de base de datos a utilizar.
+            tokens: Palabras normalizadas de la consulta.
+            limit: Número máximo de productos a devolver. None devuelve todos.
+            offset: Número de productos a omitir desde el principio del ranking.
+            categories: Categorías ya cargadas (p.ej. desde la caché del catálogo). Si es None
+                se leen de la base de datos.
+            filters: Filtros de precio y categoría, orden y facetas. Se aplican sobre las filas
+                que coinciden con el texto, por lo que requieren una consulta con palabras.
+
+        Returns:
+            Diccionario con el mismo formato que `/search/text`.
+        """
+        if categories is None:
+            categories = session.exec(CatalogQueries.categories()).all()
+        if not tokens and filters is not None and filters.active():
+            return cls.browse(session, limit, offset, categories, filters)
+        index = SearchIndex.build(categories, [])
+        query = cls.build_query(index.match_categories(tokens), tokens, filters)
+        products = session.exec(query).all() if query is not None else []
+        return cls.rank(index, products, tokens, limit, offset, filters)
+
+    @staticmethod
+    def rank(index: SearchIndex, products: Iterable[Any], tokens: List[str], limit: Optional[int],
+             offset: int, filters: Optional[SearchFilters]) -> Dict[str, Any]:
+        """Indexa las filas obtenidas en el índice efímero y resuelve la consulta sobre ellas."""
+        for product in products:
+            index.add_product(product)
+        # El vocabulario del índice efímero solo contiene las filas obtenidas, así que no se corrigen erratas
+        return index.search(tokens, limit, offset, fuzzy=False, filters=filters)
+
+    @staticmethod
+    def suggest(session: Session, prefix: str, limit: int) -> List[str]:
+        """
+        Completa un prefijo con los nombres de producto normalizados (`product.name_normalized`).
+        Se resuelve con un rango del índice de esa columna, así que los completados salen en orden
+        alfabético y no incluyen los términos de las descripciones como el índice en memoria.
+        """
+        if not prefix.strip() or limit <= 0:
+            return []
+        return list(session.exec(CatalogQueries.name_suggestions(prefix, limit)).scalars())
+
+    @classmethod
+    def search_many(cls, session: Session, token_lists: Iterable[List[str]], limit: Optional[int] = None,
+                    offset: int = 0, categories: Optional[Iterable[Any]] = None,
+                    filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """
+        Resuelve varias consultas en la misma sesión, leyendo las categorías una sola vez.
+        Cada consulta mantiene su propio índice efímero para que el resultado coincida con `search`.
+        """
+        if categories is None:
+            categories = session.exec(CatalogQueries.categories()).all()
+        categories = list(categories)
+        return [cls.search(session, tokens, limit, offset, categories, filters) for tokens in token_lists]
+
+    @classmethod
+    async def search_async(cls, session: AsyncSession, tokens: List[str], limit: Optional[int] = None,
+                           offset: int = 0, categories: Optional[Iterable[Any]] = None,
+                           filters: Optional[SearchFilters] = None) -> Dict[str, Any]:
+        """
+        Variante de `search` para sesiones asíncronas; admite los mismos argumentos y devuelve lo mismo.
+        La consulta se espera en el bucle de eventos y la indexación y el ranking de las filas se hacen en el threadpool.
+        """
+        if categories is None:
+            categories = (await session.exec(CatalogQueries.categories())).all()
+        if not tokens and filters is not None and filters.active():
+            queries = cls.browse_queries(limit, offset, filters)
+            facets = filters.facets
+            return cls.browse_result(
+                categories, (await session.exec(queries.page)).all(), (await session.exec(queries.total)).scalar_one(),
+                (await session.exec(queries.categories)).scalars(),
+                (await session.exec(queries.category_facets)).all() if facets else None,
+                (await session.exec(queries.price_facets)).all() if facets else None,
+            )
+        index = SearchIndex.build(categories, [])
+        query = cls.build_query(index.match_categories(tokens), tokens, filters)
+        products = (await session.exec(query)).all() if query is not None else []
+        return await run_in_threadpool(cls.rank, index, products, tokens, limit, offset, filters)
+
+    @classmethod
+    async def search_many_async(cls, session: AsyncSession, token_lists: Iterable[List[str]],
+                                limit: Optional[int] = None, offset: int = 0,
+                                categories: Optional[Iterable[Any]] = None,
+                                filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """Variante de `search_many` para sesiones asíncronas."""
+        if categories is None:
+            categories = (await session.exec(CatalogQueries.categories())).all()
+        categories = list(categories)
+        return [await cls.search_async(session, tokens, limit, offset, categories, filters) for tokens in token_lists]
@@ -0,0 +1,318 @@
+"""
+Almacén compacto de productos en columnas.
+En lugar de un objeto por producto, guarda arrays paralelos de NumPy para id, precio y categoría,
+y los nombres y descripciones concatenados en un único bloque UTF-8 con sus offsets. Las vistas
+de cada fila (`ProductView`, con `__slots__`) se crean solo al acceder a ella, así que el coste
+en memoria por producto son unos pocos bytes de columnas más los caracteres de sus textos.
+"""
+
+from collections.abc import Mapping, Sequence
+from typing import Any, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+# Valor de `category_ids` para los productos sin categoría
+NO_CATEGORY = -1
+
+
+class ProductView:
+    """
+    Producto de un `ProductStore`; se crea al acceder a la fila y no se guarda.
+    La descripción solo se decodifica si se lee: los listados no la necesitan.
+    """
+
+    __slots__ = ("id", "name", "price", "category_id", "_store", "_row")
+
+    def __init__(self, store: "ProductStore", row: int, id: int, name: Optional[str], price: float,
+                 category_id: Optional[int]):
+        self._store = store
+        self._row = row
+        self.id = id
+        self.name = name
+        self.price = price
+        self.category_id = category_id
+
+    @property
+    def description(self) -> Optional[str]:
+        return self._store.description(self._row)
+
+    def _fields(self) -> Tuple[Any, ...]:
+        return self.id, self.name, self.description, self.price, self.category_id
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, ProductView) and self._fields() == other._fields()
+
+    def __repr__(self) -> str:
+        return (f"ProductView(id={self.id!r}, name={self.name!r}, description={self.description!r}, "
+                f"price={self.price!r}, category_id={self.category_id!r})")
+
+
+def _pack(texts: Iterable[Optional[str]], count: int) -> Tuple[bytes, np.ndarray, np.ndarray]:
+    """Concatena textos en un bloque UTF-8; devuelve el bloque, los offsets y la máscara de nulos."""
+    lengths = np.zeros(count + 1, dtype=np.int64)
+    nulls = np.zeros(count, dtype=bool)
+    chunks: List[bytes] = []
+    for row, text in enumerate(texts):
+        if text is None:
+            nulls[row] = True
+        else:
+            chunk = text.encode()
+            chunks.append(chunk)
+            lengths[row + 1] = len(chunk)
+    return b"".join(chunks), _compact(np.cumsum(lengths)), nulls
+
+
+def _compact(offsets: np.ndarray) -> np.ndarray:
+    # Con menos de 4 GB de texto los offsets caben en 32 bits
+    return offsets.astype(np.uint32) if offsets[-1] < 2**32 else offsets
+
+
+def gather_text(blobs: Sequence[Any], sources: np.ndarray, starts: np.ndarray,
+                ends: np.ndarray) -> Tuple[bytes, np.ndarray]:
+    """
+    Concatena los tramos `blobs[sources[i]][starts[i]:ends[i]]` en un bloque nuevo.
+    Los tramos contiguos en su bloque de origen se copian con un solo corte, así que el trabajo en
+    Python depende del número de discontinuidades (p. ej. de filas cambiadas) y no del de filas.
+
+    Returns:
+        El bloque y los offsets (int64) de cada tramo en él.
+    """
+    offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+    np.cumsum(ends - starts, out=offsets[1:])
+    breaks = np.flatnonzero((sources[1:] != sources[:-1]) | (starts[1:] != ends[:-1])) + 1
+    bounds = [0] + breaks.tolist() + [len(starts)]
+    chunks = [blobs[sources.item(start)][starts.item(start):ends.item(end - 1)]
+              for start, end in zip(bounds, bounds[1:]) if start < end]
+    return b"".join(chunks), offsets
+
+
+class ProductStore(Mapping):
+    """
+    Productos del catálogo ordenados por id, en columnas de solo lectura.
+    Se comporta como un `Mapping` inmutable de id a `ProductView`; `values()` y los métodos de
+    selección devuelven secuencias de filas que crean las vistas a medida que se recorren.
+    """
+
+    # Filas cuyas columnas se leen de una vez al crear varias vistas seguidas
+    CHUNK = 4096
+
+    def __init__(self, products: Iterable[Any]):
+        """
+        Args:
+            products: Objetos con atributos `id`, `name`, `description`, `price` y `category_id`.
+        """
+        rows = sorted(products, key=lambda p: p.id)
+        count = len(rows)
+        self.ids = np.fromiter((p.id for p in rows), dtype=np.int64, count=count)
+        self.prices = np.fromiter((p.price for p in rows), dtype=np.float64, count=count)
+        self.category_ids = np.fromiter(
+            (NO_CATEGORY if p.category_id is None else p.category_id for p in rows), dtype=np.int32, count=count
+        )
+        self._names, self._name_offsets, self._name_nulls = _pack((p.name for p in rows), count)
+        self._descriptions, self._description_offsets, self._description_nulls = _pack(
+            (p.description for p in rows), count
+        )
+        self._group()
+
+    @classmethod
+    def from_columns(cls, ids: np.ndarray, prices: np.ndarray, category_ids: np.ndarray,
+                     names: Tuple[bytes, np.ndarray, np.ndarray],
+                     descriptions: Tuple[bytes, np.ndarray, np.ndarray]) -> "ProductStore":
+        """
+        Crea el almacén sobre columnas ya construidas (p. ej. leídas de la instantánea en disco), sin
+        crear un objeto por producto.
+
+        Args:
+            ids: Ids de los productos, en orden ascendente.
+            prices: Precio de cada fila.
+            category_ids: Categoría de cada fila (NO_CATEGORY para los productos sin categoría).
+            names: Bloque UTF-8 de los nombres, sus offsets y su máscara de nulos.
+            descriptions: Lo mismo para las descripciones.
+        """
+        store = cls.__new__(cls)
+        store.ids = np.asarray(ids, dtype=np.int64)
+        store.prices = np.asarray(prices, dtype=np.float64)
+        store.category_ids = np.asarray(category_ids, dtype=np.int32)
+        store._names, store._name_offsets, store._name_nulls = (
+            names[0], _compact(np.asarray(names[1], dtype=np.int64)), np.asarray(names[2], dtype=bool)
+        )
+        store._descriptions, store._description_offsets, store._description_nulls = (
+            descriptions[0], _compact(np.asarray(descriptions[1], dtype=np.int64)),
+            np.asarray(descriptions[2], dtype=bool),
+        )
+        store._group()
+        return store
+
+    def _group(self) -> None:
+        """Agrupa las filas por categoría y marca las columnas como de solo lectura."""
+        count = len(self.ids)
+        # Filas agrupadas por categoría (en orden de id dentro de cada una) y el tramo de cada categoría
+        self._category_order = np.argsort(self.category_ids, kind="stable").astype(np.int32)
+        categories, starts = np.unique(self.category_ids[self._category_order], return_index=True)
+        bounds = np.append(starts, count).tolist()
+        self._category_bounds = {
+            None if cid == NO_CATEGORY else cid: (bounds[i], bounds[i + 1])
+            for i, cid in enumerate(categories.tolist())
+        }
+        for column in self._columns():
+            column.flags.writeable = False
+
+    def updated(self, changes: Mapping[int, Optional[Any]]) -> "ProductStore":
+        """
+        Devuelve un almacén nuevo con los cambios aplicados, sin modificar este.
+        Solo los productos cambiados se leen en Python; el resto de filas se copian y reordenan con
+        operaciones vectorizadas y sus textos se copian por tramos contiguos (ver `gather_text`).
+
+        Args:
+            changes: Producto actual de cada id cambiado, o None si se ha eliminado.
+        """
+        changed = np.fromiter(changes, dtype=np.int64, count=len(changes))
+        keep = np.flatnonzero(~np.isin(self.ids, changed))
+        added = ProductStore([p for p in changes.values() if p is not None])
+        ids = np.concatenate((self.ids[keep], added.ids))
+        order = np.argsort(ids, kind="stable")
+        store = self.__class__.__new__(self.__class__)
+        store.ids = ids[order]
+        store.prices = np.concatenate((self.prices[keep], added.prices))[order]
+        store.category_ids = np.concatenate((self.category_ids[keep], added.category_ids))[order]
+        sources = np.concatenate((np.zeros(len(keep), dtype=np.int8), np.ones(len(added), dtype=np.int8)))[order]
+        for blob, offsets, nulls in (("_names", "_name_offsets", "_name_nulls"),
+                                     ("_descriptions", "_description_offsets", "_description_nulls")):
+            old, new = getattr(self, offsets).astype(np.int64), getattr(added, offsets).astype(np.int64)
+            text, text_offsets = gather_text(
+                (getattr(self, blob), getattr(added, blob)), sources,
+                np.concatenate((old[keep], new[:-1]))[order], np.concatenate((old[keep + 1], new[1:]))[order],
+            )
+            setattr(store, blob, text)
+            setattr(store, offsets, _compact(text_offsets))
+            setattr(store, nulls, np.concatenate((getattr(self, nulls)[keep], getattr(added, nulls)))[order])
+        store._group()
+        return store
+
+    def _columns(self) -> Tuple[np.ndarray, ...]:
+        return (self.ids, self.prices, self.category_ids, self._name_offsets, self._name_nulls,
+                self._description_offsets, self._description_nulls, self._category_order)
+
+    def _text(self, blob: bytes, offsets: np.ndarray, nulls: np.ndarray, row: int) -> Optional[str]:
+        if nulls.item(row):
+            return None
+        return blob[offsets.item(row):offsets.item(row + 1)].decode()
+
+    def description(self, row: int) -> Optional[str]:
+        """Decodifica la descripción de la fila `row`."""
+        return self._text(self._descriptions, self._description_offsets, self._description_nulls, row)
+
+    def row(self, row: int) -> ProductView:
+        """Crea la vista de la fila `row`."""
+        category_id = self.category_ids.item(row)
+        return ProductView(
+            self, row, self.ids.item(row),
+            self._text(self._names, self._name_offsets, self._name_nulls, row),
+            self.prices.item(row),
+            None if category_id == NO_CATEGORY else category_id,
+        )
+
+    def views(self, rows: Union[range, np.ndarray]) -> Iterator[ProductView]:
+        """Crea las vistas de varias filas, leyendo las columnas por bloques de CHUNK filas."""
+        if isinstance(rows, range):
+            rows = np.arange(rows.start, rows.stop, rows.step, dtype=np.int64)
+        names = self._names
+        for start in range(0, len(rows), self.CHUNK):
+            chunk = rows[start:start + self.CHUNK]
+            columns = zip(
+                chunk.tolist(), self.ids[chunk].tolist(), self.prices[chunk].tolist(),
+                self.category_ids[chunk].tolist(), self._name_offsets[chunk].tolist(),
+                self._name_offsets[chunk + 1].tolist(), self._name_nulls[chunk].tolist(),
+            )
+            for row, pid, price, cid, name_start, name_end, no_name in columns:
+                name = None if no_name else names[name_start:name_end].decode()
+                yield ProductView(self, row, pid, name, price, None if cid == NO_CATEGORY else cid)
+
+    def position(self, product_id: int) -> int:
+        """Devuelve la fila de un producto por bisección sobre los ids, o -1 si no existe."""
+        row = int(np.searchsorted(self.ids, product_id))
+        return row if row < len(self.ids) and self.ids.item(row) == product_id else -1
+
+    def rows_of(self, product_ids: Iterable[int]) -> "ProductRows":
+        """Devuelve las filas de varios productos, que deben existir, en el orden de `product_ids`."""
+        ids = np.fromiter(product_ids, dtype=np.int64)
+        return ProductRows(self, np.searchsorted(self.ids, ids))
+
+    def rows(self, rows: Union[range, np.ndarray, None] = None) -> "ProductRows":
+        """Devuelve una secuencia de filas (por defecto, todas en orden de id)."""
+        return ProductRows(self, range(len(self.ids)) if rows is None else rows)
+
+    def in_category(self, category_id: Optional[int]) -> "ProductRows":
+        """Devuelve los productos de una categoría, ordenados por id."""
+        start, end = self._category_bounds.get(category_id, (0, 0))
+        return ProductRows(self, self._category_order[start:end])
+
+    def in_categories(self, category_ids: Iterable[Optional[int]]) -> "ProductRows":
+        """Devuelve los productos de varias categorías, ordenados por id."""
+        slices = [self._category_order[start:end] for start, end in
+                  (self._category_bounds.get(cid, (0, 0)) for cid in set(category_ids))]
+        return ProductRows(self, np.sort(np.concatenate(slices)) if slices else range(0))
+
+    def after(self, after_id: Optional[int], limit: Optional[int] = None) -> "ProductRows":
+        """Devuelve los productos con id mayor que `after_id`, ordenados por id."""
+        start = 0 if after_id is None else int(np.searchsorted(self.ids, after_id, side="right"))
+        end = len(self.ids) if limit is None else min(start + limit, len(self.ids))
+        return ProductRows(self, range(start, end))
+
+    def category_keys(self) -> List[Optional[int]]:
+        """Devuelve los ids de categoría con algún producto (None para los productos sin categoría)."""
+        return list(self._category_bounds)
+
+    def nbytes(self) -> int:
+        """Bytes ocupados por las columnas y los bloques de texto."""
+        return sum(c.nbytes for c in self._columns()) + len(self._names) + len(self._descriptions)
+
+    # --- Interfaz de Mapping (id -> ProductView) ---
+
+    def __getitem__(self, product_id: int) -> ProductView:
+        row = self.position(product_id)
+        if row < 0:
+            raise KeyError(product_id)
+        return self.row(row)
+
+    def __contains__(self, product_id: object) -> bool:
+        return isinstance(product_id, (int, np.integer)) and self.position(product_id) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids.tolist())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def values(self) -> "ProductRows":
+        return self.rows()
+
+
+class ProductRows(Sequence):
+    """Secuencia de filas de un `ProductStore`; las vistas se crean al acceder a cada elemento."""
+
+    __slots__ = ("_store", "_rows")
+
+    def __init__(self, store: ProductStore, rows: Union[range, np.ndarray]):
+        self._store = store
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ProductRows(self._store, self._rows[index])
+        return self._store.row(self._rows[index])
+
+    def __iter__(self) -> Iterator[ProductView]:
+        return self._store.views(self._rows)
+
+    def ids(self) -> np.ndarray:
+        """Ids de los productos de la secuencia, sin crear sus vistas."""
+        return self._store.ids[self._rows]
+
+    def category_keys(self) -> Set[Optional[int]]:
+        """Ids de categoría de los productos de la secuencia (None para los que no tienen)."""
+        codes = np.unique(self._store.category_ids[self._rows]).tolist()
+        return {None if code == NO_CATEGORY else code for code in codes}
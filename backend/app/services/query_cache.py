@@ -0,0 +1,248 @@
+"""
+Caché de resultados de búsqueda en dos niveles.
+El primer nivel es una LRU acotada con TTL dentro de cada proceso; el segundo, opcional,
+se comparte entre réplicas del backend a través de Redis. Las claves incluyen la huella del
+catálogo, de modo que un cambio en el catálogo invalida implícitamente las entradas antiguas;
+sin refresco del catálogo que la siga, incluyen en su lugar el tramo de SEARCH_CACHE_TTL en curso.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+import redis
+
+from utils import get_logger
+
+from .catalog_version import CatalogVersion
+
+logger = get_logger("backend_query_cache")
+
+
+class QueryCache:
+    """
+    Servicio de caché de resultados de `/search/text`.
+    El nivel Redis solo se activa si se define `SEARCH_CACHE_REDIS_URL`; si Redis falla,
+    se desactiva temporalmente y la caché sigue funcionando solo con el nivel local.
+    La huella del catálogo incluye la tabla de categorías, así que renombrar una categoría también
+    invalida las entradas. Si no hay huella (modo `fulltext`, sin refresco del catálogo), las claves
+    cambian en cada tramo de `SEARCH_CACHE_TTL` segundos, así que ningún resultado se sirve más de ese tiempo.
+    """
+
+    MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_SIZE", 1024))
+    TTL = float(os.getenv("SEARCH_CACHE_TTL", 60))
+    REDIS_URL = os.getenv("SEARCH_CACHE_REDIS_URL")
+    REDIS_RETRY_AFTER = 30.0
+
+    _enabled = False
+    _local: "OrderedDict[str, tuple]" = OrderedDict()
+    _lock = threading.Lock()
+    _stats: Dict[str, int] = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+    _redis = None
+    _redis_disabled_until = 0.0
+
+    @classmethod
+    def initialize(cls) -> None:
+        """Activa la caché (si SEARCH_CACHE_SIZE es mayor que 0)."""
+        cls._enabled = cls.MAX_ENTRIES > 0
+        cls.clear()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        """Indica si la caché está activa."""
+        return cls._enabled
+
+    @classmethod
+    def reset(cls) -> None:
+        """Desactiva la caché y descarta su contenido."""
+        cls._enabled = False
+        cls.clear()
+
+    @classmethod
+    def make_key(cls, tokens: Iterable[str], **params: Any) -> str:
+        """
+        Construye la clave de caché de una búsqueda.
+
+        Args:
+            tokens: Palabras normalizadas de la consulta (el orden y las repeticiones no importan).
+            **params: Resto de parámetros que afectan al resultado (paginación, modo, etc.).
+
+        Returns:
+            Clave que incluye la huella del catálogo vigente o, si no se conoce, el tramo de tiempo en curso.
+        """
+        raw = json.dumps({"tokens": sorted(set(tokens)), **params}, sort_keys=True)
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        fingerprint = CatalogVersion.fingerprint()
+        if fingerprint is None:
+            # Reloj de pared y no monótono: el tramo tiene que coincidir entre réplicas que comparten Redis
+            fingerprint = f"t{int(time.time() // max(cls.TTL, 1))}"
+        return f"search:{fingerprint}:{digest}"
+
+    @classmethod
+    def get(cls, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca un resultado en la caché local y, si no está, en Redis.
+
+        Returns:
+            El resultado cacheado o None si no existe o ha caducado.
+        """
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._local.get(key)
+            if entry is not None and entry[0] > now:
+                cls._local.move_to_end(key)
+                cls._stats["local_hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del cls._local[key]
+
+        value = cls._redis_get(key)
+        with cls._lock:
+            if value is not None:
+                cls._stats["redis_hits"] += 1
+                cls._store_local(key, value, now)
+            else:
+                cls._stats["misses"] += 1
+        return value
+
+    @classmethod
+    def set(cls, key: str, value: Dict[str, Any]) -> None:
+        """Guarda un resultado en ambos niveles de la caché."""
+        with cls._lock:
+            cls._store_local(key, value, time.monotonic())
+        client = cls._redis_client()
+        if client is None:
+            return
+        try:
+            client.set(key, json.dumps(value), ex=max(1, int(cls.TTL)))
+        except Exception as e:
+            cls._disable_redis(e)
+
+    @classmethod
+    def get_many(cls, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Variante de `get` para varias claves: las que no están en la caché local se piden a Redis
+        en una sola operación (`MGET`).
+
+        Returns:
+            Los resultados encontrados, por clave.
+        """
+        now = time.monotonic()
+        found: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        with cls._lock:
+            for key in dict.fromkeys(keys):
+                entry = cls._local.get(key)
+                if entry is not None and entry[0] > now:
+                    cls._local.move_to_end(key)
+                    cls._stats["local_hits"] += 1
+                    found[key] = entry[1]
+                    continue
+                if entry is not None:
+                    del cls._local[key]
+                missing.append(key)
+
+        remote = cls._redis_get_many(missing) if missing else {}
+        with cls._lock:
+            for key in missing:
+                value = remote.get(key)
+                if value is not None:
+                    cls._stats["redis_hits"] += 1
+                    cls._store_local(key, value, now)
+                    found[key] = value
+                else:
+                    cls._stats["misses"] += 1
+        return found
+
+    @classmethod
+    def set_many(cls, values: Dict[str, Dict[str, Any]]) -> None:
+        """Variante de `set` para varios resultados; en Redis se escriben con un único pipeline."""
+        if not values:
+            return
+        now = time.monotonic()
+        with cls._lock:
+            for key, value in values.items():
+                cls._store_local(key, value, now)
+        client = cls._redis_client()
+        if client is None:
+            return
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipeline.set(key, json.dumps(value), ex=max(1, int(cls.TTL)))
+            pipeline.execute()
+        except Exception as e:
+            cls._disable_redis(e)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Devuelve los contadores de aciertos y fallos de la caché."""
+        with cls._lock:
+            stats = dict(cls._stats)
+            stats["local_entries"] = len(cls._local)
+        lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["local_hits"] + stats["redis_hits"]) / lookups if lookups else 0.0
+        stats["enabled"] = cls._enabled
+        stats["redis_enabled"] = cls._redis_client() is not None
+        return stats
+
+    @classmethod
+    def clear(cls) -> None:
+        """Vacía el nivel local y reinicia los contadores (el nivel Redis caduca por TTL)."""
+        with cls._lock:
+            cls._local.clear()
+            for name in cls._stats:
+                cls._stats[name] = 0
+
+    @classmethod
+    def _store_local(cls, key: str, value: Dict[str, Any], now: float) -> None:
+        cls._local[key] = (now + cls.TTL, value)
+        cls._local.move_to_end(key)
+        while len(cls._local) > cls.MAX_ENTRIES:
+            cls._local.popitem(last=False)
+
+    @classmethod
+    def _redis_client(cls):
+        """Devuelve el cliente de Redis, creándolo la primera vez, o None si no está disponible."""
+        if not cls.REDIS_URL or time.monotonic() < cls._redis_disabled_until:
+            return None
+        if cls._redis is None:
+            try:
+                cls._redis = redis.Redis.from_url(cls.REDIS_URL, socket_timeout=0.05)
+            except Exception as e:
+                cls._disable_redis(e)
+                return None
+        return cls._redis
+
+    @classmethod
+    def _redis_get(cls, key: str) -> Optional[Dict[str, Any]]:
+        client = cls._redis_client()
+        if client is None:
+            return None
+        try:
+            raw = client.get(key)
+        except Exception as e:
+            cls._disable_redis(e)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    @classmethod
+    def _redis_get_many(cls, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        client = cls._redis_client()
+        if client is None:
+            return {}
+        try:
+            raws = client.mget(keys)
+        except Exception as e:
+            cls._disable_redis(e)
+            return {}
+        return {key: json.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+
+    @classmethod
+    def _disable_redis(cls, error: Exception) -> None:
+        logger.warning(f"Caché Redis no disponible, se reintentará en {cls.REDIS_RETRY_AFTER}s: {str(error)}")
+        cls._redis_disabled_until = time.monotonic() + cls.REDIS_RETRY_AFTER
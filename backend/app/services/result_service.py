@@ -4,7 +4,17 @@ Este servicio proporciona métodos para almacenar y recuperar resultados de tare
 procesadas por el servicio de inferencia.
 """
 
-from typing import Any, Dict, Optional
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+from utils import get_logger
+
+logger = get_logger("backend_result_service")
 
 
 class ResultService:
@@ -13,8 +23,21 @@ class ResultService:
     Proporciona una capa de abstracción para el almacenamiento y recuperación de resultados.
     """
 
+    # Segundos que se guarda el texto de una búsqueda combinada si nadie lee el resultado de su tarea
+    QUERY_TTL = float(os.getenv("TASK_QUERY_TTL", 3600))
+    # Redis donde se guarda el texto, junto a los resultados de las tareas de inferencia; sin definir,
+    # se guarda en la memoria del proceso
+    REDIS_URL = os.getenv("TASK_QUERY_REDIS_URL")
+    REDIS_RETRY_AFTER = 30.0
+
     _instance = None
     _result_store: Dict[str, Any] = {}
+    # Texto de las búsquedas combinadas (imagen + texto) sin Redis: caducidad, tokens y si se
+    # descartan los productos sin coincidencias
+    _query_store: Dict[str, Tuple[float, List[str], bool]] = {}
+    _query_lock = threading.Lock()
+    _redis = None
+    _redis_disabled_until = 0.0
 
     def __new__(cls):
         """Implementa patrón Singleton para asegurar una única instancia del servicio."""
@@ -56,6 +79,67 @@ class ResultService:
         """
         return task_id in self._result_store
 
+    def store_text_query(self, task_id: str, tokens: List[str], only_matches: bool = False) -> None:
+        """
+        Asocia a una tarea el texto de una búsqueda combinada, con el que se reordenan sus productos.
+        Se guarda en Redis (o, sin Redis, en memoria) durante QUERY_TTL segundos como máximo, para
+        que cualquier réplica que sirva el resultado lo encuentre y no se acumule si nadie lo lee.
+
+        Args:
+            task_id: Identificador único de la tarea.
+            tokens: Palabras normalizadas del texto.
+            only_matches: Si es True, el resultado solo incluye los productos que coinciden con el texto.
+        """
+        client = self._redis_client()
+        if client is not None:
+            try:
+                client.set(self._query_key(task_id), json.dumps([tokens, only_matches]), ex=max(1, int(self.QUERY_TTL)))
+                return
+            except Exception as e:
+                self._disable_redis(e)
+        now = time.monotonic()
+        with self._query_lock:
+            for expired in [tid for tid, entry in self._query_store.items() if entry[0] <= now]:
+                del self._query_store[expired]
+            self._query_store[task_id] = (now + self.QUERY_TTL, tokens, only_matches)
+
+    def get_text_query(self, task_id: str) -> Optional[Tuple[List[str], bool]]:
+        """
+        Recupera el texto de la búsqueda combinada de una tarea.
+
+        Returns:
+            Una tupla (tokens, only_matches), o None si la tarea es una búsqueda solo por imagen.
+        """
+        return self._read_text_query(task_id, delete=False)
+
+    def pop_text_query(self, task_id: str) -> Optional[Tuple[List[str], bool]]:
+        """Como `get_text_query`, pero lo elimina: se llama al leer el resultado completado de la tarea."""
+        return self._read_text_query(task_id, delete=True)
+
+    def _read_text_query(self, task_id: str, delete: bool) -> Optional[Tuple[List[str], bool]]:
+        with self._query_lock:
+            entry = self._query_store.pop(task_id, None) if delete else self._query_store.get(task_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1], entry[2]
+        client = self._redis_client()
+        if client is None:
+            return None
+        try:
+            if delete:
+                pipeline = client.pipeline()
+                pipeline.get(self._query_key(task_id))
+                pipeline.delete(self._query_key(task_id))
+                raw = pipeline.execute()[0]
+            else:
+                raw = client.get(self._query_key(task_id))
+        except Exception as e:
+            self._disable_redis(e)
+            return None
+        if raw is None:
+            return None
+        tokens, only_matches = json.loads(raw)
+        return tokens, only_matches
+
     def clear_result(self, task_id: str) -> None:
         """
         Elimina el resultado de una tarea.
@@ -65,7 +149,32 @@ class ResultService:
         """
         if task_id in self._result_store:
             del self._result_store[task_id]
+        self.pop_text_query(task_id)
 
     def clear_all(self) -> None:
-        """Elimina todos los resultados almacenados."""
+        """Elimina todos los resultados almacenados (los textos guardados en Redis caducan por TTL)."""
         self._result_store.clear()
+        with self._query_lock:
+            self._query_store.clear()
+
+    @staticmethod
+    def _query_key(task_id: str) -> str:
+        return f"task:{task_id}:query"
+
+    @classmethod
+    def _redis_client(cls):
+        """Devuelve el cliente de Redis, creándolo la primera vez, o None si no está disponible."""
+        if not cls.REDIS_URL or time.monotonic() < cls._redis_disabled_until:
+            return None
+        if cls._redis is None:
+            try:
+                cls._redis = redis.Redis.from_url(cls.REDIS_URL, socket_timeout=0.2)
+            except Exception as e:
+                cls._disable_redis(e)
+                return None
+        return cls._redis
+
+    @classmethod
+    def _disable_redis(cls, error: Exception) -> None:
+        logger.warning(f"Redis de tareas no disponible, se reintentará en {cls.REDIS_RETRY_AFTER}s: {str(error)}")
+        cls._redis_disabled_until = time.monotonic() + cls.REDIS_RETRY_AFTER
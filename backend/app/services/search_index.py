@@ -0,0 +1,609 @@
+"""
+Índice invertido en memoria para la búsqueda por texto.
+Este servicio mantiene listas de publicación (token -> ids de producto) sobre las palabras
+normalizadas del nombre y la descripción de cada producto, además de las palabras clave
+de categoría, para que `/search/text` no tenga que recorrer todo el catálogo en cada consulta.
+Los campos de los productos no se copian: se leen de un `ProductStore`, que puede ser el mismo
+de la instantánea de `CatalogCache`.
+"""
+
+import heapq
+import math
+import os
+import threading
+from collections import defaultdict
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlmodel import Session
+
+from db import CatalogQueries
+from utils import CATEGORY_KEYWORDS, normalize_category_name, tokenize
+
+from .catalog_cache import CatalogProduct
+from .facet_index import FacetIndex, SearchFilters
+from .product_store import ProductStore
+from .trigram_index import TrigramIndex
+
+# Todas las palabras clave de categoría
+KEYWORDS = frozenset(keyword for keywords in CATEGORY_KEYWORDS.values() for keyword in keywords)
+
+
+class SearchIndex:
+    """
+    Índice invertido sobre productos y categorías.
+    La instancia activa se construye una vez al arrancar la aplicación y se sustituye
+    de forma atómica, por lo que las consultas en curso nunca ven un índice a medio construir.
+    """
+
+    _current: Optional["SearchIndex"] = None
+
+    # Parámetros de la puntuación BM25
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    # Peso de una aparición en el nombre respecto a una en la descripción
+    NAME_WEIGHT = 2.0
+    # Puntuación adicional de los productos de una categoría detectada por palabras clave
+    CATEGORY_BOOST = 3.0
+
+    # Corrección de erratas mediante el índice de trigramas (SEARCH_FUZZY=false la desactiva)
+    FUZZY_ENABLED = os.getenv("SEARCH_FUZZY", "true").lower() in ("1", "true", "yes")
+    FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", 0.55))
+    FUZZY_MAX_TERMS = 2
+    FUZZY_MIN_LENGTH = 4
+
+    def __init__(self):
+        self._categories: Dict[int, str] = {}
+        # Campos de los productos indexados, y productos cambiados que aún no se han aplicado al almacén
+        self._store = ProductStore(())
+        self._store_changes: Dict[int, Optional[CatalogProduct]] = {}
+        self._positions: Dict[int, int] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        # Término -> frecuencia ponderada del término en cada producto que lo contiene
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._next_position = 0
+        # Columnas de precio y categoría para filtros y facetas, y productos cambiados desde que se crearon
+        self._facets: Optional[FacetIndex] = None
+        self._facet_changes: Dict[int, Optional[CatalogProduct]] = {}
+        # Completados del autocompletado afectados desde que se construyó (ver `suggest_changes`)
+        self._suggest_changes: Optional[Dict[str, int]] = None
+        # Vocabulario de productos y palabras clave de categoría para la corrección de erratas
+        self._vocabulary = TrigramIndex()
+        for keyword in KEYWORDS:
+            self._vocabulary.add_term(keyword)
+        # Las escrituras incrementales (refresco del catálogo) y las consultas se serializan
+        self._lock = threading.RLock()
+
+    @classmethod
+    def build(cls, categories: Iterable[Any], products: Iterable[Any],
+              positions: Optional[Iterable[int]] = None) -> "SearchIndex":
+        """
+        Construye un índice a partir de categorías y productos.
+
+        Args:
+            categories: Objetos con atributos `id` y `name`.
+            products: Objetos con atributos `id`, `name`, `description`, `price` y `category_id`, o un
+                `ProductStore` ya construido (p. ej. el de la instantánea del catálogo), que se usa tal cual.
+            positions: Posición de cada producto (desempate del ranking). None usa el orden de `products`.
+
+        Returns:
+            El índice construido.
+        """
+        index = cls()
+        for category in categories:
+            index.add_category(category)
+        if isinstance(products, ProductStore):
+            ids = products.ids.tolist()
+        else:
+            products = list(products)
+            ids = [product.id for product in products]
+            # Un id repetido se queda con su última versión, como al añadirlo dos veces
+            products = ProductStore({product.id: product for product in products}.values())
+        positions = range(len(ids)) if positions is None else positions
+        for product_id, position in zip(ids, positions):
+            index._positions.setdefault(product_id, position)
+        index._next_position = max(index._positions.values(), default=-1) + 1
+        index._store = products
+        for product in products.values():
+            index._index_product(product)
+        return index
+
+    @classmethod
+    def from_postings(cls, categories: Iterable[Any], store: ProductStore,
+                      postings: Iterable[Tuple[str, Iterable[int], Iterable[float]]], doc_lengths: Iterable[float],
+                      positions: Iterable[int], facets: Optional[FacetIndex] = None) -> "SearchIndex":
+        """
+        Construye un índice con listas de publicación ya calculadas (las de la instantánea en disco, ver
+        `SharedIndex.search_index`), sin volver a tokenizar los textos de los productos.
+
+        Args:
+            categories: Objetos con atributos `id` y `name`.
+            store: Productos del índice.
+            postings: Para cada término, los ids de los productos que lo contienen y su frecuencia ponderada.
+            doc_lengths: Longitud de cada producto, en el orden de `store`.
+            positions: Posición de cada producto (desempate del ranking), en el orden de `store`.
+            facets: Columnas de precio y categoría de esos productos, si ya están construidas.
+        """
+        index = cls()
+        for category in categories:
+            index.add_category(category)
+        ids = store.ids.tolist()
+        index._store = store
+        index._doc_lengths = dict(zip(ids, doc_lengths))
+        index._total_length = sum(index._doc_lengths.values())
+        index._positions = dict(zip(ids, positions))
+        index._next_position = max(index._positions.values(), default=-1) + 1
+        for term, product_ids, weights in postings:
+            index._postings[term] = dict(zip(product_ids, weights))
+            index._vocabulary.add_term(term)
+        index._facets = facets
+        return index
+
+    @classmethod
+    def from_session(cls, session: Session) -> "SearchIndex":
+        """Construye un índice leyendo el catálogo completo de la base de datos."""
+        categories = session.exec(CatalogQueries.categories()).all()
+        products = session.exec(CatalogQueries.index_products()).all()
+        return cls.build(categories, products)
+
+    @classmethod
+    def initialize(cls, session: Optional[Session] = None, snapshot: Optional[Any] = None,
+                   published: Optional[Any] = None) -> "SearchIndex":
+        """
+        Construye el índice y lo publica como índice activo.
+
+        Args:
+            session: Sesión de base de datos de la que leer el catálogo.
+            snapshot: Instantánea del catálogo ya leída (`CatalogSnapshot`); si se indica, el índice se
+                construye con sus filas y no se vuelve a leer el catálogo.
+            published: Versión al día de la instantánea en disco (`SharedIndex`) de la que se leyó
+                `snapshot`; el índice se construye con sus listas de publicación, sin tokenizar los textos.
+        """
+        if published is not None:
+            index = published.search_index(snapshot.products)
+        elif snapshot is not None:
+            index = cls.build(snapshot.categories.values(), snapshot.products)
+        else:
+            index = cls.from_session(session)
+        # Las columnas de facetas se crean al arrancar, no en la primera búsqueda con filtros
+        index.refresh_facets()
+        cls._current = index
+        return index
+
+    @classmethod
+    def current(cls) -> Optional["SearchIndex"]:
+        """Devuelve el índice activo o None si todavía no se ha construido."""
+        return cls._current
+
+    @classmethod
+    def reset(cls) -> None:
+        """Descarta el índice activo."""
+        cls._current = None
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add_category(self, category: Any) -> bool:
+        """
+        Añade (o renombra) una categoría en el índice.
+
+        Returns:
+            True si el índice ha cambiado, False si la categoría ya estaba indexada igual.
+        """
+        with self._lock:
+            if self._categories.get(category.id) == category.name:
+                return False
+            self._categories[category.id] = category.name
+            return True
+
+    @property
+    def next_position(self) -> int:
+        """Posición que recibirá el próximo producto nuevo si no se indica otra."""
+        return self._next_position
+
+    def add_product(self, product: Any, position: Optional[int] = None) -> bool:
+        """
+        Añade un producto al índice, reemplazando la versión anterior si ya existía.
+
+        Args:
+            product: Objeto con atributos `id`, `name`, `description`, `price` y `category_id`.
+            position: Posición del producto si es nuevo (desempate del ranking). None lo añade tras
+                el último; un producto que ya existía conserva siempre la suya.
+
+        Returns:
+            True si el índice ha cambiado, False si el producto ya estaba indexado igual.
+        """
+        record = CatalogProduct(product.id, product.name, product.description, product.price, product.category_id)
+        with self._lock:
+            current = self._product(product.id)
+            if current is not None:
+                if (current.name, current.description, current.price, current.category_id) == record[1:]:
+                    return False
+                self._unindex_product(current)
+            else:
+                position = self._next_position if position is None else position
+                self._positions[product.id] = position
+                self._next_position = max(self._next_position, position + 1)
+            self._store_changes[product.id] = record
+            self._index_product(record)
+            if self._facets is not None:
+                self._facet_changes[product.id] = record
+            return True
+
+    def remove_product(self, product_id: int, keep_position: bool = False) -> bool:
+        """
+        Elimina un producto del índice si existe.
+
+        Returns:
+            True si el producto estaba indexado.
+        """
+        with self._lock:
+            product = self._product(product_id)
+            if product is None:
+                return False
+            self._unindex_product(product)
+            self._store_changes[product_id] = None
+            if not keep_position:
+                del self._positions[product_id]
+            if self._facets is not None:
+                self._facet_changes[product_id] = None
+            return True
+
+    def _product(self, product_id: int) -> Optional[Any]:
+        """Versión indexada de un producto: la pendiente de aplicar al almacén o la fila del almacén."""
+        if product_id in self._store_changes:
+            return self._store_changes[product_id]
+        row = self._store.position(product_id)
+        return self._store.row(row) if row >= 0 else None
+
+    def _index_product(self, product: Any) -> None:
+        """Añade los términos de un producto a las listas de publicación."""
+        weights = self.weigh_terms(product.name or '', product.description or '')
+        self._doc_lengths[product.id] = length = sum(weights.values())
+        self._total_length += length
+        for token, weight in weights.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                self._vocabulary.add_term(token)
+            posting[product.id] = weight
+        self._track_suggest(product.name, weights, 1)
+
+    def _unindex_product(self, product: Any) -> None:
+        """Quita los términos de un producto de las listas de publicación (se recalculan de sus textos)."""
+        weights = self.weigh_terms(product.name or '', product.description or '')
+        self._track_suggest(product.name, weights, -1)
+        for token in weights:
+            posting = self._postings[token]
+            del posting[product.id]
+            if not posting:
+                del self._postings[token]
+                if token not in KEYWORDS:
+                    self._vocabulary.remove_term(token)
+        self._total_length -= self._doc_lengths.pop(product.id)
+
+    def apply_changes(self, products: Iterable[Any] = (), removed_ids: Iterable[int] = (),
+                      positions: Optional[Iterable[int]] = None) -> int:
+        """
+        Aplica un lote de cambios tomando el índice una sola vez.
+
+        Args:
+            products: Productos añadidos o modificados (ver `add_product`).
+            removed_ids: Ids de los productos eliminados.
+            positions: Posición de cada producto de `products` si es nuevo. None los añade en orden.
+
+        Returns:
+            Número de productos que han cambiado el índice.
+        """
+        positions = repeat(None) if positions is None else positions
+        with self._lock:
+            changes = sum(self.add_product(product, position) for product, position in zip(products, positions))
+            return changes + sum(self.remove_product(product_id) for product_id in removed_ids)
+
+    def _track_suggest(self, name: Optional[str], terms: Iterable[str], delta: int) -> None:
+        """Anota los completados que cambian con un producto: su nombre (`delta` productos más) y sus términos."""
+        if self._suggest_changes is None:
+            return
+        key = " ".join(tokenize(name or ''))
+        if key:
+            self._suggest_changes[key] = self._suggest_changes.get(key, 0) + delta
+        for term in terms:
+            self._suggest_changes.setdefault(term, 0)
+
+    def suggest_changes(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Devuelve los completados del autocompletado afectados por los cambios desde la última llamada:
+        para cada uno, cuántos productos más (o menos) tienen ese nombre y cuántos contienen ahora ese
+        término. La primera llamada solo activa el registro (ver `SuggestIndex.updated`).
+        """
+        with self._lock:
+            changes, self._suggest_changes = self._suggest_changes or {}, {}
+            return {key: (delta, len(self._postings.get(key, ()))) for key, delta in changes.items()}
+
+    def product_ids(self) -> Set[int]:
+        """Devuelve los ids de todos los productos indexados."""
+        with self._lock:
+            return set(self._doc_lengths)
+
+    def term_frequencies(self) -> Dict[str, int]:
+        """Devuelve, para cada término del vocabulario, el número de productos que lo contienen."""
+        with self._lock:
+            return {term: len(posting) for term, posting in self._postings.items()}
+
+    def product_names(self) -> List[str]:
+        """Devuelve los nombres de todos los productos indexados."""
+        return [product.name for product in self.product_store().values()]
+
+    def product_store(self) -> ProductStore:
+        """
+        Devuelve los productos indexados en columnas, aplicándole antes los productos cambiados desde
+        la última vez (ver `ProductStore.updated`).
+        """
+        with self._lock:
+            if self._store_changes:
+                self._store = self._store.updated(self._store_changes)
+                self._store_changes = {}
+            return self._store
+
+    def facet_index(self) -> FacetIndex:
+        """
+        Devuelve el índice de precio y categoría, aplicándole los productos cambiados desde la última
+        vez (ver `FacetIndex.updated`). Solo se crea recorriendo el catálogo la primera vez.
+        """
+        with self._lock:
+            if self._facets is None:
+                self._facets = FacetIndex(self.product_store().values(), self._positions)
+            elif self._facet_changes:
+                self._facets = self._facets.updated(self._facet_changes, self._positions)
+            self._facet_changes = {}
+            return self._facets
+
+    def refresh_facets(self) -> None:
+        """
+        Pone al día el almacén de productos y el índice de precio y categoría. Se llama al construir el
+        índice activo y desde el hilo de refresco del catálogo tras aplicar cambios, para que ninguna
+        búsqueda lo haga.
+        """
+        with self._lock:
+            self.product_store()
+            self.facet_index()
+
+    def match_categories(self, tokens: Iterable[str]) -> List[int]:
+        """Devuelve los ids de las categorías cuyas palabras clave aparecen en los tokens."""
+        token_set = set(tokens)
+        matched = {cat for cat, keywords in CATEGORY_KEYWORDS.items() if token_set.intersection(keywords)}
+        return [cid for cid, name in self._categories.items() if normalize_category_name(name) in matched]
+
+    def expand_terms(self, tokens: Iterable[str], fuzzy: bool) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        """
+        Sustituye las palabras desconocidas por los términos más parecidos del vocabulario.
+
+        Args:
+            tokens: Palabras normalizadas de la consulta.
+            fuzzy: Si es False, las palabras se usan tal cual.
+
+        Returns:
+            Una tupla con los términos a buscar y su peso (1 para coincidencias exactas, la
+            similitud para las corregidas) y las correcciones aplicadas a cada palabra.
+        """
+        terms: Dict[str, float] = {}
+        corrections: Dict[str, List[str]] = {}
+        for token in dict.fromkeys(tokens):
+            if not fuzzy or token in self._postings or token in KEYWORDS or len(token) < self.FUZZY_MIN_LENGTH:
+                terms[token] = 1.0
+                continue
+            similar = self._vocabulary.similar(token, self.FUZZY_THRESHOLD, self.FUZZY_MAX_TERMS)
+            if similar:
+                corrections[token] = [term for term, _ in similar]
+            for term, similarity in similar:
+                terms[term] = max(terms.get(term, 0.0), similarity)
+        return terms, corrections
+
+    def search(self, tokens: List[str], limit: Optional[int] = None, offset: int = 0,
+               fuzzy: Optional[bool] = None, filters: Optional[SearchFilters] = None) -> Dict[str, Any]:
+        """
+        Resuelve una consulta ya tokenizada y devuelve los resultados ordenados por relevancia.
+
+        Son candidatos los productos de las categorías detectadas por palabras clave y los que
+        contienen alguna palabra de la consulta en su nombre o descripción. Se puntúan con BM25
+        (las apariciones en el nombre pesan más) más un extra por pertenecer a una categoría
+        detectada, y solo se seleccionan con un montículo los `offset + limit` mejores.
+        Las palabras que no aparecen en el vocabulario se corrigen con el índice de trigramas.
+        Con `filters` el resultado se restringe por precio y categoría, puede ordenarse por precio
+        e incluir facetas; sin palabras en la consulta, los filtros, el orden por precio y las facetas
+        se aplican a todo el catálogo (sin ninguno de ellos, el resultado está vacío).
+
+        Args:
+            tokens: Palabras normalizadas de la consulta.
+            limit: Número máximo de productos a devolver. None devuelve todos.
+            offset: Número de productos a omitir desde el principio del ranking.
+            fuzzy: Activa la corrección de erratas. None usa el valor de SEARCH_FUZZY.
+            filters: Filtros de precio y categoría, orden y facetas.
+
+        Returns:
+            Diccionario con las claves `categories`, `products`, `total` (número de productos
+            que coinciden con la consulta, sin paginar) y `corrections` (palabra -> términos usados),
+            más `facets` si se han pedido.
+        """
+        fuzzy = self.FUZZY_ENABLED if fuzzy is None else fuzzy
+        with self._lock:
+            return self._search(tokens, limit, offset, fuzzy, filters or SearchFilters())
+
+    def search_many(self, token_lists: Iterable[List[str]], limit: Optional[int] = None, offset: int = 0,
+                    fuzzy: Optional[bool] = None, filters: Optional[SearchFilters] = None,
+                    scored: bool = False) -> List[Dict[str, Any]]:
+        """
+        Resuelve varias consultas con los mismos parámetros tomando el índice una sola vez,
+        de modo que ninguna ve un refresco del catálogo aplicado a mitad del lote.
+
+        Args:
+            scored: Si es True, cada producto incluye su puntuación (`score`) y su posición (`rank`, el
+                desempate del ranking) y el resultado los ids de sus categorías (`category_ids`), para
+                poder mezclarlo con los de otros fragmentos.
+
+        Returns:
+            Un resultado con el formato de `search` por consulta, en el mismo orden.
+        """
+        fuzzy = self.FUZZY_ENABLED if fuzzy is None else fuzzy
+        filters = filters or SearchFilters()
+        with self._lock:
+            return [self._search(tokens, limit, offset, fuzzy, filters, scored) for tokens in token_lists]
+
+    def _search(self, tokens: List[str], limit: Optional[int], offset: int, fuzzy: bool,
+                filters: SearchFilters, scored: bool = False) -> Dict[str, Any]:
+        terms, corrections = self.expand_terms(tokens, fuzzy)
+        matched_ids = self.match_categories(terms)
+        store = self.product_store()
+        scores: Dict[int, float] = defaultdict(float)
+        for cid in matched_ids:
+            for pid in store.in_category(cid).ids().tolist():
+                scores[pid] = self.CATEGORY_BOOST
+
+        total_docs = len(self._doc_lengths)
+        avg_length = self._total_length / total_docs if total_docs else 0.0
+        for term, term_weight in terms.items():
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf(term_weight, len(posting), total_docs)
+            for pid, tf in posting.items():
+                norm = 1 - self.BM25_B + self.BM25_B * self._doc_lengths[pid] / avg_length
+                scores[pid] += idf * tf * (self.BM25_K1 + 1) / (tf + self.BM25_K1 * norm)
+
+        if filters.active():
+            return self._search_filtered(tokens, scores, matched_ids, corrections, limit, offset, filters, scored)
+        ranked = self._rank(scores, scores, limit, offset)
+        found = set() if matched_ids else store.rows_of(scores).category_keys()
+        result = {
+            "categories": self._category_names(matched_ids, found),
+            "products": [self.serialize(product) for product in store.rows_of(ranked)],
+            "total": len(scores),
+            "corrections": corrections,
+        }
+        if scored:
+            self._add_scores(result, scores, matched_ids, found)
+        return result
+
+    def _search_filtered(self, tokens: List[str], scores: Dict[int, float], matched_ids: List[int],
+                         corrections: Dict[str, List[str]], limit: Optional[int], offset: int,
+                         filters: SearchFilters, scored: bool = False) -> Dict[str, Any]:
+        """Aplica filtros, orden y facetas sobre las columnas de precio y categoría."""
+        facets = self.facet_index()
+        # Sin texto, los filtros, el orden y las facetas se aplican al catálogo completo; con texto,
+        # solo a los productos que coinciden
+        rows = None if not tokens else facets.rows(scores)
+        selected = facets.select(rows, filters)
+        if filters.sort == "relevance" and scores:
+            ranked = self._rank(facets.ids[selected].tolist(), scores, limit, offset)
+        else:
+            count = None if limit is None else offset + limit
+            ranked = facets.ids[facets.order(selected, filters.sort, count)[offset:]].tolist()
+        found = set() if matched_ids else facets.category_ids(selected)
+        result = {
+            "categories": self._category_names(matched_ids, found),
+            "products": [self.serialize(product) for product in self.product_store().rows_of(ranked)],
+            "total": len(selected),
+            "corrections": corrections,
+        }
+        if filters.facets:
+            result["facets"] = facets.facets(rows, filters, self._categories)
+        if scored:
+            self._add_scores(result, scores, matched_ids, found)
+        return result
+
+    def _add_scores(self, result: Dict[str, Any], scores: Dict[int, float], matched_ids: List[int],
+                    found: Set[Optional[int]]) -> None:
+        """Añade al resultado la puntuación y la posición de cada producto y los ids de las categorías devueltas."""
+        for product in result["products"]:
+            product["score"] = scores.get(product["id"], 0.0)
+            product["rank"] = self._positions[product["id"]]
+        result["category_ids"] = self._category_ids(matched_ids, found)
+
+    def rerank(self, products: Iterable[Any], tokens: List[str], only_matches: bool = False,
+               fuzzy: Optional[bool] = None) -> List[Any]:
+        """
+        Reordena una lista de productos ya seleccionada (p. ej. los de las categorías predichas para
+        una imagen) por su puntuación BM25 para `tokens`, en una sola pasada sobre la lista.
+
+        Args:
+            products: Objetos con atributo `id`, en el orden en que se devolverían sin texto.
+            tokens: Palabras normalizadas de la consulta.
+            only_matches: Si es True se descartan los productos que no contienen ninguna palabra.
+            fuzzy: Activa la corrección de erratas. None usa el valor de SEARCH_FUZZY.
+
+        Returns:
+            Primero los productos que coinciden, por puntuación, y después el resto en su orden original.
+        """
+        fuzzy = self.FUZZY_ENABLED if fuzzy is None else fuzzy
+        matched: List[Tuple[float, Any]] = []
+        unmatched: List[Any] = []
+        with self._lock:
+            terms, _ = self.expand_terms(tokens, fuzzy)
+            total_docs = len(self._doc_lengths)
+            avg_length = self._total_length / total_docs if total_docs else 0.0
+            idfs = {term: self.idf(weight, len(self._postings[term]), total_docs)
+                    for term, weight in terms.items() if term in self._postings}
+            for product in products:
+                length = self._doc_lengths.get(product.id)
+                score = 0.0
+                if length:
+                    norm = 1 - self.BM25_B + self.BM25_B * length / avg_length
+                    for term, idf in idfs.items():
+                        tf = self._postings[term].get(product.id)
+                        if tf:
+                            score += idf * tf * (self.BM25_K1 + 1) / (tf + self.BM25_K1 * norm)
+                if score > 0:
+                    matched.append((score, product))
+                elif not only_matches:
+                    unmatched.append(product)
+        # La ordenación es estable: a igual puntuación se mantiene el orden de la lista
+        matched.sort(key=lambda item: -item[0])
+        return [product for _, product in matched] + unmatched
+
+    @staticmethod
+    def idf(term_weight: float, posting_size: int, total_docs: int) -> float:
+        """IDF de BM25 de un término, escalado por su peso (menor que 1 para los términos corregidos)."""
+        return term_weight * math.log(1 + (total_docs - posting_size + 0.5) / (posting_size + 0.5))
+
+    def _rank(self, product_ids: Iterable[int], scores: Dict[int, float], limit: Optional[int],
+              offset: int) -> List[int]:
+        """Ordena los productos por puntuación (y por posición a igual puntuación) y pagina."""
+        def ranking_key(pid: int):
+            return scores[pid], -self._positions[pid]
+
+        if limit is None:
+            return sorted(product_ids, key=ranking_key, reverse=True)[offset:]
+        return heapq.nlargest(offset + limit, product_ids, key=ranking_key)[offset:]
+
+    def _category_names(self, matched_ids: List[int], found: Set[Optional[int]]) -> List[str]:
+        """
+        Devuelve los nombres de las categorías detectadas por palabras clave o, si no se detectó
+        ninguna, los de las categorías de los productos encontrados (únicas).
+        """
+        return [self._categories[cid] for cid in self._category_ids(matched_ids, found)]
+
+    def _category_ids(self, matched_ids: List[int], found: Set[Optional[int]]) -> List[int]:
+        """Ids de las categorías que devuelve `_category_names`, en el mismo orden."""
+        if matched_ids:
+            return matched_ids
+        return [cid for cid in self._categories if cid in found]
+
+    def serialize(self, product: Any) -> Dict[str, Any]:
+        """Convierte un producto (con atributos `id`, `name`, `price` y `category_id`) al formato de respuesta."""
+        return {
+            "id": product.id,
+            "name": product.name,
+            "price": product.price,
+            "category": self._categories.get(product.category_id),
+        }
+
+    @classmethod
+    def weigh_terms(cls, name: str, description: str) -> Dict[str, float]:
+        """Calcula la frecuencia ponderada de cada término en el nombre y la descripción."""
+        weights: Dict[str, float] = defaultdict(float)
+        for token in tokenize(name):
+            weights[token] += cls.NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] += 1.0
+        return dict(weights)
@@ -0,0 +1,354 @@
+"""
+Búsqueda por texto repartida en fragmentos entre un pool de procesos.
+Los productos se reparten por id (`id % SEARCH_SHARDS`) y cada proceso del pool construye y
+mantiene el `SearchIndex` de su fragmento, de modo que el catálogo completo no tiene que caber
+en el heap de un solo proceso y las consultas se resuelven en paralelo en todos los núcleos.
+Cada consulta se envía a todos los fragmentos y el proceso principal mezcla sus mejores resultados;
+el autocompletado se resuelve igual, con el índice de sugerencias de cada fragmento.
+"""
+
+import asyncio
+import heapq
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlmodel import Session, create_engine
+
+from db import CatalogQueries, Product
+from utils import get_logger
+
+from .catalog_cache import CatalogCategory, CatalogProduct
+from .facet_index import SearchFilters
+from .search_index import SearchIndex
+from .suggest_index import SuggestIndex
+
+logger = get_logger("backend_sharded_search")
+
+# Índice del fragmento que posee cada proceso del pool (solo se asigna en los procesos hijos)
+_shard_index: Optional[SearchIndex] = None
+# Autocompletado del fragmento, construido a partir de su índice
+_shard_suggest: Optional[SuggestIndex] = None
+# Serializa las actualizaciones del autocompletado del fragmento
+_shard_suggest_lock = threading.Lock()
+
+
+def _load_shard(shard: int, shards: int, db_url: Optional[str], categories: Sequence[Any],
+                products: Sequence[Any], positions: Optional[Sequence[int]] = None) -> None:
+    """
+    Inicializador de los procesos del pool: construye el índice del fragmento `shard`.
+    Con `db_url` el propio proceso lee de la base de datos solo los productos de su fragmento;
+    si no, indexa las filas recibidas con su posición en el catálogo completo.
+    """
+    global _shard_index, _shard_suggest
+    if db_url is not None:
+        engine = create_engine(db_url)
+        try:
+            with Session(engine) as session:
+                categories = session.exec(CatalogQueries.categories()).all()
+                products = session.exec(CatalogQueries.index_products(Product.id % shards == shard)).all()
+        finally:
+            engine.dispose()
+        # Un índice único lee el catálogo ordenado por id: el id conserva el orden de sus posiciones
+        positions = [p.id for p in products]
+    _shard_index = SearchIndex.build(categories, products, positions)
+    _shard_index.refresh_facets()
+    _shard_suggest = SuggestIndex.from_search_index(_shard_index)
+
+
+def _call_shard(method: str, *args) -> Any:
+    """Ejecuta un método del índice del fragmento en el proceso del pool."""
+    return getattr(_shard_index, method)(*args)
+
+
+def _suggest_shard(prefix: str, limit: int) -> List[Tuple[str, int]]:
+    """Devuelve los mejores completados del fragmento con su frecuencia en el fragmento."""
+    return _shard_suggest.suggest(prefix, limit, scored=True)
+
+
+def _shard_state() -> Tuple[int, int]:
+    """Devuelve el número de productos del fragmento y la siguiente posición libre."""
+    return len(_shard_index), _shard_index.next_position
+
+
+def _rebuild_shard_suggest() -> None:
+    """
+    Aplica al autocompletado del fragmento los completados cambiados (ver `SuggestIndex.updated`) en un
+    hilo del proceso, para que el fragmento siga respondiendo consultas mientras tanto; al terminar se
+    sustituye la referencia.
+    """
+    def rebuild() -> None:
+        global _shard_suggest
+        with _shard_suggest_lock:
+            _shard_suggest = _shard_suggest.updated(_shard_index)
+
+    threading.Thread(target=rebuild, name="shard-suggest", daemon=True).start()
+
+
+def _search_shard(token_lists: List[List[str]], count: Optional[int], fuzzy: bool,
+                  filters: SearchFilters) -> List[Dict[str, Any]]:
+    """Devuelve, por consulta, los `count` mejores productos del fragmento con su puntuación."""
+    return _shard_index.search_many(token_lists, count, 0, fuzzy=fuzzy, filters=filters, scored=True)
+
+
+class ShardedSearch:
+    """
+    Índice de búsqueda repartido en fragmentos, cada uno en su propio proceso.
+    Expone la misma interfaz que `SearchIndex` para buscar y para aplicar los cambios del refresco
+    del catálogo. Las puntuaciones BM25 usan las estadísticas de cada fragmento; con el reparto
+    por id los fragmentos tienen una distribución de términos parecida y el ranking coincide
+    en la práctica con el de un índice único. Las posiciones de inserción, que desempatan el
+    ranking, se asignan aquí para todo el catálogo, de modo que se comparan entre fragmentos.
+    """
+
+    _current: Optional["ShardedSearch"] = None
+
+    SHARDS = int(os.getenv("SEARCH_SHARDS", os.cpu_count() or 1))
+    # Segundos máximos de espera a la respuesta de un fragmento
+    TIMEOUT = float(os.getenv("SEARCH_SHARD_TIMEOUT", 10))
+    # Espera máxima a que los fragmentos construyan su índice al arrancar
+    LOAD_TIMEOUT = float(os.getenv("SEARCH_SHARD_LOAD_TIMEOUT", 600))
+
+    def __init__(self, executors: List[ProcessPoolExecutor], next_position: int = 0):
+        self._executors = executors
+        self._next_position = next_position
+
+    @classmethod
+    def _start(cls, shards: int, initargs: Callable[[int], tuple]) -> "ShardedSearch":
+        # Los procesos se crean con `spawn`: hacer fork de un proceso con hilos (servidor, refresco) no es seguro
+        context = multiprocessing.get_context("spawn")
+        executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_load_shard, initargs=initargs(shard))
+            for shard in range(shards)
+        ]
+        sharded = cls(executors)
+        try:
+            # Los fragmentos construyen su índice en paralelo
+            states = sharded._gather([executor.submit(_shard_state) for executor in executors], cls.LOAD_TIMEOUT)
+        except Exception:
+            sharded.close()
+            raise
+        sizes = [size for size, _ in states]
+        sharded._next_position = max(position for _, position in states)
+        logger.info(f"Búsqueda repartida en {shards} fragmentos: {sizes} productos")
+        return sharded
+
+    @classmethod
+    def build(cls, categories: Iterable[Any], products: Iterable[Any], shards: Optional[int] = None) -> "ShardedSearch":
+        """
+        Reparte las categorías y productos recibidos entre los fragmentos.
+
+        Args:
+            categories: Objetos con atributos `id` y `name`.
+            products: Objetos con atributos `id`, `name`, `description`, `price` y `category_id`.
+            shards: Número de fragmentos. None usa SEARCH_SHARDS.
+        """
+        shards = shards or cls.SHARDS
+        categories = [CatalogCategory(c.id, c.name) for c in categories]
+        parts: List[List[CatalogProduct]] = [[] for _ in range(shards)]
+        positions: List[List[int]] = [[] for _ in range(shards)]
+        for position, p in enumerate(products):
+            parts[p.id % shards].append(CatalogProduct(p.id, p.name, p.description, p.price, p.category_id))
+            positions[p.id % shards].append(position)
+        return cls._start(shards, lambda shard: (shard, shards, None, categories, parts[shard], positions[shard]))
+
+    @classmethod
+    def from_database(cls, db_url: str, shards: Optional[int] = None) -> "ShardedSearch":
+        """Crea los fragmentos; cada proceso lee de la base de datos solo sus productos."""
+        shards = shards or cls.SHARDS
+        return cls._start(shards, lambda shard: (shard, shards, db_url, (), ()))
+
+    @classmethod
+    def initialize(cls, db_url: str, shards: Optional[int] = None) -> "ShardedSearch":
+        """Crea los fragmentos desde la base de datos y los publica como índice activo."""
+        cls.reset()
+        cls._current = cls.from_database(db_url, shards)
+        return cls._current
+
+    @classmethod
+    def current(cls) -> Optional["ShardedSearch"]:
+        """Devuelve el índice repartido activo o None si no se ha creado."""
+        return cls._current
+
+    @classmethod
+    def reset(cls) -> None:
+        """Detiene los procesos del índice activo y lo descarta."""
+        if cls._current is not None:
+            cls._current.close()
+        cls._current = None
+
+    def close(self) -> None:
+        """Detiene los procesos de los fragmentos."""
+        for executor in self._executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @property
+    def shards(self) -> int:
+        return len(self._executors)
+
+    def __len__(self) -> int:
+        return sum(self._broadcast("__len__"))
+
+    def _gather(self, futures: List[Future], timeout: Optional[float] = None) -> List[Any]:
+        return [future.result(timeout=self.TIMEOUT if timeout is None else timeout) for future in futures]
+
+    def _broadcast(self, method: str, *args) -> List[Any]:
+        return self._gather([executor.submit(_call_shard, method, *args) for executor in self._executors])
+
+    def add_category(self, category: Any) -> bool:
+        """Añade (o renombra) una categoría en todos los fragmentos."""
+        return any(self._broadcast("add_category", CatalogCategory(category.id, category.name)))
+
+    def add_product(self, product: Any) -> bool:
+        """Añade o reemplaza un producto en el fragmento al que pertenece."""
+        return self.apply_changes([product]) > 0
+
+    def remove_product(self, product_id: int) -> bool:
+        """Elimina un producto de su fragmento si existe."""
+        return self.apply_changes((), [product_id]) > 0
+
+    def apply_changes(self, products: Iterable[Any] = (), removed_ids: Iterable[int] = ()) -> int:
+        """
+        Aplica un lote de cambios con un solo mensaje por fragmento afectado (ver `SearchIndex.apply_changes`).
+        Cada producto recibe la siguiente posición del catálogo completo; el fragmento la ignora si
+        el producto ya existía y conserva la suya.
+
+        Returns:
+            Número de productos que han cambiado algún fragmento.
+        """
+        shards = len(self._executors)
+        parts: Dict[int, Tuple[List[CatalogProduct], List[int], List[int]]] = {}
+        for p in products:
+            records, positions, _ = parts.setdefault(p.id % shards, ([], [], []))
+            records.append(CatalogProduct(p.id, p.name, p.description, p.price, p.category_id))
+            positions.append(self._next_position)
+            self._next_position += 1
+        for product_id in removed_ids:
+            parts.setdefault(product_id % shards, ([], [], []))[2].append(product_id)
+        futures = [self._executors[shard].submit(_call_shard, "apply_changes", records, removed, positions)
+                   for shard, (records, positions, removed) in parts.items()]
+        return sum(self._gather(futures))
+
+    def product_ids(self) -> Set[int]:
+        """Devuelve los ids de todos los productos indexados en los fragmentos."""
+        return set().union(*self._broadcast("product_ids"))
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Completa un prefijo con las sugerencias de todos los fragmentos.
+        Cada fragmento devuelve sus MAX_LIMIT mejores completados con su frecuencia y se suman las
+        frecuencias de los que coinciden; un completado que no está entre los mejores de ningún
+        fragmento puede quedar fuera aunque su suma lo situara entre los mejores.
+        """
+        futures = [executor.submit(_suggest_shard, prefix, SuggestIndex.MAX_LIMIT) for executor in self._executors]
+        return SuggestIndex.merge(self._gather(futures), min(limit, SuggestIndex.MAX_LIMIT))
+
+    def refresh_facets(self) -> None:
+        """Pide a cada fragmento que ponga al día su índice de precio y categoría tras aplicar cambios."""
+        self._broadcast("refresh_facets")
+
+    def rebuild_suggestions(self) -> None:
+        """Pide a cada fragmento que ponga al día su autocompletado tras aplicar cambios del catálogo."""
+        self._gather([executor.submit(_rebuild_shard_suggest) for executor in self._executors])
+
+    def search(self, tokens: List[str], limit: Optional[int] = None, offset: int = 0,
+               fuzzy: Optional[bool] = None, filters: Optional[SearchFilters] = None) -> Dict[str, Any]:
+        """Resuelve una consulta en todos los fragmentos; mismo formato que `SearchIndex.search`."""
+        return self.search_many([tokens], limit, offset, fuzzy, filters)[0]
+
+    def search_many(self, token_lists: Iterable[List[str]], limit: Optional[int] = None, offset: int = 0,
+                    fuzzy: Optional[bool] = None, filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """Resuelve varias consultas con un solo mensaje por fragmento; mismo formato que `SearchIndex.search_many`."""
+        token_lists, filters, futures = self._submit(token_lists, limit, offset, fuzzy, filters)
+        return self._merge_many(self._gather(futures), limit, offset, filters)
+
+    async def search_async(self, tokens: List[str], limit: Optional[int] = None, offset: int = 0,
+                           fuzzy: Optional[bool] = None, filters: Optional[SearchFilters] = None) -> Dict[str, Any]:
+        """Variante asíncrona de `search`: espera a los fragmentos sin bloquear el bucle de eventos."""
+        return (await self.search_many_async([tokens], limit, offset, fuzzy, filters))[0]
+
+    async def search_many_async(self, token_lists: Iterable[List[str]], limit: Optional[int] = None, offset: int = 0,
+                                fuzzy: Optional[bool] = None,
+                                filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """Variante asíncrona de `search_many`."""
+        token_lists, filters, futures = self._submit(token_lists, limit, offset, fuzzy, filters)
+        partials = await asyncio.wait_for(
+            asyncio.gather(*(asyncio.wrap_future(future) for future in futures)), self.TIMEOUT
+        )
+        return self._merge_many(partials, limit, offset, filters)
+
+    def _submit(self, token_lists, limit, offset, fuzzy, filters):
+        """Envía las consultas a todos los fragmentos pidiendo a cada uno sus `offset + limit` mejores productos."""
+        token_lists = [list(tokens) for tokens in token_lists]
+        fuzzy = SearchIndex.FUZZY_ENABLED if fuzzy is None else fuzzy
+        filters = filters or SearchFilters()
+        count = None if limit is None else offset + limit
+        futures = [executor.submit(_search_shard, token_lists, count, fuzzy, filters) for executor in self._executors]
+        return token_lists, filters, futures
+
+    def _merge_many(self, partials: List[List[Dict[str, Any]]], limit: Optional[int], offset: int,
+                    filters: SearchFilters) -> List[Dict[str, Any]]:
+        # `partials` tiene una lista por fragmento; se mezclan los resultados de cada consulta
+        return [self._merge(list(results), limit, offset, filters) for results in zip(*partials)]
+
+    @staticmethod
+    def _sort_key(sort: str) -> Callable[[Dict[str, Any]], tuple]:
+        """Clave con la que cada fragmento ordena sus productos (a igualdad, por posición de inserción)."""
+        if sort == "price_asc":
+            return lambda product: (product["price"], product["rank"])
+        if sort == "price_desc":
+            return lambda product: (-product["price"], product["rank"])
+        return lambda product: (-product["score"], product["rank"])
+
+    def _merge(self, results: List[Dict[str, Any]], limit: Optional[int], offset: int,
+               filters: SearchFilters) -> Dict[str, Any]:
+        """Mezcla los resultados de una consulta en los fragmentos en un único resultado paginado."""
+        merged = heapq.merge(*(result["products"] for result in results), key=self._sort_key(filters.sort))
+        end = None if limit is None else offset + limit
+        products = []
+        for position, product in enumerate(merged):
+            if end is not None and position >= end:
+                break
+            if position >= offset:
+                del product["score"], product["rank"]
+                products.append(product)
+
+        # Todos los fragmentos tienen todas las categorías: se unen y se ordenan por id
+        names: Dict[int, str] = {}
+        corrections: Dict[str, Dict[str, None]] = {}
+        for result in results:
+            names.update(zip(result["category_ids"], result["categories"]))
+            for word, terms in result["corrections"].items():
+                corrections.setdefault(word, {}).update(dict.fromkeys(terms))
+        merged_result = {
+            "categories": [names[cid] for cid in sorted(names)],
+            "products": products,
+            "total": sum(result["total"] for result in results),
+            "corrections": {word: list(terms) for word, terms in corrections.items()},
+        }
+        if filters.facets:
+            merged_result["facets"] = self._merge_facets([result["facets"] for result in results])
+        return merged_result
+
+    @staticmethod
+    def _merge_facets(facets: List[Dict[str, List[Dict[str, Any]]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Suma los recuentos por categoría y por tramo de precio de los fragmentos."""
+        categories: Dict[Optional[int], Dict[str, Any]] = {}
+        for shard_facets in facets:
+            for facet in shard_facets["categories"]:
+                if facet["id"] in categories:
+                    categories[facet["id"]]["count"] += facet["count"]
+                else:
+                    categories[facet["id"]] = dict(facet)
+        price = [dict(bucket) for bucket in facets[0]["price"]]
+        for shard_facets in facets[1:]:
+            for bucket, shard_bucket in zip(price, shard_facets["price"]):
+                bucket["count"] += shard_bucket["count"]
+        return {
+            # Mismo orden que `FacetIndex.facets`: por recuento y, a igualdad, sin categoría primero y por id
+            "categories": sorted(categories.values(), key=lambda facet: (
+                -facet["count"], facet["id"] is not None, facet["id"] or 0)),
+            "price": price,
+        }
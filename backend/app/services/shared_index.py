@@ -0,0 +1,612 @@
+"""
+Índice de búsqueda compartido entre los workers del servidor.
+Un solo worker construye el índice y lo escribe como arrays de NumPy (columnas de productos,
+listas de publicación en formato CSR, columnas de facetas, el autocompletado y el índice de trigramas
+para corregir erratas) en un directorio por versión,
+por defecto en `/dev/shm`. Los demás workers proyectan esos archivos en memoria en modo de solo
+lectura (`np.load(mmap_mode="r")`), de modo que todos comparten las mismas páginas físicas en lugar
+de mantener cada uno su propia copia del catálogo. Una nueva versión se publica sustituyendo de forma
+atómica el puntero `CURRENT`; las peticiones en curso siguen usando la proyección anterior.
+En un directorio persistente, la versión publicada hace de instantánea del catálogo para el siguiente
+arranque (ver `snapshot.py`), también en el modo `index`, que copia de ella la caché del catálogo y el
+índice de búsqueda en lugar de leer el catálogo.
+"""
+
+import errno
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from db import CatalogQueries, Product
+from utils import CATEGORY_KEYWORDS, get_logger, normalize_category_name
+
+from .catalog_cache import CatalogCategory, CatalogSnapshot
+from .catalog_version import CatalogVersion
+from .facet_index import FacetIndex, SearchFilters
+from .product_store import ProductStore
+from .search_index import KEYWORDS, SearchIndex
+from .suggest_index import SuggestIndex
+from .trigram_index import TrigramArrays
+
+logger = get_logger("backend_shared_index")
+
+# Arrays propios del índice de texto (además de las columnas de `FacetIndex.columns`)
+TEXT_ARRAYS = (
+    "terms", "posting_offsets", "posting_rows", "posting_weights", "doc_lengths",
+    "name_offsets", "names", "name_nulls", "description_offsets", "descriptions", "description_nulls",
+    "category_offsets", "category_rows",
+)
+# Los arrays del autocompletado y del índice de trigramas se guardan con estos prefijos junto a los del índice
+SUGGEST_PREFIX = "suggest_"
+TRIGRAM_PREFIX = "trigram_"
+
+
+def _default_directory() -> str:
+    # /dev/shm es un tmpfs: los archivos viven en memoria compartida y nunca se escriben a disco
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "ecommerce-search-index")
+
+
+class SharedIndex:
+    """
+    Vista de solo lectura sobre una versión del índice proyectada en memoria.
+    Responde con el mismo formato y la misma puntuación BM25 que `SearchIndex`; las filas son los
+    productos ordenados por id. Las instancias son inmutables: un cambio del catálogo publica una
+    versión nueva que cada worker adopta en su siguiente comprobación del puntero `CURRENT`.
+    """
+
+    DIRECTORY = os.getenv("SHARED_INDEX_DIR") or _default_directory()
+    # Segundos entre comprobaciones del puntero `CURRENT` en cada worker
+    CHECK_INTERVAL = float(os.getenv("SHARED_INDEX_CHECK_INTERVAL", 1))
+    # Versiones que se conservan en el directorio (la actual y las anteriores que aún puedan estar abriéndose)
+    KEEP_VERSIONS = 2
+    # Versión del formato de los archivos: una instantánea con otro formato se trata como desactualizada
+    FORMAT = 5
+
+    _current: Optional["SharedIndex"] = None
+    _root: Optional[str] = None
+    _checked_at = 0.0
+    _swap_lock = threading.Lock()
+
+    def __init__(self, path: str, arrays: Mapping[str, np.ndarray], meta: Dict[str, Any]):
+        self.name = os.path.basename(path)
+        self.fingerprint: Dict[str, Any] = meta["fingerprint"]
+        self._categories: Dict[int, str] = {cid: name for cid, name in self.fingerprint["categories"]}
+        self._total_length: float = meta["total_length"]
+        self._facets = FacetIndex.from_columns(arrays)
+        self._terms = arrays["terms"]
+        self._posting_offsets = arrays["posting_offsets"]
+        self._posting_rows = arrays["posting_rows"]
+        self._posting_weights = arrays["posting_weights"]
+        self._doc_lengths = arrays["doc_lengths"]
+        self._name_offsets = arrays["name_offsets"]
+        self._names = arrays["names"]
+        self._name_nulls = arrays["name_nulls"]
+        # Las descripciones no se usan al buscar: solo se leen para la caché del catálogo (ver `catalog_snapshot`)
+        self._description_offsets = arrays["description_offsets"]
+        self._descriptions = arrays["descriptions"]
+        self._description_nulls = arrays["description_nulls"]
+        self._category_offsets = arrays["category_offsets"]
+        self._category_rows = arrays["category_rows"]
+        # Autocompletado escrito con la versión: cada worker solo proyecta sus arrays
+        self.suggester = SuggestIndex({key: arrays[SUGGEST_PREFIX + key] for key in SuggestIndex.ARRAYS})
+        # Índice de trigramas del vocabulario, escrito con la versión: ningún worker lo construye
+        self._vocabulary = TrigramArrays({key: arrays[TRIGRAM_PREFIX + key] for key in TrigramArrays.ARRAYS})
+
+    # --- Construcción y publicación de versiones ---
+
+    @classmethod
+    def write(cls, directory: str, categories: Iterable[Any], products: Iterable[Any],
+              fingerprint: Dict[str, Any]) -> str:
+        """
+        Escribe una versión del índice en un subdirectorio nuevo de `directory`.
+
+        Args:
+            directory: Directorio raíz del índice compartido.
+            categories: Objetos con atributos `id` y `name`.
+            products: Objetos con atributos `id`, `name`, `description`, `price` y `category_id`.
+            fingerprint: Huella del catálogo indexado (ver `fingerprint`).
+
+        Returns:
+            La ruta de la versión escrita.
+        """
+        products = sorted(products, key=lambda p: p.id)
+        count = len(products)
+        facets = FacetIndex(products, {p.id: row for row, p in enumerate(products)})
+
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        rows: List[int] = []
+        weights: List[float] = []
+        doc_lengths = np.empty(count, dtype=np.float64)
+        names = bytearray()
+        name_offsets = np.zeros(count + 1, dtype=np.int64)
+        descriptions = bytearray()
+        description_offsets = np.zeros(count + 1, dtype=np.int64)
+        for row, product in enumerate(products):
+            term_weights = SearchIndex.weigh_terms(product.name or '', product.description or '')
+            doc_lengths[row] = sum(term_weights.values())
+            for term, weight in term_weights.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                weights.append(weight)
+            names += (product.name or '').encode()
+            name_offsets[row + 1] = len(names)
+            descriptions += (product.description or '').encode()
+            description_offsets[row + 1] = len(descriptions)
+
+        # Términos en orden binario (el de UTF-8 coincide con el de los str) para buscarlos por bisección
+        sorted_terms = sorted(vocabulary)
+        remap = np.empty(len(sorted_terms), dtype=np.int64)
+        remap[[vocabulary[term] for term in sorted_terms]] = np.arange(len(sorted_terms))
+        term_index = remap[np.array(term_ids, dtype=np.int64)]
+        rows_array = np.array(rows, dtype=np.int32)
+        order = np.lexsort((rows_array, term_index))
+        encoded_terms = [term.encode() for term in sorted_terms]
+        width = max((len(term) for term in encoded_terms), default=1)
+
+        document_frequencies = np.bincount(term_index, minlength=len(sorted_terms))
+        name_counts = SuggestIndex.name_counts(product.name for product in products)
+        suggester = SuggestIndex.from_frequencies(SuggestIndex.frequencies(
+            name_counts, dict(zip(sorted_terms, document_frequencies.tolist()))
+        ), name_counts)
+
+        codes = facets.category_codes
+        arrays = dict(facets.columns())
+        arrays.update({SUGGEST_PREFIX + key: array for key, array in suggester.arrays().items()})
+        vocabulary = TrigramArrays.from_terms(KEYWORDS.union(sorted_terms))
+        arrays.update({TRIGRAM_PREFIX + key: array for key, array in vocabulary.arrays().items()})
+        arrays.update({
+            "terms": np.array(encoded_terms, dtype=f"S{width}"),
+            "posting_offsets": np.concatenate(([0], np.cumsum(document_frequencies))),
+            "posting_rows": rows_array[order],
+            # Las frecuencias ponderadas son sumas de 1 y NAME_WEIGHT: se representan sin pérdida en float32
+            "posting_weights": np.array(weights, dtype=np.float32)[order],
+            "doc_lengths": doc_lengths,
+            "name_offsets": name_offsets,
+            "names": np.frombuffer(bytes(names), dtype=np.uint8),
+            "name_nulls": np.fromiter((p.name is None for p in products), dtype=bool, count=count),
+            "description_offsets": description_offsets,
+            "descriptions": np.frombuffer(bytes(descriptions), dtype=np.uint8),
+            "description_nulls": np.fromiter((p.description is None for p in products), dtype=bool, count=count),
+            "category_offsets": np.concatenate(([0], np.cumsum(np.bincount(codes)))).astype(np.int64),
+            "category_rows": np.argsort(codes, kind="stable"),
+        })
+        meta = {
+            "format": cls.FORMAT,
+            "fingerprint": fingerprint,
+            "total_length": float(doc_lengths.sum()),
+            "products": count,
+        }
+
+        name = f"{time.time_ns()}-{os.getpid()}"
+        staging = os.path.join(directory, f".{name}.tmp")
+        os.makedirs(staging)
+        try:
+            for key, array in arrays.items():
+                np.save(os.path.join(staging, f"{key}.npy"), array)
+            with open(os.path.join(staging, "meta.json"), "w") as handle:
+                json.dump(meta, handle)
+        except OSError as e:
+            # Una versión a medias no debe seguir ocupando el tmpfs hasta la siguiente publicación
+            shutil.rmtree(staging, ignore_errors=True)
+            if e.errno == errno.ENOSPC:
+                size = sum(array.nbytes for array in arrays.values()) / 2**20
+                raise OSError(errno.ENOSPC, f"Sin espacio en {directory} para una versión de {size:.0f} MB: "
+                              "aumenta /dev/shm (shm_size en Docker) o apunta SHARED_INDEX_DIR a un volumen") from e
+            raise
+        path = os.path.join(directory, name)
+        os.rename(staging, path)
+        return path
+
+    @classmethod
+    def attach(cls, path: str) -> "SharedIndex":
+        """Proyecta en memoria, en modo de solo lectura, una versión escrita por `write`."""
+        with open(os.path.join(path, "meta.json")) as handle:
+            meta = json.load(handle)
+        if meta.get("format") != cls.FORMAT:
+            raise ValueError(f"formato {meta.get('format')} no soportado (se esperaba {cls.FORMAT})")
+        names = (TEXT_ARRAYS + FacetIndex.COLUMNS + tuple(SUGGEST_PREFIX + key for key in SuggestIndex.ARRAYS)
+                 + tuple(TRIGRAM_PREFIX + key for key in TrigramArrays.ARRAYS))
+        arrays = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r") for key in names}
+        return cls(path, arrays, meta)
+
+    @staticmethod
+    def fingerprint_of(session: Session) -> Dict[str, Any]:
+        """
+        Huella del catálogo en la base de datos: marca de agua de `updated_at`, número de productos
+        y tabla de categorías. Si coincide con la de la versión publicada, no hace falta reconstruirla.
+        """
+        watermark = session.exec(select(func.max(Product.updated_at))).one()
+        rows = session.exec(select(func.count()).select_from(Product)).one()
+        categories = [[c.id, c.name] for c in session.exec(CatalogQueries.categories()).all()]
+        if isinstance(watermark, datetime):
+            watermark = watermark.isoformat()
+        return {"watermark": None if watermark is None else str(watermark), "rows": rows, "categories": categories}
+
+    @classmethod
+    def export(cls, session: Session, directory: Optional[str] = None,
+               force: bool = False) -> Tuple["SharedIndex", bool]:
+        """
+        Escribe y publica una instantánea del catálogo y del índice si la publicada no corresponde a
+        la base de datos. Los procesos que exportan a la vez se serializan con un bloqueo de archivo,
+        así que solo uno lee el catálogo.
+
+        Args:
+            session: Sesión de base de datos a utilizar.
+            directory: Directorio de las versiones. None usa SHARED_INDEX_DIR.
+            force: Si es True se escribe una versión nueva aunque la publicada esté al día.
+
+        Returns:
+            Una tupla con la versión publicada y si se ha construido ahora (False si se ha reutilizado).
+        """
+        root = directory or cls.DIRECTORY
+        os.makedirs(root, exist_ok=True)
+        fingerprint = cls.fingerprint_of(session)
+        with cls._locked(root):
+            index = None if force else cls._load_current(root)
+            if index is not None and index.fingerprint == fingerprint:
+                return index, False
+            return cls._build(root, session, fingerprint), True
+
+    @classmethod
+    def published(cls, directory: Optional[str] = None) -> Optional["SharedIndex"]:
+        """Proyecta la versión publicada en `directory` sin consultar la base de datos, o None si no hay."""
+        return cls._load_current(directory or cls.DIRECTORY)
+
+    @classmethod
+    def fresh(cls, session: Session, directory: Optional[str] = None) -> Optional["SharedIndex"]:
+        """Proyecta la versión publicada en `directory` si corresponde a la base de datos, o devuelve None."""
+        index = cls.published(directory)
+        if index is None or index.fingerprint != cls.fingerprint_of(session):
+            return None
+        return index
+
+    @classmethod
+    def initialize(cls, session: Session, directory: Optional[str] = None) -> "SharedIndex":
+        """
+        Adopta la versión publicada si corresponde al catálogo actual: solo se proyectan los archivos,
+        sin leer el catálogo. Si no existe o está desactualizada, se construye desde la base de datos.
+        """
+        start = time.perf_counter()
+        index, built = cls.export(session, directory)
+        cls._root = directory or cls.DIRECTORY
+        cls._activate(index)
+        action = "construida desde la base de datos" if built else "reutilizada"
+        logger.info(f"Instantánea {index.name} {action} en {time.perf_counter() - start:.3f} s ({len(index)} productos)")
+        return index
+
+    @classmethod
+    def refresh(cls, session: Session) -> int:
+        """
+        Publica una versión nueva si el catálogo de la base de datos ha cambiado.
+        Si otro worker ya la ha publicado, simplemente se adopta.
+
+        Returns:
+            1 si el worker ha pasado a una versión nueva, 0 si no había cambios.
+        """
+        root = cls._root
+        if root is None:
+            return 0
+        fingerprint = cls.fingerprint_of(session)
+        current = cls.current()
+        if current is not None and current.fingerprint == fingerprint:
+            return 0
+        index, _ = cls.export(session, root)
+        cls._activate(index)
+        return 1
+
+    @classmethod
+    def current(cls) -> Optional["SharedIndex"]:
+        """
+        Devuelve la versión activa en este worker, adoptando la publicada por otro worker si ha cambiado.
+        La comprobación del puntero se hace como mucho cada CHECK_INTERVAL segundos y por un solo hilo;
+        el resto de peticiones siguen con la versión que ya tenían.
+        """
+        index = cls._current
+        if cls._root is None or time.monotonic() - cls._checked_at < cls.CHECK_INTERVAL:
+            return index
+        if not cls._swap_lock.acquire(blocking=False):
+            return index
+        try:
+            cls._checked_at = time.monotonic()
+            name = cls._current_name(cls._root)
+            if name is not None and (index is None or name != index.name):
+                latest = cls._load_current(cls._root)
+                if latest is not None:
+                    cls._set_current(latest)
+        finally:
+            cls._swap_lock.release()
+        return cls._current
+
+    @classmethod
+    def reset(cls) -> None:
+        """Descarta la versión activa en este worker (los archivos publicados se conservan)."""
+        cls._current = None
+        cls._root = None
+        cls._checked_at = 0.0
+
+    @classmethod
+    def _build(cls, root: str, session: Session, fingerprint: Dict[str, Any]) -> "SharedIndex":
+        categories = session.exec(CatalogQueries.categories()).all()
+        products = session.exec(CatalogQueries.index_products()).all()
+        path = cls.write(root, categories, products, fingerprint)
+        cls._publish(root, os.path.basename(path))
+        logger.info(f"Índice compartido publicado: {os.path.basename(path)} ({len(products)} productos)")
+        return cls.attach(path)
+
+    @classmethod
+    def _activate(cls, index: "SharedIndex") -> None:
+        with cls._swap_lock:
+            cls._set_current(index)
+            cls._checked_at = time.monotonic()
+
+    @classmethod
+    def _set_current(cls, index: "SharedIndex") -> None:
+        # Sustitución atómica: las peticiones en curso conservan la referencia (y la proyección) anterior
+        cls._current = index
+        CatalogVersion.set_watermark(index.watermark(), index.fingerprint["rows"], index.fingerprint["categories"])
+        version = CatalogVersion.bump()
+        logger.info(f"Worker usando el índice compartido {index.name} (versión {version})")
+
+    @staticmethod
+    def _current_name(root: str) -> Optional[str]:
+        try:
+            with open(os.path.join(root, "CURRENT")) as handle:
+                return handle.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def _load_current(cls, root: str) -> Optional["SharedIndex"]:
+        name = cls._current_name(root)
+        if name is None:
+            return None
+        try:
+            return cls.attach(os.path.join(root, name))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"No se pudo abrir el índice compartido {name}: {str(e)}")
+            return None
+
+    @classmethod
+    def _publish(cls, root: str, name: str) -> None:
+        """Apunta `CURRENT` a la versión `name` (con `os.replace`, atómico) y borra las versiones antiguas."""
+        staging = os.path.join(root, ".CURRENT.tmp")
+        with open(staging, "w") as handle:
+            handle.write(name)
+        os.replace(staging, os.path.join(root, "CURRENT"))
+        # Se ejecuta con el bloqueo tomado: cualquier directorio temporal es de una escritura interrumpida.
+        # Borrar una versión no afecta a los workers que ya la tienen proyectada en memoria.
+        versions = sorted((entry for entry in os.listdir(root) if entry[0].isdigit()),
+                          key=lambda entry: int(entry.split("-")[0]))
+        stale = versions[:-cls.KEEP_VERSIONS] + [entry for entry in os.listdir(root) if entry.endswith(".tmp")]
+        for entry in stale:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+    @staticmethod
+    @contextmanager
+    def _locked(root: str) -> Iterator[None]:
+        """Bloqueo exclusivo entre procesos sobre el directorio del índice."""
+        with open(os.path.join(root, ".lock"), "w") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    # --- Carga del modo `index` ---
+
+    def categories(self) -> List[CatalogCategory]:
+        """Categorías de esta versión."""
+        return [CatalogCategory(cid, name) for cid, name in self._categories.items()]
+
+    def product_store(self) -> ProductStore:
+        """Copia a memoria las columnas de productos de esta versión como un `ProductStore`."""
+        return ProductStore.from_columns(
+            np.array(self._facets.ids), np.array(self._facets.prices),
+            # El código de categoría es el id desplazado en uno: 0 (sin categoría) pasa a ser NO_CATEGORY
+            self._facets.category_codes - 1,
+            (self._names.tobytes(), np.array(self._name_offsets), np.array(self._name_nulls)),
+            (self._descriptions.tobytes(), np.array(self._description_offsets), np.array(self._description_nulls)),
+        )
+
+    def catalog_snapshot(self, version: int) -> CatalogSnapshot:
+        """Instantánea de `CatalogCache` con los productos y las categorías de esta versión."""
+        return CatalogSnapshot(self.categories(), self.product_store(), version)
+
+    def search_index(self, store: ProductStore) -> SearchIndex:
+        """
+        Crea un `SearchIndex` modificable con las listas de publicación, las longitudes y las columnas de
+        facetas de esta versión, sin tokenizar los textos. `store` son sus productos (ver `product_store`).
+        """
+        ids = store.ids
+        rows, weights = np.asarray(self._posting_rows), np.asarray(self._posting_weights)
+        offsets = self._posting_offsets.tolist()
+        postings = ((term.decode(), ids[rows[start:end]].tolist(), weights[start:end].tolist())
+                    for term, start, end in zip(self._terms.tolist(), offsets, offsets[1:]))
+        facets = FacetIndex.from_columns({key: np.array(column) for key, column in self._facets.columns().items()})
+        return SearchIndex.from_postings(self.categories(), store, postings, self._doc_lengths.tolist(),
+                                         self._facets.ranks.tolist(), facets)
+
+    def suggest_index(self) -> SuggestIndex:
+        """Copia a memoria el índice de autocompletado de esta versión."""
+        return SuggestIndex({key: np.array(array) for key, array in self.suggester.arrays().items()})
+
+    # --- Consulta ---
+
+    def __len__(self) -> int:
+        return len(self._facets)
+
+    def watermark(self) -> Optional[datetime]:
+        """Marca de agua del catálogo indexado en esta versión."""
+        watermark = self.fingerprint["watermark"]
+        return None if watermark is None else datetime.fromisoformat(watermark)
+
+    def product_ids(self) -> Set[int]:
+        """Devuelve los ids de todos los productos indexados."""
+        return set(self._facets.ids.tolist())
+
+    def facet_index(self) -> FacetIndex:
+        """Devuelve las columnas de precio y categoría (proyectadas en memoria)."""
+        return self._facets
+
+    def _term_slot(self, term: str) -> int:
+        """Posición del término en el vocabulario ordenado, o -1 si no está."""
+        key = term.encode()
+        slot = int(np.searchsorted(self._terms, key))
+        return slot if slot < len(self._terms) and self._terms[slot] == key else -1
+
+    def match_categories(self, tokens: Iterable[str]) -> List[int]:
+        """Devuelve los ids de las categorías cuyas palabras clave aparecen en los tokens."""
+        token_set = set(tokens)
+        matched = {cat for cat, keywords in CATEGORY_KEYWORDS.items() if token_set.intersection(keywords)}
+        return [cid for cid, name in self._categories.items() if normalize_category_name(name) in matched]
+
+    def expand_terms(self, tokens: Iterable[str], fuzzy: bool) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        """Sustituye las palabras desconocidas por los términos más parecidos, como `SearchIndex.expand_terms`."""
+        terms: Dict[str, float] = {}
+        corrections: Dict[str, List[str]] = {}
+        for token in dict.fromkeys(tokens):
+            if (not fuzzy or token in KEYWORDS or len(token) < SearchIndex.FUZZY_MIN_LENGTH
+                    or self._term_slot(token) >= 0):
+                terms[token] = 1.0
+                continue
+            similar = self._vocabulary.similar(token, SearchIndex.FUZZY_THRESHOLD, SearchIndex.FUZZY_MAX_TERMS)
+            if similar:
+                corrections[token] = [term for term, _ in similar]
+            for term, similarity in similar:
+                terms[term] = max(terms.get(term, 0.0), similarity)
+        return terms, corrections
+
+    def search(self, tokens: List[str], limit: Optional[int] = None, offset: int = 0,
+               fuzzy: Optional[bool] = None, filters: Optional[SearchFilters] = None) -> Dict[str, Any]:
+        """Resuelve una consulta ya tokenizada; mismo formato y ranking que `SearchIndex.search`."""
+        fuzzy = SearchIndex.FUZZY_ENABLED if fuzzy is None else fuzzy
+        return self._search(tokens, limit, offset, fuzzy, filters or SearchFilters())
+
+    def search_many(self, token_lists: Iterable[List[str]], limit: Optional[int] = None, offset: int = 0,
+                    fuzzy: Optional[bool] = None, filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+        """Resuelve varias consultas sobre la misma versión del índice."""
+        fuzzy = SearchIndex.FUZZY_ENABLED if fuzzy is None else fuzzy
+        filters = filters or SearchFilters()
+        return [self._search(tokens, limit, offset, fuzzy, filters) for tokens in token_lists]
+
+    def _scores(self, terms: Dict[str, float], matched_ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Puntúa los productos candidatos sobre las listas de publicación proyectadas.
+
+        Returns:
+            Las filas candidatas (ordenadas) y su puntuación.
+        """
+        rows: List[np.ndarray] = []
+        contributions: List[np.ndarray] = []
+        for cid in matched_ids:
+            code = cid + 1
+            if code + 1 < len(self._category_offsets):
+                category_rows = self._category_rows[self._category_offsets[code]:self._category_offsets[code + 1]]
+                rows.append(category_rows)
+                contributions.append(np.full(len(category_rows), SearchIndex.CATEGORY_BOOST))
+
+        total_docs = len(self)
+        avg_length = self._total_length / total_docs if total_docs else 0.0
+        k1, b = SearchIndex.BM25_K1, SearchIndex.BM25_B
+        for term, term_weight in terms.items():
+            slot = self._term_slot(term)
+            if slot < 0:
+                continue
+            start, end = self._posting_offsets[slot], self._posting_offsets[slot + 1]
+            posting = self._posting_rows[start:end]
+            tf = self._posting_weights[start:end].astype(np.float64)
+            idf = SearchIndex.idf(term_weight, len(posting), total_docs)
+            norm = 1 - b + b * self._doc_lengths[posting] / avg_length
+            rows.append(posting)
+            contributions.append(idf * tf * (k1 + 1) / (tf + k1 * norm))
+
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        # `bincount` suma en el orden de entrada: mismo resultado que acumular término a término
+        candidates, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        return candidates, np.bincount(inverse.ravel(), weights=np.concatenate(contributions))
+
+    def _rank(self, rows: np.ndarray, scores: np.ndarray, limit: Optional[int], offset: int) -> np.ndarray:
+        """Ordena las filas por puntuación (y por posición a igual puntuación) y pagina."""
+        ranks = self._facets.ranks[rows]
+        count = None if limit is None else offset + limit
+        if count is not None and count < len(rows):
+            if count == 0:
+                return rows[:0]
+            # Se descartan con `partition` las filas por debajo de la puntuación del puesto `count`
+            threshold = -np.partition(-scores, count - 1)[count - 1]
+            keep = np.flatnonzero(scores >= threshold)
+            rows, scores, ranks = rows[keep], scores[keep], ranks[keep]
+        order = np.lexsort((ranks, -scores))
+        if count is not None:
+            order = order[:count]
+        return rows[order[offset:]]
+
+    def _search(self, tokens: List[str], limit: Optional[int], offset: int, fuzzy: bool,
+                filters: SearchFilters) -> Dict[str, Any]:
+        terms, corrections = self.expand_terms(tokens, fuzzy)
+        matched_ids = self.match_categories(terms)
+        candidates, scores = self._scores(terms, matched_ids)
+        facets = self._facets
+
+        if not filters.active():
+            ranked = self._rank(candidates, scores, limit, offset)
+            found = set() if matched_ids else facets.category_ids(candidates)
+            return {
+                "categories": self._category_names(matched_ids, found),
+                "products": self._serialize(ranked),
+                "total": len(candidates),
+                "corrections": corrections,
+            }
+
+        # Sin texto, los filtros, el orden y las facetas se aplican al catálogo completo (como en `SearchIndex`)
+        rows = None if not tokens else candidates
+        selected = facets.select(rows, filters)
+        if filters.sort == "relevance" and len(candidates):
+            ranked = self._rank(selected, scores[np.searchsorted(candidates, selected)], limit, offset)
+        else:
+            count = None if limit is None else offset + limit
+            ranked = facets.order(selected, filters.sort, count)[offset:]
+        found = set() if matched_ids else facets.category_ids(selected)
+        result = {
+            "categories": self._category_names(matched_ids, found),
+            "products": self._serialize(ranked),
+            "total": len(selected),
+            "corrections": corrections,
+        }
+        if filters.facets:
+            result["facets"] = facets.facets(rows, filters, self._categories)
+        return result
+
+    def _category_names(self, matched_ids: List[int], found: Set[Optional[int]]) -> List[str]:
+        if matched_ids:
+            return [self._categories[cid] for cid in matched_ids]
+        return [name for cid, name in self._categories.items() if cid in found]
+
+    def _serialize(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """Convierte filas al formato de respuesta de la búsqueda, decodificando solo sus nombres."""
+        facets = self._facets
+        columns = zip(rows.tolist(), facets.ids[rows].tolist(), facets.prices[rows].tolist(),
+                      facets.category_codes[rows].tolist())
+        return [
+            {
+                "id": pid,
+                "name": self._names[self._name_offsets[row]:self._name_offsets[row + 1]].tobytes().decode(),
+                "price": price,
+                "category": self._categories.get(code - 1) if code else None,
+            }
+            for row, pid, price, code in columns
+        ]
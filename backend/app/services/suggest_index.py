@@ -0,0 +1,394 @@
+"""
+Índice de autocompletado por prefijo.
+Mantiene un array ordenado con los nombres de producto normalizados, los términos de las
+descripciones y las palabras clave de categoría, junto con su frecuencia, de modo que
+`/search/suggest` resuelve cada pulsación con una búsqueda binaria sin consultar la base de datos.
+Los arrays se construyen fuera de las peticiones (al arrancar y en el hilo de refresco del
+catálogo) y las peticiones solo leen la referencia al índice vigente.
+"""
+
+import heapq
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from utils import normalize, tokenize
+
+from .product_store import gather_text
+from .search_index import KEYWORDS, SearchIndex
+
+# Carácter mayor que cualquiera de los que produce la normalización (ASCII)
+_PREFIX_END = "\x7f"
+
+
+class TextColumn(Sequence):
+    """Secuencia de textos guardados en un bloque de bytes con sus offsets (arrays de NumPy)."""
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, texts: List[str]) -> "TextColumn":
+        encoded = [text.encode() for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position: int) -> str:
+        return self.blob[self.offsets.item(position):self.offsets.item(position + 1)].tobytes().decode()
+
+
+class SuggestIndex:
+    """
+    Array ordenado de completados con sus frecuencias.
+    Cada prefijo que abarca más de `SCAN_LIMIT` completados tiene sus MAX_LIMIT mejores completados
+    precalculados, así que ninguna consulta recorre más de `SCAN_LIMIT` posiciones del array.
+    Todo el índice son arrays de NumPy (ver `arrays`), para poder guardarlo en disco y proyectarlo en memoria.
+    Tras un refresco del catálogo, `updated` aplica solo los completados que han cambiado.
+    """
+
+    MAX_LIMIT = 20
+    SCAN_LIMIT = 256
+    # Nombres de los arrays que forman el índice
+    ARRAYS = ("keys", "key_offsets", "frequencies", "name_counts", "ranks", "prefixes", "prefix_offsets",
+              "top_offsets", "top_positions")
+
+    _current: Optional["SuggestIndex"] = None
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        Args:
+            arrays: Arrays del índice tal y como los devuelve `arrays()` (o proyectados desde disco).
+        """
+        self._arrays = arrays
+        self._keys = TextColumn(arrays["keys"], arrays["key_offsets"])
+        self._frequencies = arrays["frequencies"]
+        # Productos con cada completado como nombre, para actualizar su frecuencia sin recontar el catálogo
+        self._name_counts = arrays["name_counts"]
+        self._ranks = arrays["ranks"]
+        self._prefixes = TextColumn(arrays["prefixes"], arrays["prefix_offsets"])
+        self._top_offsets = arrays["top_offsets"]
+        self._top_positions = arrays["top_positions"]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Devuelve los arrays que forman el índice."""
+        return dict(self._arrays)
+
+    @classmethod
+    def from_frequencies(cls, frequencies: Dict[str, int],
+                         name_counts: Optional[Mapping[str, int]] = None) -> "SuggestIndex":
+        """
+        Construye el índice a partir de la frecuencia de cada completado.
+
+        Args:
+            frequencies: Frecuencia de cada completado.
+            name_counts: Productos que tienen cada completado como nombre (ver `name_counts`).
+        """
+        keys = sorted(frequencies)
+        count = len(keys)
+        # Posición de cada completado en el orden de las sugerencias: más frecuente y más corto primero
+        order = sorted(range(count), key=lambda pos: (-frequencies[keys[pos]], len(keys[pos]), keys[pos]))
+        ranks = np.empty(count, dtype=np.int32)
+        ranks[order] = np.arange(count, dtype=np.int32)
+        prefixes, tops = cls._top_by_prefix(keys, ranks)
+        key_column = TextColumn.pack(keys)
+        name_counts = name_counts or {}
+        return cls({
+            "keys": key_column.blob, "key_offsets": key_column.offsets,
+            "frequencies": np.fromiter((frequencies[key] for key in keys), dtype=np.int32, count=count),
+            "name_counts": np.fromiter((name_counts.get(key, 0) for key in keys), dtype=np.int32, count=count),
+            "ranks": ranks,
+            **cls._top_arrays(prefixes, tops),
+        })
+
+    @staticmethod
+    def _top_arrays(prefixes: List[str], tops: List[List[int]]) -> Dict[str, np.ndarray]:
+        """Arrays de los prefijos precalculados y de sus mejores completados."""
+        top_offsets = np.zeros(len(tops) + 1, dtype=np.int64)
+        np.cumsum([len(top) for top in tops], out=top_offsets[1:])
+        prefix_column = TextColumn.pack(prefixes)
+        return {
+            "prefixes": prefix_column.blob, "prefix_offsets": prefix_column.offsets,
+            "top_offsets": top_offsets,
+            "top_positions": np.fromiter((pos for top in tops for pos in top), dtype=np.int32,
+                                         count=int(top_offsets[-1])),
+        }
+
+    def updated(self, source: SearchIndex) -> "SuggestIndex":
+        """
+        Devuelve un índice nuevo con los completados que han cambiado en `source` desde la última vez
+        (ver `SearchIndex.suggest_changes`), sin modificar este. Solo se leen en Python los completados
+        cambiados y los prefijos que los contienen; el resto de arrays se copian y reordenan con
+        operaciones vectorizadas.
+        """
+        changes = source.suggest_changes()
+        if not changes:
+            return self
+        keys, count = self._keys, len(self._keys)
+        updated_rows: Dict[int, Tuple[int, int]] = {}
+        added: List[Tuple[int, str, int, int]] = []
+        for key, (delta, document_frequency) in sorted(changes.items()):
+            position = bisect_left(keys, key)
+            exists = position < count and keys[position] == key
+            name_count = (self._name_counts.item(position) if exists else 0) + delta
+            frequency = max(name_count, document_frequency, 1 if key in KEYWORDS else 0)
+            if exists:
+                updated_rows[position] = (name_count, frequency)
+            elif frequency:
+                added.append((position, key, name_count, frequency))
+
+        # Filas que se conservan y posición final de las conservadas y de las nuevas (el orden sigue siendo el de las claves)
+        keep_mask = np.ones(count, dtype=bool)
+        keep_mask[np.array([row for row, (_, frequency) in updated_rows.items() if not frequency], dtype=np.int64)] = False
+        keep = np.flatnonzero(keep_mask)
+        inserts = np.searchsorted(keep, np.array([position for position, *_ in added], dtype=np.int64))
+        kept_at = np.arange(len(keep)) + np.searchsorted(inserts, np.arange(len(keep)), side="right")
+        added_at = inserts + np.arange(len(added))
+        moved = np.full(count, -1, dtype=np.int64)
+        moved[keep] = kept_at
+        total = len(keep) + len(added)
+
+        new_keys = TextColumn.pack([key for _, key, _, _ in added])
+        order = np.empty(total, dtype=np.int64)
+        order[kept_at] = np.arange(len(keep))
+        order[added_at] = len(keep) + np.arange(len(added))
+        offsets = self._keys.offsets
+        blob, key_offsets = gather_text(
+            (self._keys.blob, new_keys.blob),
+            np.concatenate((np.zeros(len(keep), dtype=np.int8), np.ones(len(added), dtype=np.int8)))[order],
+            np.concatenate((offsets[keep], new_keys.offsets[:-1]))[order],
+            np.concatenate((offsets[keep + 1], new_keys.offsets[1:]))[order],
+        )
+        name_counts = np.empty(total, dtype=np.int32)
+        frequencies = np.empty(total, dtype=np.int32)
+        name_counts[kept_at], frequencies[kept_at] = self._name_counts[keep], self._frequencies[keep]
+        for position, (_, _, name_count, frequency) in zip(added_at.tolist(), added):
+            name_counts[position], frequencies[position] = name_count, frequency
+        for row, (name_count, frequency) in updated_rows.items():
+            if frequency:
+                name_counts[moved[row]], frequencies[moved[row]] = name_count, frequency
+
+        # Mismo orden que `from_frequencies`: frecuencia, longitud en caracteres (no bytes UTF-8) y clave
+        characters = np.concatenate(([0], np.cumsum((np.frombuffer(blob, dtype=np.uint8) & 0xC0) != 0x80)))
+        ranks = np.empty(total, dtype=np.int32)
+        ranks[np.lexsort((np.arange(total), characters[key_offsets[1:]] - characters[key_offsets[:-1]],
+                          -frequencies))] = np.arange(total, dtype=np.int32)
+        key_column = TextColumn(np.frombuffer(blob, dtype=np.uint8), key_offsets)
+        prefixes, tops = self._updated_tops(key_column, ranks, moved, changes)
+        return self.__class__({
+            "keys": key_column.blob, "key_offsets": key_offsets,
+            "frequencies": frequencies, "name_counts": name_counts,
+            "ranks": ranks,
+            **self._top_arrays(prefixes, tops),
+        })
+
+    def _updated_tops(self, keys: TextColumn, ranks: np.ndarray, moved: np.ndarray,
+                      changed: Iterable[str]) -> Tuple[List[str], List[List[int]]]:
+        """
+        Mejores completados de cada prefijo tras un cambio: los prefijos sin completados cambiados
+        conservan sus posiciones (desplazadas con `moved`) y solo se recalculan los prefijos de los
+        completados cambiados, de los más largos a los más cortos, a partir de sus hijos.
+        """
+        affected = {key[:length] for key in changed for length in range(len(key) + 1)}
+        previous: Dict[str, List[int]] = {}
+        for entry in range(len(self._prefixes)):
+            prefix = self._prefixes[entry]
+            if prefix not in affected:
+                start, end = self._top_offsets.item(entry), self._top_offsets.item(entry + 1)
+                previous[prefix] = moved[self._top_positions[start:end]].tolist()
+
+        tops: Dict[str, List[int]] = {}
+        for prefix in sorted(affected, key=len, reverse=True):
+            start = bisect_left(keys, prefix)
+            end = bisect_left(keys, prefix + _PREFIX_END, start)
+            if end - start <= self.SCAN_LIMIT:
+                continue
+            candidates = []
+            position = start
+            if keys[position] == prefix:
+                candidates.append(position)
+                position += 1
+            while position < end:
+                child = keys[position][:len(prefix) + 1]
+                child_end = bisect_left(keys, child + _PREFIX_END, position, end)
+                if child_end - position <= self.SCAN_LIMIT:
+                    candidates.extend(self._scan(ranks, position, child_end, self.MAX_LIMIT))
+                else:
+                    candidates.extend(tops[child] if child in tops else previous[child])
+                position = child_end
+            tops[prefix] = heapq.nsmallest(self.MAX_LIMIT, candidates, key=ranks.item)
+        previous.update(tops)
+        prefixes = sorted(previous)
+        return prefixes, [previous[prefix] for prefix in prefixes]
+
+    @classmethod
+    def _top_by_prefix(cls, keys: List[str], ranks: np.ndarray) -> Tuple[List[str], List[List[int]]]:
+        """
+        Calcula los mejores completados de cada prefijo con más de SCAN_LIMIT completados.
+        Recorre el trie implícito del array ordenado: los mejores de un prefijo salen de mezclar los de
+        sus hijos (un carácter más), y los rangos pequeños se resuelven directamente sobre los rangos.
+        Devuelve los prefijos en orden y, para cada uno, las posiciones de sus mejores completados.
+        """
+        rank = ranks.item
+        result: List[Tuple[str, List[int]]] = []
+
+        def visit(prefix: str, start: int, end: int) -> List[int]:
+            if end - start <= cls.SCAN_LIMIT:
+                return cls._scan(ranks, start, end, cls.MAX_LIMIT)
+            depth = len(prefix)
+            candidates = []
+            position = start
+            if keys[position] == prefix:
+                candidates.append(position)
+                position += 1
+            while position < end:
+                child = keys[position][:depth + 1]
+                child_end = bisect_left(keys, child + _PREFIX_END, position, end)
+                candidates.extend(visit(child, position, child_end))
+                position = child_end
+            top = heapq.nsmallest(cls.MAX_LIMIT, candidates, key=rank)
+            result.append((prefix, top))
+            return top
+
+        if keys:
+            visit("", 0, len(keys))
+        result.sort()
+        return [prefix for prefix, _ in result], [top for _, top in result]
+
+    @staticmethod
+    def _scan(ranks: np.ndarray, start: int, end: int, limit: int) -> List[int]:
+        """Posiciones de los `limit` mejores completados de un rango pequeño del array."""
+        return (np.argsort(ranks[start:end], kind="stable")[:limit] + start).tolist()
+
+    @classmethod
+    def from_search_index(cls, index: SearchIndex) -> "SuggestIndex":
+        """
+        Construye el índice de autocompletado a partir del índice de búsqueda.
+        La frecuencia de un término es el número de productos que lo contienen y la de un
+        nombre, el número de productos que lo comparten.
+        """
+        # Los cambios anotados hasta ahora ya están en lo que se lee: a partir de aquí los aplica `updated`
+        index.suggest_changes()
+        name_counts = cls.name_counts(index.product_names())
+        return cls.from_frequencies(cls.frequencies(name_counts, index.term_frequencies()), name_counts)
+
+    @staticmethod
+    def name_counts(names: Iterable[Optional[str]]) -> Dict[str, int]:
+        """Cuenta los productos que comparten cada nombre normalizado."""
+        counts: Dict[str, int] = defaultdict(int)
+        for name in names:
+            counts[" ".join(tokenize(name or ''))] += 1
+        counts.pop("", None)
+        return counts
+
+    @staticmethod
+    def frequencies(name_counts: Mapping[str, int], term_frequencies: Dict[str, int]) -> Dict[str, int]:
+        """Combina los nombres de producto, los términos y las palabras clave en un diccionario de frecuencias."""
+        frequencies: Dict[str, int] = defaultdict(int, name_counts)
+        for term, frequency in term_frequencies.items():
+            frequencies[term] = max(frequencies[term], frequency)
+        for keyword in KEYWORDS:
+            frequencies[keyword] = max(frequencies[keyword], 1)
+        return frequencies
+
+    @classmethod
+    def current(cls) -> Optional["SuggestIndex"]:
+        """Devuelve el índice de autocompletado vigente, o None si aún no se ha construido."""
+        return cls._current
+
+    @classmethod
+    def rebuild(cls, source: SearchIndex) -> "SuggestIndex":
+        """
+        Construye el índice de autocompletado desde un índice de búsqueda y lo publica como vigente.
+        Se llama al arrancar y desde el hilo de refresco del catálogo tras aplicar cambios, nunca
+        desde una petición: las peticiones en curso siguen con la referencia anterior.
+        """
+        suggest_index = cls.from_search_index(source)
+        cls._current = suggest_index
+        return suggest_index
+
+    @classmethod
+    def adopt(cls, suggest_index: "SuggestIndex", source: SearchIndex) -> "SuggestIndex":
+        """
+        Publica como vigente un índice ya construido para el catálogo de `source` (p. ej. el de la
+        instantánea en disco); desde aquí, `refresh` le aplica los cambios de `source`.
+        """
+        source.suggest_changes()
+        cls._current = suggest_index
+        return suggest_index
+
+    @classmethod
+    def refresh(cls, source: SearchIndex) -> "SuggestIndex":
+        """
+        Aplica al índice vigente los completados cambiados en `source` (ver `updated`) y publica el
+        resultado; si todavía no hay ninguno, lo construye con `rebuild`.
+        """
+        current = cls._current
+        if current is None:
+            return cls.rebuild(source)
+        cls._current = current.updated(source)
+        return cls._current
+
+    @classmethod
+    def reset(cls) -> None:
+        """Descarta el índice de autocompletado."""
+        cls._current = None
+
+    def suggest(self, prefix: str, limit: int = 10, scored: bool = False) -> List[Any]:
+        """
+        Devuelve los completados más frecuentes de un prefijo.
+
+        Args:
+            prefix: Texto introducido por el usuario (se normaliza).
+            limit: Número máximo de completados (como mucho MAX_LIMIT).
+            scored: Si es True devuelve pares `(completado, frecuencia)`, para mezclar las
+                sugerencias de varios índices (ver `ShardedSearch.suggest`).
+
+        Returns:
+            Completados ordenados por frecuencia descendente.
+        """
+        positions = self._positions(prefix, limit)
+        if scored:
+            return [(self._keys[position], self._frequencies.item(position)) for position in positions]
+        return [self._keys[position] for position in positions]
+
+    @staticmethod
+    def merge(scored: Iterable[Iterable[Tuple[str, int]]], limit: int) -> List[str]:
+        """
+        Mezcla sugerencias `(completado, frecuencia)` de varios índices sumando las frecuencias de
+        cada completado, con el mismo orden que `suggest`.
+        """
+        frequencies: Dict[str, int] = defaultdict(int)
+        for suggestions in scored:
+            for key, frequency in suggestions:
+                frequencies[key] += frequency
+        return heapq.nsmallest(limit, frequencies, key=lambda key: (-frequencies[key], len(key), key))
+
+    def _positions(self, prefix: str, limit: int) -> List[int]:
+        normalized = normalize(prefix)
+        words = normalized.split()
+        limit = min(limit, self.MAX_LIMIT)
+        if not words or limit <= 0:
+            return []
+        # Un espacio final indica que la última palabra está completa y se busca la siguiente
+        prefix = " ".join(words) + (" " if normalized.endswith(" ") else "")
+        entry = bisect_left(self._prefixes, prefix)
+        if entry < len(self._prefixes) and self._prefixes[entry] == prefix:
+            start = self._top_offsets.item(entry)
+            return self._top_positions[start:min(start + limit, self._top_offsets.item(entry + 1))].tolist()
+        # Un prefijo sin entrada precalculada abarca como mucho SCAN_LIMIT completados
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + _PREFIX_END, lo=start)
+        return self._scan(self._ranks, start, end, limit)
@@ -0,0 +1,148 @@
+"""
+Índice de trigramas de caracteres sobre el vocabulario del catálogo.
+Permite encontrar, para una palabra mal escrita, los términos más parecidos del vocabulario
+comparando solo con los términos que comparten algún trigrama, en lugar de calcular una
+distancia de edición contra todo el catálogo.
+"""
+
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Mapping, Set, Tuple
+
+import numpy as np
+
+
+def trigrams(term: str) -> Set[str]:
+    """Devuelve los trigramas de un término, con relleno para dar peso a inicio y final."""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Índice trigrama -> términos con búsqueda de términos similares por coeficiente de Dice."""
+
+    def __init__(self):
+        self._terms: Dict[str, int] = {}
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add_term(self, term: str) -> None:
+        """Añade un término al vocabulario."""
+        if term in self._terms:
+            return
+        grams = trigrams(term)
+        self._terms[term] = len(grams)
+        for gram in grams:
+            self._grams[gram].add(term)
+
+    def remove_term(self, term: str) -> None:
+        """Elimina un término del vocabulario si existe."""
+        if self._terms.pop(term, None) is None:
+            return
+        for gram in trigrams(term):
+            terms = self._grams[gram]
+            terms.discard(term)
+            if not terms:
+                del self._grams[gram]
+
+    def similar(self, term: str, threshold: float = 0.5, limit: int = 3) -> List[Tuple[str, float]]:
+        """
+        Busca los términos del vocabulario más parecidos a uno dado.
+
+        Args:
+            term: Término (normalizado) a corregir.
+            threshold: Similitud mínima (coeficiente de Dice sobre trigramas, entre 0 y 1).
+            limit: Número máximo de términos a devolver.
+
+        Returns:
+            Lista de pares (término, similitud) ordenada de mayor a menor similitud.
+        """
+        grams = trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        scored = [
+            (candidate, 2 * count / (len(grams) + self._terms[candidate]))
+            for candidate, count in shared.items()
+        ]
+        scored = [item for item in scored if item[1] >= threshold]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+
+class TrigramArrays:
+    """
+    Versión de solo lectura de `TrigramIndex` sobre arrays de NumPy: trigramas ordenados con la lista
+    de términos de cada uno en formato CSR. Se construye una vez y puede guardarse en disco y
+    proyectarse en memoria (ver `arrays`), sin volver a recorrer el vocabulario en cada proceso.
+    """
+
+    # Nombres de los arrays que forman el índice
+    ARRAYS = ("terms", "term_grams", "grams", "gram_offsets", "gram_terms")
+
+    def __init__(self, arrays: Mapping[str, np.ndarray]):
+        """
+        Args:
+            arrays: Arrays del índice tal y como los devuelve `arrays()` (o proyectados desde disco).
+        """
+        self._arrays = dict(arrays)
+        self._terms = arrays["terms"]
+        self._term_grams = arrays["term_grams"]
+        self._grams = arrays["grams"]
+        self._gram_offsets = arrays["gram_offsets"]
+        self._gram_terms = arrays["gram_terms"]
+
+    @classmethod
+    def from_terms(cls, terms: Iterable[str]) -> "TrigramArrays":
+        """Construye el índice sobre un vocabulario."""
+        terms = sorted(set(terms))
+        grams_of = [sorted(gram.encode() for gram in trigrams(term)) for term in terms]
+        term_grams = np.fromiter((len(grams) for grams in grams_of), dtype=np.int32, count=len(terms))
+        term_ids = np.repeat(np.arange(len(terms), dtype=np.int32), term_grams)
+        flat = [gram for grams in grams_of for gram in grams]
+        grams, gram_ids = np.unique(np.array(flat, dtype="S"), return_inverse=True) if flat else (
+            np.empty(0, dtype="S3"), np.empty(0, dtype=np.int64))
+        # Términos de cada trigrama, en orden de término, a partir de los pares (trigrama, término)
+        order = np.lexsort((term_ids, gram_ids.ravel()))
+        gram_offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_ids.ravel(), minlength=len(grams)), out=gram_offsets[1:])
+        encoded = [term.encode() for term in terms]
+        return cls({
+            "terms": np.array(encoded, dtype=f"S{max((len(term) for term in encoded), default=1)}"),
+            "term_grams": term_grams,
+            "grams": grams,
+            "gram_offsets": gram_offsets,
+            "gram_terms": term_ids[order],
+        })
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Devuelve los arrays que forman el índice."""
+        return dict(self._arrays)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def similar(self, term: str, threshold: float = 0.5, limit: int = 3) -> List[Tuple[str, float]]:
+        """Busca los términos más parecidos a uno dado; mismo resultado que `TrigramIndex.similar`."""
+        grams = trigrams(term)
+        keys = np.array(sorted(gram.encode() for gram in grams), dtype="S")
+        slots = np.searchsorted(self._grams, keys)
+        found = slots < len(self._grams)
+        found[found] = self._grams[slots[found]] == keys[found]
+        postings = [self._gram_terms[self._gram_offsets[slot]:self._gram_offsets[slot + 1]]
+                    for slot in slots[found].tolist()]
+        if not postings:
+            return []
+        candidates, shared = np.unique(np.concatenate(postings), return_counts=True)
+        scored = [
+            (self._terms[candidate].decode(), 2 * count / (len(grams) + size))
+            for candidate, count, size in zip(candidates.tolist(), shared.tolist(),
+                                              self._term_grams[candidates].tolist())
+        ]
+        scored = [item for item in scored if item[1] >= threshold]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
@@ -0,0 +1,58 @@
+"""
+Instantánea del catálogo y del índice de búsqueda en disco para arrancar sin leer el catálogo.
+
+La instantánea es la misma que usa `SEARCH_MODE=shared`: un directorio por versión con un array
+de NumPy por columna y un puntero `CURRENT`. Al arrancar, el backend la proyecta en memoria si
+corresponde a la base de datos y solo reconstruye desde la base de datos cuando está desactualizada.
+
+Uso (con PYTHONPATH=src):
+    python src/snapshot.py export [--dir /code/snapshot] [--force]
+    python src/snapshot.py status [--dir /code/snapshot]
+"""
+
+import argparse
+import os
+import sys
+
+from sqlmodel import Session, create_engine
+
+from services import SharedIndex
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Instantánea del catálogo y del índice de búsqueda.")
+    parser.add_argument("command", choices=("export", "status"),
+                        help="export: escribe una versión nueva si la publicada está desactualizada; "
+                             "status: falla si la versión publicada no corresponde a la base de datos")
+    parser.add_argument("--dir", default=SharedIndex.DIRECTORY,
+                        help="Directorio de las versiones (por defecto, SHARED_INDEX_DIR)")
+    parser.add_argument("--force", action="store_true", help="Escribe una versión nueva aunque esté al día")
+    parser.add_argument("--db-url", default=os.getenv("DB_URL", "mysql+pymysql://user:password@db/ecommerce"),
+                        help="URL de la base de datos")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    engine = create_engine(args.db_url)
+    try:
+        with Session(engine) as session:
+            if args.command == "export":
+                index, built = SharedIndex.export(session, args.dir, force=args.force)
+                action = "Exportada" if built else "Al día"
+                print(f"{action}: {os.path.join(args.dir, index.name)} ({len(index)} productos)")
+                return 0
+            index = SharedIndex.published(args.dir)
+            if index is None:
+                print(f"No hay ninguna instantánea en {args.dir}")
+                return 1
+            fresh = index.fingerprint == SharedIndex.fingerprint_of(session)
+            print(f"{'Al día' if fresh else 'Desactualizada'}: {os.path.join(args.dir, index.name)} "
+                  f"({len(index)} productos, marca {index.fingerprint['watermark']})")
+            return 0 if fresh else 1
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
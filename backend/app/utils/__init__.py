@@ -1,3 +1,4 @@
 from .logger import get_logger
+from .text import CATEGORY_KEYWORDS, normalize, normalize_category_name, tokenize
 
-__all__ = ['get_logger']
+__all__ = ['get_logger', 'CATEGORY_KEYWORDS', 'normalize', 'normalize_category_name', 'tokenize']
@@ -0,0 +1,43 @@
+"""
+Utilidades de normalización y tokenización de texto.
+
+Centraliza las reglas que usa la búsqueda por texto para que el índice en memoria
+y las consultas se normalicen exactamente de la misma forma.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List
+
+# Diccionario de palabras clave por categoría (nombre de categoría normalizado -> palabras clave)
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "camisetas": ["camiseta", "camisa", "polo"],
+    "pantalones": ["pantalon", "jean", "vaquero", "bermuda", "chino"],
+    "zapatos": ["zapato", "zapatilla", "calzado"],
+    "telefonos": ["telefono", "movil", "smartphone", "celular"],
+    "portatiles": ["portatil", "laptop", "notebook", "ordenador"],
+    "otros": ["otros"]
+}
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def strip_accents(text: str) -> str:
+    """Elimina tildes y cualquier carácter no ASCII del texto."""
+    text = unicodedata.normalize('NFD', text)
+    return text.encode('ascii', 'ignore').decode('utf-8')
+
+
+def normalize(text: str) -> str:
+    """Normaliza un texto: quita tildes y signos de puntuación y lo pasa a minúsculas."""
+    return _NON_WORD.sub(' ', strip_accents(text)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Devuelve las palabras del texto normalizado."""
+    return normalize(text).split()
+
+
+def normalize_category_name(name: str) -> str:
+    """Normaliza el nombre de una categoría ignorando mayúsculas y tildes."""
+    return strip_accents(name).lower()
@@ -0,0 +1,281 @@
+"""
+Benchmark de los endpoints de lectura del catálogo.
+
+Mide la latencia (p50/p95/p99) y el throughput de `POST /search/text`, `GET /products` y
+`GET /tasks/{task_id}/result`, y escribe los resultados en JSON para poder comparar versiones.
+Por defecto la aplicación se ejecuta en el propio proceso (TestClient) contra la base de datos de
+`--db-url`; con `--url` se mide un backend ya desplegado.
+
+Uso (con PYTHONPATH=backend/app:backend):
+    python -m benchmarks.catalog_generator --rows 100k --db-url sqlite:///bench_100k.db
+    python -m benchmarks.bench_api --db-url sqlite:///bench_100k.db --output resultados.json
+    python -m benchmarks.bench_api --url http://localhost:8000 --baseline resultados.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .catalog_generator import COLORS, VOCABULARY
+
+SCENARIOS = ("search_text", "search_text_batch", "products", "task_result")
+
+# Consultas con tildes, mayúsculas, palabras compuestas y alguna errata
+SEARCH_QUERIES = [
+    "camiseta deportiva azul", "Camiseta básica BLANCA", "pantalón vaquero negro", "zapatillas running",
+    "zapato de piel marrón", "teléfono 5G", "móvil de alta gama", "portátil ultraligero",
+    "ordenador portátil 16GB RAM", "mochila resistente al agua", "auriculares inalámbricos",
+    "bota impermeable", "polo rojo", "chino beige", "zapatila runing", "portatil gamming",
+    "camiseta, talla M", "regalo", "azul marino", "Ñandú",
+]
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Percentil por interpolación lineal entre las dos muestras más cercanas."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies: Sequence[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Resume las latencias (en segundos) de un escenario en milisegundos."""
+    requests = len(latencies) + errors
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+def run_scenario(request: Callable[[int], Any], requests: int, concurrency: int,
+                 warmup: int = 0) -> Dict[str, Any]:
+    """
+    Ejecuta `requests` llamadas a `request` repartidas entre `concurrency` hilos.
+
+    Args:
+        request: Función que hace la petición número `i` y devuelve la respuesta HTTP.
+        requests: Número de peticiones medidas.
+        concurrency: Peticiones simultáneas.
+        warmup: Peticiones previas que no se miden (calientan cachés y conexiones).
+
+    Returns:
+        El resumen de latencias y throughput del escenario.
+    """
+    for i in range(warmup):
+        request(i)
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(i: int) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            ok = request(i).status_code < 400
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+class Scenarios:
+    """Peticiones de cada escenario sobre un cliente HTTP (TestClient o requests.Session)."""
+
+    def __init__(self, client, base_url: str = "", seed: int = 42, cache: bool = False,
+                 page_size: int = 100, max_product_id: int = 10_000, batch_size: int = 100):
+        self._client = client
+        self._base_url = base_url.rstrip("/")
+        self._rng = random.Random(seed)
+        self._headers = {} if cache else {"Cache-Control": "no-cache"}
+        self._page_size = page_size
+        self._max_product_id = max_product_id
+        self.batch_size = batch_size
+        self._task_ids: List[str] = []
+        self._queries = SEARCH_QUERIES + [
+            f"{self._rng.choice(vocabulary['nouns'])} {self._rng.choice(COLORS)}"
+            for vocabulary in VOCABULARY.values() for _ in range(5)
+        ]
+
+    def search_text(self, i: int):
+        query = self._queries[i % len(self._queries)]
+        return self._client.post(f"{self._base_url}/search/text", json={"query": query, "limit": 20},
+                                 headers=self._headers)
+
+    def search_text_batch(self, i: int):
+        start = i * self.batch_size
+        # El sufijo numérico evita que el lote repita consultas, que se resolverían una sola vez
+        queries = [self._queries[(start + j) % len(self._queries)] + f" {j // len(self._queries)}"
+                   for j in range(self.batch_size)]
+        return self._client.post(f"{self._base_url}/search/text/batch", json={"queries": queries, "limit": 20},
+                                 headers=self._headers)
+
+    def products(self, i: int):
+        after_id = (i * 7919) % self._max_product_id
+        return self._client.get(f"{self._base_url}/products",
+                                params={"after_id": after_id, "limit": self._page_size})
+
+    def prepare_tasks(self, count: int = 50) -> None:
+        """Registra tareas completadas a través del webhook, como haría el servicio de inferencia."""
+        for _ in range(count):
+            task_id = f"bench-{uuid.uuid4()}"
+            labels = self._rng.sample(range(1, len(VOCABULARY) + 1), k=self._rng.randint(1, 3))
+            payload = {"task_id": task_id, "state": "completed",
+                       "categories": [{"label": label, "score": 0.9} for label in labels]}
+            response = self._client.post(f"{self._base_url}/webhook/task_completed", json=payload)
+            response.raise_for_status()
+            self._task_ids.append(task_id)
+
+    def task_result(self, i: int):
+        task_id = self._task_ids[i % len(self._task_ids)]
+        return self._client.get(f"{self._base_url}/tasks/{task_id}/result")
+
+
+def git_revision() -> Optional[str]:
+    """Revisión de git del código medido, si está disponible."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Compara con un resultado anterior.
+
+    Returns:
+        Por escenario, el cociente actual/anterior de p50, p95, p99 y throughput
+        (> 1 en las latencias o < 1 en el throughput indica una regresión).
+    """
+    ratios = {}
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        ratios[name] = {
+            key: round(current[key] / previous[key], 3)
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps") if previous.get(key)
+        }
+    return ratios
+
+
+def run(client, args: argparse.Namespace, base_url: str = "", products: Optional[int] = None) -> Dict[str, Any]:
+    """Ejecuta los escenarios seleccionados y devuelve el documento de resultados."""
+    scenarios = Scenarios(client, base_url, seed=args.seed, cache=args.cache, page_size=args.page_size,
+                          max_product_id=products or 10_000, batch_size=args.batch_size)
+    if "task_result" in args.scenarios:
+        scenarios.prepare_tasks()
+    results: Dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "target": base_url or "in-process",
+        "catalog_products": products,
+        "config": {"requests": args.requests, "concurrency": args.concurrency, "warmup": args.warmup,
+                   "cache": args.cache, "page_size": args.page_size, "batch_size": args.batch_size,
+                   "search_mode": os.getenv("SEARCH_MODE")},
+        "scenarios": {},
+    }
+    for name in args.scenarios:
+        results["scenarios"][name] = run_scenario(
+            getattr(scenarios, name), args.requests, args.concurrency, args.warmup
+        )
+    batch = results["scenarios"].get("search_text_batch")
+    if batch:
+        # Coste por consulta del lote, comparable con la latencia media de `search_text`
+        batch["per_query_ms"] = round(batch["mean_ms"] / args.batch_size, 3)
+    return results
+
+
+def count_products(db_url: str) -> int:
+    from sqlalchemy import func
+    from sqlmodel import Session, create_engine, select
+    from db import Product
+
+    engine = create_engine(db_url)
+    try:
+        with Session(engine) as session:
+            return session.exec(select(func.count()).select_from(Product)).one()
+    finally:
+        engine.dispose()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de /search/text, /products y /tasks/{id}/result.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db-url", help="Ejecuta la aplicación en este proceso contra esta base de datos")
+    target.add_argument("--url", help="URL de un backend ya desplegado")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="Peticiones medidas por escenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Peticiones simultáneas")
+    parser.add_argument("--warmup", type=int, default=20, help="Peticiones de calentamiento por escenario")
+    parser.add_argument("--page-size", type=int, default=100, help="Parámetro `limit` de /products")
+    parser.add_argument("--batch-size", type=int, default=100, help="Consultas por petición de /search/text/batch")
+    parser.add_argument("--cache", action="store_true", help="Permite la caché de búsquedas (por defecto se omite)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Fichero JSON de resultados (por defecto, la salida estándar)")
+    parser.add_argument("--baseline", help="Resultados anteriores con los que comparar")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.url:
+        import requests
+
+        with requests.Session() as session:
+            results = run(session, args, base_url=args.url)
+    else:
+        from fastapi.testclient import TestClient
+
+        os.environ["DB_URL"] = args.db_url
+        from main import app
+
+        products = count_products(args.db_url)
+        # El bloque `with` ejecuta el ciclo de vida de la aplicación (índice de búsqueda incluido)
+        with TestClient(app) as client:
+            results = run(client, args, products=products)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline:
+            results["comparison"] = compare(results, json.load(baseline))
+    document = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(document + "\n")
+    else:
+        print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Benchmark de la memoria residente por producto de las representaciones del catálogo en memoria.
+
+Compara instancias del ORM (`Product`), los registros por producto que guardaba la caché del catálogo
+(`CatalogProduct` con un diccionario por id) y el almacén columnar `ProductStore`. Cada representación
+se construye a partir de productos sintéticos de `CatalogGenerator`, generados uno a uno, y se mide la
+memoria que sigue asignada al terminar (tracemalloc) y el pico durante la construcción, además del tiempo
+de un recorrido completo como el del listado de productos. Los resultados se escriben en JSON como los de `bench_api`.
+
+Con `--index-mode` mide además la memoria residente (RSS) del proceso con todo lo que mantiene el modo `index`
+al arrancar: la instantánea de la caché del catálogo, el índice de búsqueda con sus columnas de facetas y el
+índice de autocompletado. La instantánea se construye desde el generador como se lee de la base de datos y
+el índice de búsqueda sobre su almacén de productos, como en `load_catalog`.
+La RSS se lee de /proc, así que esta medida solo está disponible en Linux.
+
+Uso (con PYTHONPATH=backend/app:backend):
+    python -m benchmarks.bench_memory --rows 1m --output memoria.json
+    python -m benchmarks.bench_memory --rows 1m --representations store --index-mode
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from db import Product
+from services import ProductStore, SearchIndex, SuggestIndex
+from services.catalog_cache import CatalogProduct, CatalogSnapshot
+
+from .bench_api import git_revision
+from .catalog_generator import CatalogGenerator, parse_rows
+
+
+def _records(rows: Iterable[Dict[str, Any]]) -> Dict[int, CatalogProduct]:
+    records = (CatalogProduct(r["id"], r["name"], r["description"], r["price"], r["category_id"]) for r in rows)
+    return {record.id: record for record in records}
+
+
+# Cada representación recibe las filas generadas y devuelve (estructura, iterable de productos)
+REPRESENTATIONS: Dict[str, Callable[[Iterable[Dict[str, Any]]], Any]] = {
+    "orm": lambda rows: [Product(**row) for row in rows],
+    "records": _records,
+    "store": lambda rows: ProductStore(SimpleNamespace(**row) for row in rows),
+}
+
+
+def _products(structure: Any) -> Iterable[Any]:
+    return structure.values() if hasattr(structure, "values") else structure
+
+
+def measure(build: Callable[[Iterable[Dict[str, Any]]], Any], rows: int, seed: int) -> Dict[str, Any]:
+    """Construye una representación con `rows` productos y mide su memoria retenida y su recorrido."""
+    generator = CatalogGenerator(seed=seed)
+    gc.collect()
+    tracemalloc.start()
+    structure = build(row for _, row in generator.products(rows))
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for product in _products(structure):
+        _ = product.id, product.name, product.price
+    scan_seconds = time.perf_counter() - start
+    del structure
+    gc.collect()
+    return {
+        "rows": rows,
+        "retained_mb": round(retained / 2**20, 1),
+        "peak_mb": round(peak / 2**20, 1),
+        "bytes_per_product": round(retained / max(rows, 1), 1),
+        "scan_ms": round(scan_seconds * 1000, 1),
+    }
+
+
+def _rss() -> int:
+    """Memoria residente actual del proceso, en bytes."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _generated(rows: int, seed: int) -> Iterable[SimpleNamespace]:
+    return (SimpleNamespace(**row) for _, row in CatalogGenerator(seed=seed).products(rows))
+
+
+def _categories() -> List[SimpleNamespace]:
+    return [SimpleNamespace(**row) for _, row in CatalogGenerator.categories()]
+
+
+def measure_index_mode(rows: int, seed: int) -> Dict[str, Any]:
+    """
+    Mide la RSS que añade cada estructura que el modo `index` mantiene en memoria, en el orden de arranque.
+    Cada estructura se conserva hasta el final: el total es la memoria del proceso con el catálogo cargado.
+    """
+    gc.collect()
+    baseline = previous = _rss()
+    stages: Dict[str, Any] = {}
+    structures: List[Any] = []
+
+    def stage(name: str, build: Callable[[], Any]) -> None:
+        nonlocal previous
+        start = time.perf_counter()
+        structures.append(build())
+        seconds = time.perf_counter() - start
+        gc.collect()
+        current = _rss()
+        stages[name] = {
+            "rss_mb": round((current - previous) / 2**20, 1),
+            "bytes_per_product": round((current - previous) / max(rows, 1), 1),
+            "build_s": round(seconds, 2),
+        }
+        previous = current
+
+    stage("catalog_snapshot", lambda: CatalogSnapshot(_categories(), _generated(rows, seed), 1))
+
+    def search_index() -> SearchIndex:
+        index = SearchIndex.build(_categories(), structures[0].products)
+        index.refresh_facets()
+        return index
+
+    stage("search_index", search_index)
+    stage("suggest_index", lambda: SuggestIndex.from_search_index(structures[-1]))
+    # El índice de búsqueda lee los campos de los productos del almacén de la instantánea, sin copiarlos
+    shares_store = structures[1].product_store() is structures[0].products
+    total = previous - baseline
+    structures.clear()
+    gc.collect()
+    return {
+        "rows": rows,
+        "baseline_rss_mb": round(baseline / 2**20, 1),
+        "stages": stages,
+        "search_index_shares_store": shares_store,
+        "total_rss_mb": round(total / 2**20, 1),
+        "total_bytes_per_product": round(total / max(rows, 1), 1),
+        # ru_maxrss está en KiB en Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10, 1),
+    }
+
+
+def run(rows: int, seed: int = 42, representations: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Mide cada representación y calcula cuántas veces ocupa más que el almacén columnar."""
+    results = {name: measure(REPRESENTATIONS[name], rows, seed) for name in representations or list(REPRESENTATIONS)}
+    store = results.get("store")
+    if store and store["bytes_per_product"]:
+        for name, result in results.items():
+            result["ratio_vs_store"] = round(result["bytes_per_product"] / store["bytes_per_product"], 2)
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mide la memoria por producto de las representaciones del catálogo.")
+    parser.add_argument("--rows", type=parse_rows, default=parse_rows("100k"),
+                        help="Número de productos o tamaño predefinido (10k, 100k, 1m)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--representations", nargs="+", choices=list(REPRESENTATIONS), default=list(REPRESENTATIONS))
+    parser.add_argument("--index-mode", action="store_true",
+                        help="Mide también la RSS de las estructuras que mantiene el modo index (solo Linux)")
+    parser.add_argument("--output", help="Fichero JSON de resultados (por defecto, la salida estándar)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results: Dict[str, Any] = {
+        "revision": git_revision(),
+        "seed": args.seed,
+        # El modo index se mide primero, antes de que las representaciones dejen memoria sin devolver al sistema
+        "index_mode": measure_index_mode(args.rows, args.seed) if args.index_mode else None,
+        "representations": run(args.rows, args.seed, args.representations),
+    }
+    document = json.dumps({key: value for key, value in results.items() if value is not None}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(document + "\n")
+    else:
+        print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Benchmark de la capa de lectura proyectada frente a las consultas ORM.
+
+Ejecuta las lecturas de los endpoints críticos de dos formas, hidratando instancias de
+`Product`/`Category` (ORM) y con las consultas de `CatalogQueries` (filas de Core), y mide el
+tiempo y la memoria asignada de cada una. Los resultados se escriben en JSON como los de `bench_api`.
+
+Uso (con PYTHONPATH=backend/app:backend):
+    python -m benchmarks.catalog_generator --rows 100k --db-url sqlite:///bench_100k.db
+    python -m benchmarks.bench_read_path --db-url sqlite:///bench_100k.db --output lectura.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlmodel import Session, create_engine, select
+
+from db import CatalogQueries, Category, Product
+
+from .bench_api import git_revision, percentile
+
+TASK_CATEGORIES = [1, 3]
+PAGE_SIZE = 1000
+
+# Pares (ORM, proyección) de cada lectura; los dos elementos devuelven lo mismo para la respuesta
+READS: Dict[str, Dict[str, Callable[[Session], List[Any]]]] = {
+    "catalog_load": {
+        "orm": lambda session: session.exec(select(Product)).all(),
+        "projection": lambda session: session.exec(CatalogQueries.index_products()).all(),
+    },
+    "task_result": {
+        "orm": lambda session: (
+            session.exec(select(Category).where(Category.id.in_(TASK_CATEGORIES))).all()
+            + session.exec(select(Product).where(Product.category_id.in_(TASK_CATEGORIES))).all()
+        ),
+        "projection": lambda session: (
+            session.exec(CatalogQueries.categories(TASK_CATEGORIES)).all()
+            + session.exec(CatalogQueries.products_in(TASK_CATEGORIES)).all()
+        ),
+    },
+    "products_page": {
+        "orm": lambda session: session.exec(select(Product).order_by(Product.id).limit(PAGE_SIZE)).all(),
+        "projection": lambda session: session.exec(CatalogQueries.products_page(limit=PAGE_SIZE)).all(),
+    },
+}
+
+
+def measure(engine, read: Callable[[Session], List[Any]], repeat: int) -> Dict[str, Any]:
+    """Ejecuta `read` `repeat` veces, cada una con una sesión nueva, y resume tiempo y memoria."""
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            rows = read(session)
+            timings.append(time.perf_counter() - start)
+    # La memoria se mide en una pasada aparte: tracemalloc ralentiza la ejecución
+    with Session(engine) as session:
+        tracemalloc.start()
+        read(session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "rows": len(rows),
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "us_per_row": round(min(timings) * 1e6 / max(len(rows), 1), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run(engine, repeat: int, reads: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Mide cada lectura con las dos variantes y calcula la mejora de la proyección."""
+    results: Dict[str, Any] = {}
+    for name in reads or list(READS):
+        variants = {variant: measure(engine, read, repeat) for variant, read in READS[name].items()}
+        orm, projection = variants["orm"], variants["projection"]
+        variants["speedup"] = round(orm["min_ms"] / projection["min_ms"], 2) if projection["min_ms"] else None
+        variants["memory_ratio"] = round(projection["peak_kb"] / orm["peak_kb"], 3) if orm["peak_kb"] else None
+        results[name] = variants
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compara las lecturas ORM con las proyectadas.")
+    parser.add_argument("--db-url", required=True, help="Base de datos con el catálogo a leer")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por lectura")
+    parser.add_argument("--reads", nargs="+", choices=list(READS), default=list(READS))
+    parser.add_argument("--output", help="Fichero JSON de resultados (por defecto, la salida estándar)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    engine = create_engine(args.db_url)
+    try:
+        document = json.dumps({
+            "revision": git_revision(),
+            "repeat": args.repeat,
+            "reads": run(engine, args.repeat, args.reads),
+        }, indent=2)
+    finally:
+        engine.dispose()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(document + "\n")
+    else:
+        print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
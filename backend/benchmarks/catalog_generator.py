@@ -0,0 +1,190 @@
+"""
+Generador de catálogos sintéticos para pruebas de rendimiento.
+
+Produce productos en español repartidos entre las seis `CategoryTypes`, con tildes, signos de
+puntuación y una frecuencia de palabras sesgada (unas pocas muy comunes y una cola larga), de
+modo que el índice de búsqueda se comporte como con un catálogo real. La generación es
+determinista para una semilla dada y se hace en streaming, así que la memoria usada no depende
+del número de filas.
+
+Uso (con PYTHONPATH=backend/app:backend):
+    python -m benchmarks.catalog_generator --rows 100000 --db-url sqlite:///bench_100k.db
+    python -m benchmarks.catalog_generator --rows 1000000 --output catalogo_1m.jsonl
+"""
+
+import argparse
+import json
+import random
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from db import CategoryTypes
+
+CATEGORY_NAMES = {
+    CategoryTypes.CAMISETAS: "Camisetas",
+    CategoryTypes.TELEFONOS: "Teléfonos",
+    CategoryTypes.PANTALONES: "Pantalones",
+    CategoryTypes.ZAPATOS: "Zapatos",
+    CategoryTypes.PORTATILES: "Portátiles",
+    CategoryTypes.OTROS: "Otros",
+}
+
+# Vocabulario por categoría: nombres, calificativos, detalles de la descripción y rango de precios
+VOCABULARY: Dict[CategoryTypes, Dict[str, Any]] = {
+    CategoryTypes.CAMISETAS: {
+        "nouns": ["Camiseta", "Camisa", "Polo", "Camiseta técnica", "Camisa de lino", "Top"],
+        "qualifiers": ["deportiva", "básica", "estampada", "de manga larga", "de manga corta", "oversize",
+                       "running", "slim fit", "térmica", "de algodón orgánico"],
+        "details": ["tejido transpirable", "cuello redondo", "cuello en pico", "secado rápido",
+                    "100% algodón", "lavable a máquina", "costuras reforzadas"],
+        "sizes": ["talla XS", "talla S", "talla M", "talla L", "talla XL", "talla XXL"],
+        "price": (7.99, 59.99),
+    },
+    CategoryTypes.TELEFONOS: {
+        "nouns": ["Smartphone", "Teléfono", "Móvil", "Teléfono plegable", "Smartphone Pro"],
+        "qualifiers": ["5G", "compacto", "de gama media", "de alta gama", "libre", "reacondicionado",
+                       "con doble SIM", "resistente al agua"],
+        "details": ["pantalla AMOLED de 6,5\"", "cámara de 108MP", "batería de 5000mAh", "carga rápida",
+                    "128GB de almacenamiento", "256GB de almacenamiento", "lector de huella", "NFC"],
+        "sizes": ["4GB RAM", "6GB RAM", "8GB RAM", "12GB RAM"],
+        "price": (79.99, 1499.99),
+    },
+    CategoryTypes.PANTALONES: {
+        "nouns": ["Pantalón", "Vaquero", "Jean", "Bermuda", "Chino", "Pantalón cargo"],
+        "qualifiers": ["de vestir", "slim", "recto", "acampanado", "deportivo", "de pana", "elástico",
+                       "de talle alto", "desgastado"],
+        "details": ["con bolsillos laterales", "cintura ajustable", "tejido stretch", "bajo vuelto",
+                    "cierre de botones", "algodón y elastano"],
+        "sizes": ["talla 36", "talla 38", "talla 40", "talla 42", "talla 44", "talla 46"],
+        "price": (14.99, 119.99),
+    },
+    CategoryTypes.ZAPATOS: {
+        "nouns": ["Zapatilla", "Zapato", "Bota", "Sandalia", "Mocasín", "Calzado de montaña"],
+        "qualifiers": ["running", "de piel", "impermeable", "casual", "de vestir", "urbana", "de trail",
+                       "con cordones", "sin cordones"],
+        "details": ["suela de goma", "plantilla acolchada", "amortiguación reactiva", "puntera reforzada",
+                    "forro transpirable", "cierre de velcro"],
+        "sizes": ["talla 37", "talla 38", "talla 40", "talla 42", "talla 43", "talla 45"],
+        "price": (19.99, 189.99),
+    },
+    CategoryTypes.PORTATILES: {
+        "nouns": ["Portátil", "Ordenador portátil", "Laptop", "Notebook", "Ultrabook", "Portátil gaming"],
+        "qualifiers": ["ultraligero", "convertible 2 en 1", "profesional", "para estudiantes", "con GPU dedicada",
+                       "de 14\"", "de 15,6\"", "de 17\""],
+        "details": ["procesador i5", "procesador i7", "procesador Ryzen 7", "512GB SSD", "1TB SSD",
+                    "pantalla táctil", "teclado retroiluminado", "Wi-Fi 6"],
+        "sizes": ["8GB RAM", "16GB RAM", "32GB RAM"],
+        "price": (299.99, 2999.99),
+    },
+    CategoryTypes.OTROS: {
+        "nouns": ["Mochila", "Gorra", "Auriculares", "Cinturón", "Reloj", "Bufanda", "Tarjeta de regalo"],
+        "qualifiers": ["inalámbricos", "urbana", "de piel", "deportiva", "clásica", "resistente al agua",
+                       "con cancelación de ruido", "ajustable"],
+        "details": ["garantía de 2 años", "envío gratuito", "edición limitada", "materiales reciclados",
+                    "incluye funda", "bolsillo interior"],
+        "sizes": ["talla única", "20L", "30L", "modelo estándar"],
+        "price": (4.99, 249.99),
+    },
+}
+
+COLORS = ["negro", "blanco", "azul", "azul marino", "rojo", "verde", "gris", "beige", "marrón", "rosa",
+          "amarillo", "morado", "naranja", "burdeos", "caqui"]
+BRANDS = ["Ñandú", "Acmé", "Norteña", "Valverde", "Lúmina", "Brisa", "Córdoba", "Tramontana", "Solano", "Íbero"]
+MODELS = ["Classic", "Pro", "Lite", "Max", "Urban", "Trail", "Omega", "Nova", "Zeta", "Sport"]
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def _zipf_weights(count: int) -> List[float]:
+    """Pesos 1/rango: las primeras palabras de cada lista son mucho más frecuentes que las últimas."""
+    return [1.0 / rank for rank in range(1, count + 1)]
+
+
+class CatalogGenerator:
+    """Generador determinista de categorías y productos sintéticos."""
+
+    def __init__(self, seed: int = 42):
+        self._rng = random.Random(seed)
+        self._weights: Dict[int, List[float]] = {}
+
+    def _pick(self, words: Sequence[str]) -> str:
+        weights = self._weights.setdefault(len(words), _zipf_weights(len(words)))
+        return self._rng.choices(words, weights=weights)[0]
+
+    @staticmethod
+    def categories() -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Devuelve las filas (número de línea, fila) de las seis categorías."""
+        for line_num, category in enumerate(CategoryTypes, start=1):
+            yield line_num, {"id": category.value, "name": CATEGORY_NAMES[category]}
+
+    def product(self, product_id: int) -> Dict[str, Any]:
+        """Genera un producto con nombre, descripción, precio y categoría."""
+        category = self._rng.choice(list(CategoryTypes))
+        vocabulary = VOCABULARY[category]
+        noun = self._pick(vocabulary["nouns"])
+        qualifier = self._pick(vocabulary["qualifiers"])
+        color = self._pick(COLORS)
+        name = f"{noun} {qualifier} {color}"
+        if self._rng.random() < 0.4:
+            name += f" {self._pick(MODELS)}"
+        details = self._rng.sample(vocabulary["details"], k=min(2, len(vocabulary["details"])))
+        description = (f"{noun} {qualifier} de {self._pick(BRANDS)}, color {color}: "
+                       f"{details[0]}, {details[1]}; {self._pick(vocabulary['sizes'])}.")
+        low, high = vocabulary["price"]
+        price = round(self._rng.uniform(low, high), 2)
+        return {"id": product_id, "name": name, "description": description, "price": price,
+                "category_id": category.value}
+
+    def products(self, rows: int, first_id: int = 1) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Genera `rows` productos como filas (número de línea, fila), uno a uno."""
+        for offset in range(rows):
+            yield offset + 1, self.product(first_id + offset)
+
+
+def parse_rows(value: str) -> int:
+    """Admite un número de filas o uno de los tamaños predefinidos (10k, 100k, 1m)."""
+    return SIZES.get(value.lower()) or int(value)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Genera un catálogo sintético de productos en español.")
+    parser.add_argument("--rows", type=parse_rows, default=SIZES["10k"],
+                        help="Número de productos (o 10k, 100k, 1m)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db-url", help="Carga el catálogo en esta base de datos (SQLite o MariaDB)")
+    target.add_argument("--output", help="Escribe los productos en un fichero JSONL ('-' para la salida estándar)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Filas por transacción al cargar")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    generator = CatalogGenerator(args.seed)
+    if args.output:
+        stream = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            for _, row in generator.products(args.rows):
+                stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        return 0
+
+    # Importación diferida: escribir un fichero no necesita conectar con la base de datos
+    from db import DatabaseRegistry
+    from services import CatalogIngest
+
+    DatabaseRegistry.initialize(args.db_url)
+    try:
+        engine = DatabaseRegistry.engine()
+        CatalogIngest.ingest(engine, "categories", generator.categories())
+        report = CatalogIngest.ingest(engine, "products", generator.products(args.rows), args.batch_size)
+    finally:
+        DatabaseRegistry.close()
+    print(f"{report.rows} productos cargados en {report.seconds:.2f}s ({report.rows_per_second:.0f} filas/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
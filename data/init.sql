@@ -12,7 +12,10 @@ CREATE TABLE IF NOT EXISTS product (
     description TEXT,
     price DECIMAL(10, 2),
     category_id INT,
-    FOREIGN KEY (category_id) REFERENCES category(id)
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    FOREIGN KEY (category_id) REFERENCES category(id),
+    INDEX ix_product_updated_at (updated_at),
+    FULLTEXT INDEX ft_product_name_description (name, description)
 );
 
 INSERT INTO category (id, name) VALUES 
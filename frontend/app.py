@@ -7,15 +7,20 @@ import os
 BACKEND_URL = os.getenv("BACKEND_URL", "http://host.docker.internal:8000")
 POLL_INTERVAL = 2  # segundos
 MAX_POLLS = 10
+PRODUCTS_PAGE_SIZE = int(os.getenv("PRODUCTS_PAGE_SIZE", 100))
 
-def get_all_products():
+def get_products_page(after_id=None, limit=PRODUCTS_PAGE_SIZE):
+    # Una página del catálogo; devuelve (productos, next_after_id, mensaje de error)
+    params = {"limit": limit}
+    if after_id is not None:
+        params["after_id"] = after_id
     try:
-        r = requests.get(f"{BACKEND_URL}/products", timeout=5)
+        r = requests.get(f"{BACKEND_URL}/products", params=params, timeout=5)
         r.raise_for_status()
         data = r.json()
-        return data.get("products", [])
-    except Exception:
-        return []
+        return data.get("products", []), data.get("next_after_id"), ""
+    except Exception as e:
+        return [], after_id, f"Error al cargar productos: {e}"
 
 def search_by_text(query):
     if not query.strip():
@@ -32,13 +37,27 @@ def search_by_text(query):
     except Exception as e:
         return [], [], f"Error al buscar por texto: {e}"
 
-def search_by_image(image):
+def get_suggestions(prefix):
+    if not prefix.strip():
+        return []
+    try:
+        r = requests.get(f"{BACKEND_URL}/search/suggest", params={"q": prefix, "limit": 5}, timeout=2)
+        r.raise_for_status()
+        return r.json().get("suggestions", [])
+    except Exception:
+        return []
+
+def search_by_image(image, text=None):
     if image is None:
         return [], [], "Sube una imagen para buscar."
     try:
         img_bytes = gr.processing_utils.encode_pil_to_bytes(image)
         files = {"file": ("image.png", img_bytes, "image/png")}
-        r = requests.post(f"{BACKEND_URL}/search/image", files=files, timeout=30)
+        if text:
+            # Imagen + texto en una sola petición: el backend reordena los productos por el texto
+            r = requests.post(f"{BACKEND_URL}/search/combined", files=files, data={"query": text}, timeout=30)
+        else:
+            r = requests.post(f"{BACKEND_URL}/search/image", files=files, timeout=30)
         r.raise_for_status()
         task_id = r.json().get("task_id")
         if not task_id:
@@ -63,20 +82,6 @@ def search_by_image(image):
             continue
     return [], [], "La inferencia tardó demasiado. Intenta de nuevo."
 
-def main_search(text, image):
-    if text and not image:
-        return *search_by_text(text), gr.update(visible=False)
-    if image and not text:
-        cats, prods, msg = search_by_image(image)
-        return cats, prods, msg, gr.update(visible=False)
-    if text and image:
-        # Prioridad: imagen
-        cats, prods, msg = search_by_image(image)
-        return cats, prods, msg, gr.update(visible=False)
-    # Sin entrada: mostrar todos los productos
-    prods = get_all_products()
-    return [], prods, "Mostrando todos los productos.", gr.update(visible=False)
-
 def format_products(products):
     if not products:
         return "No hay productos para mostrar."
@@ -98,6 +103,7 @@ with gr.Blocks(theme=gr.themes.Soft(), css=".gradio-container {max-width: 700px
     with gr.Row():
         with gr.Column():
             text_in = gr.Textbox(label="Buscar por texto", placeholder="Ej: camiseta deportiva roja", show_label=True)
+            suggestions_out = gr.Markdown("", elem_id="suggestions")
             image_in = gr.Image(label="Buscar por imagen", type="pil", show_label=True)
             search_text_btn = gr.Button("Buscar por texto", elem_id="search-text-btn", variant="primary")
             search_image_btn = gr.Button("Buscar por imagen", elem_id="search-image-btn", variant="secondary")
@@ -105,7 +111,11 @@ with gr.Blocks(theme=gr.themes.Soft(), css=".gradio-container {max-width: 700px
             loader = gr.Markdown("", visible=False, elem_id="loader")
             cats_out = gr.Textbox(label="Categorías detectadas", interactive=False, show_label=True)
             prods_out = gr.HTML(label="Productos encontrados")
+            more_btn = gr.Button("Cargar más productos", visible=False, elem_id="more-btn")
             msg_out = gr.Markdown("", elem_id="msg")
+    # Productos del catálogo ya mostrados y `after_id` de la página siguiente (None si no hay más)
+    listed_state = gr.State([])
+    next_state = gr.State(None)
 
     def on_search_text(text):
         loader.update(value="Buscando por texto...", visible=True)
@@ -114,43 +124,67 @@ with gr.Blocks(theme=gr.themes.Soft(), css=".gradio-container {max-width: 700px
             loader: gr.update(value="", visible=False),
             cats_out: format_categories(cats),
             prods_out: format_products(prods),
+            more_btn: gr.update(visible=False),
             msg_out: msg
         }
 
-    def on_search_image(image):
+    def on_search_image(image, text):
+        # Con texto en la caja la búsqueda es combinada: el backend reordena los productos de la imagen por el texto
         loader.update(value="Buscando por imagen...", visible=True)
-        cats, prods, msg = search_by_image(image)
+        cats, prods, msg = search_by_image(image, text.strip() if text else None)
         return {
             loader: gr.update(value="", visible=False),
             cats_out: format_categories(cats),
             prods_out: format_products(prods),
+            more_btn: gr.update(visible=False),
             msg_out: msg
         }
 
     search_text_btn.click(
         on_search_text,
         inputs=[text_in],
-        outputs=[loader, cats_out, prods_out, msg_out],
+        outputs=[loader, cats_out, prods_out, more_btn, msg_out],
         show_progress=True
     )
     # Permitir buscar pulsando Enter en el textbox
     text_in.submit(
         on_search_text,
         inputs=[text_in],
-        outputs=[loader, cats_out, prods_out, msg_out],
+        outputs=[loader, cats_out, prods_out, more_btn, msg_out],
         show_progress=True
     )
+    # Sugerencias mientras se escribe
+    def on_text_change(text):
+        suggestions = get_suggestions(text)
+        return "Sugerencias: " + ", ".join(suggestions) if suggestions else ""
+    text_in.change(on_text_change, inputs=[text_in], outputs=suggestions_out, show_progress=False)
     search_image_btn.click(
         on_search_image,
-        inputs=[image_in],
-        outputs=[loader, cats_out, prods_out, msg_out],
+        inputs=[image_in, text_in],
+        outputs=[loader, cats_out, prods_out, more_btn, msg_out],
         show_progress=True
     )
 
-    # Mostrar todos los productos al cargar
+    # Mostrar la primera página de productos al cargar; el resto se pide con "Cargar más productos"
+    def show_catalog_page(listed, after_id):
+        prods, next_after_id, msg = get_products_page(after_id)
+        listed = listed + prods
+        return {
+            listed_state: listed,
+            next_state: next_after_id,
+            prods_out: format_products(listed),
+            more_btn: gr.update(visible=next_after_id is not None),
+            msg_out: msg,
+        }
+
     def on_load():
-        prods = get_all_products()
-        return format_products(prods)
-    demo.load(on_load, inputs=None, outputs=prods_out)
+        return show_catalog_page([], None)
+
+    def on_load_more(listed, after_id):
+        return show_catalog_page(listed, after_id)
+
+    catalog_outputs = [listed_state, next_state, prods_out, more_btn, msg_out]
+    demo.load(on_load, inputs=None, outputs=catalog_outputs)
+    more_btn.click(on_load_more, inputs=[listed_state, next_state], outputs=catalog_outputs)
 
 demo.launch(server_name="0.0.0.0", server_port=7860)
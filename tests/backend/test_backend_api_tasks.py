@@ -28,8 +28,8 @@ class TestAPITasks(unittest.TestCase):
         self.original_get_engine = DatabaseRegistry._DatabaseRegistry__get_engine
         DatabaseRegistry._DatabaseRegistry__get_engine = MagicMock(return_value=self.engine)
         
-        # Reiniciar la sesión singleton
-        DatabaseRegistry._DatabaseRegistry__session = None
+        # Reiniciar el motor compartido
+        DatabaseRegistry._DatabaseRegistry__engine = None
         
         # Crear tablas y poblar con datos de prueba
         SQLModel.metadata.create_all(self.engine)
@@ -52,6 +52,12 @@ class TestAPITasks(unittest.TestCase):
         # Obtener instancia del servicio de resultados y limpiar todos los resultados
         self.result_service = ResultService()
         self.result_service._result_store = {}  # Limpiar resultados anteriores
+
+    def tearDown(self):
+        # Restaurar el método original
+        DatabaseRegistry._DatabaseRegistry__get_engine = self.original_get_engine
+        DatabaseRegistry._DatabaseRegistry__engine = None
+        self.session.close()
         
     def test_task_result_not_found(self):
         """Prueba que se devuelve un 202 cuando una tarea no existe."""
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from controllers import async_catalog_router
+from db import Category, DatabaseRegistry, Product
+from services import CatalogCache, QueryCache, ResultService, SearchIndex
+
+
+class MockPrediction:
+    """Clase para simular las predicciones del modelo."""
+    def __init__(self, label, score):
+        self.label = label
+        self.score = score
+
+
+class TestAsyncCatalog(unittest.TestCase):
+    """Endpoints asíncronos sobre SQLite con aiosqlite como sustituto local de MariaDB."""
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        db_url = f'sqlite:///{self.db_path}'
+        engine = create_engine(db_url)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(Category(id=1, name='Camisetas'))
+            session.add(Category(id=4, name='Zapatos'))
+            session.add(Product(id=1, name='Camiseta azul', description='Algodón', price=19.99, category_id=1))
+            session.add(Product(id=2, name='Camiseta blanca', price=15.99, category_id=1))
+            session.add(Product(id=3, name='Zapatos azul marino', price=59.99, category_id=4))
+            session.commit()
+        engine.dispose()
+
+        DatabaseRegistry._DatabaseRegistry__db_url = db_url
+        DatabaseRegistry._DatabaseRegistry__async_engine = None
+        app = FastAPI()
+        app.include_router(async_catalog_router)
+        self.client = TestClient(app)
+        self.client.__enter__()
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+        asyncio.run(DatabaseRegistry.close_async())
+        DatabaseRegistry._DatabaseRegistry__db_url = None
+        SearchIndex.reset()
+        CatalogCache.reset()
+        os.remove(self.db_path)
+
+    def test_async_url(self):
+        self.assertEqual(DatabaseRegistry.async_url(), f'sqlite+aiosqlite:///{self.db_path}')
+        DatabaseRegistry._DatabaseRegistry__db_url = 'mysql+pymysql://user:password@db/ecommerce'
+        self.assertEqual(DatabaseRegistry.async_url(), 'mysql+aiomysql://user:password@db/ecommerce')
+        with patch.object(DatabaseRegistry, 'DB_ASYNC_URL', 'mysql+asyncmy://u:p@db/x'):
+            self.assertEqual(DatabaseRegistry.async_url(), 'mysql+asyncmy://u:p@db/x')
+        DatabaseRegistry._DatabaseRegistry__db_url = 'postgresql://u:p@db/x'
+        with self.assertRaises(ValueError):
+            DatabaseRegistry.async_url()
+
+    def test_categories_and_products(self):
+        categories = self.client.get('/categories').json()['categories']
+        self.assertEqual(categories, [{'id': 1, 'name': 'Camisetas'}, {'id': 4, 'name': 'Zapatos'}])
+        products = self.client.get('/products').json()['products']
+        self.assertEqual([p['id'] for p in products], [1, 2, 3])
+
+    def test_products_keyset_and_stream(self):
+        page = self.client.get('/products', params={'after_id': 1, 'limit': 1}).json()
+        self.assertEqual(page, {'products': [{'id': 2, 'name': 'Camiseta blanca', 'price': 15.99}], 'next_after_id': 2})
+        with patch('controllers.core.PRODUCTS_STREAM_CHUNK', 2):
+            response = self.client.get('/products', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual([json.loads(line)['id'] for line in response.text.splitlines()], [1, 2, 3])
+
+    def test_search_text_from_database(self):
+        response = self.client.post('/search/text', json={'query': 'camiseta azul'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['categories'], ['Camisetas'])
+        self.assertEqual([p['id'] for p in data['products']], [1, 2, 3])
+        self.assertEqual(response.headers['X-Cache'], 'BYPASS')
+
+    @patch('controllers.core.SEARCH_MODE', 'fulltext')
+    @patch('services.fulltext_search.FulltextSearch.build_query')
+    def test_search_text_fulltext_mode(self, mock_build_query):
+        # SQLite no admite MATCH ... AGAINST: se sustituye por un filtro equivalente
+        mock_build_query.return_value = select(Product).where(Product.name.contains('Zapatos'))
+        data = self.client.post('/search/text', json={'query': 'zapatos'}).json()
+        self.assertEqual([p['id'] for p in data['products']], [3])
+
+    @patch('controllers.core.SEARCH_MODE', 'fulltext')
+    def test_search_text_fulltext_mode_browses_without_text(self):
+        data = self.client.post('/search/text', json={'query': '', 'sort': 'price_desc', 'limit': 2,
+                                                      'facets': True}).json()
+        self.assertEqual([p['id'] for p in data['products']], [3, 1])
+        self.assertEqual((data['total'], data['categories']), (3, ['Camisetas', 'Zapatos']))
+        self.assertEqual(sorted(f['count'] for f in data['facets']['categories']), [1, 2])
+
+    def test_search_text_batch(self):
+        data = self.client.post('/search/text/batch', json={'queries': ['camiseta azul', 'zapatos']}).json()
+        self.assertEqual([p['id'] for p in data['results']['camiseta azul']['products']], [1, 2, 3])
+        self.assertEqual([p['id'] for p in data['results']['zapatos']['products']], [3])
+
+    @patch('controllers.core.SEARCH_MODE', 'fulltext')
+    @patch('services.fulltext_search.FulltextSearch.build_query')
+    def test_search_text_batch_fulltext_mode(self, mock_build_query):
+        mock_build_query.return_value = select(Product).where(Product.name.contains('Zapatos'))
+        data = self.client.post('/search/text/batch', json={'queries': ['zapatos', 'zapato marino']}).json()
+        self.assertEqual([p['id'] for p in data['results']['zapato marino']['products']], [3])
+
+    @patch.object(ResultService, 'has_result', return_value=True)
+    @patch.object(ResultService, 'get_result')
+    def test_task_result(self, mock_get_result, mock_has_result):
+        mock_get_result.return_value = [MockPrediction(label=4, score=0.9), MockPrediction(label=1, score=0.01)]
+        data = self.client.get('/tasks/task1/result').json()
+        self.assertEqual(data, {'categories': ['Zapatos'], 'products': [{'id': 3, 'name': 'Zapatos azul marino', 'price': 59.99}]})
+
+    def test_blocking_work_runs_off_the_event_loop(self):
+        on_loop = {}
+
+        def recording(name, function):
+            def call(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop[name] = True
+                except RuntimeError:
+                    on_loop.setdefault(name, False)
+                return function(*args, **kwargs)
+            return call
+
+        QueryCache.initialize()
+        self.addCleanup(QueryCache.reset)
+        targets = [(QueryCache, 'get'), (QueryCache, 'set'), (QueryCache, 'get_many'), (SearchIndex, 'search'),
+                   (SearchIndex, 'search_many'), (ResultService, 'has_result'), (ResultService, 'pop_text_query')]
+        functions = {'has_result': lambda service, task_id: True}
+        for owner, name in targets:
+            patcher = patch.object(owner, name, recording(name, functions.get(name, getattr(owner, name))))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        with patch.object(ResultService, 'get_result', return_value=[MockPrediction(label=4, score=0.9)]):
+            self.client.post('/search/text', json={'query': 'zapatos'})
+            self.client.post('/search/text', json={'query': 'zapatos'})
+            self.client.post('/search/text/batch', json={'queries': ['camiseta', 'zapatos']})
+            self.client.get('/tasks/task1/result')
+        self.assertEqual(on_loop, {name: False for _, name in targets})
+
+    def test_pool_stats_include_async_engine(self):
+        self.client.get('/categories')
+        self.assertTrue(DatabaseRegistry.pool_stats()['async']['initialized'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import sys
+import unittest
+from types import SimpleNamespace
+
+from db import CategoryTypes, SchemaMigrations
+from services import SearchIndex
+from utils import tokenize
+from benchmarks.bench_api import compare, percentile, run_scenario, summarize
+from benchmarks.catalog_generator import CatalogGenerator, parse_rows
+from benchmarks import bench_memory, bench_read_path
+from sqlmodel import create_engine
+from sqlmodel.pool import StaticPool
+from services import CatalogIngest
+
+
+class TestCatalogGenerator(unittest.TestCase):
+    def test_deterministic_for_a_seed(self):
+        first = [row for _, row in CatalogGenerator(seed=7).products(50)]
+        second = [row for _, row in CatalogGenerator(seed=7).products(50)]
+        other = [row for _, row in CatalogGenerator(seed=8).products(50)]
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_products_cover_every_category(self):
+        rows = [row for _, row in CatalogGenerator().products(600, first_id=101)]
+        self.assertEqual([row['id'] for row in rows], list(range(101, 701)))
+        self.assertEqual({row['category_id'] for row in rows}, {c.value for c in CategoryTypes})
+        self.assertTrue(any(set(row['name'] + row['description']) & set('áéíóúñÑ') for row in rows))
+        self.assertTrue(all(row['price'] > 0 and tokenize(row['name']) for row in rows))
+
+    def test_categories(self):
+        categories = [row for _, row in CatalogGenerator.categories()]
+        self.assertEqual(len(categories), len(CategoryTypes))
+        self.assertIn({'id': 2, 'name': 'Teléfonos'}, categories)
+
+    def test_parse_rows(self):
+        self.assertEqual(parse_rows('100k'), 100_000)
+        self.assertEqual(parse_rows('1M'), 1_000_000)
+        self.assertEqual(parse_rows('2500'), 2500)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_percentile(self):
+        samples = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(samples, 50), 50.5)
+        self.assertAlmostEqual(percentile(samples, 99), 99.01)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_summarize(self):
+        summary = summarize([0.001, 0.002, 0.003], errors=1, elapsed=2.0)
+        self.assertEqual(summary['requests'], 4)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['throughput_rps'], 2.0)
+        self.assertEqual(summary['p50_ms'], 2.0)
+
+    def test_run_scenario_counts_errors(self):
+        calls = []
+
+        def request(i):
+            calls.append(i)
+            return SimpleNamespace(status_code=500 if i % 5 == 0 else 200)
+
+        summary = run_scenario(request, requests=20, concurrency=4, warmup=3)
+        self.assertEqual(len(calls), 23)
+        self.assertEqual((summary['requests'], summary['errors']), (20, 4))
+
+    def test_compare(self):
+        current = {'scenarios': {'search_text': {'p50_ms': 3.0, 'p95_ms': 6.0, 'p99_ms': 9.0, 'throughput_rps': 50.0}}}
+        baseline = {'scenarios': {'search_text': {'p50_ms': 2.0, 'p95_ms': 6.0, 'p99_ms': 0.0, 'throughput_rps': 100.0}}}
+        self.assertEqual(compare(current, baseline),
+                         {'search_text': {'p50_ms': 1.5, 'p95_ms': 1.0, 'throughput_rps': 0.5}})
+
+    def test_generated_catalog_is_searchable(self):
+        generator = CatalogGenerator()
+        index = SearchIndex()
+        for _, row in CatalogGenerator.categories():
+            index.add_category(SimpleNamespace(**row))
+        for _, row in generator.products(200):
+            index.add_product(SimpleNamespace(updated_at=None, **row))
+        self.assertGreater(index.search(tokenize('camiseta azul'))['total'], 0)
+
+
+class TestReadPathBenchmark(unittest.TestCase):
+    def test_projection_matches_orm(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SchemaMigrations.upgrade(engine)
+        generator = CatalogGenerator()
+        CatalogIngest.ingest(engine, 'categories', generator.categories())
+        CatalogIngest.ingest(engine, 'products', generator.products(300))
+        results = bench_read_path.run(engine, repeat=1)
+        self.assertEqual(set(results), set(bench_read_path.READS))
+        for read in results.values():
+            self.assertEqual(read['orm']['rows'], read['projection']['rows'])
+            self.assertGreater(read['projection']['rows'], 0)
+            self.assertIsNotNone(read['speedup'])
+
+
+class TestMemoryBenchmark(unittest.TestCase):
+    def test_store_is_the_most_compact(self):
+        results = bench_memory.run(300)
+        self.assertEqual(set(results), set(bench_memory.REPRESENTATIONS))
+        self.assertTrue(all(r['rows'] == 300 for r in results.values()))
+        self.assertEqual(results['store']['ratio_vs_store'], 1.0)
+        self.assertGreater(results['records']['ratio_vs_store'], 1.0)
+        self.assertGreater(results['orm']['ratio_vs_store'], results['records']['ratio_vs_store'])
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'La RSS se lee de /proc')
+    def test_index_mode_reports_every_structure(self):
+        result = bench_memory.measure_index_mode(300, seed=1)
+        self.assertEqual(list(result['stages']), ['catalog_snapshot', 'search_index', 'suggest_index'])
+        self.assertTrue(result['search_index_shares_store'])
+        self.assertAlmostEqual(result['total_rss_mb'], sum(s['rss_mb'] for s in result['stages'].values()), delta=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+from main import app
+from db import Category, Product
+from services import CatalogCache, CatalogVersion, ResultService
+
+
+class MockPrediction:
+    """Clase para simular las predicciones del modelo."""
+    def __init__(self, label, score):
+        self.label = label
+        self.score = score
+
+
+class TestCatalogCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.session.add(Category(id=1, name='Camisetas'))
+        self.session.add(Category(id=3, name='Pantalones'))
+        self.session.add(Product(id=1, name='Camiseta deportiva', price=19.99, category_id=1))
+        self.session.add(Product(id=2, name='Pantalón chino', price=39.99, category_id=3))
+        self.session.add(Product(id=3, name='Camiseta blanca', price=15.99, category_id=1))
+        self.session.commit()
+        self.snapshot = CatalogCache.initialize(self.session)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        CatalogCache.stop()
+        CatalogCache.reset()
+        self.session.close()
+
+    def test_snapshot_lookups(self):
+        self.assertEqual(self.snapshot.category_name(3), 'Pantalones')
+        self.assertIsNone(self.snapshot.category_name(99))
+        self.assertEqual([p.id for p in self.snapshot.products_by_category[1]], [1, 3])
+        self.assertEqual([p.id for p in self.snapshot.products_in([3, 1])], [1, 2, 3])
+
+    def test_snapshot_is_immutable(self):
+        with self.assertRaises(TypeError):
+            self.snapshot.products[99] = None
+
+    def test_current_without_changes_reuses_snapshot(self):
+        self.assertIs(CatalogCache.current(), self.snapshot)
+
+    def test_reload_on_version_change(self):
+        """Un cambio de versión del catálogo publica una instantánea nueva."""
+        self.session.add(Product(id=4, name='Pantalón cargo', price=44.99, category_id=3))
+        self.session.commit()
+        CatalogVersion.bump()
+        self.assertTrue(CatalogCache.refresh(self.session))
+        snapshot = CatalogCache.current()
+        self.assertIsNot(snapshot, self.snapshot)
+        self.assertIn(4, snapshot.products)
+        self.assertEqual(snapshot.version, CatalogVersion.current())
+        self.assertFalse(CatalogCache.refresh(self.session))
+
+    def test_apply_changes_updates_snapshot_without_reading_catalog(self):
+        """El refresco incremental publica una instantánea con las filas cambiadas sin releer el catálogo."""
+        CatalogVersion.bump()
+        renamed = Product(id=3, name='Camiseta blanca lisa', price=14.99, category_id=1)
+        added = Product(id=5, name='Polo azul', price=24.99, category_id=None)
+        categories = [Category(id=1, name='Camisetas y polos'), Category(id=3, name='Pantalones')]
+        with patch.object(CatalogCache, 'load', side_effect=AssertionError('catálogo releído')):
+            self.assertTrue(CatalogCache.apply_changes(categories, {3: renamed, 2: None, 5: added}))
+        snapshot = CatalogCache.current()
+        self.assertEqual(snapshot.version, CatalogVersion.current())
+        self.assertEqual(list(snapshot.products), [1, 3, 5])
+        self.assertEqual(snapshot.products[3].name, 'Camiseta blanca lisa')
+        self.assertEqual([p.id for p in snapshot.products_by_category[None]], [5])
+        self.assertEqual(snapshot.category_name(1), 'Camisetas y polos')
+        self.assertEqual(list(self.snapshot.products), [1, 2, 3])
+        self.assertFalse(CatalogCache.refresh(self.session))
+
+    def test_reload_on_ttl(self):
+        with patch.object(CatalogCache, 'TTL', -1), patch('db.DatabaseRegistry.engine', return_value=self.engine):
+            self.assertTrue(CatalogCache.refresh())
+        self.assertIsNot(CatalogCache.current(), self.snapshot)
+
+    def test_requests_never_reload(self):
+        """Una instantánea caducada se sigue sirviendo hasta que el hilo de recarga la sustituye."""
+        CatalogVersion.bump()
+        with patch.object(CatalogCache, 'load') as mock_load:
+            self.assertIs(CatalogCache.current(), self.snapshot)
+            self.assertEqual(len(self.client.get('/products').json()['products']), 3)
+            mock_load.assert_not_called()
+
+    def test_reload_error_keeps_previous_snapshot(self):
+        CatalogVersion.bump()
+        with patch('db.DatabaseRegistry.engine', side_effect=Exception('DB caída')):
+            self.assertFalse(CatalogCache.refresh())
+        self.assertIs(CatalogCache.current(), self.snapshot)
+
+    def test_background_reload(self):
+        CatalogVersion.bump()
+        with patch('db.DatabaseRegistry.engine', return_value=self.engine):
+            CatalogCache.start(interval=0.01)
+            for _ in range(500):
+                if CatalogCache.current() is not self.snapshot:
+                    break
+                time.sleep(0.01)
+            CatalogCache.stop()
+        self.assertIsNot(CatalogCache.current(), self.snapshot)
+        self.assertIsNone(CatalogCache._thread)
+
+    @patch('db.DatabaseRegistry.session')
+    def test_catalog_endpoints_use_snapshot(self, mock_session):
+        categories = self.client.get('/categories').json()['categories']
+        self.assertEqual(categories, [{'id': 1, 'name': 'Camisetas'}, {'id': 3, 'name': 'Pantalones'}])
+        products = self.client.get('/products').json()['products']
+        self.assertEqual([p['id'] for p in products], [1, 2, 3])
+        mock_session.return_value.exec.assert_not_called()
+
+    @patch('db.DatabaseRegistry.session')
+    @patch.object(ResultService, 'has_result', return_value=True)
+    @patch.object(ResultService, 'get_result')
+    def test_task_result_uses_snapshot(self, mock_get_result, mock_has_result, mock_session):
+        mock_get_result.return_value = [MockPrediction(label=3, score=0.9), MockPrediction(label=1, score=0.5)]
+        data = self.client.get('/tasks/task1/result').json()
+        self.assertEqual(data['categories'], ['Camisetas', 'Pantalones'])
+        self.assertEqual([p['id'] for p in data['products']], [1, 2, 3])
+        mock_session.return_value.exec.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
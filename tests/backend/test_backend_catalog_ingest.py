@@ -0,0 +1,102 @@
+import io
+import os
+import tempfile
+import unittest
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from db import Category, Product
+from services import CatalogIngest
+import ingest
+
+
+class TestCatalogIngest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            session.add(Category(id=1, name='Camisetas'))
+            session.add(Product(id=1, name='Camiseta azul', price=19.99, category_id=1))
+            session.commit()
+
+    def products(self):
+        with Session(self.engine) as session:
+            return {p.id: p for p in session.exec(select(Product)).all()}
+
+    def test_csv_upsert_in_batches(self):
+        feed = io.StringIO(
+            "id,name,description,price,category_id\n"
+            "1,Camiseta roja,,21.5,1\n"
+            "2,Camiseta verde,Algodón,15,1\n"
+            "3,Camiseta negra,,17.25,1\n"
+        )
+        report = CatalogIngest.ingest(self.engine, 'products', CatalogIngest.read_rows(feed, 'csv'), batch_size=2)
+        self.assertEqual((report.rows, report.rejected, report.batches), (3, 0, 2))
+        self.assertGreater(report.rows_per_second, 0)
+        products = self.products()
+        self.assertEqual(sorted(products), [1, 2, 3])
+        self.assertEqual((products[1].name, products[1].price), ('Camiseta roja', 21.5))
+        self.assertIsNone(products[1].description)
+        self.assertEqual(products[2].description, 'Algodón')
+
+    def test_invalid_rows_are_rejected(self):
+        feed = io.StringIO(
+            '{"id": 2, "name": "Camiseta verde", "price": 15, "category_id": 1}\n'
+            '{"id": 3, "name": "Sin precio", "category_id": 1}\n'
+            '{"id": 4, "name": "Precio raro", "price": "gratis", "category_id": 1}\n'
+            '{no es json\n'
+            '\n'
+        )
+        report = CatalogIngest.ingest(self.engine, 'products', CatalogIngest.read_rows(feed, 'jsonl'))
+        self.assertEqual((report.rows, report.rejected, report.batches), (1, 3, 1))
+        self.assertEqual(sorted(self.products()), [1, 2])
+
+    def test_unchanged_rows_keep_updated_at(self):
+        with Session(self.engine) as session:
+            session.get(Product, 1).updated_at = None
+            session.commit()
+        rows = [(1, {'id': 1, 'name': 'Camiseta azul', 'price': 19.99, 'category_id': 1})]
+        CatalogIngest.ingest(self.engine, 'products', rows)
+        self.assertIsNone(self.products()[1].updated_at)
+        rows = [(1, {'id': 1, 'name': 'Camiseta celeste', 'price': 19.99, 'category_id': 1})]
+        CatalogIngest.ingest(self.engine, 'products', rows)
+        self.assertIsNotNone(self.products()[1].updated_at)
+
+    def test_categories(self):
+        rows = [(1, {'id': 1, 'name': 'Camisetas y polos'}), (2, {'id': 7, 'name': 'Relojes'})]
+        report = CatalogIngest.ingest(self.engine, 'categories', rows)
+        self.assertEqual(report.rows, 2)
+        with Session(self.engine) as session:
+            self.assertEqual(session.get(Category, 1).name, 'Camisetas y polos')
+            self.assertEqual(session.get(Category, 7).name, 'Relojes')
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            CatalogIngest.ingest(self.engine, 'users', [])
+        with self.assertRaises(ValueError):
+            CatalogIngest.ingest(self.engine, 'products', [], batch_size=-1)
+        with self.assertRaises(ValueError):
+            CatalogIngest.detect_format('catalogo.xml')
+
+
+class TestIngestCommand(unittest.TestCase):
+    def test_main_loads_file(self):
+        directory = tempfile.mkdtemp()
+        db_path = os.path.join(directory, 'catalogo.db')
+        feed_path = os.path.join(directory, 'categorias.csv')
+        with open(feed_path, 'w', encoding='utf-8') as feed:
+            feed.write("id,name\n1,Camisetas\n2,Teléfonos\n")
+        self.assertEqual(ingest.main(['categories', feed_path, '--db-url', f'sqlite:///{db_path}']), 0)
+        engine = create_engine(f'sqlite:///{db_path}')
+        with Session(engine) as session:
+            self.assertEqual([c.name for c in session.exec(select(Category).order_by(Category.id))],
+                             ['Camisetas', 'Teléfonos'])
+        engine.dispose()
+        self.assertEqual(ingest.main(['categories', os.path.join(directory, 'no_existe.csv'),
+                                      '--db-url', f'sqlite:///{db_path}']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+from main import app
+from db import Category, Product
+from services import CatalogCache, CatalogRefresher, CatalogVersion, SearchIndex, SuggestIndex
+
+
+class TestCatalogRefresher(unittest.TestCase):
+    def setUp(self):
+        # Base de datos en memoria con un catálogo mínimo
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.session.add(Category(id=1, name='Camisetas'))
+        self.session.add(Category(id=2, name='Zapatos'))
+        self.session.add(Product(id=1, name='Camiseta azul', price=19.99, category_id=1))
+        self.session.add(Product(id=2, name='Zapato negro', price=59.99, category_id=2))
+        self.session.commit()
+
+        watermark = CatalogRefresher.current_watermark(self.session)
+        categories = CatalogRefresher.current_categories(self.session)
+        SearchIndex.initialize(self.session)
+        CatalogRefresher.start(watermark, interval=0, rows=2, categories=categories)
+
+    def tearDown(self):
+        CatalogRefresher.stop()
+        CatalogCache.reset()
+        CatalogVersion.reset()
+        SearchIndex.reset()
+        SuggestIndex.reset()
+        self.session.close()
+
+    def test_watermark_is_set_by_database(self):
+        self.assertIsNotNone(CatalogVersion.watermark())
+
+    def test_refresh_without_changes_keeps_version(self):
+        version = CatalogVersion.current()
+        self.assertEqual(CatalogRefresher.refresh(self.session), 0)
+        self.assertEqual(CatalogVersion.current(), version)
+
+    def test_refresh_applies_incremental_changes(self):
+        """Las altas, modificaciones y bajas se aplican al índice y cambian la versión."""
+        version = CatalogVersion.current()
+        product = self.session.get(Product, 1)
+        product.name = 'Camiseta roja'
+        self.session.add(Product(id=3, name='Zapato azul', price=49.99, category_id=2))
+        self.session.delete(self.session.get(Product, 2))
+        self.session.commit()
+
+        self.assertEqual(CatalogRefresher.refresh(self.session), 3)
+        self.assertEqual(CatalogVersion.current(), version + 1)
+
+        index = SearchIndex.current()
+        self.assertEqual([p['id'] for p in index.search(['azul'])['products']], [3])
+        self.assertEqual([p['id'] for p in index.search(['roja'])['products']], [1])
+        self.assertEqual(index.product_ids(), {1, 3})
+        # El autocompletado se reconstruye en el refresco, no en la siguiente petición
+        self.assertEqual(SuggestIndex.current().suggest('roj'), ['roja'])
+
+    def test_refresh_updates_structures_incrementally(self):
+        """Las filas cambiadas se aplican a la instantánea y al autocompletado sin reconstruirlos."""
+        # Como en `load_catalog`, el índice se construye sobre el almacén de la instantánea
+        SearchIndex.initialize(snapshot=CatalogCache.initialize(self.session))
+        SuggestIndex.rebuild(SearchIndex.current())
+        self.session.add(Product(id=3, name='Mochila urbana', price=39.99, category_id=2))
+        self.session.delete(self.session.get(Product, 1))
+        self.session.commit()
+        with patch.object(CatalogCache, 'load', side_effect=AssertionError('catálogo releído')), \
+                patch.object(SuggestIndex, 'from_search_index', side_effect=AssertionError('autocompletado reconstruido')):
+            self.assertEqual(CatalogRefresher.refresh(self.session), 2)
+        snapshot = CatalogCache.current()
+        self.assertEqual(list(snapshot.products), [2, 3])
+        self.assertEqual(snapshot.version, CatalogVersion.current())
+        self.assertIs(snapshot.products, SearchIndex.current().product_store())
+        self.assertEqual(SuggestIndex.current().suggest('moch'), ['mochila', 'mochila urbana'])
+        self.assertEqual(SuggestIndex.current().suggest('camiseta a'), [])
+
+    def test_refresh_applies_category_rename(self):
+        category = self.session.get(Category, 1)
+        category.name = 'Camisetas y polos'
+        self.session.commit()
+        fingerprint = CatalogVersion.fingerprint()
+        self.assertIsNotNone(fingerprint)
+        self.assertEqual(CatalogRefresher.refresh(self.session), 1)
+        self.assertEqual(SearchIndex.current().search(['azul'])['categories'], ['Camisetas y polos'])
+        # El renombrado no toca `product.updated_at`, pero sí la huella (y con ella ETags y claves de caché)
+        self.assertNotEqual(CatalogVersion.fingerprint(), fingerprint)
+
+    def test_refresh_without_index(self):
+        SearchIndex.reset()
+        self.assertEqual(CatalogRefresher.refresh(self.session), 0)
+
+    def test_background_thread_start_and_stop(self):
+        CatalogRefresher.start(CatalogVersion.watermark(), interval=60)
+        self.assertIsNotNone(CatalogRefresher._thread)
+        CatalogRefresher.stop()
+        self.assertIsNone(CatalogRefresher._thread)
+
+    def test_version_endpoint(self):
+        response = TestClient(app).get('/catalog/version')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], CatalogVersion.current())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from sqlalchemy import inspect, text
+from sqlmodel import Session, create_engine, select
+from sqlmodel.pool import StaticPool
+
+import migrate
+from db import Product, QueryPlanCheck, SchemaMigrations
+from db.query_plans import name_prefix_condition
+from services import CatalogIngest, FulltextSearch
+
+# Esquema anterior a las migraciones, como el que crea `data/init.sql`
+LEGACY_SCHEMA = [
+    "CREATE TABLE category (id INTEGER PRIMARY KEY, name VARCHAR(50))",
+    "CREATE TABLE product (id INTEGER PRIMARY KEY, name VARCHAR(100), description TEXT, price DECIMAL(10, 2), "
+    "category_id INTEGER REFERENCES category(id), updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)",
+    "CREATE INDEX ix_product_updated_at ON product (updated_at)",
+    "INSERT INTO category (id, name) VALUES (1, 'Camisetas'), (2, 'Zapatos')",
+    "INSERT INTO product (id, name, price, category_id, updated_at) VALUES "
+    "(1, 'Camiseta Deportiva AZUL', 19.99, 1, '2024-01-01 00:00:00'), "
+    "(2, 'Zapatillas «Running» Pro', 59.99, 2, '2024-01-01 00:00:00')",
+]
+
+# Esquema anterior a la marca de agua `updated_at` y a los índices de búsqueda
+UNVERSIONED_SCHEMA = [
+    "CREATE TABLE category (id INTEGER PRIMARY KEY, name VARCHAR(50))",
+    "CREATE TABLE product (id INTEGER PRIMARY KEY, name VARCHAR(100), description TEXT, price DECIMAL(10, 2), "
+    "category_id INTEGER REFERENCES category(id))",
+    "INSERT INTO category (id, name) VALUES (1, 'Camisetas')",
+    "INSERT INTO product (id, name, price, category_id) VALUES (1, 'Camiseta Básica', 9.99, 1)",
+]
+
+
+def memory_engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    def test_empty_database(self):
+        engine = memory_engine()
+        self.assertEqual(SchemaMigrations.current_version(engine), 0)
+        self.assertEqual(SchemaMigrations.upgrade(engine), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(SchemaMigrations.current_version(engine), SchemaMigrations.latest_version())
+        self.assertEqual(SchemaMigrations.upgrade(engine), [])
+        indexes = {index['name'] for index in inspect(engine).get_indexes('product')}
+        self.assertTrue({'ix_product_category_price', 'ix_product_name_normalized'} <= indexes)
+
+    def test_legacy_database(self):
+        """Una base de datos creada por init.sql recibe los índices y la columna normalizada."""
+        engine = memory_engine()
+        with engine.begin() as connection:
+            for statement in LEGACY_SCHEMA:
+                connection.execute(text(statement))
+        by_category = select(Product.id).where(Product.category_id.in_([1, 2]))
+        self.assertEqual(QueryPlanCheck.explain(engine, 'by_category', by_category).full_scans, ['product'])
+
+        self.assertEqual(SchemaMigrations.upgrade(engine, target=2), [1, 2])
+        self.assertEqual(SchemaMigrations.current_version(engine), 2)
+        self.assertEqual(SchemaMigrations.upgrade(engine), [3, 4, 5, 6])
+
+        with Session(engine) as session:
+            products = {p.id: p for p in session.exec(select(Product)).all()}
+            self.assertEqual(products[1].name_normalized, 'camiseta deportiva azul')
+            self.assertEqual(products[2].name_normalized, 'zapatillas running pro')
+            # El relleno no mueve la marca de agua del catálogo
+            self.assertEqual({str(p.updated_at) for p in products.values()}, {'2024-01-01 00:00:00'})
+        self.assertEqual(QueryPlanCheck.explain(engine, 'by_category', by_category).full_scans, [])
+        self.assertEqual(QueryPlanCheck.failures(engine), [])
+
+    def test_database_without_updated_at(self):
+        """El relleno de `name_normalized` se aplica después de añadir la marca de agua."""
+        engine = memory_engine()
+        with engine.begin() as connection:
+            for statement in UNVERSIONED_SCHEMA:
+                connection.execute(text(statement))
+        self.assertEqual(SchemaMigrations.upgrade(engine), [1, 2, 3, 4, 5, 6])
+        indexes = {index['name'] for index in inspect(engine).get_indexes('product')}
+        self.assertTrue({'ix_product_updated_at', 'ix_product_name_normalized'} <= indexes)
+        with Session(engine) as session:
+            product = session.get(Product, 1)
+            self.assertEqual(product.name_normalized, 'camiseta basica')
+            self.assertIsNotNone(product.updated_at)
+        self.assertEqual(QueryPlanCheck.failures(engine), [])
+
+    def test_updates_outside_the_orm_move_updated_at(self):
+        engine = memory_engine()
+        with engine.begin() as connection:
+            for statement in LEGACY_SCHEMA:
+                connection.execute(text(statement))
+        SchemaMigrations.upgrade(engine)
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE product SET price = 17.99 WHERE id = 1"))
+            stamps = dict(connection.execute(text("SELECT id, updated_at FROM product")).all())
+        self.assertGreater(str(stamps[1]), '2024-01-01 00:00:00')
+        self.assertEqual(str(stamps[2]), '2024-01-01 00:00:00')
+        # Una escritura que fija `updated_at` conserva su valor
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE product SET price = 18.99, updated_at = '2024-02-01 00:00:00' WHERE id = 1"))
+            self.assertEqual(connection.execute(text("SELECT updated_at FROM product WHERE id = 1")).scalar(),
+                             '2024-02-01 00:00:00')
+
+
+class TestMigrateCommand(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.url = f"sqlite:///{os.path.join(self.directory, 'catalogo.db')}"
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def run_cli(self, *args):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            code = migrate.main([*args, '--db-url', self.url])
+        return code, output.getvalue()
+
+    def test_upgrade_and_current(self):
+        latest = SchemaMigrations.latest_version()
+        self.assertEqual(self.run_cli('current'), (0, f'Versión del esquema: 0 (última: {latest})\n'))
+        self.assertEqual(self.run_cli('upgrade', '--target', '2'), (0, 'Migraciones aplicadas: 1, 2\n'))
+        self.assertEqual(self.run_cli('current'), (0, f'Versión del esquema: 2 (última: {latest})\n'))
+        code, output = self.run_cli('upgrade')
+        self.assertEqual(code, 0)
+        self.assertEqual(output, f"Migraciones aplicadas: {', '.join(map(str, range(3, latest + 1)))}\n")
+        self.assertEqual(self.run_cli('upgrade'), (0, 'El esquema está al día\n'))
+
+    def test_check(self):
+        self.run_cli('upgrade')
+        code, output = self.run_cli('check')
+        self.assertEqual(code, 0)
+        self.assertNotIn('FULL SCAN', output)
+        self.assertIn('[OK]', output)
+
+
+class TestQueryPlans(unittest.TestCase):
+    def setUp(self):
+        self.engine = memory_engine()
+        SchemaMigrations.upgrade(self.engine)
+
+    def test_hot_queries_use_indexes(self):
+        plans = QueryPlanCheck.run(self.engine)
+        self.assertTrue(plans)
+        self.assertEqual([plan.full_scans for plan in plans], [[] for _ in plans])
+
+    def test_full_scan_is_detected(self):
+        plan = QueryPlanCheck.explain(self.engine, 'description', select(Product).where(Product.description == 'x'))
+        self.assertEqual(plan.full_scans, ['product'])
+
+    def test_name_normalized_is_maintained(self):
+        with Session(self.engine) as session:
+            session.exec(text("INSERT INTO category (id, name) VALUES (1, 'Camisetas')"))
+            session.add(Product(id=1, name='Camiseta Técnica, M', price=10.0, category_id=1))
+            session.commit()
+            product = session.get(Product, 1)
+            self.assertEqual(product.name_normalized, 'camiseta tecnica m')
+            product.name = 'Camiseta Básica'
+            session.commit()
+            self.assertEqual(session.get(Product, 1).name_normalized, 'camiseta basica')
+
+        row = {'id': 2, 'name': 'CAMISETA ñandú', 'price': 5, 'category_id': 1}
+        CatalogIngest.ingest(self.engine, 'products', [(1, row)])
+        with Session(self.engine) as session:
+            ids = session.exec(select(Product.id).where(name_prefix_condition('Camiseta')).order_by(Product.id)).all()
+            self.assertEqual(ids, [1, 2])
+            self.assertEqual(session.get(Product, 2).name_normalized, 'camiseta nandu')
+            self.assertEqual(session.exec(select(Product.id).where(name_prefix_condition('camiseta b'))).all(), [1])
+
+    def test_name_suggestions(self):
+        with Session(self.engine) as session:
+            session.exec(text("INSERT INTO category (id, name) VALUES (1, 'Camisetas')"))
+            session.add_all([
+                Product(id=1, name='Camiseta Técnica', price=10.0, category_id=1),
+                Product(id=2, name='camiseta técnica', price=12.0, category_id=1),
+                Product(id=3, name='Camisa Lino', price=30.0, category_id=1),
+                Product(id=4, name='Zapatillas', price=50.0, category_id=1),
+            ])
+            session.commit()
+            self.assertEqual(FulltextSearch.suggest(session, 'CAMI', 10), ['camisa lino', 'camiseta tecnica'])
+            self.assertEqual(FulltextSearch.suggest(session, 'cami', 1), ['camisa lino'])
+            self.assertEqual(FulltextSearch.suggest(session, '  ', 10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,8 +17,8 @@ class TestDBModels(unittest.TestCase):
         self.original_get_engine = DatabaseRegistry._DatabaseRegistry__get_engine
         DatabaseRegistry._DatabaseRegistry__get_engine = MagicMock(return_value=self.engine)
         
-        # Reiniciar la sesión singleton
-        DatabaseRegistry._DatabaseRegistry__session = None
+        # Reiniciar el motor compartido
+        DatabaseRegistry._DatabaseRegistry__engine = None
         
         # Crear tablas
         SQLModel.metadata.create_all(self.engine)
@@ -0,0 +1,52 @@
+import unittest
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+from db import CatalogQueries, Category, Product
+
+
+class TestCatalogQueries(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.session.add(Category(id=1, name='Camisetas'))
+        self.session.add(Category(id=2, name='Zapatos'))
+        for i in range(1, 6):
+            self.session.add(Product(id=i, name=f'Producto {i}', description=f'Descripción {i}',
+                                     price=float(i), category_id=1 if i % 2 else 2))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_rows_are_not_model_instances(self):
+        rows = self.session.exec(CatalogQueries.index_products()).all()
+        self.assertEqual([tuple(row) for row in rows][0], (1, 'Producto 1', 'Descripción 1', 1.0, 1))
+        self.assertFalse(any(isinstance(row, Product) for row in rows))
+        self.assertEqual(rows[1].description, 'Descripción 2')
+
+    def test_categories(self):
+        self.assertEqual([tuple(r) for r in self.session.exec(CatalogQueries.categories()).all()],
+                         [(1, 'Camisetas'), (2, 'Zapatos')])
+        self.assertEqual([r.name for r in self.session.exec(CatalogQueries.categories([2])).all()], ['Zapatos'])
+
+    def test_products_page(self):
+        rows = self.session.exec(CatalogQueries.products_page(after_id=2, limit=2)).all()
+        self.assertEqual([tuple(r) for r in rows], [(3, 'Producto 3', 3.0), (4, 'Producto 4', 4.0)])
+        self.assertEqual(len(self.session.exec(CatalogQueries.products_page()).all()), 5)
+
+    def test_products_in(self):
+        rows = self.session.exec(CatalogQueries.products_in([2])).all()
+        self.assertEqual(sorted(r.id for r in rows), [2, 4])
+        self.assertEqual(rows[0]._fields, ('id', 'name', 'price'))
+
+    def test_index_products_with_conditions(self):
+        rows = self.session.exec(CatalogQueries.index_products(Product.price > 3)).all()
+        self.assertEqual([r.id for r in rows], [4, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from fastapi.testclient import TestClient
+from sqlalchemy import exc, text
+from sqlalchemy.pool import QueuePool
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from main import app
+from db import Category, DatabaseRegistry, Product
+from db.replicas import Replica, ReplicaSet
+
+
+def memory_engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+class TestReplicaSet(unittest.TestCase):
+    def test_round_robin(self):
+        replicas = [Replica(f'sqlite:///r{i}.db', memory_engine()) for i in range(3)]
+        replica_set = ReplicaSet(replicas)
+        chosen = [replica_set.choose() for _ in range(6)]
+        self.assertEqual(chosen, replicas + replicas)
+        self.assertEqual([r.reads for r in replicas], [2, 2, 2])
+
+    def test_least_connections(self):
+        busy = Replica('sqlite:///busy.db', create_engine('sqlite://', poolclass=QueuePool))
+        idle = Replica('sqlite:///idle.db', create_engine('sqlite://', poolclass=QueuePool))
+        replica_set = ReplicaSet([busy, idle], strategy='least_connections')
+        connections = [busy.engine.connect() for _ in range(3)]
+        try:
+            self.assertEqual((busy.checked_out(), idle.checked_out()), (3, 0))
+            self.assertEqual({replica_set.choose().url for _ in range(4)}, {'sqlite:///idle.db'})
+        finally:
+            for connection in connections:
+                connection.close()
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            ReplicaSet([], strategy='random')
+
+    def test_connection_error_ejects_replica(self):
+        broken = Replica('sqlite:////nonexistent/dir/replica.db', create_engine('sqlite:////nonexistent/dir/replica.db'))
+        healthy = Replica('sqlite:///healthy.db', memory_engine())
+        replica_set = ReplicaSet([broken, healthy], retry_after=60)
+        with self.assertRaises(exc.OperationalError):
+            with broken.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        self.assertEqual(broken.failures, 1)
+        self.assertEqual({replica_set.choose().url for _ in range(3)}, {'sqlite:///healthy.db'})
+        stats = replica_set.stats()
+        self.assertFalse(stats[0]['healthy'])
+        self.assertGreater(stats[0]['ejected_for_s'], 0)
+        # Pasado el tiempo de expulsión vuelve a recibir lecturas
+        broken.ejected_until = 0.0
+        self.assertIn(broken, [replica_set.choose() for _ in range(2)])
+
+    def test_all_ejected(self):
+        replica = Replica('sqlite:///r.db', memory_engine())
+        replica_set = ReplicaSet([replica])
+        replica_set.eject(replica, 'caída')
+        self.assertIsNone(replica_set.choose())
+
+
+class TestRegistryReplicas(unittest.TestCase):
+    """El primario recibe las escrituras y las lecturas de los endpoints van a las réplicas."""
+
+    def setUp(self):
+        self.paths = []
+        self.dirs = []
+        self.primary_url = self._database([Product(id=1, name='Solo en primario', price=1.0, category_id=1)])
+        self.replica_url = self._database([Product(id=2, name='Camiseta en réplica', price=2.0, category_id=1)])
+        DatabaseRegistry._DatabaseRegistry__engine = None
+        DatabaseRegistry.initialize(self.primary_url, replica_urls=[self.replica_url])
+
+    def tearDown(self):
+        asyncio.run(DatabaseRegistry.close_async())
+        DatabaseRegistry.close()
+        DatabaseRegistry._DatabaseRegistry__db_url = None
+        for path in self.paths:
+            os.remove(path)
+        for path in self.dirs:
+            os.rmdir(path)
+
+    def _database(self, products):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.paths.append(path)
+        engine = create_engine(f'sqlite:///{path}')
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(Category(id=1, name='Camisetas'))
+            for product in products:
+                session.add(product)
+            session.commit()
+        engine.dispose()
+        return f'sqlite:///{path}'
+
+    def break_replica(self):
+        """Sustituye el archivo de la réplica por un directorio: conectar a ella falla."""
+        path = self.replica_url.removeprefix('sqlite:///')
+        os.remove(path)
+        os.makedirs(path)
+        self.paths.remove(path)
+        self.dirs.append(path)
+
+    def test_read_and_write_sessions(self):
+        with DatabaseRegistry.read_session() as session:
+            self.assertEqual([p.id for p in session.exec(select(Product)).all()], [2])
+        with DatabaseRegistry.session() as session:
+            self.assertEqual([p.id for p in session.exec(select(Product)).all()], [1])
+
+    def test_read_falls_back_to_primary(self):
+        replicas = DatabaseRegistry._DatabaseRegistry__replicas
+        for replica in replicas:
+            replicas.eject(replica, 'prueba')
+        with DatabaseRegistry.read_session() as session:
+            self.assertEqual([p.id for p in session.exec(select(Product)).all()], [1])
+
+    def test_failed_read_is_retried_on_primary(self):
+        replica = next(iter(DatabaseRegistry._DatabaseRegistry__replicas))
+        self.break_replica()
+        with DatabaseRegistry.read_session() as session:
+            self.assertEqual([p.id for p in session.exec(select(Product)).all()], [1])
+        self.assertEqual(replica.failures, 1)
+        self.assertFalse(replica.healthy(time.monotonic()))
+
+    def test_failed_async_read_is_retried_on_primary(self):
+        self.break_replica()
+
+        async def read():
+            session = DatabaseRegistry.async_read_session()
+            try:
+                return [p.id for p in (await session.exec(select(Product))).all()]
+            finally:
+                await session.close()
+        self.assertEqual(asyncio.run(read()), [1])
+
+    def test_async_read_session(self):
+        async def read():
+            session = DatabaseRegistry.async_read_session()
+            try:
+                return [p.id for p in (await session.exec(select(Product))).all()]
+            finally:
+                await session.close()
+        self.assertEqual(asyncio.run(read()), [2])
+
+    def test_endpoints_read_from_replica(self):
+        client = TestClient(app)
+        self.assertEqual([p['id'] for p in client.get('/products').json()['products']], [2])
+        stats = client.get('/db/pool/stats').json()
+        self.assertEqual(len(stats['replicas']), 1)
+        self.assertGreaterEqual(stats['replicas'][0]['reads'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import gzip
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+from main import app
+from db import Category, Product
+from services import CatalogCache, CatalogVersion, EncodedBody, SearchIndex
+from services.encoded_response import accepts_gzip, etag_matches
+
+
+class TestEncodedBody(unittest.TestCase):
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip('gzip, deflate, br'))
+        self.assertTrue(accepts_gzip('br;q=1.0, gzip;q=0.5'))
+        self.assertTrue(accepts_gzip('*'))
+        self.assertFalse(accepts_gzip('gzip;q=0'))
+        self.assertFalse(accepts_gzip('identity'))
+        self.assertFalse(accepts_gzip(None))
+
+    def test_gzip_variant_matches_raw(self):
+        payload = {'products': [{'id': i, 'name': f'Producto {i}', 'price': 9.99} for i in range(200)]}
+        body = EncodedBody(payload)
+        self.assertEqual(json.loads(body.raw), payload)
+        self.assertIs(body.gzip, body.gzip)
+        self.assertEqual(gzip.decompress(body.gzip), body.raw)
+
+        response = body.response('gzip')
+        self.assertEqual(response.headers['content-encoding'], 'gzip')
+        self.assertEqual(response.body, body.gzip)
+        self.assertNotIn('content-encoding', body.response('identity').headers)
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"a", "b"', '"b"'))
+        self.assertTrue(etag_matches('W/"a"', '"a"'))
+        self.assertTrue(etag_matches('*', '"a"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+        self.assertFalse(etag_matches(None, '"a"'))
+
+    def test_etag_per_representation(self):
+        body = EncodedBody({'x': 'y' * 5000})
+        self.assertEqual(body.response('identity').headers['etag'], body.etag)
+        self.assertEqual(body.response('gzip').headers['etag'], body.gzip_etag)
+        self.assertIn('max-age', body.response().headers['cache-control'])
+        # Cualquiera de las dos variantes revalida el recurso
+        for tag in (body.etag, body.gzip_etag):
+            response = body.response('gzip', tag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.body, b'')
+            self.assertEqual(response.headers['etag'], body.gzip_etag)
+        self.assertNotEqual(EncodedBody({'x': 'z'}).etag, body.etag)
+
+    def test_small_or_disabled_bodies_are_not_compressed(self):
+        self.assertIsNone(EncodedBody({'categories': []}).gzip)
+        with patch.object(EncodedBody, 'GZIP_ENABLED', False):
+            self.assertIsNone(EncodedBody({'x': 'y' * 5000}).gzip)
+
+
+class TestEncodedCatalogEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.session.add(Category(id=1, name='Camisetas'))
+        for i in range(1, 101):
+            self.session.add(Product(id=i, name=f'Camiseta {i}', price=10.5, category_id=1))
+        self.session.commit()
+        self.snapshot = CatalogCache.initialize(self.session)
+        self.client = TestClient(app)
+        CatalogVersion.set_watermark(datetime(2024, 1, 1), 100, [(1, 'Camisetas')])
+        self.addCleanup(CatalogVersion.reset)
+
+    def tearDown(self):
+        CatalogCache.reset()
+        SearchIndex.reset()
+        self.session.close()
+
+    def test_bodies_are_encoded_once_per_snapshot(self):
+        first = self.client.get('/products', headers={'Accept-Encoding': 'identity'})
+        second = self.client.get('/products', headers={'Accept-Encoding': 'identity'})
+        self.assertEqual(first.content, second.content)
+        self.assertIs(self.snapshot.encoded('products', dict), self.snapshot.encoded('products', dict))
+        self.assertEqual(len(first.json()['products']), 100)
+        self.assertEqual(first.json()['products'][0], {'id': 1, 'name': 'Camiseta 1', 'price': 10.5})
+
+    def test_gzip_response(self):
+        response = self.client.get('/products', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['content-encoding'], 'gzip')
+        self.assertEqual(response.headers['vary'], 'Accept-Encoding')
+        self.assertEqual(response.content, self.snapshot.encoded('products', dict).raw)
+
+    def test_categories(self):
+        response = self.client.get('/categories')
+        self.assertEqual(response.json(), {'categories': [{'id': 1, 'name': 'Camisetas'}]})
+        self.assertIn('categories', self.snapshot._encoded)
+
+    def test_new_snapshot_gets_new_bodies(self):
+        self.client.get('/categories')
+        self.session.add(Category(id=2, name='Zapatos'))
+        self.session.commit()
+        CatalogCache.initialize(self.session)
+        names = [c['name'] for c in self.client.get('/categories').json()['categories']]
+        self.assertEqual(names, ['Camisetas', 'Zapatos'])
+
+    def test_catalog_not_modified(self):
+        for url in ('/categories', '/products', '/products?limit=10'):
+            first = self.client.get(url)
+            etag = first.headers['etag']
+            self.assertIn('public', first.headers['cache-control'])
+            second = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(second.status_code, 304, url)
+            self.assertEqual(second.content, b'')
+            self.assertEqual(second.headers['etag'], etag)
+
+    def test_page_etag_follows_the_body(self):
+        etag = self.client.get('/products?limit=10').headers['etag']
+        self.assertNotEqual(self.client.get('/products?limit=10&after_id=10').headers['etag'], etag)
+        product = self.session.get(Product, 5)
+        product.price = 11.5
+        self.session.commit()
+        CatalogCache.initialize(self.session)
+        response = self.client.get('/products?limit=10', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['etag'], etag)
+
+    def test_page_etag_does_not_run_ahead_of_the_snapshot(self):
+        # El refresco publica la nueva huella antes de sustituir la instantánea: el ETag sigue al cuerpo servido
+        etag = self.client.get('/products?limit=10').headers['etag']
+        CatalogVersion.set_watermark(datetime(2024, 1, 2), 101, [(1, 'Camisetas de verano')])
+        response = self.client.get('/products?limit=10', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_search_is_not_conditional(self):
+        SearchIndex.initialize(self.session)
+        first = self.client.post('/search/text', json={'query': 'camiseta', 'limit': 5})
+        self.assertNotIn('etag', first.headers)
+        self.assertNotIn('cache-control', first.headers)
+        response = self.client.post('/search/text', json={'query': 'camiseta', 'limit': 5},
+                                    headers={'If-None-Match': '*'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['products'], first.json()['products'])
+
+    def test_page_etag_without_fingerprint(self):
+        # Sin refresco del catálogo (modo `fulltext`) las páginas también llevan el ETag de su cuerpo
+        etag = self.client.get('/products?limit=10').headers['etag']
+        with patch.object(CatalogVersion, '_rows', None):
+            self.assertEqual(self.client.get('/products?limit=10').headers['etag'], etag)
+
+
+if __name__ == '__main__':
+    unittest.main()
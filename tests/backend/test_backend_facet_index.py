@@ -0,0 +1,146 @@
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from main import app
+from db import Category, Product
+from services import FacetIndex, QueryCache, SearchFilters, SearchIndex
+
+
+CATEGORIES = [
+    Category(id=1, name='Camisetas'),
+    Category(id=2, name='Teléfonos'),
+    Category(id=3, name='Pantalones'),
+]
+
+PRODUCTS = [
+    Product(id=1, name='Camiseta deportiva azul', description='Camiseta de color azul', price=19.99, category_id=1),
+    Product(id=2, name='Smartphone azul', description='Teléfono compacto', price=199.99, category_id=2),
+    Product(id=3, name='Pantalón azul', description='Pantalón de vestir', price=54.99, category_id=3),
+    Product(id=4, name='Camiseta Classic', description='Camiseta modelo Classic', price=9.99, category_id=1),
+    Product(id=5, name='Pantalón chino', description='Pantalón de algodón', price=19.99, category_id=3),
+]
+
+
+def ids(result):
+    return [p['id'] for p in result['products']]
+
+
+class TestFacetIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex.build(CATEGORIES, PRODUCTS)
+
+    def test_price_and_category_filters(self):
+        result = self.index.search(['azul'], filters=SearchFilters(max_price=60))
+        self.assertEqual(sorted(ids(result)), [1, 3])
+        self.assertEqual(result['total'], 2)
+        result = self.index.search(['azul'], filters=SearchFilters(min_price=20, categories=(2, 3)))
+        self.assertEqual(sorted(ids(result)), [2, 3])
+        self.assertEqual(self.index.search(['azul'], filters=SearchFilters(min_price=500))['products'], [])
+
+    def test_sort_by_price(self):
+        asc = self.index.search(['azul'], filters=SearchFilters(sort='price_asc'))
+        self.assertEqual(ids(asc), [1, 3, 2])
+        desc = self.index.search(['azul'], limit=2, offset=0, filters=SearchFilters(sort='price_desc'))
+        self.assertEqual(ids(desc), [2, 3])
+        self.assertEqual(desc['total'], 3)
+
+    def test_relevance_is_kept_with_filters(self):
+        unfiltered = [pid for pid in ids(self.index.search(['camiseta', 'azul'])) if pid != 4]
+        self.assertEqual(ids(self.index.search(['camiseta', 'azul'], filters=SearchFilters(min_price=15))), unfiltered)
+
+    def test_browse_without_text(self):
+        """Sin palabras en la consulta los filtros se aplican a todo el catálogo."""
+        result = self.index.search([], filters=SearchFilters(min_price=15, max_price=60, sort='price_asc'))
+        self.assertEqual(ids(result), [1, 5, 3])
+        self.assertEqual(set(result['categories']), {'Camisetas', 'Pantalones'})
+        self.assertEqual(self.index.search([])['products'], [])
+
+    def test_sort_without_text_browses_catalog(self):
+        """Sin palabras, ordenar por precio recorre todo el catálogo igual que un filtro de precio."""
+        result = self.index.search([], limit=3, filters=SearchFilters(sort='price_desc'))
+        self.assertEqual(ids(result), [2, 3, 1])
+        self.assertEqual(result['total'], 5)
+        filtered = self.index.search([], limit=3, filters=SearchFilters(min_price=0, sort='price_desc'))
+        self.assertEqual((ids(filtered), filtered['total']), (ids(result), result['total']))
+        facets = self.index.search([], filters=SearchFilters(facets=True))
+        self.assertEqual(facets['total'], 5)
+        self.assertEqual(sum(facet['count'] for facet in facets['facets']['categories']), 5)
+
+    def test_facets_ignore_their_own_filter(self):
+        result = self.index.search([], filters=SearchFilters(categories=(1,), max_price=100, facets=True))
+        self.assertEqual(ids(result), [1, 4])
+        categories = {facet['id']: facet['count'] for facet in result['facets']['categories']}
+        self.assertEqual(categories, {1: 2, 3: 2})
+        price = {facet['min']: facet['count'] for facet in result['facets']['price']}
+        self.assertEqual(price[0.0], 1)
+        self.assertEqual(price[10.0], 1)
+        self.assertEqual(sum(price.values()), 2)
+        self.assertIsNone(result['facets']['price'][-1]['max'])
+
+    def test_changes_update_columns(self):
+        before = self.index.facet_index()
+        self.assertIs(self.index.facet_index(), before)
+        self.index.add_product(Product(id=6, name='Camiseta azul', description='', price=5.0, category_id=1))
+        self.assertIsNot(self.index.facet_index(), before)
+        self.assertEqual(ids(self.index.search(['azul'], filters=SearchFilters(max_price=6))), [6])
+        self.index.remove_product(6)
+        self.assertEqual(self.index.search(['azul'], filters=SearchFilters(max_price=6))['products'], [])
+
+    def test_updated_columns_match_a_full_build(self):
+        """Aplicar cambios a las columnas da el mismo resultado que recorrer el catálogo de nuevo."""
+        self.index.refresh_facets()
+        self.index.add_product(Product(id=7, name='Camiseta roja', description='', price=12.0, category_id=None))
+        self.index.add_product(Product(id=2, name='Smartphone azul', description='', price=99.0, category_id=2))
+        self.index.remove_product(3)
+        with patch.object(FacetIndex, '__init__', side_effect=AssertionError('recorrido del catálogo')):
+            self.index.refresh_facets()
+        updated = self.index.facet_index()
+        full = FacetIndex(self.index.product_store().values(), self.index._positions)
+        for name, column in full.columns().items():
+            self.assertEqual(updated.columns()[name].tolist(), column.tolist(), name)
+        result = self.index.search([], filters=SearchFilters(max_price=100, sort='price_asc'))
+        self.assertEqual(ids(result), [4, 7, 1, 5, 2])
+
+    def test_search_does_not_rebuild_refreshed_columns(self):
+        self.index.refresh_facets()
+        self.index.add_product(Product(id=6, name='Camiseta azul', description='', price=5.0, category_id=1))
+        self.index.refresh_facets()
+        with patch.object(FacetIndex, 'updated', side_effect=AssertionError('recalculo en la búsqueda')):
+            self.assertEqual(ids(self.index.search(['azul'], filters=SearchFilters(max_price=6))), [6])
+
+
+class TestSearchFiltersEndpoint(unittest.TestCase):
+    def setUp(self):
+        SearchIndex._current = SearchIndex.build(CATEGORIES, PRODUCTS)
+        QueryCache.initialize()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        SearchIndex.reset()
+        QueryCache.reset()
+
+    def test_filters_and_facets(self):
+        payload = {'query': 'azul', 'max_price': 100, 'sort': 'price_desc', 'facets': True}
+        data = self.client.post('/search/text', json=payload).json()
+        self.assertEqual(ids(data), [3, 1])
+        self.assertIn('facets', data)
+        self.assertNotIn('facets', self.client.post('/search/text', json={'query': 'azul'}).json())
+
+    def test_filters_are_part_of_cache_key(self):
+        first = self.client.post('/search/text', json={'query': 'azul', 'categories': [3]})
+        second = self.client.post('/search/text', json={'query': 'azul', 'categories': [1]})
+        self.assertEqual(second.headers['X-Cache'], 'MISS')
+        self.assertEqual(ids(first.json()), [3])
+        self.assertEqual(ids(second.json()), [1])
+        third = self.client.post('/search/text', json={'query': 'azul', 'categories': [3]})
+        self.assertEqual(third.headers['X-Cache'], 'HIT')
+
+    def test_invalid_filters(self):
+        self.assertEqual(self.client.post('/search/text', json={'query': 'a', 'sort': 'name'}).status_code, 422)
+        self.assertEqual(self.client.post('/search/text', json={'query': 'a', 'min_price': 'x'}).status_code, 422)
+        self.assertEqual(self.client.post('/search/text', json={'query': 'a', 'categories': ['x']}).status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
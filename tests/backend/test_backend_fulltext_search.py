@@ -0,0 +1,135 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import mysql
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+from main import app
+from db import Category, Product
+from services import FulltextSearch, SearchIndex
+from services.facet_index import SearchFilters
+
+
+class TestFulltextSearch(unittest.TestCase):
+    def setUp(self):
+        self.categories = [Category(id=1, name='Camisetas'), Category(id=4, name='Zapatos')]
+        self.products = [
+            Product(id=1, name='Camiseta deportiva azul', description='Camiseta de color azul', price=19.99, category_id=1),
+            Product(id=2, name='Camiseta blanca', description='Algodón', price=15.99, category_id=1),
+            Product(id=31, name='Zapatos deportivos azul', description='Para correr', price=74.99, category_id=4),
+        ]
+
+    def _mock_session(self, products):
+        session = MagicMock()
+        session.exec.side_effect = [
+            MagicMock(all=MagicMock(return_value=self.categories)),
+            MagicMock(all=MagicMock(return_value=products)),
+        ]
+        return session
+
+    def test_build_query_uses_match_against(self):
+        query = FulltextSearch.build_query([1], ['azul', 'camiseta'])
+        sql = str(query.compile(dialect=mysql.dialect()))
+        self.assertIn('MATCH (product.name, product.description) AGAINST', sql)
+        self.assertIn('IN BOOLEAN MODE', sql)
+        self.assertIn('product.category_id IN', sql)
+
+    def test_build_query_without_terms(self):
+        self.assertIsNone(FulltextSearch.build_query([], []))
+
+    def test_build_query_pushes_filters_and_limit(self):
+        filters = SearchFilters(min_price=10, categories=(1,), sort='price_asc')
+        sql = str(FulltextSearch.build_query([], ['azul'], filters).compile(dialect=mysql.dialect()))
+        self.assertIn('product.price >=', sql)
+        self.assertIn('product.category_id IN', sql)
+        self.assertIn('LIMIT', sql)
+        self.assertIn('DESC', sql)
+        # Las facetas cuentan los productos que excluye cada filtro: no se filtra en SQL
+        faceted = FulltextSearch.build_query([], ['azul'], filters._replace(facets=True))
+        self.assertNotIn('product.price >=', str(faceted.compile(dialect=mysql.dialect())))
+
+    def test_search_keeps_payload_and_order(self):
+        """Los productos de la categoría van primero, igual que en la búsqueda en memoria."""
+        result = FulltextSearch.search(self._mock_session(self.products), ['camiseta', 'azul'])
+        self.assertEqual(result['categories'], ['Camisetas'])
+        self.assertEqual([p['id'] for p in result['products']], [1, 2, 31])
+        self.assertEqual(result['products'][2]['category'], 'Zapatos')
+
+    def test_search_pagination(self):
+        result = FulltextSearch.search(self._mock_session(self.products), ['camiseta', 'azul'], limit=1, offset=1)
+        self.assertEqual([p['id'] for p in result['products']], [2])
+        self.assertEqual(result['total'], 3)
+
+    def test_search_empty_query_skips_product_query(self):
+        session = self._mock_session([])
+        result = FulltextSearch.search(session, [])
+        self.assertEqual(result, {'categories': [], 'products': [], 'total': 0, 'corrections': {}})
+        self.assertEqual(session.exec.call_count, 1)
+
+    @patch('controllers.core.SEARCH_MODE', 'fulltext')
+    @patch('db.DatabaseRegistry.session')
+    def test_endpoint_fulltext_mode(self, mock_session):
+        mock_session.return_value = self._mock_session(self.products[2:])
+        response = TestClient(app).post('/search/text', json={'query': 'Zapatos AZUL'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.json()['products']], [31])
+
+    @patch('controllers.core.SEARCH_MODE', 'fulltext')
+    @patch('controllers.core.DatabaseRegistry.read_session')
+    def test_suggest_endpoint_fulltext_mode(self, mock_session):
+        """En modo FULLTEXT las sugerencias salen de `product.name_normalized`, sin índice en memoria."""
+        session = MagicMock()
+        session.exec.return_value.scalars.return_value = ['camiseta blanca', 'camiseta deportiva azul']
+        mock_session.return_value = session
+        response = TestClient(app).get('/search/suggest', params={'q': 'Camiseta', 'limit': 2})
+        self.assertEqual(response.json()['suggestions'], ['camiseta blanca', 'camiseta deportiva azul'])
+        sql = str(session.exec.call_args[0][0].compile(dialect=mysql.dialect()))
+        self.assertIn('product.name_normalized >=', sql)
+        session.close.assert_called_once()
+
+
+class TestFulltextBrowse(unittest.TestCase):
+    """Sin palabras, el modo `fulltext` recorre el catálogo en SQL con el mismo resultado que el índice."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+        self.categories = [Category(id=1, name='Camisetas'), Category(id=4, name='Zapatos')]
+        products = [Product(id=i, name=f'Producto {i}', description='', price=float(5 + (i * 37) % 300),
+                            category_id=1 if i % 3 else 4) for i in range(1, 41)]
+        # Mismo precio que el producto 1: el desempate es el mismo en SQL y en el índice
+        products.append(Product(id=41, name='Producto 41', price=42.0, category_id=4))
+        with Session(self.engine) as session:
+            session.add_all([Category(**c.model_dump()) for c in self.categories] +
+                            [Product(**p.model_dump()) for p in products])
+            session.commit()
+        self.index = SearchIndex.build(self.categories, products)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_browse_matches_index_mode(self):
+        cases = [
+            SearchFilters(sort='price_asc'),
+            SearchFilters(sort='price_desc'),
+            SearchFilters(min_price=20, max_price=150),
+            SearchFilters(categories=(4,), sort='price_asc'),
+            SearchFilters(min_price=50, categories=(1, 9), sort='price_desc', facets=True),
+            SearchFilters(facets=True),
+        ]
+        with Session(self.engine) as session:
+            for filters in cases:
+                for limit, offset in ((5, 0), (5, 3), (None, 0)):
+                    expected = self.index.search([], limit, offset, filters=filters)
+                    result = FulltextSearch.search(session, [], limit, offset, self.categories, filters)
+                    self.assertEqual(result, expected, (filters, limit, offset))
+
+    def test_empty_query_without_filters_stays_empty(self):
+        with Session(self.engine) as session:
+            result = FulltextSearch.search(session, [], 5, 0, self.categories, SearchFilters())
+        self.assertEqual(result, {'categories': [], 'products': [], 'total': 0, 'corrections': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
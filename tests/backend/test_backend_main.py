@@ -44,5 +44,48 @@ class TestMainLifespan(unittest.TestCase):
             with TestClient(main.app):
                 pass
 
+class TestLoadCatalog(unittest.TestCase):
+    def setUp(self):
+        from sqlmodel import SQLModel, Session, create_engine
+        from sqlmodel.pool import StaticPool
+        from db import Category, Product
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            session.add(Category(id=1, name='Camisetas'))
+            session.add(Product(id=1, name='Camiseta azul', price=19.99, category_id=1))
+            session.add(Product(id=2, name='Camiseta roja', price=17.99, category_id=1))
+            session.commit()
+        self.session_factory = lambda: Session(self.engine)
+
+    def tearDown(self):
+        from services import CatalogCache, CatalogRefresher, CatalogVersion, SearchIndex, SuggestIndex
+        CatalogRefresher.stop()
+        CatalogCache.stop()
+        for service in (CatalogVersion, SearchIndex, SuggestIndex, CatalogCache):
+            service.reset()
+
+    def test_catalog_is_read_once_for_snapshot_and_index(self):
+        """La instantánea del catálogo y el índice de búsqueda se construyen con una sola lectura."""
+        from db import CatalogQueries
+        from services import CatalogCache, SearchIndex, SuggestIndex
+        main = importlib.import_module('main')
+        with patch('db.DatabaseRegistry.session', side_effect=self.session_factory), \
+                patch.object(CatalogQueries, 'index_products', wraps=CatalogQueries.index_products) as reads:
+            main.load_catalog()
+        self.assertEqual(reads.call_count, 1)
+        self.assertEqual(len(CatalogCache.current().products), 2)
+        self.assertEqual([p['id'] for p in SearchIndex.current().search(['roja'])['products']], [2])
+        self.assertEqual(SuggestIndex.current().suggest('camiseta r'), ['camiseta roja'])
+
+    def test_fulltext_mode_only_loads_snapshot(self):
+        from services import CatalogCache, SearchIndex
+        main = importlib.import_module('main')
+        with patch('db.DatabaseRegistry.session', side_effect=self.session_factory):
+            main.load_catalog(build_index=False)
+        self.assertEqual(len(CatalogCache.current().products), 2)
+        self.assertIsNone(SearchIndex.current())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,110 @@
+import random
+import unittest
+from types import SimpleNamespace
+
+from services import ProductStore
+from services.product_store import ProductView
+
+
+PRODUCTS = [
+    SimpleNamespace(id=7, name='Camiseta azul', description='Algodón', price=14.99, category_id=1),
+    SimpleNamespace(id=2, name='Pantalón chino', description=None, price=39.99, category_id=3),
+    SimpleNamespace(id=5, name='Teléfono móvil', description='Pantalla de 6"', price=199.0, category_id=None),
+    SimpleNamespace(id=3, name='Camiseta roja', description='', price=12.5, category_id=1),
+]
+
+
+def ids(products):
+    return [p.id for p in products]
+
+
+class TestProductStore(unittest.TestCase):
+    def setUp(self):
+        self.store = ProductStore(PRODUCTS)
+
+    def test_rows_are_ordered_by_id(self):
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(list(self.store), [2, 3, 5, 7])
+        self.assertEqual(ids(self.store.values()), [2, 3, 5, 7])
+
+    def test_views_keep_every_field(self):
+        for original in PRODUCTS:
+            view = self.store[original.id]
+            self.assertIsInstance(view, ProductView)
+            self.assertEqual((view.id, view.name, view.description, view.price, view.category_id),
+                             (original.id, original.name, original.description, original.price,
+                              original.category_id))
+            self.assertIs(type(view.id), int)
+            self.assertIs(type(view.price), float)
+        self.assertEqual(list(self.store.values()), [self.store[pid] for pid in self.store])
+
+    def test_views_have_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            self.store[7].extra = 1
+
+    def test_lookups(self):
+        self.assertIn(5, self.store)
+        self.assertNotIn(4, self.store)
+        self.assertNotIn('5', self.store)
+        self.assertIsNone(self.store.get(100))
+        with self.assertRaises(KeyError):
+            self.store[100]
+        with self.assertRaises(TypeError):
+            self.store[100] = None
+
+    def test_updated_matches_rebuilt_store(self):
+        """Aplicar cambios sobre un almacén da el mismo resultado que construirlo desde cero."""
+        rng = random.Random(7)
+
+        def product(pid):
+            return SimpleNamespace(id=pid, name=rng.choice([None, '', f'Camiseta {pid} ñ']),
+                                   description=rng.choice([None, '', f'Descripción {pid}' * rng.randint(1, 3)]),
+                                   price=float(pid), category_id=rng.choice([None, 1, 2]))
+
+        catalog = {pid: product(pid) for pid in rng.sample(range(200), 60)}
+        store = ProductStore(catalog.values())
+        for _ in range(20):
+            changes = {pid: None if rng.random() < 0.3 else product(pid) for pid in rng.sample(range(200), 8)}
+            for pid, changed in changes.items():
+                if changed is None:
+                    catalog.pop(pid, None)
+                else:
+                    catalog[pid] = changed
+            store = store.updated(changes)
+            expected = ProductStore(catalog.values())
+            self.assertEqual(list(store.values()), list(expected.values()))
+            for category_id in (None, 1, 2):
+                self.assertEqual(ids(store.in_category(category_id)), ids(expected.in_category(category_id)))
+        self.assertFalse(store.ids.flags.writeable)
+        self.assertEqual(len(store.updated({pid: None for pid in store})), 0)
+
+    def test_categories(self):
+        self.assertEqual(ids(self.store.in_category(1)), [3, 7])
+        self.assertEqual(ids(self.store.in_category(None)), [5])
+        self.assertEqual(ids(self.store.in_category(9)), [])
+        self.assertEqual(ids(self.store.in_categories([3, 1, 9])), [2, 3, 7])
+        self.assertEqual(ids(self.store.in_categories([])), [])
+
+    def test_after(self):
+        self.assertEqual(ids(self.store.after(None, 2)), [2, 3])
+        page = self.store.after(3, 10)
+        self.assertEqual(ids(page), [5, 7])
+        self.assertEqual((len(page), page[-1].id, ids(page[:1])), (2, 7, [5]))
+        self.assertEqual(ids(self.store.after(7)), [])
+
+    def test_views_are_read_in_chunks(self):
+        products = [SimpleNamespace(id=i, name=f'Producto {i}', description=None, price=float(i), category_id=i % 2)
+                    for i in range(1, 50)]
+        store = ProductStore(products)
+        store.CHUNK = 8
+        self.assertEqual([p.name for p in store.values()], [p.name for p in products])
+        self.assertEqual(ids(store.in_category(0)), list(range(2, 50, 2)))
+
+    def test_empty_store(self):
+        store = ProductStore([])
+        self.assertEqual((len(store), list(store.values()), ids(store.in_categories([1]))), (0, [], []))
+        self.assertEqual(ids(store.after(None, 10)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+from main import app
+from db import Category, Product
+from services import CatalogCache
+
+
+class TestProductsPagination(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.session.add(Category(id=1, name='Camisetas'))
+        for pid in (3, 1, 7, 5, 9):
+            self.session.add(Product(id=pid, name=f'Producto {pid}', price=float(pid), category_id=1))
+        self.session.commit()
+        patcher = patch('db.DatabaseRegistry.session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        CatalogCache.reset()
+        self.session.close()
+
+    def _ids(self, products):
+        return [p['id'] for p in products]
+
+    def test_keyset_pages(self):
+        first = self.client.get('/products', params={'limit': 2}).json()
+        self.assertEqual(self._ids(first['products']), [1, 3])
+        self.assertEqual(first['next_after_id'], 3)
+        second = self.client.get('/products', params={'after_id': 3, 'limit': 2}).json()
+        self.assertEqual(self._ids(second['products']), [5, 7])
+        last = self.client.get('/products', params={'after_id': 7, 'limit': 2}).json()
+        self.assertEqual(self._ids(last['products']), [9])
+        self.assertIsNone(last['next_after_id'])
+
+    def test_limit_is_capped(self):
+        with patch('controllers.core.PRODUCTS_MAX_LIMIT', 2):
+            data = self.client.get('/products', params={'limit': 100}).json()
+        self.assertEqual(len(data['products']), 2)
+
+    def test_invalid_limit(self):
+        self.assertEqual(self.client.get('/products', params={'limit': 0}).status_code, 422)
+
+    def test_ndjson_stream_in_chunks(self):
+        with patch('controllers.core.PRODUCTS_STREAM_CHUNK', 2):
+            response = self.client.get('/products', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['content-type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(self._ids(rows), [1, 3, 5, 7, 9])
+        self.assertEqual(rows[0], {'id': 1, 'name': 'Producto 1', 'price': 1.0})
+
+    def test_ndjson_stream_with_cursor_and_limit(self):
+        with patch('controllers.core.PRODUCTS_STREAM_CHUNK', 2):
+            response = self.client.get('/products', params={'after_id': 1, 'limit': 3},
+                                       headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(self._ids(json.loads(line) for line in response.text.splitlines()), [3, 5, 7])
+
+    def test_pages_from_snapshot(self):
+        CatalogCache.initialize(self.session)
+        with patch('db.DatabaseRegistry.session') as mock_session:
+            data = self.client.get('/products', params={'after_id': 4, 'limit': 2}).json()
+        mock_session.return_value.exec.assert_not_called()
+        self.assertEqual(self._ids(data['products']), [5, 7])
+        self.assertEqual(data['next_after_id'], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
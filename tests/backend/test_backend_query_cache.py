@@ -0,0 +1,141 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+
+from main import app
+from db import Category, Product
+from services import CatalogVersion, QueryCache, SearchIndex
+
+
+class FakeRedis:
+    """Cliente Redis mínimo en memoria."""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode('utf-8')
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        # Las escrituras se aplican al momento; `execute` no tiene nada pendiente
+        return self
+
+    def execute(self):
+        return []
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        QueryCache.initialize()
+
+    def tearDown(self):
+        QueryCache.reset()
+        QueryCache._redis = None
+        QueryCache._redis_disabled_until = 0.0
+        CatalogVersion.reset()
+        SearchIndex.reset()
+
+    def test_key_ignores_token_order_and_depends_on_params(self):
+        key = QueryCache.make_key(['azul', 'camiseta'], limit=10)
+        self.assertEqual(key, QueryCache.make_key(['camiseta', 'azul', 'azul'], limit=10))
+        self.assertNotEqual(key, QueryCache.make_key(['camiseta', 'azul'], limit=20))
+
+    def test_key_changes_with_catalog(self):
+        CatalogVersion.set_watermark(CatalogVersion.watermark(), 12344, [(1, 'Camisetas')])
+        key = QueryCache.make_key(['azul'])
+        CatalogVersion.set_watermark(CatalogVersion.watermark(), 12345, [(1, 'Camisetas')])
+        self.assertNotEqual(key, QueryCache.make_key(['azul']))
+        key = QueryCache.make_key(['azul'])
+        CatalogVersion.set_watermark(CatalogVersion.watermark(), 12345, [(1, 'Camisetas de verano')])
+        self.assertNotEqual(key, QueryCache.make_key(['azul']))
+
+    def test_key_without_fingerprint_expires_with_ttl(self):
+        """Sin refresco del catálogo la clave cambia en cada tramo de SEARCH_CACHE_TTL segundos."""
+        CatalogVersion.reset()
+        ttl = patch.object(QueryCache, 'TTL', 60)
+        ttl.start()
+        self.addCleanup(ttl.stop)
+        with patch('services.query_cache.time.time', return_value=6000.0):
+            key = QueryCache.make_key(['azul'])
+            self.assertEqual(key, QueryCache.make_key(['azul']))
+        with patch('services.query_cache.time.time', return_value=6059.0):
+            self.assertEqual(key, QueryCache.make_key(['azul']))
+        with patch('services.query_cache.time.time', return_value=6060.0):
+            self.assertNotEqual(key, QueryCache.make_key(['azul']))
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(QueryCache.get('k'))
+        QueryCache.set('k', {'products': []})
+        self.assertEqual(QueryCache.get('k'), {'products': []})
+        stats = QueryCache.stats()
+        self.assertEqual((stats['local_hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_lru_eviction(self):
+        with patch.object(QueryCache, 'MAX_ENTRIES', 2):
+            QueryCache.set('a', {})
+            QueryCache.set('b', {})
+            QueryCache.get('a')
+            QueryCache.set('c', {})
+        self.assertIsNotNone(QueryCache.get('a'))
+        self.assertIsNone(QueryCache.get('b'))
+
+    def test_ttl_expiry(self):
+        with patch.object(QueryCache, 'TTL', -1):
+            QueryCache.set('k', {})
+        self.assertIsNone(QueryCache.get('k'))
+
+    def test_redis_tier_shared_between_processes(self):
+        """Una entrada escrita por otra réplica se encuentra en Redis y se copia al nivel local."""
+        QueryCache._redis = FakeRedis()
+        with patch.object(QueryCache, 'REDIS_URL', 'redis://fake'):
+            QueryCache.set('k', {'total': 1})
+            QueryCache._local.clear()
+            self.assertEqual(QueryCache.get('k'), {'total': 1})
+            self.assertEqual(QueryCache.get('k'), {'total': 1})
+            stats = QueryCache.stats()
+        self.assertEqual((stats['redis_hits'], stats['local_hits']), (1, 1))
+        self.assertTrue(stats['redis_enabled'])
+
+    def test_get_many_and_set_many(self):
+        QueryCache._redis = FakeRedis()
+        with patch.object(QueryCache, 'REDIS_URL', 'redis://fake'):
+            QueryCache.set_many({'a': {'total': 1}, 'b': {'total': 2}})
+            QueryCache._local.pop('b')
+            self.assertEqual(QueryCache.get_many(['a', 'b', 'c', 'a']), {'a': {'total': 1}, 'b': {'total': 2}})
+            stats = QueryCache.stats()
+        self.assertEqual((stats['local_hits'], stats['redis_hits'], stats['misses']), (1, 1, 1))
+        self.assertEqual(QueryCache.get('b'), {'total': 2})
+
+    def test_redis_failure_falls_back_to_local(self):
+        QueryCache._redis = MagicMock(get=MagicMock(side_effect=Exception('conexión rechazada')))
+        with patch.object(QueryCache, 'REDIS_URL', 'redis://fake'):
+            self.assertIsNone(QueryCache.get('k'))
+            self.assertFalse(QueryCache.stats()['redis_enabled'])
+
+    def test_endpoint_hit_miss_and_bypass(self):
+        SearchIndex._current = SearchIndex.build(
+            [Category(id=1, name='Camisetas')],
+            [Product(id=1, name='Camiseta azul', price=9.99, category_id=1)],
+        )
+        client = TestClient(app)
+        first = client.post('/search/text', json={'query': 'camiseta azul'})
+        second = client.post('/search/text', json={'query': 'Azul, camiseta'})
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+        bypass = client.post('/search/text', json={'query': 'camiseta azul', 'cache': False})
+        self.assertEqual(bypass.headers['X-Cache'], 'BYPASS')
+        bypass = client.post('/search/text', json={'query': 'camiseta azul'}, headers={'Cache-Control': 'no-cache'})
+        self.assertEqual(bypass.headers['X-Cache'], 'BYPASS')
+        stats = client.get('/search/cache/stats').json()
+        self.assertEqual((stats['local_hits'], stats['misses']), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
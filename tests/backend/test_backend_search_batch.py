@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from main import app
+from db import Category, Product
+from services import QueryCache, SearchIndex
+from controllers import core
+
+
+CATEGORIES = [Category(id=1, name='Camisetas'), Category(id=3, name='Pantalones')]
+
+PRODUCTS = [
+    Product(id=1, name='Camiseta deportiva azul', description='Camiseta de color azul', price=19.99, category_id=1),
+    Product(id=2, name='Pantalón azul', description='Pantalón de vestir', price=54.99, category_id=3),
+    Product(id=3, name='Camiseta blanca', description='Camiseta básica', price=9.99, category_id=1),
+]
+
+
+class TestSearchTextBatch(unittest.TestCase):
+    def setUp(self):
+        SearchIndex._current = SearchIndex.build(CATEGORIES, PRODUCTS)
+        QueryCache.initialize()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        SearchIndex.reset()
+        QueryCache.reset()
+
+    def test_results_match_individual_searches(self):
+        queries = ['camiseta azul', 'Pantalón', 'zzz']
+        data = self.client.post('/search/text/batch', json={'queries': queries, 'limit': 2, 'cache': False}).json()
+        self.assertEqual(list(data['results']), queries)
+        for query in queries:
+            single = self.client.post('/search/text', json={'query': query, 'limit': 2, 'cache': False}).json()
+            self.assertEqual(data['results'][query], single)
+
+    def test_equivalent_queries_are_resolved_once(self):
+        queries = ['camiseta azul', 'AZUL camiseta', 'azul, camiseta', 'pantalon']
+        with patch.object(SearchIndex, '_search', autospec=True, side_effect=SearchIndex._search) as mock_search:
+            data = self.client.post('/search/text/batch', json={'queries': queries}).json()
+        self.assertEqual(mock_search.call_count, 2)
+        self.assertEqual(data['results']['camiseta azul'], data['results']['azul, camiseta'])
+
+    def test_cache_is_shared_with_single_searches(self):
+        self.client.post('/search/text', json={'query': 'camiseta', 'limit': 5})
+        with patch.object(SearchIndex, 'search_many', autospec=True, side_effect=SearchIndex.search_many) as mock_many:
+            data = self.client.post('/search/text/batch', json={'queries': ['Camiseta', 'pantalon'], 'limit': 5}).json()
+        self.assertEqual(mock_many.call_args.args[1], [['pantalon']])
+        self.assertEqual(len(data['results']), 2)
+        single = self.client.post('/search/text', json={'query': 'pantalon', 'limit': 5})
+        self.assertEqual(single.headers['X-Cache'], 'HIT')
+
+    def test_filters_apply_to_every_query(self):
+        data = self.client.post('/search/text/batch', json={'queries': ['camiseta', 'azul'], 'max_price': 15}).json()
+        self.assertEqual([p['id'] for p in data['results']['camiseta']['products']], [3])
+        self.assertEqual(data['results']['azul']['products'], [])
+
+    def test_invalid_batches(self):
+        self.assertEqual(self.client.post('/search/text/batch', json={'queries': []}).status_code, 422)
+        self.assertEqual(self.client.post('/search/text/batch', json={'queries': 'camiseta'}).status_code, 422)
+        self.assertEqual(self.client.post('/search/text/batch', json={'queries': [1]}).status_code, 422)
+        with patch.object(core, 'SEARCH_BATCH_MAX_QUERIES', 2):
+            response = self.client.post('/search/text/batch', json={'queries': ['a', 'b', 'c']})
+        self.assertEqual(response.status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
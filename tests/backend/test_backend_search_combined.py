@@ -0,0 +1,230 @@
+import asyncio
+import unittest
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock
+from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.pool import StaticPool
+
+from main import app
+from db import Category, Product
+from db import DatabaseRegistry
+from services import CatalogCache, ResultService, SearchIndex
+
+
+CATEGORIES = [
+    Category(id=1, name='Camisetas'),
+    Category(id=2, name='Teléfonos'),
+]
+
+PRODUCTS = [
+    Product(id=1, name='Camiseta deportiva', description='Camiseta técnica', price=19.99, category_id=1),
+    Product(id=2, name='Camiseta azul', description='Camiseta de algodón azul', price=14.99, category_id=1),
+    Product(id=3, name='Camiseta roja', description='Camiseta de algodón', price=12.99, category_id=1),
+    Product(id=4, name='Smartphone azul', description='Teléfono compacto', price=199.99, category_id=2),
+]
+
+
+class MockPrediction:
+    """Clase para simular las predicciones del modelo."""
+    def __init__(self, label, score):
+        self.label = label
+        self.score = score
+
+
+class FakeRedis:
+    """Cliente Redis mínimo en memoria, con pipelines que se ejecutan al llamar a `execute`."""
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.pending = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode('utf-8')
+        self.expiry[key] = ex
+
+    def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class LoopRecordingRedis(FakeRedis):
+    """FakeRedis que anota si cada operación se ejecuta con un bucle de eventos en marcha en el hilo."""
+    def __init__(self):
+        super().__init__()
+        self.on_loop = []
+
+    def _record(self):
+        try:
+            asyncio.get_running_loop()
+            self.on_loop.append(True)
+        except RuntimeError:
+            self.on_loop.append(False)
+
+    def set(self, key, value, ex=None):
+        self._record()
+        super().set(key, value, ex)
+
+    def pipeline(self, transaction=True):
+        self._record()
+        return super().pipeline(transaction)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+def ids(products):
+    return [p['id'] if isinstance(p, dict) else p.id for p in products]
+
+
+class TestRerank(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex.build(CATEGORIES, PRODUCTS)
+        self.candidates = PRODUCTS[:3]
+
+    def test_matches_first_then_original_order(self):
+        self.assertEqual(ids(self.index.rerank(self.candidates, ['algodon', 'azul'])), [2, 3, 1])
+        self.assertEqual(ids(self.index.rerank(self.candidates, ['nada'])), [1, 2, 3])
+
+    def test_only_matches(self):
+        self.assertEqual(ids(self.index.rerank(self.candidates, ['azul'], only_matches=True)), [2])
+        self.assertEqual(self.index.rerank(self.candidates, ['nada'], only_matches=True), [])
+
+    def test_fuzzy_terms(self):
+        result = self.index.rerank(self.candidates, ['algodom'], only_matches=True, fuzzy=True)
+        self.assertEqual(sorted(ids(result)), [2, 3])
+
+
+class TestSearchCombined(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        self.original_get_engine = DatabaseRegistry._DatabaseRegistry__get_engine
+        DatabaseRegistry._DatabaseRegistry__get_engine = MagicMock(return_value=self.engine)
+        DatabaseRegistry._DatabaseRegistry__engine = None
+
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            session.add_all([Category(**c.model_dump()) for c in CATEGORIES])
+            session.add_all([Product(**p.model_dump()) for p in PRODUCTS])
+            session.commit()
+
+        self.client = TestClient(app)
+        self.result_service = ResultService()
+        self.result_service.clear_all()
+
+    def tearDown(self):
+        DatabaseRegistry._DatabaseRegistry__get_engine = self.original_get_engine
+        DatabaseRegistry._DatabaseRegistry__engine = None
+        self.result_service.clear_all()
+        SearchIndex.reset()
+        CatalogCache.reset()
+
+    def submit(self, query, **data):
+        with patch("requests.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            mock_post.return_value.json.return_value = {"task_id": "combined-task"}
+            return self.client.post(
+                "/search/combined",
+                files={"file": ("test.jpg", b"fakeimage", "image/jpeg")},
+                data={"query": query, **data},
+            )
+
+    def test_stores_text_query(self):
+        response = self.submit("Camiseta AZUL", match="filter")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"task_id": "combined-task"})
+        self.assertEqual(self.result_service.get_text_query("combined-task"), (["camiseta", "azul"], True))
+
+    def test_invalid_match(self):
+        self.assertEqual(self.submit("azul", match="any").status_code, 422)
+
+    def test_inference_error(self):
+        with patch("requests.post") as mock_post:
+            mock_post.return_value.status_code = 500
+            response = self.client.post(
+                "/search/combined",
+                files={"file": ("test.jpg", b"fakeimage", "image/jpeg")},
+                data={"query": "azul"},
+            )
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("Error al procesar la imagen", response.text)
+        self.assertIsNone(self.result_service.get_text_query("combined-task"))
+
+    def test_result_is_reranked_from_database(self):
+        """Sin caché ni índice activos se indexan solo los productos de las categorías predichas."""
+        self.submit("algodón azul")
+        self.result_service.store_result("combined-task", [MockPrediction(1, 0.9)])
+        data = self.client.get("/tasks/combined-task/result").json()
+        self.assertEqual(data["categories"], ["Camisetas"])
+        self.assertEqual(ids(data["products"]), [2, 3, 1])
+
+    def test_result_is_filtered_with_index(self):
+        SearchIndex._current = SearchIndex.build(CATEGORIES, PRODUCTS)
+        self.submit("azul", match="filter")
+        self.result_service.store_result("combined-task", [MockPrediction(1, 0.9), MockPrediction(2, 0.5)])
+        data = self.client.get("/tasks/combined-task/result").json()
+        self.assertEqual(sorted(ids(data["products"])), [2, 4])
+
+    def test_text_query_is_removed_after_result_read(self):
+        self.submit("azul", match="filter")
+        self.result_service.store_result("combined-task", [MockPrediction(1, 0.9)])
+        self.assertEqual(ids(self.client.get("/tasks/combined-task/result").json()["products"]), [2])
+        self.assertIsNone(self.result_service.get_text_query("combined-task"))
+
+    def test_pending_task_keeps_text_query(self):
+        self.submit("azul")
+        self.assertEqual(self.client.get("/tasks/combined-task/result").status_code, 202)
+        self.assertEqual(self.result_service.get_text_query("combined-task"), (["azul"], False))
+
+    def test_unread_text_query_expires(self):
+        with patch.object(ResultService, "QUERY_TTL", -1):
+            self.submit("azul")
+        self.assertIsNone(self.result_service.get_text_query("combined-task"))
+        self.result_service.store_text_query("other-task", ["roja"])
+        # Las entradas caducadas se descartan al guardar otras
+        self.assertEqual(list(ResultService._query_store), ["other-task"])
+
+    def test_text_query_is_shared_through_redis(self):
+        fake = FakeRedis()
+        with patch.object(ResultService, "REDIS_URL", "redis://fake"), patch.object(ResultService, "_redis", fake):
+            self.submit("AZUL", match="filter")
+            self.assertEqual(ResultService._query_store, {})
+            self.assertEqual(fake.expiry, {"task:combined-task:query": 3600})
+            # Otra réplica (sin el texto en su memoria) lo lee de Redis
+            self.assertEqual(self.result_service.get_text_query("combined-task"), (["azul"], True))
+            self.result_service.store_result("combined-task", [MockPrediction(1, 0.9)])
+            self.assertEqual(ids(self.client.get("/tasks/combined-task/result").json()["products"]), [2])
+            self.assertEqual(fake.data, {})
+
+    def test_redis_calls_run_off_the_event_loop(self):
+        fake = LoopRecordingRedis()
+        with patch.object(ResultService, "REDIS_URL", "redis://fake"), patch.object(ResultService, "_redis", fake):
+            self.submit("azul")
+            self.result_service.store_result("combined-task", [MockPrediction(1, 0.9)])
+            self.client.get("/tasks/combined-task/result")
+        self.assertEqual(len(fake.on_loop), 2)
+        self.assertFalse(any(fake.on_loop))
+
+    def test_image_only_result_is_unchanged(self):
+        self.result_service.store_result("image-task", [MockPrediction(1, 0.9)])
+        data = self.client.get("/tasks/image-task/result").json()
+        self.assertEqual(sorted(ids(data["products"])), [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
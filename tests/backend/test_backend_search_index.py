@@ -0,0 +1,139 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+
+from main import app
+from db import Category, Product
+from services import ProductStore, SearchIndex
+
+
+CATEGORIES = [
+    Category(id=1, name='Camisetas'),
+    Category(id=2, name='Teléfonos'),
+    Category(id=3, name='Pantalones'),
+]
+
+PRODUCTS = [
+    Product(id=1, name='Camiseta deportiva azul', description='Camiseta de color azul, talla M', price=19.99, category_id=1),
+    Product(id=2, name='Smartphone Mini', description='Teléfono compacto, 32GB', price=199.99, category_id=2),
+    Product(id=3, name='Pantalón azul', description='Pantalón de vestir color azul', price=54.99, category_id=3),
+    Product(id=4, name='Camiseta Classic', description='Camiseta modelo Classic, talla L', price=18.99, category_id=1),
+]
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex.build(CATEGORIES, PRODUCTS)
+
+    def tearDown(self):
+        SearchIndex.reset()
+
+    def test_category_keyword_match(self):
+        """Las palabras clave de categoría devuelven todos los productos de la categoría."""
+        result = self.index.search(['camiseta'])
+        self.assertEqual(result['categories'], ['Camisetas'])
+        # El documento más corto puntúa más con BM25
+        self.assertEqual([p['id'] for p in result['products']], [4, 1])
+        self.assertEqual(result['products'][0]['category'], 'Camisetas')
+        self.assertEqual(result['total'], 2)
+
+    def test_word_match_without_category(self):
+        """Sin categoría detectada se devuelven las categorías de los productos encontrados."""
+        result = self.index.search(['azul'])
+        self.assertEqual([p['id'] for p in result['products']], [3, 1])
+        self.assertEqual(result['categories'], ['Camisetas', 'Pantalones'])
+
+    def test_category_products_before_word_matches(self):
+        """Los productos de la categoría detectada van antes que las coincidencias por palabra."""
+        result = self.index.search(['telefono', 'azul'])
+        self.assertEqual(result['categories'], ['Teléfonos'])
+        self.assertEqual([p['id'] for p in result['products']][0], 2)
+        self.assertEqual(set(p['id'] for p in result['products']), {1, 2, 3})
+
+    def test_name_matches_rank_higher(self):
+        """Las apariciones en el nombre pesan más que en la descripción."""
+        index = SearchIndex.build(CATEGORIES, [
+            Product(id=1, name='Mochila urbana', description='Resistente al agua, color azul', price=39.99, category_id=3),
+            Product(id=2, name='Mochila azul', description='Resistente al agua, urbana', price=39.99, category_id=3),
+        ])
+        self.assertEqual([p['id'] for p in index.search(['azul'])['products']], [2, 1])
+
+    def test_limit_and_offset(self):
+        """La paginación recorta el ranking sin cambiar el total."""
+        full = [p['id'] for p in self.index.search(['camiseta', 'azul'])['products']]
+        page = self.index.search(['camiseta', 'azul'], limit=2, offset=1)
+        self.assertEqual([p['id'] for p in page['products']], full[1:3])
+        self.assertEqual(page['total'], len(full))
+        self.assertEqual(self.index.search(['camiseta'], limit=5, offset=10)['products'], [])
+
+    def test_no_match(self):
+        result = self.index.search(['inexistente'])
+        self.assertEqual(result, {'categories': [], 'products': [], 'total': 0, 'corrections': {}})
+
+    def test_typo_is_corrected(self):
+        """Una palabra mal escrita se corrige con el término más parecido del vocabulario."""
+        result = self.index.search(['camisetq'])
+        self.assertEqual(result['corrections']['camisetq'][0], 'camiseta')
+        self.assertEqual(result['categories'], ['Camisetas'])
+        self.assertEqual(result['total'], 2)
+        result = self.index.search(['smartphon'])
+        self.assertEqual([p['id'] for p in result['products']], [2])
+
+    def test_typo_correction_can_be_disabled(self):
+        result = self.index.search(['camisetq'], fuzzy=False)
+        self.assertEqual(result['total'], 0)
+        self.assertEqual(result['corrections'], {})
+
+    def test_exact_words_are_not_corrected(self):
+        result = self.index.search(['azul'])
+        self.assertEqual(result['corrections'], {})
+
+    def test_update_and_remove_product(self):
+        """Actualizar un producto reemplaza sus términos y conserva su posición."""
+        self.index.add_product(Product(id=1, name='Camiseta roja', description=None, price=9.99, category_id=1))
+        self.assertEqual([p['id'] for p in self.index.search(['azul'])['products']], [3])
+        self.assertEqual(self.index.search(['camiseta'])['total'], 2)
+        self.index.remove_product(4)
+        self.assertEqual([p['id'] for p in self.index.search(['classic'])['products']], [])
+        self.assertEqual(len(self.index), 3)
+
+    def test_product_fields_are_read_from_store(self):
+        """El índice construido sobre un `ProductStore` lo usa tal cual y lee de él los campos de los productos."""
+        store = ProductStore(PRODUCTS)
+        index = SearchIndex.build(CATEGORIES, store)
+        self.assertIs(index.product_store(), store)
+        self.assertEqual(index.search(['mini'])['products'][0]['name'], 'Smartphone Mini')
+        index.add_product(Product(id=2, name='Smartphone Mini 2', description=None, price=149.99, category_id=2))
+        # Los cambios se aplican a un almacén nuevo; el compartido no se modifica
+        self.assertEqual(store[2].name, 'Smartphone Mini')
+        product = index.search(['mini'])['products'][0]
+        self.assertEqual((product['name'], product['price']), ('Smartphone Mini 2', 149.99))
+        self.assertEqual(index.product_store()[2].name, 'Smartphone Mini 2')
+
+    def test_endpoint_uses_current_index(self):
+        """El endpoint responde desde el índice activo sin consultar la base de datos."""
+        SearchIndex._current = self.index
+        client = TestClient(app)
+        with patch('db.DatabaseRegistry.session') as mock_session:
+            response = client.post('/search/text', json={'query': 'Busco una CAMISETA'})
+        mock_session.return_value.exec.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.json()['products']], [4, 1])
+
+    def test_endpoint_pagination(self):
+        SearchIndex._current = self.index
+        client = TestClient(app)
+        response = client.post('/search/text', json={'query': 'camiseta', 'limit': 1, 'offset': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.json()['products']], [1])
+        self.assertEqual(response.json()['total'], 2)
+        response = client.post('/search/text', json={'query': 'camisetq', 'fuzzy': False})
+        self.assertEqual(response.json()['total'], 0)
+        response = client.post('/search/text', json={'query': 'camiseta', 'limit': 0})
+        self.assertEqual(response.status_code, 422)
+        response = client.post('/search/text', json={'query': 'camiseta', 'offset': 'x'})
+        self.assertEqual(response.status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
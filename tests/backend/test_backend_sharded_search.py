@@ -0,0 +1,203 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+
+from main import app
+from db import Category, Product
+from services import SearchFilters, SearchIndex, ShardedSearch, SuggestIndex
+
+
+CATEGORIES = [
+    Category(id=1, name='Camisetas'),
+    Category(id=2, name='Teléfonos'),
+    Category(id=3, name='Pantalones'),
+]
+
+COLORS = ['azul', 'rojo', 'verde', 'negro']
+KINDS = [(1, 'Camiseta'), (2, 'Smartphone'), (3, 'Pantalón')]
+
+PRODUCTS = [
+    Product(
+        id=pid,
+        name=f'{KINDS[pid % 3][1]} {COLORS[pid % 4]}',
+        description=f'Modelo {pid} de color {COLORS[pid % 4]}',
+        price=round(5 + (pid * 37 % 300) + pid / 100, 2),
+        category_id=KINDS[pid % 3][0],
+    )
+    for pid in range(1, 61)
+]
+
+
+def ids(result):
+    return [p['id'] for p in result['products']]
+
+
+class TestShardedSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.sharded = ShardedSearch.build(CATEGORIES, PRODUCTS, shards=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharded.close()
+
+    def setUp(self):
+        self.index = SearchIndex.build(CATEGORIES, PRODUCTS)
+
+    def test_products_are_partitioned(self):
+        self.assertEqual(self.sharded.shards, 3)
+        self.assertEqual(len(self.sharded), len(PRODUCTS))
+        self.assertEqual(self.sharded.product_ids(), {p.id for p in PRODUCTS})
+
+    def test_matches_single_index(self):
+        for tokens in (['azul'], ['camiseta', 'negro'], ['smartphone']):
+            expected = self.index.search(tokens)
+            result = self.sharded.search(tokens)
+            self.assertEqual(result['total'], expected['total'])
+            self.assertEqual(set(ids(result)), set(ids(expected)))
+            self.assertEqual(result['categories'], expected['categories'])
+            self.assertNotIn('score', result['products'][0])
+
+    def test_price_sort_and_pagination(self):
+        for sort, tokens in (('price_asc', ['azul']), ('price_desc', ['azul']), ('price_asc', [])):
+            filters = SearchFilters(sort=sort, max_price=200 if tokens else None)
+            for offset in (0, 4):
+                expected = self.index.search(tokens, limit=5, offset=offset, filters=filters)
+                result = self.sharded.search(tokens, limit=5, offset=offset, filters=filters)
+                self.assertEqual(ids(result), ids(expected))
+                self.assertEqual(result['total'], expected['total'])
+
+    def test_facets_are_summed(self):
+        filters = SearchFilters(min_price=20, categories=(1, 3), facets=True)
+        expected = self.index.search([], filters=filters)
+        result = self.sharded.search([], filters=filters)
+        self.assertEqual(result['facets'], expected['facets'])
+        self.assertEqual(result['total'], expected['total'])
+
+    def test_corrections_are_merged(self):
+        expected = self.index.search(['camisetaa'], fuzzy=True)
+        result = self.sharded.search(['camisetaa'], fuzzy=True)
+        self.assertEqual(result['corrections'], expected['corrections'])
+        self.assertEqual(set(ids(result)), set(ids(expected)))
+
+    def test_search_many(self):
+        results = self.sharded.search_many([['rojo'], ['verde']], limit=3)
+        self.assertEqual([r['total'] for r in results], [15, 15])
+        self.assertTrue(all(len(r['products']) == 3 for r in results))
+
+    def test_changes_go_to_owner_shard(self):
+        product = Product(id=100, name='Camiseta dorada', description='', price=1.0, category_id=1)
+        self.assertTrue(self.sharded.add_product(product))
+        self.assertFalse(self.sharded.add_product(product))
+        self.assertEqual(ids(self.sharded.search(['dorada'])), [100])
+        self.assertTrue(self.sharded.remove_product(100))
+        self.assertEqual(self.sharded.search(['dorada'])['products'], [])
+        self.assertTrue(self.sharded.add_category(Category(id=4, name='Zapatos')))
+
+    def test_ties_follow_insertion_order(self):
+        """A igual puntuación o precio, los productos añadidos después van detrás aunque su id sea menor."""
+        product = Product(id=0, name='Camiseta azul', description='Modelo 12 de color azul', price=42.01,
+                          category_id=1)
+        self.index.add_product(product)
+        self.assertTrue(self.sharded.add_product(product))
+        try:
+            for tokens, sort in ((['camiseta', 'azul'], 'relevance'), ([], 'price_asc'), ([], 'relevance')):
+                filters = SearchFilters(sort=sort, max_price=None if tokens else 1000)
+                expected = self.index.search(tokens, limit=10, filters=filters)
+                self.assertEqual(ids(self.sharded.search(tokens, limit=10, filters=filters)), ids(expected))
+        finally:
+            self.sharded.remove_product(0)
+
+    def test_changes_are_batched_per_shard(self):
+        products = [Product(id=pid, name='Gorra negra', description='', price=3.0, category_id=None)
+                    for pid in range(200, 206)]
+        executors = self.sharded._executors
+        with patch.object(executors[0], 'submit', wraps=executors[0].submit) as submit:
+            self.assertEqual(self.sharded.apply_changes(products), 6)
+            self.assertEqual(submit.call_count, 1)
+        self.assertEqual(self.sharded.search(['gorra'])['total'], 6)
+        with patch.object(executors[0], 'submit', wraps=executors[0].submit) as submit:
+            self.assertEqual(self.sharded.apply_changes((), range(200, 206)), 6)
+            self.assertEqual(submit.call_count, 1)
+        self.assertEqual(self.sharded.search(['gorra'])['total'], 0)
+
+    def test_suggestions_match_single_index(self):
+        """Los fragmentos completan el prefijo y se suman las frecuencias de cada completado."""
+        expected = SuggestIndex.from_search_index(self.index)
+        for prefix in ('c', 'camiseta ', 'smart', 'ro'):
+            self.assertEqual(self.sharded.suggest(prefix, 5), expected.suggest(prefix, 5), prefix)
+
+    def test_suggestions_are_rebuilt_in_shards(self):
+        product = Product(id=101, name='Mochila urbana', description='', price=1.0, category_id=1)
+        self.sharded.add_product(product)
+        self.assertEqual(self.sharded.suggest('moch'), [])
+        self.sharded.rebuild_suggestions()
+        deadline = time.monotonic() + 10
+        while not self.sharded.suggest('moch') and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.sharded.suggest('moch'), ['mochila', 'mochila urbana'])
+        self.sharded.remove_product(101)
+        self.sharded.rebuild_suggestions()
+
+
+class TestShardedMerge(unittest.TestCase):
+    def test_merge_orders_by_score_then_rank(self):
+        shard = ShardedSearch([])
+        results = [
+            {'products': [{'id': 1, 'price': 5.0, 'score': 3.0, 'rank': 7},
+                          {'id': 4, 'price': 1.0, 'score': 1.0, 'rank': 0}],
+             'categories': ['Camisetas'], 'category_ids': [1], 'total': 2, 'corrections': {'x': ['a']}},
+            {'products': [{'id': 2, 'price': 2.0, 'score': 3.0, 'rank': 5},
+                          {'id': 3, 'price': 9.0, 'score': 2.0, 'rank': 1}],
+             'categories': ['Teléfonos', 'Camisetas'], 'category_ids': [2, 1], 'total': 5, 'corrections': {'x': ['b']}},
+        ]
+        merged = shard._merge(results, limit=2, offset=1, filters=SearchFilters())
+        self.assertEqual(ids(merged), [1, 3])
+        self.assertNotIn('rank', merged['products'][0])
+        self.assertEqual(merged['categories'], ['Camisetas', 'Teléfonos'])
+        self.assertEqual(merged['total'], 7)
+        self.assertEqual(merged['corrections'], {'x': ['a', 'b']})
+
+
+class TestShardedFromDatabase(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.url = f'sqlite:///{self.path}'
+        engine = create_engine(self.url)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all([Category(**c.model_dump()) for c in CATEGORIES])
+            session.add_all([Product(**p.model_dump()) for p in PRODUCTS])
+            session.commit()
+        engine.dispose()
+
+    def tearDown(self):
+        ShardedSearch.reset()
+        os.remove(self.path)
+
+    def test_each_shard_loads_its_products(self):
+        sharded = ShardedSearch.initialize(self.url, shards=2)
+        self.assertIs(ShardedSearch.current(), sharded)
+        self.assertEqual(len(sharded), len(PRODUCTS))
+        self.assertEqual(sharded.search(['azul'])['total'], 15)
+        expected = SearchIndex.build(CATEGORIES, PRODUCTS).search(['camiseta'], limit=8)
+        self.assertEqual(ids(sharded.search(['camiseta'], limit=8)), ids(expected))
+        with patch('controllers.core.SEARCH_MODE', 'sharded'):
+            response = TestClient(app).get('/search/suggest', params={'q': 'smartphone', 'limit': 1})
+        self.assertEqual(response.json()['suggestions'], ['smartphone'])
+
+        client = TestClient(app)
+        with patch('controllers.core.SEARCH_MODE', 'sharded'):
+            data = client.post('/search/text', json={'query': 'pantalón rojo', 'limit': 3, 'cache': False}).json()
+        self.assertEqual(data['total'], sharded.search(['pantalon', 'rojo'])['total'])
+        self.assertEqual(len(data['products']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
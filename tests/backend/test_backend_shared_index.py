@@ -0,0 +1,174 @@
+import errno
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+
+from main import app
+from db import Category, Product
+from services import CatalogRefresher, SearchFilters, SearchIndex, SharedIndex, SuggestIndex
+
+
+CATEGORIES = [
+    Category(id=1, name='Camisetas'),
+    Category(id=2, name='Pantalones'),
+    Category(id=3, name='Teléfonos'),
+]
+
+WORDS = [f'w{i}' for i in range(80)] + ['camiseta', 'pantalon', 'azul', 'movil']
+
+
+def random_products(count, seed=7, categories=(1, 2, 3, None)):
+    rng = random.Random(seed)
+    return [
+        Product(
+            id=pid,
+            name=' '.join(rng.choices(WORDS, k=3)),
+            description=' '.join(rng.choices(WORDS, k=6)),
+            price=round(rng.random() * 300, 2),
+            category_id=rng.choice(categories),
+        )
+        for pid in sorted(rng.sample(range(1, 5000), count))
+    ]
+
+
+def fingerprint(products):
+    return {'watermark': None, 'rows': len(products), 'categories': [[c.id, c.name] for c in CATEGORIES]}
+
+
+class TestSharedIndexSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.products = random_products(400)
+        cls.index = SearchIndex.build(CATEGORIES, cls.products)
+        path = SharedIndex.write(cls.directory, CATEGORIES, cls.products, fingerprint(cls.products))
+        cls.shared = SharedIndex.attach(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_matches_search_index(self):
+        rng = random.Random(1)
+        for _ in range(150):
+            tokens = rng.choices(WORDS, k=rng.randint(0, 3))
+            filters = SearchFilters(
+                rng.choice([None, 20.0]), rng.choice([None, 150.0]), rng.choice([(), (1,), (2, 3)]),
+                rng.choice(['relevance', 'price_asc', 'price_desc']), rng.random() < 0.3,
+            ) if rng.random() < 0.5 else None
+            limit, offset = rng.choice([None, 5, 20]), rng.choice([0, 3])
+            self.assertEqual(self.shared.search(tokens, limit, offset, filters=filters),
+                             self.index.search(tokens, limit, offset, filters=filters))
+
+    def test_fuzzy_corrections(self):
+        for tokens in (['camisetx'], ['pantalom', 'azul']):
+            self.assertEqual(self.shared.search(tokens, 10, fuzzy=True), self.index.search(tokens, 10, fuzzy=True))
+
+    def test_vocabulary_is_stored_with_the_version(self):
+        """El índice de trigramas se escribe con la versión: la primera corrección no lo construye."""
+        with patch('services.trigram_index.TrigramArrays.from_terms') as build:
+            attached = SharedIndex.attach(os.path.join(self.directory, self.shared.name))
+            self.assertEqual(attached.search(['camisetx'], 10, fuzzy=True), self.index.search(['camisetx'], 10, fuzzy=True))
+        build.assert_not_called()
+        self.assertFalse(attached._vocabulary.arrays()['gram_terms'].flags.writeable)
+
+    def test_arrays_are_read_only_mappings(self):
+        self.assertEqual(len(self.shared), 400)
+        self.assertEqual(self.shared.product_ids(), {p.id for p in self.products})
+        with self.assertRaises(ValueError):
+            self.shared.facet_index().prices[0] = 1.0
+
+    def test_full_directory_leaves_no_partial_version(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with patch('services.shared_index.np.save', side_effect=OSError(errno.ENOSPC, 'No space left on device')):
+            with self.assertRaisesRegex(OSError, 'shm_size'):
+                SharedIndex.write(directory, CATEGORIES, self.products, fingerprint(self.products))
+        self.assertEqual(os.listdir(directory), [])
+
+    def test_suggester_is_stored_with_the_version(self):
+        """El autocompletado se escribe con la versión y cada worker solo lo proyecta."""
+        expected = SuggestIndex.from_search_index(self.index)
+        for prefix in ('w1', 'cam', 'w7 ', 'azul w'):
+            self.assertEqual(self.shared.suggester.suggest(prefix, 10), expected.suggest(prefix, 10), prefix)
+        self.assertFalse(self.shared.suggester.arrays()['ranks'].flags.writeable)
+
+
+class TestSharedIndexVersions(unittest.TestCase):
+    def setUp(self):
+        handle, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.engine = create_engine(f'sqlite:///{self.db_path}')
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            session.add_all([Category(**c.model_dump()) for c in CATEGORIES])
+            session.add_all([Product(**p.model_dump()) for p in random_products(50, categories=(1, 2, 3))])
+            session.commit()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        SharedIndex.reset()
+        self.engine.dispose()
+        os.remove(self.db_path)
+        shutil.rmtree(self.directory)
+
+    def test_second_worker_attaches_published_version(self):
+        with Session(self.engine) as session:
+            first = SharedIndex.initialize(session, self.directory)
+            SharedIndex.reset()
+            second = SharedIndex.initialize(session, self.directory)
+        self.assertEqual(second.name, first.name)
+        self.assertEqual(len([e for e in os.listdir(self.directory) if e[0].isdigit()]), 1)
+
+    def test_refresh_publishes_new_version(self):
+        with Session(self.engine) as session:
+            old = SharedIndex.initialize(session, self.directory)
+            self.assertEqual(SharedIndex.refresh(session), 0)
+            session.add(Product(id=9000, name='Camiseta dorada', description='', price=9.5, category_id=1))
+            session.commit()
+            self.assertEqual(CatalogRefresher.refresh(session), 1)
+        new = SharedIndex.current()
+        self.assertNotEqual(new.name, old.name)
+        self.assertEqual([p['id'] for p in new.search(['dorada'])['products']], [9000])
+        # Una petición en curso con la versión anterior sigue funcionando
+        self.assertEqual(old.search(['dorada'])['products'], [])
+        self.assertEqual(new.suggester.suggest('dorad'), ['dorada'])
+        self.assertEqual(old.suggester.suggest('dorad'), [])
+
+    def test_worker_adopts_version_published_by_another(self):
+        with Session(self.engine) as session:
+            old = SharedIndex.initialize(session, self.directory)
+        products = random_products(10, seed=3, categories=(1, 2, 3))
+        for _ in range(3):
+            path = SharedIndex.write(self.directory, CATEGORIES, products, fingerprint(products))
+            SharedIndex._publish(self.directory, os.path.basename(path))
+        with patch.object(SharedIndex, 'CHECK_INTERVAL', 0):
+            self.assertEqual(SharedIndex.current().name, os.path.basename(path))
+        self.assertEqual(len(SharedIndex.current()), 10)
+        # Las versiones antiguas se borran, pero la proyección anterior sigue siendo legible
+        self.assertFalse(os.path.exists(os.path.join(self.directory, old.name)))
+        self.assertEqual(old.search(['camiseta'])['total'], SearchIndex.build(
+            CATEGORIES, random_products(50, categories=(1, 2, 3))).search(['camiseta'])['total'])
+
+    def test_search_endpoint(self):
+        with Session(self.engine) as session:
+            SharedIndex.initialize(session, self.directory)
+        client = TestClient(app)
+        with patch('controllers.core.SEARCH_MODE', 'shared'):
+            data = client.post('/search/text', json={'query': 'camiseta', 'limit': 5, 'cache': False}).json()
+        expected = SearchIndex.build(CATEGORIES, random_products(50, categories=(1, 2, 3))).search(['camiseta'], 5)
+        self.assertEqual(data['products'], expected['products'])
+        with patch('controllers.core.SEARCH_MODE', 'shared'):
+            suggestions = client.get('/search/suggest', params={'q': 'camis'}).json()['suggestions']
+        self.assertEqual(suggestions, SharedIndex.current().suggester.suggest('camis'))
+        self.assertIn('camiseta', suggestions)
+
+
+if __name__ == '__main__':
+    unittest.main()
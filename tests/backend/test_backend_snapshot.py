@@ -0,0 +1,155 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from sqlmodel import Session, SQLModel, create_engine
+
+import main
+import snapshot
+from db import CatalogQueries, Category, Product
+from services import (
+    CatalogCache, CatalogRefresher, CatalogVersion, ProductStore, SearchIndex, SharedIndex, SuggestIndex
+)
+from services.facet_index import SearchFilters
+
+
+CATEGORIES = [
+    Category(id=1, name='Camisetas'),
+    Category(id=2, name='Pantalones'),
+]
+
+PRODUCTS = [
+    Product(id=pid, name=f'{"Camiseta" if pid % 2 else "Pantalón"} modelo {pid}',
+            description='', price=float(pid), category_id=1 if pid % 2 else 2)
+    for pid in range(1, 31)
+]
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        handle, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.url = f'sqlite:///{self.db_path}'
+        self.engine = create_engine(self.url)
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            session.add_all([Category(**c.model_dump()) for c in CATEGORIES])
+            session.add_all([Product(**p.model_dump()) for p in PRODUCTS])
+            session.commit()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        CatalogRefresher.stop()
+        CatalogCache.stop()
+        for service in (CatalogVersion, SearchIndex, SuggestIndex, CatalogCache, SharedIndex):
+            service.reset()
+        self.engine.dispose()
+        os.remove(self.db_path)
+        shutil.rmtree(self.directory)
+
+    def run_cli(self, *args):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            code = snapshot.main([*args, '--dir', self.directory, '--db-url', self.url])
+        return code, output.getvalue()
+
+    def test_export_and_status(self):
+        self.assertEqual(self.run_cli('status')[0], 1)
+        code, output = self.run_cli('export')
+        self.assertEqual(code, 0)
+        self.assertIn('Exportada', output)
+        self.assertIn('Al día', self.run_cli('export')[1])
+        code, output = self.run_cli('status')
+        self.assertEqual(code, 0)
+        self.assertIn('30 productos', output)
+
+    def test_force_writes_new_version(self):
+        self.run_cli('export')
+        first = SharedIndex.published(self.directory).name
+        self.assertIn('Exportada', self.run_cli('export', '--force')[1])
+        self.assertNotEqual(SharedIndex.published(self.directory).name, first)
+
+    def test_startup_attaches_fresh_snapshot_without_reading_catalog(self):
+        self.run_cli('export')
+        with Session(self.engine) as session, patch.object(SharedIndex, '_build') as build:
+            index = SharedIndex.initialize(session, self.directory)
+        build.assert_not_called()
+        self.assertIs(SharedIndex.current(), index)
+        expected = SearchIndex.build(CATEGORIES, PRODUCTS).search(['camiseta'], 5)
+        self.assertEqual(index.search(['camiseta'], 5), expected)
+
+    def test_stale_snapshot_is_rebuilt_from_database(self):
+        self.run_cli('export')
+        with Session(self.engine) as session:
+            session.add(Product(id=100, name='Camiseta dorada', description='', price=9.5, category_id=1))
+            session.commit()
+        code, output = self.run_cli('status')
+        self.assertEqual(code, 1)
+        self.assertIn('Desactualizada', output)
+        with Session(self.engine) as session:
+            index = SharedIndex.initialize(session, self.directory)
+        self.assertEqual([p['id'] for p in index.search(['dorada'])['products']], [100])
+        self.assertEqual(self.run_cli('status')[0], 0)
+
+    def test_snapshot_with_other_format_is_rebuilt(self):
+        self.run_cli('export')
+        old = SharedIndex.published(self.directory).name
+        meta_path = os.path.join(self.directory, old, 'meta.json')
+        with open(meta_path) as handle:
+            meta = json.load(handle)
+        with open(meta_path, 'w') as handle:
+            json.dump({**meta, 'format': SharedIndex.FORMAT + 1}, handle)
+        self.assertIsNone(SharedIndex.published(self.directory))
+        with Session(self.engine) as session:
+            index = SharedIndex.initialize(session, self.directory)
+        self.assertNotEqual(index.name, old)
+        self.assertEqual(len(index), len(PRODUCTS))
+
+    def load_catalog(self):
+        """Arranca el modo `index` (ver `main.load_catalog`) con la instantánea en el directorio del test."""
+        with patch('db.DatabaseRegistry.session', side_effect=lambda: Session(self.engine)), \
+                patch.object(SharedIndex, 'DIRECTORY', self.directory), \
+                patch.object(CatalogQueries, 'index_products', wraps=CatalogQueries.index_products) as reads:
+            main.load_catalog()
+        return reads.call_count
+
+    def test_index_mode_loads_fresh_snapshot_without_reading_catalog(self):
+        with Session(self.engine) as session:
+            session.add(Product(id=31, name='Calcetines', description=None, price=3.0, category_id=2))
+            session.commit()
+        self.run_cli('export')
+        self.assertEqual(self.load_catalog(), 0)
+        with Session(self.engine) as session:
+            products = session.exec(CatalogQueries.index_products()).all()
+        self.assertEqual(list(CatalogCache.current().products.values()), list(ProductStore(products).values()))
+        expected = SearchIndex.build(CATEGORIES, products)
+        filters = SearchFilters(max_price=20, sort='price_desc', facets=True)
+        for tokens, kwargs in ((['camiseta'], {}), (['modelo'], {'filters': filters}), ([], {'filters': filters})):
+            self.assertEqual(SearchIndex.current().search(tokens, 5, **kwargs), expected.search(tokens, 5, **kwargs))
+        self.assertEqual(SuggestIndex.current().suggest('mod'), SuggestIndex.from_search_index(expected).suggest('mod'))
+
+        # El índice leído de la instantánea admite el refresco incremental como uno construido desde la base de datos
+        with Session(self.engine) as session:
+            session.add(Product(id=100, name='Camiseta dorada', description='', price=9.5, category_id=1))
+            session.commit()
+            self.assertEqual(CatalogRefresher.refresh(session), 1)
+        self.assertEqual([p['id'] for p in SearchIndex.current().search(['dorada'], filters=filters)['products']], [100])
+        self.assertIn(100, CatalogCache.current().products)
+        self.assertEqual(SuggestIndex.current().suggest('camiseta d'), ['camiseta dorada'])
+
+    def test_index_mode_reads_catalog_when_snapshot_is_stale(self):
+        self.run_cli('export')
+        with Session(self.engine) as session:
+            session.add(Product(id=100, name='Camiseta dorada', description='', price=9.5, category_id=1))
+            session.commit()
+        self.assertEqual(self.load_catalog(), 1)
+        self.assertEqual([p['id'] for p in SearchIndex.current().search(['dorada'])['products']], [100])
+
+
+if __name__ == '__main__':
+    unittest.main()
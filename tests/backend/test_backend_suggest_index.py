@@ -0,0 +1,115 @@
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+from fastapi.testclient import TestClient
+
+from main import app
+from db import Category, Product
+from services import CatalogVersion, SearchIndex, SuggestIndex
+
+
+class TestSuggestIndex(unittest.TestCase):
+    def setUp(self):
+        self.search_index = SearchIndex.build(
+            [Category(id=1, name='Camisetas'), Category(id=4, name='Zapatos')],
+            [
+                Product(id=1, name='Camiseta deportiva azul', description='Camiseta de color azul', price=19.99, category_id=1),
+                Product(id=2, name='Camiseta blanca básica', description='Camiseta de algodón', price=15.99, category_id=1),
+                Product(id=3, name='Zapatos de vestir negros', description='Zapatos de piel', price=89.99, category_id=4),
+            ],
+        )
+        self.index = SuggestIndex.from_search_index(self.search_index)
+
+    def tearDown(self):
+        SearchIndex.reset()
+        SuggestIndex.reset()
+
+    def test_prefix_ordered_by_frequency(self):
+        """Los términos más frecuentes aparecen primero."""
+        suggestions = self.index.suggest('cam')
+        self.assertEqual(suggestions[0], 'camiseta')
+        self.assertIn('camiseta deportiva azul', suggestions)
+        self.assertIn('camisa', suggestions)
+
+    def test_short_prefix_uses_precomputed_lists(self):
+        self.assertEqual(self.index.suggest('c', limit=1), ['camiseta'])
+        self.assertEqual(self.index.suggest('Z', limit=1), ['zapato'])
+
+    def test_prefix_is_normalized(self):
+        self.assertEqual(self.index.suggest('BÁSI'), ['basica'])
+        self.assertEqual(self.index.suggest('zapatos de '), ['zapatos de vestir negros'])
+
+    def test_no_suggestions(self):
+        self.assertEqual(self.index.suggest('xyz'), [])
+        self.assertEqual(self.index.suggest('   '), [])
+
+    def test_long_prefixes_are_bounded(self):
+        """Ningún prefijo recorre más de SCAN_LIMIT completados: los que abarcan más están precalculados."""
+        frequencies = {f'camiseta modelo {i:04d}': i % 7 + 1 for i in range(2000)}
+        frequencies.update({f'camisa {i:03d}': 1 for i in range(300)})
+        with patch.object(SuggestIndex, 'SCAN_LIMIT', 50):
+            index = SuggestIndex.from_frequencies(frequencies)
+
+        def expected(prefix, limit):
+            keys = sorted((k for k in frequencies if k.startswith(prefix)), key=lambda k: (-frequencies[k], len(k), k))
+            return keys[:limit]
+
+        for prefix in ['c', 'cami', 'camiseta modelo', 'camiseta modelo 1', 'camiseta modelo 19', 'camisa 2', 'camisa 29']:
+            self.assertEqual(index.suggest(prefix, 20), expected(prefix, 20), prefix)
+            self.assertEqual(index.suggest(prefix, 3), expected(prefix, 3), prefix)
+        with patch.object(SuggestIndex, '_scan', side_effect=AssertionError('rango recorrido')):
+            index.suggest('camiseta modelo', 20)
+
+    def test_updated_matches_rebuilt_index(self):
+        """Aplicar los completados cambiados da los mismos arrays que reconstruir el índice."""
+        rng = random.Random(5)
+        words = ['camiseta', 'camisa', 'cami', 'zapato', 'zapatilla', 'azul', 'niño', 'straße', 'ca', 'z']
+
+        def product(pid):
+            return Product(id=pid, name=' '.join(rng.choices(words, k=rng.randint(1, 3))),
+                           description=' '.join(rng.choices(words + [f'w{rng.randint(0, 30)}'], k=rng.randint(0, 4))),
+                           price=1.0, category_id=1)
+
+        with patch.object(SuggestIndex, 'SCAN_LIMIT', 8), patch.object(SuggestIndex, 'MAX_LIMIT', 5):
+            search_index = SearchIndex.build([], [product(pid) for pid in range(150)])
+            index = SuggestIndex.from_search_index(search_index)
+            for _ in range(30):
+                for pid in rng.sample(range(200), rng.randint(1, 20)):
+                    if rng.random() < 0.3:
+                        search_index.remove_product(pid)
+                    else:
+                        search_index.add_product(product(pid))
+                index = index.updated(search_index)
+                expected = SuggestIndex.from_search_index(search_index).arrays()
+                for name, array in index.arrays().items():
+                    self.assertTrue(np.array_equal(array, expected[name]), name)
+            self.assertIs(index.updated(search_index), index)
+
+    def test_current_is_built_off_the_request_path(self):
+        """Las peticiones solo leen el índice publicado; lo reconstruye el refresco tras aplicar cambios."""
+        SearchIndex._current = self.search_index
+        first = SuggestIndex.rebuild(self.search_index)
+        self.assertIs(SuggestIndex.current(), first)
+        self.search_index.add_product(Product(id=4, name='Mochila urbana', price=39.99, category_id=4))
+        CatalogVersion.bump()
+        self.assertIs(SuggestIndex.current(), first)
+        self.assertEqual(SuggestIndex.rebuild(self.search_index).suggest('moch', limit=1), ['mochila'])
+
+    def test_endpoint_without_database(self):
+        SuggestIndex.rebuild(self.search_index)
+        client = TestClient(app)
+        with patch('db.DatabaseRegistry.session', MagicMock(side_effect=Exception('DB no disponible'))):
+            response = client.get('/search/suggest', params={'q': 'zap', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'query': 'zap', 'suggestions': ['zapato', 'zapatos']})
+        self.assertEqual(client.get('/search/suggest', params={'q': 'zap', 'limit': 100}).status_code, 422)
+
+    def test_endpoint_before_index_is_built(self):
+        SuggestIndex.reset()
+        response = TestClient(app).get('/search/suggest', params={'q': 'zap'})
+        self.assertEqual(response.json(), {'query': 'zap', 'suggestions': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import random
+
+from services.trigram_index import TrigramArrays, TrigramIndex, trigrams
+
+
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TrigramIndex()
+        for term in ['zapatilla', 'zapato', 'portatil', 'pantalon', 'camiseta']:
+            self.index.add_term(term)
+
+    def test_trigrams_are_padded(self):
+        self.assertEqual(trigrams('sol'), {'  s', ' so', 'sol', 'ol '})
+
+    def test_similar_terms(self):
+        """Las erratas habituales encuentran el término correcto."""
+        self.assertEqual(self.index.similar('zapatila', limit=1)[0][0], 'zapatilla')
+        self.assertEqual(self.index.similar('portatl')[0][0], 'portatil')
+        self.assertEqual(self.index.similar('pantalom')[0][0], 'pantalon')
+
+    def test_similar_respects_threshold_and_limit(self):
+        self.assertEqual(self.index.similar('xyz'), [])
+        self.assertEqual(len(self.index.similar('zapatila', threshold=0.1, limit=1)), 1)
+
+    def test_exact_term_has_full_similarity(self):
+        self.assertEqual(self.index.similar('zapato')[0], ('zapato', 1.0))
+
+    def test_add_and_remove_term(self):
+        self.index.add_term('zapato')
+        self.assertEqual(len(self.index), 5)
+        self.index.remove_term('zapatilla')
+        self.index.remove_term('inexistente')
+        self.assertNotIn('zapatilla', self.index)
+        self.assertEqual(self.index.similar('zapatila', limit=1)[0][0], 'zapato')
+
+
+class TestTrigramArrays(unittest.TestCase):
+    def test_matches_trigram_index(self):
+        rng = random.Random(3)
+        terms = {''.join(rng.choices('aeioucmnprstlz', k=rng.randint(2, 9))) for _ in range(300)}
+        terms.update(['zapatilla', 'zapato', 'camion', 'niño'])
+        index = TrigramIndex()
+        for term in terms:
+            index.add_term(term)
+        arrays = TrigramArrays.from_terms(terms)
+        self.assertEqual(len(arrays), len(index))
+        for query in ['zapatila', 'camon', 'nino', 'xyz', 'a'] + rng.sample(sorted(terms), 30):
+            for threshold, limit in ((0.55, 2), (0.2, 10)):
+                self.assertEqual(arrays.similar(query, threshold, limit), index.similar(query, threshold, limit), query)
+
+    def test_empty_vocabulary(self):
+        self.assertEqual(TrigramArrays.from_terms([]).similar('zapato'), [])
+
+    def test_arrays_roundtrip(self):
+        arrays = TrigramArrays.from_terms(['zapato', 'zapatilla'])
+        self.assertEqual(set(arrays.arrays()), set(TrigramArrays.ARRAYS))
+        self.assertEqual(TrigramArrays(arrays.arrays()).similar('zapatila', limit=1)[0][0], 'zapatilla')
+
+
+if __name__ == '__main__':
+    unittest.main()